@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 
 from akagi_ng.application import AkagiApp
@@ -11,4 +12,6 @@ def main() -> int:
 
 
 if __name__ == "__main__":
+    # 打包后的可执行文件需要支持推理子进程（spawn）
+    multiprocessing.freeze_support()
     sys.exit(main())
@@ -4,9 +4,11 @@ import queue
 import signal
 import threading
 import time
+from concurrent.futures import Future
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
-from akagi_ng.core import AppContext, NotificationHandler, get_app_context, set_app_context
+from akagi_ng.core import AppContext, NotificationHandler, encode_event, get_app_context, set_app_context
 from akagi_ng.core.constants import ServerConstants
 from akagi_ng.core.logging import configure_logging, logger
 from akagi_ng.dataserver import DataServer
@@ -15,6 +17,9 @@ from akagi_ng.mitm_client import MitmClient
 from akagi_ng.mjai_bot import Controller, StateTrackerBot
 from akagi_ng.settings import local_settings as loaded_settings
 
+if TYPE_CHECKING:
+    from akagi_ng.mjai_bot.engine import InferenceExecutor
+
 logger = logger.bind(module="akagi")
 
 
@@ -35,6 +40,8 @@ class AkagiApp:
         self._autoplay_seq = 0
         self._game_activity_seq = 0
         self._pending_autoplay: _PendingAutoplay | None = None
+        self._held_message: dict | None = None  # 收集同步事件时取出的非 MJAI 消息，留给下一轮处理
+        self.executor: InferenceExecutor | None = None
 
     def initialize(self):
         import importlib
@@ -58,7 +65,8 @@ class AkagiApp:
             importlib.import_module("akagi_ng.core.lib_loader")
             from akagi_ng.mjai_bot import Controller, StateTrackerBot
 
-            mjai_bot, mjai_controller = StateTrackerBot(), Controller()
+            mjai_bot = StateTrackerBot()
+            mjai_controller = Controller(game_state=mjai_bot.state)
             logger.info("Bot components loaded successfully.")
         except ImportError as e:
             logger.error(f"Failed to load bot components or native library: {e}")
@@ -109,6 +117,28 @@ class AkagiApp:
 
         set_app_context(app_context)
 
+        # 决策在专用推理线程中执行；需在预加载之前启动，以便 torch 线程配置先于任何推理生效
+        if mjai_controller:
+            try:
+                from akagi_ng.mjai_bot.engine import inference_executor
+
+                inference_executor.start(
+                    num_threads=settings.model_config.num_threads,
+                    num_interop_threads=settings.model_config.num_interop_threads,
+                )
+                self.executor = inference_executor
+            except Exception as e:
+                logger.warning(f"Failed to start inference executor, decisions will run on the main loop: {e}")
+
+        # 在后台预加载本地模型，避免首个决策承担模型加载与预热的开销
+        if mjai_controller:
+            try:
+                from akagi_ng.mjai_bot.engine import engine_preloader
+
+                engine_preloader.start()
+            except Exception as e:
+                logger.warning(f"Failed to start model preload: {e}")
+
     def start(self):
         self.ds.start()
         logger.info(f"DataServer started at {self.frontend_url}")
@@ -192,6 +222,39 @@ class AkagiApp:
         if flags:
             batch_notifications.extend(NotificationHandler.from_flags(flags))
 
+    def _process_sync_burst(
+        self,
+        mjai_msgs: list[dict],
+        bot: StateTrackerBot | None,
+        controller: Controller | None,
+    ) -> tuple[list[dict], list[dict]]:
+        """
+        整批回放重连 / 进入对局时的同步事件
+        StateTrackerBot 与 Controller 各处理一次整批事件，只对最后一个事件计算动作，通知也只采集一次
+        """
+        mjai_responses: list[dict] = []
+        batch_notifications: list[dict] = []
+        events = [encode_event(msg) for msg in mjai_msgs]
+
+        self._game_activity_seq += 1
+        self._pending_autoplay = None
+
+        try:
+            if bot:
+                bot.react_batch(events)
+                if flags := getattr(bot, "notification_flags", {}):
+                    batch_notifications.extend(NotificationHandler.from_flags(flags))
+
+            if controller and (resp := controller.react_batch(events)):
+                mjai_responses.append(resp)
+                if flags := getattr(controller, "notification_flags", {}):
+                    batch_notifications.extend(NotificationHandler.from_flags(flags))
+
+        except Exception:
+            logger.exception(f"Unexpected error replaying {len(events)} sync events")
+
+        return mjai_responses, batch_notifications
+
     def _process_message_batch(
         self,
         mjai_msgs: list[dict],
@@ -201,14 +264,17 @@ class AkagiApp:
         """
         处理一批 MJAI 消息
 
-        注意: Controller 必须在 Bot 更新状态之前响应
-        Controller 基于当前状态做决策，如果 Bot 先更新状态
-        Controller 将基于"未来"状态而非当前事件做出响应
+        注意: StateTrackerBot 必须在 Controller 响应之前更新状态
+        事件只由 StateTrackerBot 应用到共享的 GameState 一次，Controller 加载的 Bot 读取同一状态做决策
         """
+        if len(mjai_msgs) > 1 and mjai_msgs[0].get("sync", False):
+            return self._process_sync_burst(mjai_msgs, bot, controller)
+
         mjai_responses: list[dict] = []
         batch_notifications: list[dict] = []
 
-        for msg in mjai_msgs:
+        # 已在 Bridge 输出处编码的事件原样复用，其他来源的事件在此包装一次
+        for msg in map(encode_event, mjai_msgs):
             try:
                 # 0. 处理系统关闭消息
                 if self._handle_system_shutdown(msg):
@@ -222,7 +288,10 @@ class AkagiApp:
                 self._game_activity_seq += 1
                 self._pending_autoplay = None
 
-                # 2. Controller response (decision)
+                # 2. Update state tracker bot (shared game state)
+                self._update_bot_state(msg, bot, batch_notifications)
+
+                # 3. Controller response (decision)
                 resp = None
                 if controller:
                     resp = controller.react(msg)
@@ -232,9 +301,6 @@ class AkagiApp:
                         if flags:
                             batch_notifications.extend(NotificationHandler.from_flags(flags))
 
-                # 3. Update state tracker bot
-                self._update_bot_state(msg, bot, batch_notifications)
-
             except (ValueError, KeyError, TypeError) as e:
                 logger.error(f"Invalid MJAI message format: {msg}, error: {e}")
             except Exception:
@@ -249,11 +315,31 @@ class AkagiApp:
 
         这是事件驱动的 INPUT 阶段
         """
+        if self._held_message is not None:
+            msg, self._held_message = self._held_message, None
+            return msg
         try:
             return self.message_queue.get(block=True, timeout=timeout)
         except queue.Empty:
             return None
 
+    def _collect_sync_burst(self, first: dict) -> list[dict]:
+        """
+        收集同一次 syncGame / enterGame 产生的连续同步事件
+        连同其后第一个非同步 MJAI 事件一起作为一批回放；遇到系统消息时留给下一轮处理
+        """
+        burst = [first]
+        while burst[-1].get("sync", False):
+            try:
+                msg = self.message_queue.get(block=True, timeout=ServerConstants.SYNC_BURST_GAP_SECONDS)
+            except queue.Empty:
+                break
+            if msg.get("type") in ("system_event", "system_shutdown"):
+                self._held_message = msg
+                break
+            burst.append(msg)
+        return burst
+
     def _process_events(
         self, mjai_msgs: list[dict], bot: StateTrackerBot | None, controller: Controller | None
     ) -> dict:
@@ -270,9 +356,29 @@ class AkagiApp:
         return {
             "mjai_responses": mjai_responses,
             "batch_notifications": batch_notifications,
-            "is_sync": any(msg.get("sync", False) for msg in mjai_msgs),
+            # 同步批次以最后一个事件为准：回放结束后的第一个实时事件需要展示推荐
+            "is_sync": mjai_msgs[-1].get("sync", False),
         }
 
+    def _dispatch_events(
+        self, mjai_msgs: list[dict], bot: StateTrackerBot | None, controller: Controller | None
+    ) -> dict | None:
+        """
+        将事件处理提交到推理执行器并等待结果。
+        等待期间仍响应停止信号；停止时返回 None 放弃本批输出。
+        """
+        if not self.executor:
+            return self._process_events(mjai_msgs, bot, controller)
+
+        future: Future[dict] = self.executor.submit(self._process_events, mjai_msgs, bot, controller)
+        while True:
+            try:
+                return future.result(timeout=ServerConstants.MAIN_LOOP_POLL_TIMEOUT_SECONDS)
+            except TimeoutError:
+                if self._stop_event.is_set():
+                    logger.warning("Stop requested while a decision was in progress, dropping its output.")
+                    return None
+
     def _estimate_autoplay_steps_duration_seconds(self, steps: list[dict[str, object]]) -> float:
         delay_ms = 0
         click_n = 0
@@ -323,9 +429,9 @@ class AkagiApp:
         batch_notifications = result["batch_notifications"]
         is_sync = result.get("is_sync", False)
 
-        # 1. Payload：使用最后一个有效响应
+        # 1. Payload：使用最后一个有效响应；同步期间不展示推荐，无需构建
         last_response = mjai_responses[-1] if mjai_responses else {}
-        payload = build_dataserver_payload(last_response, bot)
+        payload = None if is_sync else build_dataserver_payload(last_response, bot)
 
         # 2. Notifications: 从各种来源收集通知
         all_notifications = batch_notifications.copy()
@@ -387,12 +493,14 @@ class AkagiApp:
                     self._check_autoplay_retry()
                     continue
 
-                # 将单个消息包装为列表以兼容现有处理逻辑
-                mjai_msgs = [msg]
+                # 重连 / 进入对局时的同步事件整批回放，其余消息逐条处理
+                mjai_msgs = self._collect_sync_burst(msg) if msg.get("sync", False) else [msg]
 
                 try:
-                    # 阶段 2：PROCESS - 处理事件
-                    result = self._process_events(mjai_msgs, bot, controller)
+                    # 阶段 2：PROCESS - 在推理线程中处理事件，主循环只等待结果
+                    result = self._dispatch_events(mjai_msgs, bot, controller)
+                    if result is None:
+                        continue
 
                     # 阶段 3：OUTPUT - 分发结果
                     self._emit_outputs(result, bot)
@@ -406,6 +514,16 @@ class AkagiApp:
 
         return 0
 
+    def _stop_executor(self):
+        """停止推理执行器（不等待进行中的决策）"""
+        if not self.executor:
+            return
+        try:
+            logger.info("Stopping inference executor...")
+            self.executor.shutdown(wait=False)
+        except Exception as e:
+            logger.error(f"Error stopping inference executor: {e}")
+
     def cleanup(self):
         """清理资源并记录详细的关闭日志"""
         logger.info("Stopping Akagi-NG...")
@@ -435,6 +553,8 @@ class AkagiApp:
             except Exception as e:
                 logger.error(f"Error stopping Electron client: {e}")
 
+        self._stop_executor()
+
         # 停止 DataServer
         if self.ds:
             try:
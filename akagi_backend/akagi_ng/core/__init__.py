@@ -1,15 +1,18 @@
 from akagi_ng.core import context, paths
 from akagi_ng.core.context import AppContext, get_app_context, set_app_context
 from akagi_ng.core.logging import configure_logging, logger
+from akagi_ng.core.mjai_event import EncodedEvent, encode_event
 from akagi_ng.core.notification_codes import NotificationCode
 from akagi_ng.core.notification_handler import NotificationHandler
 
 __all__ = [
     "AppContext",
+    "EncodedEvent",
     "NotificationCode",
     "NotificationHandler",
     "configure_logging",
     "context",
+    "encode_event",
     "get_app_context",
     "logger",
     "paths",
@@ -59,3 +59,4 @@ class ServerConstants:
     MESSAGE_QUEUE_MAXSIZE = 1000  # 核心/客户端消息队列最大大小
     SHUTDOWN_JOIN_TIMEOUT_SECONDS = 2.0  # 线程退出等待时间
     MAIN_LOOP_POLL_TIMEOUT_SECONDS = 0.1  # 主循环轮询超时时间
+    SYNC_BURST_GAP_SECONDS = 0.05  # 批量回放同步事件时等待后续事件的最长间隔
@@ -0,0 +1,59 @@
+import json
+from typing import Any
+
+
+class EncodedEvent(dict):
+    """
+    携带紧凑 JSON 编码的 MJAI 事件。
+    在 Bridge 输出处包装一次，Controller / MortalBot / StateTrackerBot 及 libriichi 共用同一份编码，
+    不再各自 json.dumps。编码在首次访问 .json 时生成并缓存，修改事件内容会使缓存失效。
+    """
+
+    __slots__ = ("_json",)
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._json: str | None = None
+
+    @property
+    def json(self) -> str:
+        if self._json is None:
+            self._json = json.dumps(self, separators=(",", ":"))
+        return self._json
+
+    def __setitem__(self, key: str, value: object):
+        self._json = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: str):
+        self._json = None
+        super().__delitem__(key)
+
+    def update(self, *args: Any, **kwargs: Any):
+        self._json = None
+        super().update(*args, **kwargs)
+
+    def pop(self, *args: object) -> object:
+        self._json = None
+        return super().pop(*args)
+
+    def setdefault(self, key: str, default: object = None) -> object:
+        self._json = None
+        return super().setdefault(key, default)
+
+    def popitem(self) -> tuple[str, object]:
+        self._json = None
+        return super().popitem()
+
+    def clear(self):
+        self._json = None
+        super().clear()
+
+    def __ior__(self, other: object) -> "EncodedEvent":
+        self._json = None
+        return super().__ior__(other)
+
+
+def encode_event(event: dict) -> EncodedEvent:
+    """将事件包装为 EncodedEvent；已包装的事件原样返回"""
+    return event if isinstance(event, EncodedEvent) else EncodedEvent(event)
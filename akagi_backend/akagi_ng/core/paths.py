@@ -47,6 +47,10 @@ def get_logs_dir() -> Path:
     return get_runtime_root() / "logs"
 
 
+def get_cache_dir() -> Path:
+    return get_runtime_root() / "cache"
+
+
 def ensure_dir(path: Path) -> Path:
     path.mkdir(parents=True, exist_ok=True)
     return path
@@ -242,6 +242,7 @@ def build_dataserver_payload(mjai_response: dict[str, object], bot: StateTracker
             "engine_type": meta.get("engine_type"),
             "is_fallback": meta.get("is_fallback"),
             "circuit_open": meta.get("circuit_open"),
+            "circuit_state": meta.get("circuit_state"),
         }
 
     except Exception as e:
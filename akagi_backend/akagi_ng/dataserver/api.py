@@ -1,5 +1,6 @@
 import json
 from collections.abc import Callable
+from pathlib import Path
 
 from aiohttp import web
 
@@ -45,6 +46,33 @@ async def cors_middleware(request: web.Request, handler: Callable[[web.Request],
     return response
 
 
+# 单次请求最多采集的决策数
+MAX_PROFILE_DECISIONS = 100
+
+# 仅在加载引擎时生效、修改后需要重启的 model_config 字段
+_RESTART_MODEL_CONFIG_KEYS = (
+    "device",
+    "fused_inference",
+    "precision",
+    "batch_window_ms",
+    "max_batch_size",
+    "q_cache_mb",
+    "num_threads",
+    "num_interop_threads",
+    "inference_process",
+    "ensemble_4p",
+    "ensemble_3p",
+    "ensemble_aggregation",
+    "ensemble_weights",
+)
+
+
+def _model_config_changed(payload: dict, old_settings: dict) -> bool:
+    new_model_config = payload.get("model_config", {})
+    old_model_config = old_settings.get("model_config", {})
+    return any(new_model_config.get(key) != old_model_config.get(key) for key in _RESTART_MODEL_CONFIG_KEYS)
+
+
 def _json_response(data: dict, status: int = 200) -> web.Response:
     """Helper to create JSON response with ensure_ascii=False."""
     return web.json_response(
@@ -87,7 +115,7 @@ async def save_settings_handler(request: web.Request) -> web.Response:
         or payload.get("mitm") != old_settings.get("mitm")
         or payload.get("server") != old_settings.get("server")
         or payload.get("ot") != old_settings.get("ot")
-        or payload.get("model_config", {}).get("device") != old_settings.get("model_config", {}).get("device")
+        or _model_config_changed(payload, old_settings)
         or payload.get("autoplay") != old_settings.get("autoplay")
     ):
         restart_required = True
@@ -113,6 +141,82 @@ async def get_models_handler(_request: web.Request) -> web.Response:
     return _json_response({"ok": True, "data": models})
 
 
+async def get_models_status_handler(_request: web.Request) -> web.Response:
+    """返回本地模型的预加载就绪状态"""
+    from akagi_ng.mjai_bot.engine import engine_preloader
+
+    return _json_response({"ok": True, "data": engine_preloader.get_status()})
+
+
+def _validate_activation(payload: object) -> tuple[str | None, int]:
+    """校验模型切换请求，返回 (错误信息, HTTP 状态码)"""
+    from akagi_ng.core.paths import get_models_dir
+
+    if not isinstance(payload, dict):
+        return "Payload must be a JSON object", 400
+    model = payload.get("model")
+    mode = payload.get("mode", "4p")
+    if mode not in ("4p", "3p"):
+        return f"Unknown mode: {mode}", 400
+    if not isinstance(model, str) or not model.endswith(".pth") or Path(model).name != model:
+        return "model must be a .pth file name", 400
+    if not (get_models_dir() / model).is_file():
+        return f"Model not found: {model}", 404
+    return None, 200
+
+
+async def activate_model_handler(request: web.Request) -> web.Response:
+    """在不重启后端的情况下切换本地模型：后台加载预热后在两次决策之间替换"""
+    from akagi_ng.mjai_bot.engine import model_activator
+
+    try:
+        payload = await request.json()
+    except Exception:
+        return _json_response({"ok": False, "error": "Invalid JSON"}, status=400)
+
+    error, status = _validate_activation(payload)
+    if error is not None:
+        return _json_response({"ok": False, "error": error}, status=status)
+
+    mode = payload.get("mode", "4p")
+    if not model_activator.activate(payload["model"], mode == "3p"):
+        return _json_response({"ok": False, "error": f"A {mode} model switch is already in progress"}, status=409)
+    return _json_response({"ok": True, "status": "loading"}, status=202)
+
+
+async def get_activation_status_handler(_request: web.Request) -> web.Response:
+    """返回模型热切换的进度"""
+    from akagi_ng.mjai_bot.engine import model_activator
+
+    return _json_response({"ok": True, "data": model_activator.get_status()})
+
+
+async def capture_profile_handler(request: web.Request) -> web.Response:
+    """采集接下来 K 次本地推理的 torch.profiler trace"""
+    from akagi_ng.mjai_bot.engine import decision_profiler
+
+    try:
+        payload = await request.json()
+    except Exception:
+        payload = {}
+
+    decisions = payload.get("decisions", 1) if isinstance(payload, dict) else None
+    if not isinstance(decisions, int) or isinstance(decisions, bool) or not 1 <= decisions <= MAX_PROFILE_DECISIONS:
+        return _json_response(
+            {"ok": False, "error": f"decisions must be an integer between 1 and {MAX_PROFILE_DECISIONS}"}, status=400
+        )
+
+    pending = decision_profiler.request(decisions)
+    return _json_response({"ok": True, "pending": pending}, status=202)
+
+
+async def get_profile_status_handler(_request: web.Request) -> web.Response:
+    """返回最近的决策性能采集摘要"""
+    from akagi_ng.mjai_bot.engine import decision_profiler
+
+    return _json_response({"ok": True, "data": decision_profiler.get_status()})
+
+
 async def ingest_mjai_handler(request: web.Request) -> web.Response:
     """接收 Electron 发送的 MJAI 消息"""
     try:
@@ -181,5 +285,10 @@ def setup_routes(app: web.Application):
     app.router.add_post("/api/settings", save_settings_handler)
     app.router.add_post("/api/settings/reset", reset_settings_handler)
     app.router.add_get("/api/models", get_models_handler)
+    app.router.add_get("/api/models/status", get_models_status_handler)
+    app.router.add_get("/api/models/activate", get_activation_status_handler)
+    app.router.add_post("/api/models/activate", activate_model_handler)
+    app.router.add_get("/api/profile", get_profile_status_handler)
+    app.router.add_post("/api/profile/capture", capture_profile_handler)
     app.router.add_post("/api/ingest", ingest_mjai_handler)
     app.router.add_post("/api/shutdown", shutdown_handler)
@@ -5,6 +5,7 @@ import json
 import queue
 
 from akagi_ng.bridge.majsoul.bridge import MajsoulBridge
+from akagi_ng.core.mjai_event import encode_event
 from akagi_ng.core.paths import ensure_dir, get_assets_dir
 from akagi_ng.electron_client.base import BaseElectronClient
 from akagi_ng.electron_client.logger import logger
@@ -136,7 +137,7 @@ class MajsoulElectronClient(BaseElectronClient):
             if mjai_messages:
                 logger.debug(f"[Majsoul] Decoded {len(mjai_messages)} MJAI messages")
                 for msg in mjai_messages:
-                    self.message_queue.put(msg)
+                    self.message_queue.put(encode_event(msg))
 
                     # Check for game end to trigger notification
                     if msg.get("type") == "end_game":
@@ -3,6 +3,7 @@ from __future__ import annotations
 import queue
 
 from akagi_ng.bridge.tenhou.bridge import TenhouBridge
+from akagi_ng.core.mjai_event import encode_event
 from akagi_ng.electron_client.base import BaseElectronClient
 from akagi_ng.electron_client.logger import logger
 
@@ -103,7 +104,7 @@ class TenhouElectronClient(BaseElectronClient):
             if mjai_messages:
                 logger.debug(f"[Tenhou] Decoded {len(mjai_messages)} MJAI messages")
                 for msg in mjai_messages:
-                    self.message_queue.put(msg)
+                    self.message_queue.put(encode_event(msg))
 
                     # Check for game end to trigger notification
                     if msg.get("type") == "end_game":
@@ -13,7 +13,7 @@ from akagi_ng.bridge import (
     RiichiCityBridge,
     TenhouBridge,
 )
-from akagi_ng.core import NotificationCode
+from akagi_ng.core import NotificationCode, encode_event
 from akagi_ng.core.constants import Platform
 from akagi_ng.mitm_client.logger import logger
 from akagi_ng.settings import local_settings
@@ -142,7 +142,7 @@ class BridgeAddon:
             if msgs:
                 for m in msgs:
                     try:
-                        self.mjai_messages.put(m, block=False)
+                        self.mjai_messages.put(encode_event(m), block=False)
                     except queue.Full:
                         logger.warning("[MITM] MJAI message queue is full, dropping message.")
 
@@ -1,4 +1,5 @@
 from akagi_ng.mjai_bot.bot import StateTrackerBot
 from akagi_ng.mjai_bot.controller import Controller
+from akagi_ng.mjai_bot.game_state import GameState
 
-__all__ = ["Controller", "StateTrackerBot"]
+__all__ = ["Controller", "GameState", "StateTrackerBot"]
@@ -1,12 +1,13 @@
 import json
 
 from mjai import Bot
-from mjai.bot.tools import calc_shanten
-from mjai.mlibriichi.state import PlayerState
+from mjai.mlibriichi.state import ActionCandidate, PlayerState
 
 from akagi_ng.core import NotificationCode
 from akagi_ng.core.constants import MahjongConstants
+from akagi_ng.mjai_bot.game_state import GameState
 from akagi_ng.mjai_bot.logger import logger
+from akagi_ng.mjai_bot.shanten import HandAnalysis, analyze_hand, tiles_to_counts
 from akagi_ng.mjai_bot.utils import make_error_response
 
 
@@ -14,16 +15,47 @@ class StateTrackerBot(Bot):
     """
     状态追踪 Bot，用于跟踪游戏状态。
     重写部分 mjai.Bot 方法以兼容 Akagi 应用。
+    状态保存在 GameState 中，并与 Controller 加载的 MortalBot 共用。
     """
 
     def __init__(self):
+        self.state = GameState()
         super().__init__()
-        self.is_3p = False
         self.meta = {}
         self.notification_flags = {}  # 系统状态通知标志
-        self.__discard_events = []
-        self.__call_events = []
-        self.__dora_indicators = []
+
+    # mjai.Bot 通过以下属性读取状态，统一转发到共享的 GameState
+    @property
+    def player_id(self) -> int:
+        return self.state.player_id
+
+    @player_id.setter
+    def player_id(self, value: int):
+        self.state.player_id = value
+
+    @property
+    def player_state(self) -> PlayerState:
+        return self.state.player_state
+
+    @player_state.setter
+    def player_state(self, value: PlayerState):
+        self.state.player_state = value
+
+    @property
+    def action_candidate(self) -> ActionCandidate | None:
+        return self.state.action_candidate
+
+    @action_candidate.setter
+    def action_candidate(self, value: ActionCandidate | None):
+        self.state.action_candidate = value
+
+    @property
+    def is_3p(self) -> bool:
+        return self.state.is_3p
+
+    @is_3p.setter
+    def is_3p(self, value: bool):
+        self.state.is_3p = value
 
     def think(self) -> str:
         """默认行为：自摸切"""
@@ -32,63 +64,51 @@ class StateTrackerBot(Bot):
             return self.action_discard(tile_str)
         return self.action_nothing()
 
+    def _decide(self) -> str:
+        # 立直后自动摸切（除非可以和牌/暗杠）
+        if self.self_riichi_accepted and not (self.can_agari or self.can_ankan) and self.can_discard:
+            return self.action_discard(self.last_self_tsumo)
+
+        return self.think()
+
     def react(self, event: dict) -> str:
-        try:
-            if not event:
-                raise ValueError("Empty event")
-
-            if event["type"] == "start_game":
-                self.player_id = event["id"]
-                self.player_state = PlayerState(self.player_id)
-                self.is_3p = False
-                self.__discard_events = []
-                self.__call_events = []
-                self.__dora_indicators = []
-            # 使用 Bridge 传递的 is_3p 字段判断游戏是四麻还是三麻对局
-            if event["type"] == "start_kyoku":
-                self.is_3p = event.get("is_3p")
-            if event["type"] == "start_kyoku" or event["type"] == "dora":
-                self.__dora_indicators.append(event["dora_marker"])
-            if event["type"] == "dahai":
-                self.__discard_events.append(event)
-            if event["type"] in [
-                "chi",
-                "pon",
-                "daiminkan",
-                "kakan",
-                "ankan",
-            ]:
-                self.__call_events.append(event)
-            # 三麻兼容：mjai.mlibriichi 状态追踪库不支持 nukidora，转换为 dahai 事件
-            if event["type"] == "nukidora":
-                logger.debug(f"Event: {event}")
-                replace_event = {
-                    "type": "dahai",
-                    "actor": event["actor"],
-                    "pai": "N",
-                    "tsumogiri": self.last_self_tsumo == "N" and event["actor"] == self.player_id,
-                }
-                self.__discard_events.append(replace_event)
-                self.action_candidate = self.player_state.update(json.dumps(replace_event))
-
-            else:
-                logger.debug(f"Event: {event}")
-                self.action_candidate = self.player_state.update(json.dumps(event))
-
-            # 立直后自动摸切（除非可以和牌/暗杠）
-            if self.self_riichi_accepted and not (self.can_agari or self.can_ankan) and self.can_discard:
-                return self.action_discard(self.last_self_tsumo)
-
-            return self.think()
+        return self.react_batch([event])
+
+    def react_batch(self, events: list[dict]) -> str:
+        """
+        依次用事件更新状态，只对最后一个事件计算动作。
+        用于重连 / 进入对局时批量回放同步事件；单个事件出错时记录日志并继续应用其余事件。
+        """
+        if not events:
+            self._log_exception(ValueError("Empty event"))
+            return self._error_response()
+
+        failed = False
+        for event in events:
+            try:
+                self.state.apply(event)
+            except BaseException as e:
+                failed = True
+                self._log_exception(e)
+        if failed:
+            return self._error_response()
 
+        try:
+            return self._decide()
         except BaseException as e:
-            logger.error(f"Exception: {e!s}")
-            logger.error("Brief info:")
-            logger.error(self.brief_info())
-            import traceback
+            self._log_exception(e)
+        return self._error_response()
 
-            logger.error(traceback.format_exc())
+    def _log_exception(self, e: BaseException):
+        logger.error(f"Exception: {e!s}")
+        logger.error("Brief info:")
+        logger.error(self.brief_info())
+        import traceback
 
+        logger.error(traceback.format_exc())
+
+    @staticmethod
+    def _error_response() -> str:
         return json.dumps(make_error_response(NotificationCode.STATE_TRACKER_ERROR), separators=(",", ":"))
 
     # ==========================================================
@@ -96,8 +116,6 @@ class StateTrackerBot(Bot):
 
     def find_daiminkan_candidates(self) -> list[dict]:
         """寻找大明杠候选"""
-        current_shanten = calc_shanten(self.tehai)
-
         candidates = []
 
         # 检查手牌中是否有 3 张与最后弃牌相同的牌
@@ -109,7 +127,7 @@ class StateTrackerBot(Bot):
 
         if len(matching_tiles) >= MahjongConstants.DAIMINKAN_CONSUMED:  # 大明杠需要3张
             consumed = matching_tiles[:3]
-            candidates.append(self.__new_kan_candidate(consumed, "daiminkan", current_shanten))
+            candidates.append(self.__new_kan_candidate(consumed, "daiminkan", self._analyze_hand()))
 
         return candidates
 
@@ -119,7 +137,7 @@ class StateTrackerBot(Bot):
 
         # 暗杠需要手牌中有 4 张相同的牌
         hand_tiles = self.tehai_mjai
-        current_shanten = calc_shanten(self.tehai)
+        current = None
         counts = {}
         for t in hand_tiles:
             base = t.replace("r", "")
@@ -130,7 +148,8 @@ class StateTrackerBot(Bot):
         for tiles in counts.values():
             if len(tiles) == MahjongConstants.ANKAN_TILES:
                 consumed = tiles
-                candidates.append(self.__new_kan_candidate(consumed, "ankan", current_shanten))
+                current = current or self._analyze_hand()
+                candidates.append(self.__new_kan_candidate(consumed, "ankan", current))
 
         return candidates
 
@@ -139,25 +158,34 @@ class StateTrackerBot(Bot):
         candidates = []
 
         # 加杠需要手牌中有一张与已有碰副相同的牌
-        events = [ev for ev in self.__call_events if ev.get("actor") == self.player_id]
+        events = [ev for ev in self.state.call_events if ev.get("actor") == self.player_id]
         pons = [ev for ev in events if ev["type"] == "pon"]
-        current_shanten = calc_shanten(self.tehai)
+        current = None
 
         hand_tiles = self.tehai_mjai
         for pon in pons:
             consumed_base = pon["consumed"][0].replace("r", "")
             matches = [t for t in hand_tiles if t.replace("r", "") == consumed_base]
             if matches:
-                candidates.append(self.__new_kan_candidate(matches[:1], "kakan", current_shanten))
+                current = current or self._analyze_hand()
+                candidates.append(self.__new_kan_candidate(matches[:1], "kakan", current))
 
         return candidates
 
-    def __new_kan_candidate(self, consumed: list[str], kan_type: str, current_shanten: int = 0) -> dict:
+    def _analyze_hand(self, tiles: list[str] | None = None) -> HandAnalysis:
+        """计算手牌（缺省为当前手牌）的向听数与进张，进张按 tiles_seen 扣除可见牌"""
+        if tiles is None:
+            tiles = self.tehai_mjai
+        return analyze_hand(tiles_to_counts(tiles), list(self.player_state.tiles_seen))
+
+    def __new_kan_candidate(self, consumed: list[str], kan_type: str, current: HandAnalysis) -> dict:
         """创建杠候选字典"""
         new_tehai_mjai = self.tehai_mjai.copy()
         for c in consumed:
             if c in new_tehai_mjai:
                 new_tehai_mjai.remove(c)
+        # 杠后剩余 3n+1 张，岭上摸牌前的向听数与进张
+        after = self._analyze_hand(new_tehai_mjai)
 
         event = {}
         if kan_type == "daiminkan":
@@ -185,9 +213,9 @@ class StateTrackerBot(Bot):
         return {
             "consumed": consumed,
             "event": event,
-            "current_shanten": current_shanten,
-            "current_ukeire": 0,  # 占位符
+            "current_shanten": current.shanten,
+            "current_ukeire": current.ukeire,
             "discard_candidates": [],
-            "next_shanten": 0,  # 占位符
-            "next_ukeire": 0,  # 占位符
+            "next_shanten": after.shanten,
+            "next_ukeire": after.ukeire,
         }
@@ -1,16 +1,23 @@
-import json
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
 
 from akagi_ng.core import NotificationCode
 from akagi_ng.mjai_bot.logger import logger
-from akagi_ng.mjai_bot.protocols import Bot
+from akagi_ng.mjai_bot.protocols import EventBot
 from akagi_ng.mjai_bot.utils import make_error_response
 
+if TYPE_CHECKING:
+    from akagi_ng.mjai_bot.game_state import GameState
+
 
 class Controller:
-    def __init__(self):
-        self.available_bots: list[type[Bot]] = []
+    def __init__(self, game_state: GameState | None = None):
+        self.available_bots: list[type[EventBot]] = []
         self.available_bots_names: list[str] = []
-        self.bot: Bot | None = None
+        self.bot: EventBot | None = None
+        # StateTrackerBot 维护的游戏状态，加载的 Bot 直接读取而不再自行追踪
+        self.game_state = game_state
         self.list_available_bots()
         # Bot 将在收到第一个 start_kyoku 事件时延迟初始化
         self.pending_start_game_event: dict | None = None
@@ -22,7 +29,7 @@ class Controller:
             return self.bot.notification_flags
         return {}
 
-    def list_available_bots(self) -> list[type[Bot]]:
+    def list_available_bots(self) -> list[type[EventBot]]:
         from akagi_ng.mjai_bot.mortal import Mortal3pBot, MortalBot
 
         self.available_bots = [MortalBot, Mortal3pBot]
@@ -65,57 +72,87 @@ class Controller:
                 return make_error_response(NotificationCode.BOT_SWITCH_FAILED)
         return None
 
-    def _process_bot_reaction(self, event: dict) -> dict:
-        """处理 Bot 响应并解析结果"""
-        events = [event]
+    def _process_bot_reaction(self, events: list[dict]) -> dict:
+        """处理 Bot 响应。事件与响应都以字典在进程内传递，事件的 JSON 编码只在 Bridge 输出处生成一次"""
         if self.pending_start_game_event:
-            events.insert(0, self.pending_start_game_event)
+            events = [self.pending_start_game_event, *events]
             self.pending_start_game_event = None
 
-        ans = self.bot.react(json.dumps(events, separators=(",", ":")))
+        ans = self.bot.react_events(events)
         logger.trace(f"<- {ans}")
-        try:
-            return json.loads(ans)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse bot response: {e}")
-            return make_error_response(NotificationCode.JSON_DECODE_ERROR)
+        return ans
+
+    def _route_event(self, event: dict) -> dict | None:
+        """
+        处理 Bot 的加载与切换。
+        返回 None 表示事件需要交给 Bot 处理，否则返回该事件的响应。
+        """
+        # 允许在 Bot 未初始化时处理 start_game 和 start_kyoku 事件
+        if not self.bot and event["type"] not in ("start_game", "start_kyoku"):
+            logger.error("No bot available")
+            return make_error_response(NotificationCode.NO_BOT_LOADED)
+
+        # 三麻特殊事件检测：nukidora 只存在于三麻中
+        if event["type"] == "nukidora" and (result := self._handle_nukidora_event()):
+            return result
+
+        # start_game 事件
+        if event["type"] == "start_game":
+            return self._handle_start_game_event(event)
+
+        # 在 start_kyoku 时根据游戏模式加载或切换 Bot
+        if event["type"] == "start_kyoku":
+            return self._handle_start_kyoku_event(event)
+
+        # 检查 pending_start_game_event 的一致性
+        if self.pending_start_game_event:
+            logger.error("Event after start_game is not start_kyoku!")
+            logger.error(f"Event: {event}")
+            return {"type": "none"}
+
+        return None
 
     def react(self, event: dict) -> dict:
         try:
-            # 允许在 Bot 未初始化时处理 start_game 和 start_kyoku 事件
-            if not self.bot and event["type"] not in ("start_game", "start_kyoku"):
-                logger.error("No bot available")
-                return make_error_response(NotificationCode.NO_BOT_LOADED)
-
-            result = None
-
-            # 三麻特殊事件检测：nukidora 只存在于三麻中
-            if event["type"] == "nukidora":
-                result = self._handle_nukidora_event()
-                if result:
-                    return result
-
-            # start_game 事件
-            if event["type"] == "start_game":
-                result = self._handle_start_game_event(event)
-
-            # 在 start_kyoku 时根据游戏模式加载或切换 Bot
-            elif event["type"] == "start_kyoku":
-                result = self._handle_start_kyoku_event(event)
-                if result:
-                    return result
-                result = None  # 重置为 None，继续处理
-
-            # 检查 pending_start_game_event 的一致性
-            if result is None and self.pending_start_game_event and event["type"] != "start_kyoku":
-                logger.error("Event after start_game is not start_kyoku!")
-                logger.error(f"Event: {event}")
-                result = {"type": "none"}
-
-            # 处理 Bot 响应
+            result = self._route_event(event)
             if result is None:
-                result = self._process_bot_reaction(event)
+                result = self._process_bot_reaction([event])
+            return result
+
+        except Exception as e:
+            logger.exception(f"Controller error: {e}")
+            return make_error_response(NotificationCode.BOT_RUNTIME_ERROR)
 
+    def react_batch(self, events: list[dict]) -> dict:
+        """
+        批量回放一段事件（重连 / 进入对局时的同步事件）。
+        Bot 的加载与切换仍逐个事件处理，需要 Bot 处理的连续事件一次性交给 Bot，只返回最后一个事件的响应。
+        """
+        result: dict = {"type": "none"}
+        forward: list[dict] = []
+        try:
+            for event in events:
+                # 可能切换 Bot 的事件之前，先把已收集的事件交给当前 Bot
+                if forward and event["type"] in ("start_game", "start_kyoku", "nukidora"):
+                    self._process_bot_reaction(forward)
+                    forward = []
+
+                routed = self._route_event(event)
+                if routed is not None:
+                    if forward:
+                        self._process_bot_reaction(forward)
+                        forward = []
+                    result = routed
+                    continue
+
+                # 暂存的 start_game 随其后的第一个事件一起交给 Bot
+                if self.pending_start_game_event:
+                    forward.append(self.pending_start_game_event)
+                    self.pending_start_game_event = None
+                forward.append(event)
+
+            if forward:
+                result = self._process_bot_reaction(forward)
             return result
 
         except Exception as e:
@@ -130,15 +167,20 @@ class Controller:
         except ValueError:
             return None
 
+    def _create_bot(self, bot_index: int):
+        self.bot = self.available_bots[bot_index]()
+        # 与 StateTrackerBot 共用游戏状态，事件只应用一次
+        if self.game_state is not None and hasattr(self.bot, "attach_state"):
+            self.bot.attach_state(self.game_state)
+
     def _choose_bot_index(self, bot_index: int) -> bool:
         if 0 <= bot_index < len(self.available_bots):
-            self.bot = self.available_bots[bot_index]()
+            self._create_bot(bot_index)
             return True
         return False
 
     def _choose_bot_name(self, bot_name: str) -> bool:
         if bot_name in self.available_bots_names:
-            index = self.available_bots_names.index(bot_name)
-            self.bot = self.available_bots[index]()
+            self._create_bot(self.available_bots_names.index(bot_name))
             return True
         return False
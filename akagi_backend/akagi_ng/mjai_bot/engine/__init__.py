@@ -1,14 +1,30 @@
+from akagi_ng.mjai_bot.engine.activation import ModelActivator, model_activator
 from akagi_ng.mjai_bot.engine.akagi_ot import AkagiOTEngine
 from akagi_ng.mjai_bot.engine.base import BaseEngine
+from akagi_ng.mjai_bot.engine.batching import BatchingEngine
+from akagi_ng.mjai_bot.engine.executor import InferenceExecutor, inference_executor
 from akagi_ng.mjai_bot.engine.factory import load_bot_and_engine
 from akagi_ng.mjai_bot.engine.mortal import MortalEngine, load_local_mortal_engine
+from akagi_ng.mjai_bot.engine.preload import EnginePreloader, engine_preloader
+from akagi_ng.mjai_bot.engine.process import ProcessEngine
+from akagi_ng.mjai_bot.engine.profiling import DecisionProfiler, decision_profiler
 from akagi_ng.mjai_bot.engine.provider import EngineProvider
 
 __all__ = [
     "AkagiOTEngine",
     "BaseEngine",
+    "BatchingEngine",
+    "DecisionProfiler",
+    "EnginePreloader",
     "EngineProvider",
+    "InferenceExecutor",
+    "ModelActivator",
     "MortalEngine",
+    "ProcessEngine",
+    "decision_profiler",
+    "engine_preloader",
+    "inference_executor",
     "load_bot_and_engine",
     "load_local_mortal_engine",
+    "model_activator",
 ]
@@ -0,0 +1,152 @@
+import contextlib
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from akagi_ng.core.paths import get_models_dir
+from akagi_ng.mjai_bot.engine.base import BaseEngine
+from akagi_ng.mjai_bot.engine.batching import BatchingEngine
+from akagi_ng.mjai_bot.engine.factory import _CACHE_LOCK, _ENGINE_CACHE, LazyLocalEngine
+from akagi_ng.mjai_bot.engine.preload import PreloadStatus, engine_preloader
+from akagi_ng.mjai_bot.engine.process import ProcessEngine
+from akagi_ng.mjai_bot.engine.provider import EngineProvider
+from akagi_ng.mjai_bot.logger import logger
+from akagi_ng.settings import local_settings
+
+
+@dataclass
+class _Activation:
+    model: str
+    status: PreloadStatus = PreloadStatus.LOADING
+    elapsed_ms: float | None = None
+    error: str | None = None
+
+
+def _unwrap_local_engines(engine: BaseEngine) -> Iterator[BaseEngine]:
+    """沿 Provider -> BatchingEngine -> ProcessEngine -> LazyLocalEngine 的包装链遍历本地引擎"""
+    while engine is not None:
+        yield engine
+        if isinstance(engine, EngineProvider):
+            engine = engine.local_engine
+        elif isinstance(engine, BatchingEngine):
+            engine = engine.engine
+        elif isinstance(engine, ProcessEngine):
+            engine = engine.fallback
+        else:
+            return
+
+
+class ModelActivator:
+    """
+    运行时模型热切换。
+    新模型在后台线程中加载并预热为备用引擎，就绪后在两次决策之间替换各 Provider 使用的本地引擎：
+    进行中的 react_batch 继续使用持有的旧引擎完成，之后的决策使用新引擎，旧引擎随引用释放。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._activations: dict[bool, _Activation] = {}
+
+    def activate(self, model_filename: str, is_3p: bool) -> bool:
+        """开始切换到指定模型。同一模式已有切换进行中时返回 False"""
+        with self._lock:
+            current = self._activations.get(is_3p)
+            if current is not None and current.status == PreloadStatus.LOADING:
+                return False
+            activation = _Activation(model=model_filename)
+            self._activations[is_3p] = activation
+
+        threading.Thread(target=self._run, args=(activation, is_3p), name="ModelActivation", daemon=True).start()
+        return True
+
+    def _run(self, activation: _Activation, is_3p: bool):
+        mode = "3P" if is_3p else "4P"
+        model_path = get_models_dir() / activation.model
+        start = time.perf_counter()
+        try:
+            self._switch(model_path, is_3p)
+        except Exception as e:
+            activation.status = PreloadStatus.FAILED
+            activation.error = str(e)
+            logger.error(f"ModelActivator: Failed to activate {mode} model {activation.model}: {e}")
+            return
+        finally:
+            activation.elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if is_3p:
+            local_settings.model_config.model_3p = activation.model
+        else:
+            local_settings.model_config.model_4p = activation.model
+        local_settings.save()
+        activation.status = PreloadStatus.READY
+        logger.info(f"ModelActivator: {mode} model switched to {activation.model} in {activation.elapsed_ms:.0f} ms.")
+
+    def _switch(self, model_path: Path, is_3p: bool):
+        with _CACHE_LOCK:
+            engines = [
+                engine
+                for (cached_3p, *_), provider in _ENGINE_CACHE.items()
+                if cached_3p == is_3p
+                for engine in _unwrap_local_engines(provider)
+            ]
+        process_engines = [e for e in engines if isinstance(e, ProcessEngine)]
+        lazy_engines = [e for e in engines if isinstance(e, LazyLocalEngine)]
+
+        if process_engines:
+            # 子进程推理：在新子进程中加载，进程内引擎只是保底，改为按需加载新模型
+            for engine in process_engines:
+                if not engine.switch_model(model_path):
+                    raise RuntimeError(f"inference worker failed to load {model_path.name}")
+            with self._hold(lazy_engines):
+                for lazy in lazy_engines:
+                    lazy.model_path = model_path
+                    lazy._real_engine = None
+            engine_preloader.evict(is_3p, reason="swap")
+            return
+
+        from akagi_ng.core.lib_loader import libriichi, libriichi3p
+
+        lib = libriichi3p if is_3p else libriichi
+        if lib is None:
+            raise RuntimeError("libriichi3p is not available")
+        engine = engine_preloader.load_standby(model_path, lib.consts, is_3p)
+        if engine is None:
+            raise RuntimeError(f"failed to load {model_path.name}")
+
+        # 持有全部延迟加载引擎的锁，保证替换期间没有决策在获取引擎
+        with self._hold(lazy_engines):
+            engine_preloader.promote(is_3p)
+            for lazy in lazy_engines:
+                lazy.model_path = model_path
+                engine.set_sync_mode(lazy.is_sync_mode)
+                lazy._real_engine = engine
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _hold(lazy_engines: list[LazyLocalEngine]) -> Iterator[None]:
+        with contextlib.ExitStack() as stack:
+            for lazy in lazy_engines:
+                stack.enter_context(lazy._load_lock)
+            yield
+
+    def get_status(self) -> dict[str, Any]:
+        status = {}
+        for is_3p, key in ((False, "4p"), (True, "3p")):
+            activation = self._activations.get(is_3p)
+            if activation is None:
+                status[key] = {"status": PreloadStatus.IDLE.value, "model": None}
+                continue
+            status[key] = {
+                "status": activation.status.value,
+                "model": activation.model,
+                "elapsed_ms": activation.elapsed_ms,
+                "error": activation.error,
+            }
+        return status
+
+
+# 全局模型切换器
+model_activator = ModelActivator()
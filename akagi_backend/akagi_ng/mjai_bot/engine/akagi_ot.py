@@ -1,19 +1,43 @@
 import gzip
 import json
+import threading
 import time
+from collections import deque
 
 import numpy as np
 import requests
 
+from akagi_ng.mjai_bot.engine import ot_wire
 from akagi_ng.mjai_bot.engine.base import BaseEngine
+from akagi_ng.mjai_bot.engine.latency import LatencyWindow
+from akagi_ng.mjai_bot.engine.ot_transport import PooledSession
 from akagi_ng.mjai_bot.logger import logger
 
+# 服务端以这些状态码拒绝二进制请求时，视为不支持并回退到 JSON
+_WIRE_REJECT_STATUS = {400, 404, 406, 415}
+
+# 延迟 SLO：超过该耗时的响应虽然成功，也计为一次违约
+LATENCY_SLO_MS = 1500.0
+LATENCY_WINDOW_SIZE = 100
+# 最近 SLO_WINDOW_SIZE 次响应中违约比例达到阈值时熔断
+SLO_WINDOW_SIZE = 10
+SLO_VIOLATION_RATIO = 0.6
+# 自适应读取超时：样本足够时取 p99 的若干倍，限制在 [下限, 硬超时] 之间
+ADAPTIVE_TIMEOUT_MIN_SAMPLES = 20
+ADAPTIVE_TIMEOUT_P99_MULTIPLIER = 2.0
+MIN_READ_TIMEOUT_SECONDS = 1.0
+# 半开状态下连续成功（且未违约）的探测次数达到该值后闭合
+HALF_OPEN_PROBES = 2
+# 半开探测失败后恢复等待时间加倍，直到上限
+MAX_RECOVERY_PERIOD_SECONDS = 300.0
+
 
 class AkagiOTClient:
     def __init__(self, url: str, api_key: str):
         self.url = url.rstrip("/")
         self.api_key = api_key
-        self.session = requests.Session()
+        # aiohttp keep-alive 连接池之上的同步门面，接口与 requests.Session 一致
+        self.session = PooledSession()
         self.session.headers.update(
             {
                 "Authorization": self.api_key,
@@ -29,83 +53,237 @@ class AkagiOTClient:
         self._failures = 0
         self._circuit_open = False
         self._last_failure_time = 0
-        self._circuit_recovery_period = 30.0  # 秒
+        self._base_recovery_period = 30.0  # 秒
+        self._circuit_recovery_period = self._base_recovery_period
         self._failure_threshold = 3
         self._just_restored = False
+        self._half_open = False
+        self._probe_in_flight = False
+        self._probe_successes = 0
+        self._open_reason: str | None = None
+        self._breaker_lock = threading.Lock()
+
+        # 按端点统计的延迟窗口与最近的 SLO 违约记录
+        self.latency_slo_ms = LATENCY_SLO_MS
+        self._latency: dict[str, LatencyWindow] = {}
+        self._slo_violations: deque[bool] = deque(maxlen=SLO_WINDOW_SIZE)
+
+        # 传输格式：None 表示尚未协商，"binary" / "json" 为协商结果
+        self.wire_format: str | None = None
 
         # 启动背景连接预热
+        self._warmed = False
         self._pre_warm_connection()
 
     def _pre_warm_connection(self):
-        """发送一个轻量级的 OPTIONS 请求以预热 TCP/TLS 连接。"""
+        """预热连接并定期发送轻量级 OPTIONS 探测，使连接与 TLS 会话在对局间隙保持温热。"""
+        self.session.start_health_pings(self.url, self._on_health_ping)
+
+    def _on_health_ping(self, response: requests.Response | None):
+        if response is None:
+            return
+        if not self._warmed:
+            self._warmed = True
+            logger.info(f"AkagiOT: Connection pre-warmed for {self.url}")
+        # 同时协商传输格式
+        self._negotiate_wire(response.headers.get(ot_wire.WIRE_HEADER))
+
+    def _negotiate_wire(self, advertised: str | None):
+        """根据服务端声明的 WIRE_HEADER 选择传输格式"""
+        if self.wire_format is not None:
+            return
+        if ot_wire.WIRE_VERSION in ot_wire.parse_wire_versions(advertised):
+            self.wire_format = "binary"
+            logger.info(f"AkagiOT: Using binary wire format v{ot_wire.WIRE_VERSION}.")
+        else:
+            self.wire_format = "json"
+
+    def _downgrade_wire(self, reason: str):
+        logger.warning(f"AkagiOT: Binary wire format rejected ({reason}), falling back to JSON.")
+        self.wire_format = "json"
+
+    def predict(self, is_3p: bool, obs: np.ndarray, masks: np.ndarray) -> dict:
+        # 熔断器检查（半开状态下同一时间只放行一个探测请求）
+        is_probe = self._acquire_request_slot()
+
+        endpoint = "/react_batch_3p" if is_3p else "/react_batch"
+        full_url = f"{self.url}{endpoint}"
+        timeout = self.timeout_for(endpoint)
+
         try:
-            import threading
-
-            def _warm():
-                try:
-                    # 使用 OPTIONS 或 HEAD 以最小化开销
-                    self.session.options(self.url, timeout=2.0)
-                    logger.info(f"AkagiOT: Connection pre-warmed for {self.url}")
-                except Exception:
-                    pass
-
-            threading.Thread(target=_warm, daemon=True).start()
-        except Exception as e:
-            logger.warning(f"AkagiOT: Pre-warm failed: {e}")
-
-    def predict(self, is_3p: bool, obs: list, masks: list) -> dict:
-        # 熔断器检查
-        if self._circuit_open:
-            if time.time() - self._last_failure_time > self._circuit_recovery_period:
-                self._close_circuit()
-            else:
-                raise RuntimeError("AkagiOT Circuit Breaker is OPEN. Skipping request.")
+            start = time.perf_counter()
+            result = None
+            if self.wire_format == "binary":
+                result = self._post_binary(full_url, obs, masks, timeout)
+            if result is None:
+                result = self._post_json(full_url, obs, masks, timeout)
+            self._record_success(endpoint, (time.perf_counter() - start) * 1000)
+            return result
 
+        except requests.RequestException as e:
+            self._record_failure()
+            logger.error(f"AkagiOT Request Failed: {e}")
+            raise RuntimeError(f"AkagiOT request failed: {e}") from e
+        finally:
+            if is_probe:
+                self._probe_in_flight = False
+
+    def _acquire_request_slot(self) -> bool:
+        """检查熔断器是否放行请求；返回本次请求是否为半开探测"""
+        with self._breaker_lock:
+            if self._circuit_open:
+                if time.time() - self._last_failure_time > self._circuit_recovery_period:
+                    self._close_circuit()
+                else:
+                    raise RuntimeError("AkagiOT Circuit Breaker is OPEN. Skipping request.")
+            if not self._half_open:
+                return False
+            if self._probe_in_flight:
+                raise RuntimeError("AkagiOT Circuit Breaker is HALF-OPEN. Probe already in flight.")
+            self._probe_in_flight = True
+            return True
+
+    def timeout_for(self, endpoint: str) -> tuple[float, float]:
+        """根据端点近期 p99 延迟收紧读取超时，样本不足时使用硬超时"""
+        window = self._latency.get(endpoint)
+        if window is None or len(window) < ADAPTIVE_TIMEOUT_MIN_SAMPLES:
+            return self.timeout
+        p99_seconds = window.percentile(99) / 1000
+        read = min(max(p99_seconds * ADAPTIVE_TIMEOUT_P99_MULTIPLIER, MIN_READ_TIMEOUT_SECONDS), self.timeout[1])
+        return self.timeout[0], read
+
+    def _post_json(self, full_url: str, obs: np.ndarray, masks: np.ndarray, timeout: tuple[float, float]) -> dict:
         # 准备请求负载
-        post_data = {"obs": obs, "masks": masks}
+        post_data = {"obs": [o.tolist() for o in obs], "masks": [m.tolist() for m in masks]}
         data = json.dumps(post_data, separators=(",", ":"))
         compressed_data = gzip.compress(data.encode("utf-8"))
 
-        endpoint = "/react_batch_3p" if is_3p else "/react_batch"
-        full_url = f"{self.url}{endpoint}"
-
+        response = self.session.post(full_url, data=compressed_data, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _post_binary(
+        self, full_url: str, obs: np.ndarray, masks: np.ndarray, timeout: tuple[float, float]
+    ) -> dict | None:
+        """以二进制格式请求；服务端拒绝或返回无法识别的负载时返回 None，由调用方改用 JSON"""
+        headers = {
+            "Content-Type": ot_wire.CONTENT_TYPE,
+            "Accept": ot_wire.CONTENT_TYPE,
+            ot_wire.WIRE_HEADER: str(ot_wire.WIRE_VERSION),
+            # 按位打包后的负载已足够小，不再 gzip
+            "Content-Encoding": None,
+        }
+        body = ot_wire.encode_request(obs, masks)
+        response = self.session.post(full_url, data=body, headers=headers, timeout=timeout)
+        if response.status_code in _WIRE_REJECT_STATUS:
+            self._downgrade_wire(f"HTTP {response.status_code}")
+            return None
+        response.raise_for_status()
+
+        if not response.headers.get("Content-Type", "").startswith(ot_wire.CONTENT_TYPE):
+            self._downgrade_wire(f"unexpected content type {response.headers.get('Content-Type')!r}")
+            return None
         try:
-            response = self.session.post(full_url, data=compressed_data, timeout=self.timeout)
-            response.raise_for_status()
+            decoded = ot_wire.decode_response(response.content)
+        except ot_wire.WireFormatError as e:
+            self._downgrade_wire(str(e))
+            return None
+        return {
+            "actions": decoded.actions,
+            "q_out": decoded.q_out,
+            "masks": masks.tolist(),
+            "is_greedy": decoded.is_greedy,
+        }
+
+    def _record_success(self, endpoint: str, latency_ms: float):
+        self._latency.setdefault(endpoint, LatencyWindow(LATENCY_WINDOW_SIZE)).record(latency_ms)
+        violated = latency_ms > self.latency_slo_ms
+        with self._breaker_lock:
+            self._slo_violations.append(violated)
+            if self._half_open:
+                if violated:
+                    self._open_circuit(f"slow probe ({latency_ms:.0f} ms)")
+                    return
+                self._failures = 0
+                self._probe_successes += 1
+                if self._probe_successes >= HALF_OPEN_PROBES:
+                    self._reset_breaker()
+                return
 
             # 请求成功时重置熔断器
             if self._failures > 0:
                 self._reset_breaker()
+            if self._slo_breached():
+                self._open_circuit(f"latency SLO violated ({self.latency_slo_ms:.0f} ms)")
 
-            return response.json()
-
-        except requests.RequestException as e:
-            self._record_failure()
-            logger.error(f"AkagiOT Request Failed: {e}")
-            raise RuntimeError(f"AkagiOT request failed: {e}") from e
+    def _slo_breached(self) -> bool:
+        if len(self._slo_violations) < SLO_WINDOW_SIZE:
+            return False
+        return sum(self._slo_violations) / len(self._slo_violations) >= SLO_VIOLATION_RATIO
 
     def _record_failure(self):
-        if self._failures < self._failure_threshold:
-            self._failures += 1
-        self._last_failure_time = time.time()
-        if self._failures >= self._failure_threshold:
-            self._open_circuit()
-
-    def _open_circuit(self):
+        with self._breaker_lock:
+            if self._failures < self._failure_threshold:
+                self._failures += 1
+            self._last_failure_time = time.time()
+            if self._half_open:
+                self._open_circuit("probe failed")
+            elif self._failures >= self._failure_threshold:
+                self._open_circuit(f"{self._failures} failures")
+
+    def _open_circuit(self, reason: str):
+        if self._half_open:
+            # 探测失败：延长下一次恢复等待
+            self._circuit_recovery_period = min(self._circuit_recovery_period * 2, MAX_RECOVERY_PERIOD_SECONDS)
         if not self._circuit_open:
-            logger.warning(f"AkagiOT Circuit Breaker OPENED after {self._failures} failures.")
+            logger.warning(
+                f"AkagiOT Circuit Breaker OPENED: {reason}. Retrying in {self._circuit_recovery_period:.0f}s."
+            )
             self._circuit_open = True
+        self._half_open = False
+        self._probe_successes = 0
+        self._open_reason = reason
+        self._last_failure_time = time.time()
+        self._slo_violations.clear()
 
     def _close_circuit(self):
         logger.info("AkagiOT Circuit Breaker HALF-OPEN. Probing connection...")
         self._circuit_open = False
+        self._half_open = True
+        self._probe_successes = 0
 
     def _reset_breaker(self):
         logger.info("AkagiOT Circuit Breaker CLOSED. Connection restored, service fully operational.")
         self._failures = 0
         self._circuit_open = False
+        self._half_open = False
+        self._probe_successes = 0
+        self._open_reason = None
+        self._circuit_recovery_period = self._base_recovery_period
         self._just_restored = True
 
+    @property
+    def circuit_state(self) -> str:
+        if self._circuit_open:
+            return "open"
+        return "half_open" if self._half_open else "closed"
+
+    def get_breaker_state(self) -> dict[str, object]:
+        """熔断器状态与各端点延迟分位数，供 UI 展示"""
+        return {
+            "state": self.circuit_state,
+            "reason": self._open_reason,
+            "recovery_period_s": self._circuit_recovery_period,
+            "slo_ms": self.latency_slo_ms,
+            "slo_violation_rate": sum(self._slo_violations) / len(self._slo_violations)
+            if self._slo_violations
+            else 0.0,
+            "endpoints": {
+                endpoint: {**window.snapshot(), "read_timeout_s": self.timeout_for(endpoint)[1]}
+                for endpoint, window in self._latency.items()
+            },
+        }
+
 
 class AkagiOTEngine(BaseEngine):
     def __init__(self, is_3p: bool, url: str, api_key: str):
@@ -126,7 +304,12 @@ class AkagiOTEngine(BaseEngine):
         return flags
 
     def get_additional_meta(self) -> dict[str, object]:
-        return {"circuit_open": self.client._circuit_open}
+        return {
+            "circuit_open": self.client._circuit_open,
+            "circuit_state": self.client.circuit_state,
+            "wire_format": self.client.wire_format or "json",
+            "online_latency": self.client.get_breaker_state(),
+        }
 
     @property
     def enable_rule_based_agari_guard(self) -> bool:
@@ -153,10 +336,7 @@ class AkagiOTEngine(BaseEngine):
             is_greedy = [True] * batch_size
             return actions, q_values, masks.tolist(), is_greedy
 
-        list_obs = [o.tolist() for o in obs]
-        list_masks = [m.tolist() for m in masks]
-
-        r_json = self.client.predict(self.is_3p, list_obs, list_masks)
+        r_json = self.client.predict(self.is_3p, obs, masks)
 
         self.last_inference_result = {
             "actions": r_json["actions"],
@@ -0,0 +1,237 @@
+import hashlib
+import json
+import shutil
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import torch
+
+from akagi_ng.core.constants import ModelConstants
+from akagi_ng.core.paths import ensure_dir, get_cache_dir
+from akagi_ng.mjai_bot.logger import logger
+
+# 缓存格式版本，修改编译流程时递增以使旧缓存失效
+ARTIFACT_FORMAT_VERSION = 1
+
+# 编译产物与原始模型对比时允许的最大误差
+_VERIFY_ATOL = 1e-4
+
+
+@dataclass
+class InferenceArtifact:
+    """
+    推理产物：Brain 与 DQN/CategoricalPolicy 头以及重建引擎所需的元数据。
+    compiled 为 False 时 brain/dqn 为原始 eager 模块。
+    """
+
+    brain: torch.nn.Module
+    dqn: torch.nn.Module
+    meta: dict[str, Any]
+    compiled: bool = False
+
+
+def get_artifact_cache_dir() -> Path:
+    return get_cache_dir() / "models"
+
+
+def get_weights_cache_dir() -> Path:
+    return get_cache_dir() / "weights"
+
+
+def model_stamp(model_path: Path) -> dict[str, int]:
+    """模型文件的大小与修改时间，用于廉价地判断文件是否变化"""
+    stat = model_path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _digest_memo_path(model_path: Path) -> Path:
+    return get_artifact_cache_dir() / f"{model_path.stem}.digest.json"
+
+
+def compute_model_digest(model_path: Path) -> str:
+    """
+    计算模型文件的 SHA-256 摘要。
+    摘要连同文件大小与修改时间记录在缓存目录中，文件未变化时直接复用，
+    缓存命中的启动路径不必每次读完整个检查点；内容相同的文件仍得到相同的摘要。
+    """
+    stamp = model_stamp(model_path)
+    memo_path = _digest_memo_path(model_path)
+    try:
+        memo = json.loads(memo_path.read_text(encoding="utf-8"))
+        if memo["source"] == stamp:
+            return memo["sha256"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    with open(model_path, "rb") as f:
+        digest = hashlib.file_digest(f, "sha256").hexdigest()
+    try:
+        ensure_dir(memo_path.parent)
+        memo_path.write_text(json.dumps({"source": stamp, "sha256": digest}), encoding="utf-8")
+    except OSError as e:
+        logger.debug(f"ArtifactCache: Unable to record digest for {model_path.name}: {e}")
+    return digest
+
+
+def _artifact_prefix(digest: str) -> str:
+    """同一检查点、同一 torch 版本的所有产物共用的键前缀"""
+    torch_version = torch.__version__.replace("+", "_")
+    return f"{digest[:16]}-torch{torch_version}-"
+
+
+def _artifact_key(digest: str, device: torch.device, variant: str, precision: str) -> str:
+    return f"{_artifact_prefix(digest)}{device.type}-{variant}-{precision}-v{ARTIFACT_FORMAT_VERSION}"
+
+
+def _artifact_dir(model_path: Path, digest: str, device: torch.device, variant: str, precision: str) -> Path:
+    return get_artifact_cache_dir() / model_path.stem / _artifact_key(digest, device, variant, precision)
+
+
+def _remove_stale_artifacts(model_path: Path, digest: str):
+    """
+    清理同一模型的旧版本缓存（模型文件、torch 版本或缓存格式已变更）。
+    同一检查点的其他设备、网络变体与精度的产物仍然有效，予以保留。
+    """
+    model_cache_dir = get_artifact_cache_dir() / model_path.stem
+    if not model_cache_dir.exists():
+        return
+    prefix = _artifact_prefix(digest)
+    suffix = f"-v{ARTIFACT_FORMAT_VERSION}"
+    for path in model_cache_dir.iterdir():
+        if path.is_dir() and not (path.name.startswith(prefix) and path.name.endswith(suffix)):
+            logger.info(f"ArtifactCache: Removing stale artifact {path.name}")
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_artifact(
+    model_path: Path, device: torch.device, digest: str, variant: str, precision: str
+) -> InferenceArtifact | None:
+    """
+    加载已缓存的编译产物。
+    缓存不存在、已损坏或与当前模型/torch 版本/网络变体/精度不匹配时返回 None。
+    """
+    artifact_dir = _artifact_dir(model_path, digest, device, variant, precision)
+    meta_path = artifact_dir / "meta.json"
+    if not meta_path.exists():
+        return None
+
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if (
+            meta.get("digest") != digest
+            or meta.get("torch_version") != torch.__version__
+            or meta.get("variant") != variant
+            or meta.get("precision") != precision
+            or not _is_compilable(meta)
+        ):
+            logger.info("ArtifactCache: Cached artifact is stale, rebuilding.")
+            return None
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", FutureWarning)
+            brain = torch.jit.load(artifact_dir / "brain.pt", map_location=device)
+            dqn = torch.jit.load(artifact_dir / "dqn.pt", map_location=device)
+        logger.info(f"ArtifactCache: Loaded compiled artifact for {model_path.name}.")
+        return InferenceArtifact(brain=brain, dqn=dqn, meta=meta, compiled=True)
+    except Exception as e:
+        logger.warning(f"ArtifactCache: Failed to load cached artifact, rebuilding: {e}")
+        shutil.rmtree(artifact_dir, ignore_errors=True)
+        return None
+
+
+def _compile_module(module: torch.nn.Module, example_inputs: tuple[torch.Tensor, ...]) -> torch.jit.ScriptModule:
+    """Trace 并冻结模块，随后尝试 optimize_for_inference"""
+    # TorchScript 在新版 torch 中会发出弃用警告，这里的使用是有意的
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        traced = torch.jit.trace(module, example_inputs)
+        frozen = torch.jit.freeze(traced)
+        try:
+            return torch.jit.optimize_for_inference(frozen)
+        except Exception as e:
+            logger.debug(f"ArtifactCache: optimize_for_inference skipped: {e}")
+            return frozen
+
+
+def _example_inputs(meta: dict[str, Any], device: torch.device, batch_size: int) -> tuple[torch.Tensor, torch.Tensor]:
+    generator = torch.Generator().manual_seed(batch_size)
+    # Mortal 观测几乎全部为 0/1 平面，使用随机二值输入进行 trace 与校验
+    obs = torch.randint(0, 2, (batch_size, meta["in_channels"], 34), generator=generator).float().to(device)
+    masks = torch.randint(0, 2, (batch_size, meta["action_space"]), generator=generator).bool().to(device)
+    masks[:, 0] = True
+    return obs, masks
+
+
+def _is_compilable(meta: dict[str, Any]) -> bool:
+    """
+    v1 Brain 在推理时以 (obs, invisible_obs) 调用并返回 (mu, logsig)，
+    invisible_obs 可能为 None，无法用固定签名 trace，因此只编译 v2-v4。
+    """
+    return meta["version"] != ModelConstants.MODEL_VERSION_1
+
+
+def _brain_forward(brain: torch.nn.Module, obs: torch.Tensor) -> torch.Tensor:
+    """与 MortalEngine._react_batch 相同的方式调用 Brain（v2-v4 仅传入 obs）"""
+    return brain(obs)
+
+
+def _verify(
+    eager: tuple[torch.nn.Module, torch.nn.Module],
+    compiled: tuple[torch.nn.Module, torch.nn.Module],
+    meta: dict[str, Any],
+    device: torch.device,
+) -> bool:
+    """在不同批大小上对比编译产物与原始模型的输出"""
+    for batch_size in (1, 3):
+        obs, masks = _example_inputs(meta, device, batch_size)
+        q_eager = eager[1](_brain_forward(eager[0], obs), masks)
+        q_compiled = compiled[1](_brain_forward(compiled[0], obs), masks)
+        if not torch.equal(q_eager.argmax(-1), q_compiled.argmax(-1)):
+            return False
+        # 被 mask 的位置为 -inf，仅比较合法动作的 Q 值
+        if not torch.allclose(q_eager[masks], q_compiled[masks], atol=_VERIFY_ATOL, rtol=0):
+            return False
+    return True
+
+
+def build_artifact(
+    model_path: Path, eager: InferenceArtifact, *, device: torch.device, digest: str
+) -> InferenceArtifact | None:
+    """
+    编译 Brain 与 DQN 头并写入缓存。
+    编译或校验失败时返回 None，调用方应回退到 eager 模块。
+    """
+    brain, dqn, meta = eager.brain, eager.dqn, eager.meta
+    if not _is_compilable(meta):
+        logger.info(f"ArtifactCache: Version {meta['version']} model is not compiled, using eager model.")
+        return None
+    try:
+        with torch.no_grad():
+            obs, masks = _example_inputs(meta, device, 1)
+            compiled_brain = _compile_module(brain, (obs,))
+            compiled_dqn = _compile_module(dqn, (_brain_forward(brain, obs), masks))
+
+            if not _verify((brain, dqn), (compiled_brain, compiled_dqn), meta, device):
+                logger.warning("ArtifactCache: Compiled artifact output mismatch, using eager model.")
+                return None
+
+        meta = {**meta, "digest": digest, "torch_version": torch.__version__, "format": ARTIFACT_FORMAT_VERSION}
+        artifact_dir = _artifact_dir(model_path, digest, device, meta["variant"], meta["precision"])
+        artifact_dir.mkdir(parents=True, exist_ok=True)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", FutureWarning)
+            torch.jit.save(compiled_brain, artifact_dir / "brain.pt")
+            torch.jit.save(compiled_dqn, artifact_dir / "dqn.pt")
+        # meta.json 最后写入，作为缓存完整性的标志
+        with open(artifact_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+        _remove_stale_artifacts(model_path, digest)
+        logger.info(f"ArtifactCache: Compiled artifact saved to {artifact_dir}")
+        return InferenceArtifact(brain=compiled_brain, dqn=compiled_dqn, meta=meta, compiled=True)
+    except Exception as e:
+        logger.warning(f"ArtifactCache: Failed to build compiled artifact: {e}")
+        return None
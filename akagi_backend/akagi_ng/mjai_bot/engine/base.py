@@ -52,6 +52,13 @@ class BaseEngine:
         """
         raise NotImplementedError
 
+    def precompute(self, obs: np.ndarray, masks: np.ndarray) -> bool:
+        """
+        预先计算一批假设观测的决策并保存，供之后到达的相同观测直接复用。
+        返回 False 表示引擎不支持预计算（默认实现）。
+        """
+        return False
+
     def get_notification_flags(self) -> dict[str, Any]:
         """
         返回引擎的通知标志（如网络故障、熔断等）。
@@ -63,3 +70,16 @@ class BaseEngine:
         返回需要合并到推荐响应中的附加元数据。
         """
         return {}
+
+    def release(self):
+        """
+        释放引擎常驻的本地权重，下次推理时按需重新加载（默认无操作）。
+        推理改由子进程承担后调用，避免主进程与子进程同时常驻一份模型。
+        """
+
+    def get_resident_bytes(self) -> int:
+        """
+        返回引擎常驻内存（模型权重与缓存）的估计字节数，供引擎缓存按内存预算淘汰。
+        0 表示不持有本地权重或无法估计。
+        """
+        return 0
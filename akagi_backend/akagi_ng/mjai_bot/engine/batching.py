@@ -0,0 +1,202 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from akagi_ng.mjai_bot.engine.base import BaseEngine
+from akagi_ng.mjai_bot.logger import logger
+
+
+@dataclass
+class _BatchRequest:
+    obs: np.ndarray
+    masks: np.ndarray
+    invisible_obs: np.ndarray | None
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+@dataclass
+class _DecisionTiming:
+    batch_size: int
+    queue_wait_ms: float
+    compute_ms: float
+
+
+@dataclass
+class BatchingStats:
+    """合批调度统计：排队等待与前向计算耗时分开累计"""
+
+    batches: int = 0
+    requests: int = 0
+    rows: int = 0
+    max_batch_rows: int = 0
+    queue_wait_ms_total: float = 0.0
+    compute_ms_total: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "avg_batch_rows": self.rows / self.batches if self.batches else 0.0,
+            "max_batch_rows": self.max_batch_rows,
+            "avg_queue_wait_ms": self.queue_wait_ms_total / self.requests if self.requests else 0.0,
+            "avg_compute_ms": self.compute_ms_total / self.batches if self.batches else 0.0,
+        }
+
+
+class BatchingEngine(BaseEngine):
+    """
+    跨会话微批调度器。
+    收集时间窗口内（或达到最大批大小前）并发到达的 react_batch 请求，
+    拼接后只执行一次前向推理，再将结果按请求拆分返回给各调用方。
+    """
+
+    def __init__(self, engine: BaseEngine, window_ms: float = 2.0, max_batch_size: int = 8):
+        super().__init__(
+            is_3p=engine.is_3p, version=engine.version, name=f"Batched({engine.name})", is_oracle=engine.is_oracle
+        )
+        self.engine = engine
+        self.engine_type = engine.engine_type
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self.stats = BatchingStats()
+        self._stats_lock = threading.Lock()
+        self._queue: queue.Queue[_BatchRequest] = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._worker_lock = threading.Lock()
+        # 每个调用线程最近一次决策的合批耗时，用于附加到该线程的决策元数据
+        self._local = threading.local()
+
+    def set_sync_mode(self, enabled: bool):
+        super().set_sync_mode(enabled)
+        self.engine.set_sync_mode(enabled)
+
+    def react_batch(
+        self, obs: np.ndarray, masks: np.ndarray, invisible_obs: np.ndarray
+    ) -> tuple[list[int], list[list[float]], list[list[bool]], list[bool]]:
+        # 同步快进不经过神经网络，无需合批
+        if self.is_sync_mode:
+            self._local.timing = None
+            res = self.engine.react_batch(obs, masks, invisible_obs)
+            self.last_inference_result = self.engine.last_inference_result
+            return res
+
+        request = _BatchRequest(
+            obs=np.asanyarray(obs),
+            masks=np.asanyarray(masks),
+            invisible_obs=np.asanyarray(invisible_obs) if invisible_obs is not None else None,
+        )
+        self._ensure_worker()
+        self._queue.put(request)
+        result, timing = request.future.result()
+
+        self._local.timing = timing
+        actions, q_out, clean_masks, is_greedy = result
+        self.last_inference_result = {
+            "actions": actions,
+            "q_out": q_out,
+            "masks": clean_masks,
+            "is_greedy": is_greedy,
+        }
+        return result
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="BatchingEngine", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = batch[0].enqueued_at + self.window
+            rows = len(batch[0].obs)
+            while rows < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(request)
+                rows += len(request.obs)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: list[_BatchRequest]):
+        """执行一批请求。任何异常都返回给尚未得到结果的调用方，工作线程继续处理后续请求"""
+        try:
+            self._execute_batch(batch)
+        except Exception as e:
+            logger.error(f"BatchingEngine: Batch of {len(batch)} requests failed: {e}")
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+
+    def _execute_batch(self, batch: list[_BatchRequest]):
+        obs = np.concatenate([r.obs for r in batch], axis=0)
+        masks = np.concatenate([r.masks for r in batch], axis=0)
+        # 仅当所有请求都带有 invisible_obs 时才拼接（oracle 模型），否则统一传 None
+        invisible_obs = (
+            np.concatenate([r.invisible_obs for r in batch], axis=0)
+            if all(r.invisible_obs is not None for r in batch)
+            else None
+        )
+
+        start = time.perf_counter()
+        actions, q_out, clean_masks, is_greedy = self.engine.react_batch(obs, masks, invisible_obs)
+        end = time.perf_counter()
+        compute_ms = (end - start) * 1000
+
+        offset = 0
+        queue_wait_ms_total = 0.0
+        for request in batch:
+            n = len(request.obs)
+            queue_wait_ms = (start - request.enqueued_at) * 1000
+            queue_wait_ms_total += queue_wait_ms
+            result = (
+                actions[offset : offset + n],
+                q_out[offset : offset + n],
+                clean_masks[offset : offset + n],
+                is_greedy[offset : offset + n],
+            )
+            request.future.set_result((result, _DecisionTiming(len(obs), queue_wait_ms, compute_ms)))
+            offset += n
+
+        with self._stats_lock:
+            self.stats.batches += 1
+            self.stats.requests += len(batch)
+            self.stats.rows += len(obs)
+            self.stats.max_batch_rows = max(self.stats.max_batch_rows, len(obs))
+            self.stats.queue_wait_ms_total += queue_wait_ms_total
+            self.stats.compute_ms_total += compute_ms
+
+        if len(batch) > 1:
+            logger.trace(f"BatchingEngine: Served {len(batch)} requests in one pass ({compute_ms:.2f} ms).")
+
+    def precompute(self, obs: np.ndarray, masks: np.ndarray) -> bool:
+        return self.engine.precompute(obs, masks)
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._stats_lock:
+            return self.stats.to_dict()
+
+    def get_notification_flags(self) -> dict[str, Any]:
+        return self.engine.get_notification_flags()
+
+    def get_additional_meta(self) -> dict[str, Any]:
+        meta = dict(self.engine.get_additional_meta())
+        timing: _DecisionTiming | None = getattr(self._local, "timing", None)
+        if timing is not None:
+            meta.update(
+                {
+                    "batch_size": timing.batch_size,
+                    "queue_wait_ms": round(timing.queue_wait_ms, 3),
+                    "compute_ms": round(timing.compute_ms, 3),
+                }
+            )
+        return meta
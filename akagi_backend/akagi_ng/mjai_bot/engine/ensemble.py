@@ -0,0 +1,249 @@
+import copy
+from pathlib import Path
+from types import ModuleType
+
+import numpy as np
+import torch
+from torch.func import functional_call, stack_module_state
+
+from akagi_ng.core.constants import ModelConstants
+from akagi_ng.mjai_bot.engine.mortal import MortalEngine, _build_eager_artifact, _resolve_precision
+from akagi_ng.mjai_bot.engine.profiling import decision_profiler
+from akagi_ng.mjai_bot.logger import logger
+from akagi_ng.mjai_bot.network import get_inference_device
+from akagi_ng.settings import local_settings
+
+ENSEMBLE_AGGREGATIONS = ("mean", "min", "weighted")
+# 集成仅支持 Brain 直接输出特征的版本（v1 需要采样隐变量，oracle 需要额外输入）
+_ENSEMBLE_VERSIONS = (ModelConstants.MODEL_VERSION_2, ModelConstants.MODEL_VERSION_3, ModelConstants.MODEL_VERSION_4)
+
+StateDict = dict[str, torch.Tensor]
+
+
+def _architecture_signature(brain: torch.nn.Module, dqn: torch.nn.Module) -> list[tuple[str, tuple[int, ...]]]:
+    return [
+        (f"{prefix}.{key}", tuple(tensor.shape))
+        for prefix, module in (("brain", brain), ("dqn", dqn))
+        for key, tensor in module.state_dict().items()
+    ]
+
+
+def _normalize_weights(weights: list[float] | None, num_members: int) -> torch.Tensor:
+    if not weights:
+        raise ValueError("weighted aggregation requires ensemble_weights")
+    if len(weights) != num_members:
+        raise ValueError(f"expected {num_members} ensemble weights, got {len(weights)}")
+    if any(w <= 0 for w in weights):
+        raise ValueError("ensemble weights must be positive")
+    tensor = torch.tensor(weights, dtype=torch.float32)
+    return tensor / tensor.sum()
+
+
+class EnsembleEngine(MortalEngine):
+    """
+    多个同构 Mortal 检查点的集成引擎。
+    各成员的权重按层堆叠，经 torch.vmap 在一次批量前向中同时计算所有成员的 Q 值，
+    再按 mean / min / weighted 聚合后选取动作；各成员对首条观测的合法动作 Q 值写入元数据。
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        brains: list[torch.nn.Module],
+        dqns: list[torch.nn.Module],
+        member_names: list[str],
+        *,
+        version: int,
+        aggregation: str = "mean",
+        weights: list[float] | None = None,
+        device: torch.device | None = None,
+        name: str = "mortal",
+        is_3p: bool = False,
+        precision: str = "fp32",
+        q_cache_bytes: int = 0,
+    ):
+        if len(brains) < 2 or len(brains) != len(dqns) or len(brains) != len(member_names):  # noqa: PLR2004
+            raise ValueError("an ensemble needs at least two members with matching brain/dqn pairs")
+        if version not in _ENSEMBLE_VERSIONS:
+            raise ValueError(f"Mortal version {version} is not supported in an ensemble")
+        if aggregation not in ENSEMBLE_AGGREGATIONS:
+            raise ValueError(f"unknown ensemble aggregation: {aggregation}")
+        signature = _architecture_signature(brains[0], dqns[0])
+        for member, brain, dqn in zip(member_names[1:], brains[1:], dqns[1:], strict=True):
+            if _architecture_signature(brain, dqn) != signature:
+                raise ValueError(f"ensemble member {member} has a different architecture from {member_names[0]}")
+
+        super().__init__(
+            brains[0],
+            dqns[0],
+            version=version,
+            device=device,
+            name=name,
+            is_3p=is_3p,
+            precision=precision,
+            q_cache_bytes=q_cache_bytes,
+        )
+        self.member_names = member_names
+        self.aggregation = aggregation
+        self.weights = _normalize_weights(weights, len(brains)).to(self.device) if aggregation == "weighted" else None
+
+        # 堆叠后的参数拥有独立存储；基础模块移到 meta 设备只保留结构，不再额外占用一份成员权重
+        brains = [brain.to(self.device).eval() for brain in brains]
+        dqns = [dqn.to(self.device).eval() for dqn in dqns]
+        self._brain_state: tuple[StateDict, StateDict] = stack_module_state(brains)
+        self._dqn_state: tuple[StateDict, StateDict] = stack_module_state(dqns)
+        self.brain = copy.deepcopy(brains[0]).to("meta")
+        self.dqn = copy.deepcopy(dqns[0]).to("meta")
+        self._vmap_enabled = True
+
+        # 最近一次前向中各成员对首条观测的合法动作 Q 值，命中缓存时清空
+        self.member_q_values: list[list[float]] | None = None
+
+    def _member_forward(
+        self,
+        brain_state: tuple[StateDict, StateDict],
+        dqn_state: tuple[StateDict, StateDict],
+        obs_t: torch.Tensor,
+        masks_t: torch.Tensor,
+    ) -> torch.Tensor:
+        with self._amp_autocast():
+            phi = functional_call(self.brain, brain_state, (obs_t,))
+        return functional_call(self.dqn, dqn_state, (phi.float(), masks_t))
+
+    def _member_q(self, obs_t: torch.Tensor, masks_t: torch.Tensor) -> torch.Tensor:
+        """返回形状为 [成员, 批, 动作空间] 的 Q 值"""
+        if self._vmap_enabled:
+            try:
+                return torch.vmap(self._member_forward, in_dims=(0, 0, None, None))(
+                    self._brain_state, self._dqn_state, obs_t, masks_t
+                )
+            except Exception as e:
+                # 个别算子没有批处理规则时退回逐成员计算，结果一致但延迟随成员数线性增长
+                logger.warning(f"EnsembleEngine ({self.name}): vmap failed, evaluating members sequentially: {e}")
+                self._vmap_enabled = False
+
+        def member_state(state: tuple[StateDict, StateDict], i: int) -> tuple[StateDict, StateDict]:
+            return tuple({k: v[i] for k, v in part.items()} for part in state)
+
+        return torch.stack(
+            [
+                self._member_forward(
+                    member_state(self._brain_state, i), member_state(self._dqn_state, i), obs_t, masks_t
+                )
+                for i in range(len(self.member_names))
+            ]
+        )
+
+    def _aggregate(self, member_q: torch.Tensor) -> torch.Tensor:
+        match self.aggregation:
+            case "min":
+                return member_q.min(dim=0).values
+            case "weighted":
+                return torch.einsum("m,mba->ba", self.weights, member_q)
+            case _:
+                return member_q.mean(dim=0)
+
+    def react_batch(
+        self, obs: np.ndarray, masks: np.ndarray, invisible_obs: np.ndarray
+    ) -> tuple[list[int], list[list[float]], list[list[bool]], list[bool]]:
+        self.member_q_values = None
+        return super().react_batch(obs, masks, invisible_obs)
+
+    def precompute(self, obs: np.ndarray, masks: np.ndarray) -> bool:
+        # 假设观测的前向不应覆盖当前决策的成员 Q 值
+        member_q_values = self.member_q_values
+        try:
+            return super().precompute(obs, masks)
+        finally:
+            self.member_q_values = member_q_values
+
+    def get_resident_bytes(self) -> int:
+        stacked = sum(
+            tensor.numel() * tensor.element_size()
+            for state in (self._brain_state, self._dqn_state)
+            for part in state
+            for tensor in part.values()
+        )
+        return stacked + super().get_resident_bytes()
+
+    def get_additional_meta(self) -> dict[str, object]:
+        meta = super().get_additional_meta()
+        meta["ensemble_members"] = self.member_names
+        meta["ensemble_aggregation"] = self.aggregation
+        if self.member_q_values is not None:
+            meta["ensemble_q_values"] = self.member_q_values
+        return meta
+
+    def _react_batch(
+        self, obs: np.ndarray, masks: np.ndarray, invisible_obs: np.ndarray | None
+    ) -> tuple[list[int], list[list[float]], list[list[bool]], list[bool]]:
+        with decision_profiler.stage("to_tensor"):
+            obs_t = torch.as_tensor(np.stack(obs, axis=0), device=self.device)
+            masks_t = torch.as_tensor(np.stack(masks, axis=0), device=self.device)
+        batch_size = obs_t.shape[0]
+
+        with decision_profiler.stage("forward"):
+            member_q = self._member_q(obs_t, masks_t)
+        with decision_profiler.stage("select"):
+            q_out = self._aggregate(member_q)
+            actions = q_out.argmax(-1)
+
+        with decision_profiler.stage("tolist"):
+            self.member_q_values = member_q[:, 0, masks_t[0]].tolist()
+            result_actions = actions.tolist()
+            result_q_out = q_out.tolist()
+            result_masks = masks_t.tolist()
+        result_is_greedy = [True] * batch_size
+
+        self.last_inference_result = {
+            "actions": result_actions,
+            "q_out": result_q_out,
+            "masks": result_masks,
+            "is_greedy": result_is_greedy,
+        }
+        return result_actions, result_q_out, result_masks, result_is_greedy
+
+
+def load_ensemble_engine(
+    model_paths: list[Path],
+    consts: ModuleType,
+    is_3p: bool = False,
+) -> EnsembleEngine:
+    """
+    加载多个检查点并构建 EnsembleEngine。
+    成员需为相同版本与结构的 Q 值模型；权重堆叠后无法使用编译产物与 int8 量化，统一以 eager 模块加载。
+    """
+    config = local_settings.model_config
+    device = get_inference_device()
+    variant = "fused" if config.fused_inference else "standard"
+    precision = _resolve_precision(device)
+    if precision == "int8":
+        logger.warning("int8 quantization is not supported for ensembles, using fp32.")
+        precision = "fp32"
+
+    artifacts = [_build_eager_artifact(path, consts, device, variant, precision) for path in model_paths]
+    first = artifacts[0].meta
+    for path, artifact in zip(model_paths[1:], artifacts[1:], strict=True):
+        meta = artifact.meta
+        if meta["engine_name"] != "mortal" or first["engine_name"] != "mortal":
+            raise ValueError("only Q-value (DQN) checkpoints can be ensembled")
+        if (meta["version"], meta["in_channels"], meta["action_space"]) != (
+            first["version"],
+            first["in_channels"],
+            first["action_space"],
+        ):
+            raise ValueError(f"ensemble member {path.name} is incompatible with {model_paths[0].name}")
+
+    engine = EnsembleEngine(
+        [artifact.brain for artifact in artifacts],
+        [artifact.dqn for artifact in artifacts],
+        [path.name for path in model_paths],
+        version=first["version"],
+        aggregation=config.ensemble_aggregation,
+        weights=config.ensemble_weights,
+        device=device,
+        is_3p=is_3p,
+        precision=precision,
+        q_cache_bytes=int(config.q_cache_mb * 1024 * 1024),
+    )
+    engine.warmup(in_channels=first["in_channels"], action_space=first["action_space"])
+    return engine
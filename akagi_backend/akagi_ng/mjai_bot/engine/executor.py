@@ -0,0 +1,153 @@
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+import torch
+
+from akagi_ng.mjai_bot.engine.mortal import MortalEngine
+from akagi_ng.mjai_bot.engine.thread_tuner import ThreadProfile, load_thread_profile, machine_fingerprint, tune_threads
+from akagi_ng.mjai_bot.logger import logger
+from akagi_ng.mjai_bot.network import get_inference_device
+
+
+class InferenceExecutor:
+    """
+    专用推理执行器。
+    所有决策（Controller/Bot 的事件处理与推理）都在同一个专用工作线程中串行执行，
+    主循环只提交任务并等待 Future，不再与 MITM、DataServer 线程争抢 torch 的线程池配置。
+
+    torch 线程数:
+    - 配置了 num_threads 时直接使用；
+    - 否则使用本机已保存的调优结果；
+    - 本机尚无调优结果时，在模型就绪后执行一次性调优并保存。
+    """
+
+    def __init__(self):
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self.profile: ThreadProfile | None = None
+        self.fingerprint: str | None = None
+        self._needs_tuning = False
+        self._tuning_scheduled = False
+        # 已提交尚未完成的决策数；推测预计算等后台工作只在没有决策时进行
+        self._in_flight = 0
+        self._idle = threading.Condition()
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self, num_threads: int = 0, num_interop_threads: int = 0):
+        """启动工作线程并确定 torch 线程配置。重复调用无副作用。"""
+        with self._lock:
+            if self._executor is not None:
+                return
+
+            device = get_inference_device()
+            self.fingerprint = machine_fingerprint(device)
+            if num_threads > 0:
+                self.profile = ThreadProfile(num_threads=num_threads, num_interop_threads=num_interop_threads)
+            elif saved := load_thread_profile(self.fingerprint):
+                self.profile = ThreadProfile(saved.num_threads, num_interop_threads or saved.num_interop_threads)
+                logger.info(f"InferenceExecutor: Using tuned profile {self.profile.num_threads} threads.")
+            else:
+                # 线程调优只对 CPU 推理有意义
+                self._needs_tuning = device.type == "cpu"
+                if num_interop_threads > 0:
+                    self.profile = ThreadProfile(torch.get_num_threads(), num_interop_threads)
+
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="InferenceExecutor", initializer=self._configure_torch
+            )
+
+    def _configure_torch(self):
+        if self.profile is None:
+            return
+        torch.set_num_threads(self.profile.num_threads)
+        if self.profile.num_interop_threads > 0:
+            try:
+                torch.set_num_interop_threads(self.profile.num_interop_threads)
+            except RuntimeError as e:
+                # 进程中已经执行过并行计算后无法再修改 inter-op 线程数
+                logger.warning(f"InferenceExecutor: Unable to set inter-op threads: {e}")
+        logger.info(
+            f"InferenceExecutor: torch configured with {self.profile.num_threads} intra-op / "
+            f"{self.profile.num_interop_threads or torch.get_num_interop_threads()} inter-op threads."
+        )
+
+    @property
+    def busy(self) -> bool:
+        return self._in_flight > 0
+
+    def wait_idle(self, timeout: float) -> bool:
+        """等待没有进行中的决策，超时返回 False"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._in_flight == 0, timeout)
+
+    def _begin(self):
+        with self._idle:
+            self._in_flight += 1
+
+    def _end(self, _future: Future | None = None):
+        with self._idle:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self._idle.notify_all()
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """提交任务到推理线程。执行器未启动时直接在当前线程执行，以保持原有的同步语义。"""
+        self._begin()
+        if self._executor is None:
+            future: Future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._end()
+            return future
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._end()
+            raise
+        future.add_done_callback(self._end)
+        return future
+
+    def schedule_auto_tune(self, engine: MortalEngine):
+        """模型就绪后调用：本机尚无调优结果时，在推理线程中排队执行一次调优"""
+        with self._lock:
+            if not self._needs_tuning or self._tuning_scheduled or self._executor is None:
+                return
+            self._tuning_scheduled = True
+        self._executor.submit(self._auto_tune, engine)
+
+    def _auto_tune(self, engine: MortalEngine):
+        try:
+            result = tune_threads(engine, fingerprint=self.fingerprint)
+        except Exception as e:
+            logger.warning(f"InferenceExecutor: Thread auto-tuning failed: {e}")
+            return
+        self.profile = result.profile
+        self._needs_tuning = False
+        torch.set_num_threads(result.profile.num_threads)
+
+    def get_status(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "fingerprint": self.fingerprint,
+            "num_threads": torch.get_num_threads(),
+            "num_interop_threads": torch.get_num_interop_threads(),
+            "tuned": self.profile is not None and not self._needs_tuning,
+        }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# 全局推理执行器
+inference_executor = InferenceExecutor()
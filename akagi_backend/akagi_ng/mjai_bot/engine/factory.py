@@ -1,4 +1,5 @@
 import threading
+import weakref
 from pathlib import Path
 from types import ModuleType
 from typing import Any
@@ -8,7 +9,9 @@ import numpy as np
 from akagi_ng.core.paths import get_models_dir
 from akagi_ng.mjai_bot.engine.akagi_ot import AkagiOTEngine
 from akagi_ng.mjai_bot.engine.base import BaseEngine
-from akagi_ng.mjai_bot.engine.mortal import load_local_mortal_engine
+from akagi_ng.mjai_bot.engine.batching import BatchingEngine
+from akagi_ng.mjai_bot.engine.preload import engine_preloader
+from akagi_ng.mjai_bot.engine.process import ProcessEngine
 from akagi_ng.mjai_bot.engine.provider import EngineProvider
 from akagi_ng.mjai_bot.logger import logger
 from akagi_ng.mjai_bot.protocols import Bot
@@ -22,7 +25,9 @@ _CACHE_LOCK = threading.Lock()
 class LazyLocalEngine(BaseEngine):
     """
     轻量级延迟加载引擎。
-    仅在第一次调用 react_batch 时加载真实的本地模型。
+    仅在第一次调用 react_batch 时获取真实的本地模型。
+    如果后台预加载已完成或正在进行，则复用/等待预加载结果而不是重新加载。
+    真实引擎由预加载器持有，这里只保留弱引用：引擎因空闲或内存预算被淘汰后，下次决策时重新加载。
     不使用 __getattr__ 代理，而是通过显式委托实现。
     """
 
@@ -31,37 +36,61 @@ class LazyLocalEngine(BaseEngine):
         self.model_path = model_path
         self.consts = consts
         self.engine_type = "mortal"
-        self._real_engine: BaseEngine | None = None
+        self._engine_ref: weakref.ref[BaseEngine] | None = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def _real_engine(self) -> BaseEngine | None:
+        return self._engine_ref() if self._engine_ref is not None else None
+
+    @_real_engine.setter
+    def _real_engine(self, engine: BaseEngine | None):
+        self._engine_ref = weakref.ref(engine) if engine is not None else None
 
     def _ensure_engine(self) -> BaseEngine:
-        if self._real_engine is None:
-            logger.info("LazyLocalEngine: Loading real model from disk...")
-            self._real_engine = load_local_mortal_engine(self.model_path, self.consts, self.is_3p)
-            if not self._real_engine:
+        with self._load_lock:
+            if self._real_engine is None:
+                logger.info("LazyLocalEngine: Acquiring real model...")
+            # 每次决策都经过预加载器，以刷新空闲计时并在淘汰后重新加载
+            real_engine = engine_preloader.get_or_load(self.model_path, self.consts, self.is_3p)
+            if not real_engine:
                 raise RuntimeError(f"Failed to load local model at {self.model_path}")
-            # 同步模式应在加载后继承
-            self._real_engine.set_sync_mode(self.is_sync_mode)
-        return self._real_engine
+            if real_engine is not self._real_engine:
+                # 同步模式应在加载后继承
+                real_engine.set_sync_mode(self.is_sync_mode)
+                self._real_engine = real_engine
+        return real_engine
 
     def set_sync_mode(self, enabled: bool):
         super().set_sync_mode(enabled)
-        if self._real_engine:
-            self._real_engine.set_sync_mode(enabled)
+        if real_engine := self._real_engine:
+            real_engine.set_sync_mode(enabled)
 
     def react_batch(
         self, obs: np.ndarray, masks: np.ndarray, invisible_obs: np.ndarray
     ) -> tuple[list[int], list[list[float]], list[list[bool]], list[bool]]:
         return self._ensure_engine().react_batch(obs, masks, invisible_obs)
 
+    def precompute(self, obs: np.ndarray, masks: np.ndarray) -> bool:
+        # 预计算只利用已加载的模型，不为此触发加载
+        if (real_engine := self._real_engine) is None:
+            return False
+        return real_engine.precompute(obs, masks)
+
+    def release(self):
+        # 预加载器是唯一的强引用持有者，淘汰后权重随之回收；进行中的决策持有自己的引用，不受影响
+        if engine_preloader.evict(self.is_3p, reason="inference_process"):
+            logger.info("LazyLocalEngine: Released in-process model, inference runs in the worker process.")
+
     def get_notification_flags(self) -> dict[str, Any]:
-        if self._real_engine is None:
+        if (real_engine := self._real_engine) is None:
             return {}
-        return self._real_engine.get_notification_flags()
+        return real_engine.get_notification_flags()
 
     def get_additional_meta(self) -> dict[str, Any]:
-        if self._real_engine is None:
+        if (real_engine := self._real_engine) is None:
             return {}
-        return self._real_engine.get_additional_meta()
+        return real_engine.get_additional_meta()
 
 
 def load_bot_and_engine(seat: int, is_3p: bool) -> tuple[Bot, BaseEngine]:
@@ -89,6 +118,23 @@ def load_bot_and_engine(seat: int, is_3p: bool) -> tuple[Bot, BaseEngine]:
         cache_key = (is_3p, local_settings.ot.online, local_settings.ot.server)
         if cache_key not in _ENGINE_CACHE:
             local_engine = LazyLocalEngine(model_path, consts, is_3p)
+            # 子进程推理：进程内引擎作为崩溃时的保底
+            if local_settings.model_config.inference_process:
+                local_engine = ProcessEngine(
+                    model_path,
+                    is_3p,
+                    fallback=local_engine,
+                    max_batch_size=local_settings.model_config.max_batch_size,
+                )
+                # 创建时即在后台启动子进程，就绪前由进程内引擎处理决策
+                local_engine.start(wait=False)
+            # 多桌/前瞻并发推理时合并为一次前向计算
+            if local_settings.model_config.batch_window_ms > 0:
+                local_engine = BatchingEngine(
+                    local_engine,
+                    window_ms=local_settings.model_config.batch_window_ms,
+                    max_batch_size=local_settings.model_config.max_batch_size,
+                )
 
             online_engine = None
             if local_settings.ot.online:
@@ -97,7 +143,9 @@ def load_bot_and_engine(seat: int, is_3p: bool) -> tuple[Bot, BaseEngine]:
                 )
 
             # 使用 EngineProvider 汇总
-            provider = EngineProvider(online_engine, local_engine, is_3p)
+            provider = EngineProvider(
+                online_engine, local_engine, is_3p, hedge_budget_ms=local_settings.ot.hedge_budget_ms
+            )
             _ENGINE_CACHE[cache_key] = provider
 
         engine = _ENGINE_CACHE[cache_key]
@@ -0,0 +1,168 @@
+"""
+扁平权重格式：把 Mortal 检查点的 Brain 与 DQN/CategoricalPolicy 张量按 64 字节对齐顺序写入单个文件，
+加载时直接在内存映射上构造张量，不经过 pickle，也不复制到新的堆内存。
+
+文件布局（小端）：
+    magic "AKFW" | u32 格式版本 | u64 头部长度 | JSON 头部 | 对齐填充 | 张量数据...
+
+JSON 头部包含 config、DQN 状态键名、源检查点的大小与修改时间，以及每个张量的 dtype / shape / 偏移。
+映射使用写时复制（ACCESS_COPY），多个进程加载同一文件时共享同一份页缓存。
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import Any
+
+import torch
+
+from akagi_ng.core.paths import ensure_dir
+from akagi_ng.mjai_bot.engine.artifact_cache import get_weights_cache_dir, model_stamp
+from akagi_ng.mjai_bot.logger import logger
+
+FLAT_MAGIC = b"AKFW"
+FLAT_FORMAT_VERSION = 1
+FLAT_SUFFIX = ".akw"
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct("<4sIQ")
+# 写入扁平文件的状态字典键：Brain，以及 DQN（current_dqn）或策略头（policy_net）
+_STATE_KEYS = ("mortal", "current_dqn", "policy_net")
+
+
+class FlatWeightsError(ValueError):
+    """扁平权重文件损坏、版本不符或与源检查点不一致"""
+
+
+def _align(n: int) -> int:
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _dtype_name(dtype: torch.dtype) -> str:
+    return str(dtype).removeprefix("torch.")
+
+
+def flat_weights_path(model_path: Path) -> Path:
+    """检查点对应的扁平权重文件位置"""
+    return get_weights_cache_dir() / f"{model_path.stem}{FLAT_SUFFIX}"
+
+
+def write_flat_weights(state: dict[str, Any], dst: Path, source: Path | None = None) -> Path:
+    """将检查点字典写为扁平权重文件（先写临时文件再原子替换）"""
+    tensors: list[tuple[str, torch.Tensor]] = [
+        (f"{key}.{name}", tensor.detach().cpu().contiguous())
+        for key in _STATE_KEYS
+        if key in state
+        for name, tensor in state[key].items()
+    ]
+
+    entries = []
+    offset = 0
+    for name, tensor in tensors:
+        nbytes = tensor.numel() * tensor.element_size()
+        entries.append(
+            {"name": name, "dtype": _dtype_name(tensor.dtype), "shape": list(tensor.shape), "offset": offset}
+        )
+        offset = _align(offset + nbytes)
+
+    header = json.dumps(
+        {
+            "config": state["config"],
+            "dqn_key": "policy_net" if "policy_net" in state else "current_dqn",
+            "source": model_stamp(source) if source is not None else None,
+            "byteorder": sys.byteorder,
+            "tensors": entries,
+        },
+        default=str,
+    ).encode("utf-8")
+    data_start = _align(_PREAMBLE.size + len(header))
+
+    ensure_dir(dst.parent)
+    tmp = dst.with_suffix(dst.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_PREAMBLE.pack(FLAT_MAGIC, FLAT_FORMAT_VERSION, len(header)))
+        f.write(header)
+        for entry, (_, tensor) in zip(entries, tensors, strict=True):
+            f.seek(data_start + entry["offset"])
+            f.write(tensor.reshape(-1).view(torch.uint8).numpy().tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, dst)
+    return dst
+
+
+def convert_checkpoint(source: Path, dst: Path | None = None) -> Path:
+    """把 .pth 检查点转换为扁平权重文件，默认写到加载器查找的缓存位置"""
+    state = torch.load(source, map_location="cpu", weights_only=False)
+    return write_flat_weights(state, dst or flat_weights_path(source), source=source)
+
+
+def load_flat_weights(path: Path, source: Path | None = None) -> dict[str, Any]:
+    """
+    内存映射扁平权重文件，返回与 torch.load 结果结构相同的字典（config / mortal / DQN 状态）。
+    张量直接引用映射内存；指定 source 时校验文件是否由该检查点的当前版本生成。
+    """
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    try:
+        magic, version, header_len = _PREAMBLE.unpack_from(mm, 0)
+        if magic != FLAT_MAGIC:
+            raise FlatWeightsError(f"{path.name} is not a flat weights file")
+        if version != FLAT_FORMAT_VERSION:
+            raise FlatWeightsError(f"unsupported flat weights version {version}")
+        header = json.loads(mm[_PREAMBLE.size : _PREAMBLE.size + header_len])
+        if header["byteorder"] != sys.byteorder:
+            raise FlatWeightsError(f"flat weights were written on a {header['byteorder']}-endian machine")
+        if source is not None and header["source"] != model_stamp(source):
+            raise FlatWeightsError(f"{path.name} is stale for {source.name}")
+
+        data_start = _align(_PREAMBLE.size + header_len)
+        state: dict[str, Any] = {"config": header["config"]}
+        for entry in header["tensors"]:
+            key, name = entry["name"].split(".", 1)
+            dtype = getattr(torch, entry["dtype"])
+            shape = entry["shape"]
+            count = 1
+            for dim in shape:
+                count *= dim
+            offset = data_start + entry["offset"]
+            if offset + count * dtype.itemsize > len(mm):
+                raise FlatWeightsError(f"{path.name} is truncated")
+            tensor = (
+                torch.frombuffer(mm, dtype=dtype, count=count, offset=offset) if count else torch.empty(0, dtype=dtype)
+            )
+            state.setdefault(key, {})[name] = tensor.view(shape)
+        return state
+    except (struct.error, KeyError, json.JSONDecodeError, AttributeError) as e:
+        raise FlatWeightsError(f"corrupt flat weights file {path.name}: {e}") from e
+
+
+def load_checkpoint(model_path: Path, flat_path: Path | None) -> tuple[dict[str, Any], bool]:
+    """
+    读取检查点。flat_path 指向的扁平文件有效时直接内存映射；
+    否则 torch.load 原始检查点，并尝试写出扁平文件供下次使用。
+    返回 (状态字典, 是否来自内存映射)。
+    """
+    if flat_path is not None and flat_path.exists():
+        try:
+            return load_flat_weights(flat_path, source=model_path), True
+        except (ValueError, OSError) as e:
+            logger.info(f"FlatWeights: {e}, rebuilding from checkpoint.")
+
+    state = torch.load(model_path, map_location="cpu", weights_only=False)
+    if flat_path is not None:
+        try:
+            write_flat_weights(state, flat_path, source=model_path)
+            logger.info(f"FlatWeights: Wrote {flat_path.name} for {model_path.name}.")
+        except Exception as e:
+            logger.warning(f"FlatWeights: Unable to write {flat_path}: {e}")
+    return state, False
+
+
+if __name__ == "__main__":
+    # 手动转换：python -m akagi_ng.mjai_bot.engine.flat_weights models/mortal.pth [...]
+    for arg in sys.argv[1:]:
+        print(convert_checkpoint(Path(arg)))
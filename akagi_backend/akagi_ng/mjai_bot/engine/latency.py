@@ -0,0 +1,40 @@
+import math
+import threading
+from collections import deque
+
+
+def _nearest_rank(ordered: list[float], p: float) -> float:
+    return ordered[max(math.ceil(p / 100 * len(ordered)), 1) - 1]
+
+
+class LatencyWindow:
+    """最近 N 次请求耗时（毫秒）的滚动窗口，提供 p50/p95/p99 等分位数"""
+
+    def __init__(self, size: int = 100):
+        self._samples: deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, latency_ms: float):
+        with self._lock:
+            self._samples.append(latency_ms)
+
+    def percentile(self, p: float) -> float | None:
+        """最近秩法分位数；窗口为空时返回 None"""
+        with self._lock:
+            ordered = sorted(self._samples)
+        return _nearest_rank(ordered, p) if ordered else None
+
+    def snapshot(self) -> dict[str, float | int | None]:
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return {"samples": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+        return {
+            "samples": len(ordered),
+            "p50_ms": round(_nearest_rank(ordered, 50), 3),
+            "p95_ms": round(_nearest_rank(ordered, 95), 3),
+            "p99_ms": round(_nearest_rank(ordered, 99), 3),
+        }
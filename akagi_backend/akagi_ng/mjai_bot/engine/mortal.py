@@ -1,3 +1,5 @@
+import contextlib
+import time
 from pathlib import Path
 from types import ModuleType
 
@@ -6,9 +8,30 @@ import torch
 from torch.distributions import Categorical, Normal
 
 from akagi_ng.core.constants import ModelConstants
+from akagi_ng.mjai_bot.engine.artifact_cache import (
+    InferenceArtifact,
+    build_artifact,
+    compute_model_digest,
+    load_artifact,
+)
 from akagi_ng.mjai_bot.engine.base import BaseEngine
+from akagi_ng.mjai_bot.engine.flat_weights import flat_weights_path, load_checkpoint
+from akagi_ng.mjai_bot.engine.profiling import decision_profiler
+from akagi_ng.mjai_bot.engine.q_cache import CachedDecision, QValueCache
 from akagi_ng.mjai_bot.logger import logger
-from akagi_ng.mjai_bot.network import DQN, Brain, get_inference_device
+from akagi_ng.mjai_bot.network import (
+    DQN,
+    Brain,
+    CategoricalPolicy,
+    fuse_brain_for_inference,
+    get_inference_device,
+    quantize_dynamic_int8,
+    supports_bf16_autocast,
+)
+from akagi_ng.settings import local_settings
+
+# warmup 时测量 bf16 加速比的推理轮数
+AMP_BENCHMARK_ROUNDS = 5
 
 
 class MortalEngine(BaseEngine):
@@ -25,6 +48,8 @@ class MortalEngine(BaseEngine):
         boltzmann_temp: float = 1,
         top_p: float = 1,
         is_3p: bool = False,
+        precision: str = "fp32",
+        q_cache_bytes: int = 0,
     ):
         super().__init__(is_3p=is_3p, version=version, name=name, is_oracle=is_oracle)
 
@@ -39,13 +64,34 @@ class MortalEngine(BaseEngine):
         self.boltzmann_temp = boltzmann_temp
         self.top_p = top_p
 
-    def warmup(self):
-        """执行一次 dummy 推理以预热 CUDA/CPU 内核，消除首个真实请求的卡顿。"""
+        # 推理精度 (fp32 / int8 / bf16)，随决策元数据一起上报
+        self.precision = precision
+        # warmup 时测得的 bf16 相对 fp32 的加速比
+        self.amp_speedup: float | None = None
+
+        # 观测 -> Q 值缓存，仅在确定性推理时使用
+        self.q_cache = QValueCache(q_cache_bytes) if q_cache_bytes > 0 else None
+
+        # 输入维度，在 warmup 时确定（线程调优等需要构造观测的场景使用）
+        self.in_channels: int | None = None
+        self.action_space: int | None = None
+
+    @property
+    def enable_amp(self) -> bool:
+        return self.precision == "bf16"
+
+    def warmup(self, in_channels: int | None = None, action_space: int | None = None):
+        """
+        执行一次 dummy 推理以预热 CUDA/CPU 内核，消除首个真实请求的卡顿。
+        编译后的模块不保留层属性，此时需显式传入输入维度。
+        """
         try:
             # 动态检测模型输入维度
             # Brain.encoder.net[0] 是第一个 Conv1d 层
-            in_channels = self.brain.encoder.net[0].in_channels
-            action_space = self.dqn.action_space
+            in_channels = in_channels or self.brain.encoder.net[0].in_channels
+            action_space = action_space or self.dqn.action_space
+            self.in_channels = in_channels
+            self.action_space = action_space
 
             # 构造最小规模的有效观测
             # 观测维由 Brain.encoder 决定，通常是 (B, C, 34)
@@ -55,10 +101,39 @@ class MortalEngine(BaseEngine):
 
             logger.debug(f"MortalEngine ({self.name}): Warming up engine with shape (1, {in_channels}, 34)...")
             self.react_batch(obs, masks, invisible_obs)
+            if self.enable_amp:
+                self._measure_amp_speedup(obs, masks, invisible_obs)
+            # 预热用的空观测不应计入缓存统计
+            if self.q_cache is not None:
+                self.q_cache.clear()
             logger.info(f"MortalEngine ({self.name}): Warmup completed.")
         except Exception as e:
             logger.warning(f"MortalEngine warmup failed: {e}")
 
+    def _measure_amp_speedup(self, obs: np.ndarray, masks: np.ndarray, invisible_obs: np.ndarray):
+        """
+        对比 fp32 与 bf16 autocast 的推理耗时并记录加速比。
+        没有 bf16 硬件加速的 CPU 上 autocast 反而更慢，此时回退到 fp32。
+        """
+        timings = {}
+        for precision in ("fp32", "bf16"):
+            self.precision = precision
+            self._infer(obs, masks, invisible_obs)
+            start = time.perf_counter()
+            for _ in range(AMP_BENCHMARK_ROUNDS):
+                self._infer(obs, masks, invisible_obs)
+            timings[precision] = time.perf_counter() - start
+
+        self.amp_speedup = timings["fp32"] / timings["bf16"]
+        if self.amp_speedup < 1:
+            self.precision = "fp32"
+            logger.warning(
+                f"MortalEngine ({self.name}): bf16 autocast is slower than fp32 "
+                f"(speedup {self.amp_speedup:.2f}x), falling back to fp32."
+            )
+        else:
+            logger.info(f"MortalEngine ({self.name}): bf16 autocast speedup {self.amp_speedup:.2f}x over fp32.")
+
     def react_batch(
         self, obs: np.ndarray, masks: np.ndarray, invisible_obs: np.ndarray
     ) -> tuple[list[int], list[list[float]], list[list[bool]], list[bool]]:
@@ -83,6 +158,14 @@ class MortalEngine(BaseEngine):
             }
             return fast_actions, q_out, clean_masks, is_greedy
 
+        with decision_profiler.capture(self.name, len(obs)):
+            if self._cache_enabled:
+                return self._react_batch_cached(obs, masks, invisible_obs)
+            return self._infer(obs, masks, invisible_obs)
+
+    def _infer(
+        self, obs: np.ndarray, masks: np.ndarray, invisible_obs: np.ndarray | None
+    ) -> tuple[list[int], list[list[float]], list[list[bool]], list[bool]]:
         try:
             with (
                 torch.autocast(self.device.type, enabled=False),
@@ -92,42 +175,138 @@ class MortalEngine(BaseEngine):
         except Exception as ex:
             raise RuntimeError(f"Error during inference: {ex}") from ex
 
+    @property
+    def _cache_enabled(self) -> bool:
+        return self.q_cache is not None and self.boltzmann_epsilon <= 0 and not self.stochastic_latent
+
+    def _cache_keys(self, obs: np.ndarray, masks: np.ndarray, invisible_obs: np.ndarray | None) -> list[bytes]:
+        return [
+            QValueCache.make_key(
+                obs[i], masks[i], invisible_obs[i] if invisible_obs is not None else None, self.precision
+            )
+            for i in range(len(obs))
+        ]
+
+    def _infer_into_cache(
+        self,
+        obs: np.ndarray,
+        masks: np.ndarray,
+        invisible_obs: np.ndarray | None,
+        keys: list[bytes],
+        rows: list[int],
+    ) -> list[CachedDecision]:
+        """对指定行执行一次前向推理并写入 Q 值缓存"""
+        row_inv = invisible_obs[rows] if invisible_obs is not None else None
+        actions, q_out, _, _ = self._infer(obs[rows], masks[rows], row_inv)
+        entries = []
+        for j, i in enumerate(rows):
+            entry = CachedDecision(
+                action=actions[j],
+                q_out=np.asarray(q_out[j], dtype=np.float32),
+                masks=np.asarray(masks[i], dtype=bool),
+            )
+            self.q_cache.put(keys[i], entry)
+            entries.append(entry)
+        return entries
+
+    def precompute(self, obs: np.ndarray, masks: np.ndarray) -> bool:
+        """将一批假设观测一次性前向推理并写入 Q 值缓存，真实决策到达时直接命中缓存"""
+        if not self._cache_enabled or self.is_oracle:
+            return False
+        obs = np.asanyarray(obs)
+        masks = np.asanyarray(masks)
+        keys = self._cache_keys(obs, masks, None)
+        if rows := [i for i, key in enumerate(keys) if key not in self.q_cache]:
+            self._infer_into_cache(obs, masks, None, keys, rows)
+        return True
+
+    def _react_batch_cached(
+        self, obs: np.ndarray, masks: np.ndarray, invisible_obs: np.ndarray | None
+    ) -> tuple[list[int], list[list[float]], list[list[bool]], list[bool]]:
+        """逐条查询 Q 值缓存，仅对未命中的观测执行前向推理"""
+        invisible_obs = np.asanyarray(invisible_obs) if invisible_obs is not None else None
+        with decision_profiler.stage("cache_lookup"):
+            keys = self._cache_keys(obs, masks, invisible_obs)
+            entries = [self.q_cache.get(key) for key in keys]
+
+        if misses := [i for i, entry in enumerate(entries) if entry is None]:
+            computed = self._infer_into_cache(obs, masks, invisible_obs, keys, misses)
+            for i, entry in zip(misses, computed, strict=True):
+                entries[i] = entry
+
+        result_actions = [entry.action for entry in entries]
+        result_q_out = [entry.q_out.tolist() for entry in entries]
+        result_masks = [entry.masks.tolist() for entry in entries]
+        result_is_greedy = [True] * len(entries)
+
+        self.last_inference_result = {
+            "actions": result_actions,
+            "q_out": result_q_out,
+            "masks": result_masks,
+            "is_greedy": result_is_greedy,
+        }
+        return result_actions, result_q_out, result_masks, result_is_greedy
+
+    def get_additional_meta(self) -> dict[str, object]:
+        meta: dict[str, object] = {"precision": self.precision}
+        if self.q_cache is not None:
+            meta["q_cache_hits"] = self.q_cache.hits
+            meta["q_cache_misses"] = self.q_cache.misses
+        return meta
+
+    def get_resident_bytes(self) -> int:
+        cache_bytes = self.q_cache.size_bytes if self.q_cache is not None else 0
+        return module_nbytes(self.brain) + module_nbytes(self.dqn) + cache_bytes
+
+    def _amp_autocast(self) -> torch.autocast:
+        return torch.autocast(self.device.type, dtype=torch.bfloat16, enabled=self.enable_amp)
+
     def _react_batch(
         self, obs: np.ndarray, masks: np.ndarray, invisible_obs: np.ndarray
     ) -> tuple[list[int], list[list[float]], list[list[bool]], list[bool]]:
-        obs_t = torch.as_tensor(np.stack(obs, axis=0), device=self.device)
-        masks_t = torch.as_tensor(np.stack(masks, axis=0), device=self.device)
-        inv_obs_t = (
-            torch.as_tensor(np.stack(invisible_obs, axis=0), device=self.device) if invisible_obs is not None else None
-        )
+        with decision_profiler.stage("to_tensor"):
+            obs_t = torch.as_tensor(np.stack(obs, axis=0), device=self.device)
+            masks_t = torch.as_tensor(np.stack(masks, axis=0), device=self.device)
+            inv_obs_t = (
+                torch.as_tensor(np.stack(invisible_obs, axis=0), device=self.device)
+                if invisible_obs is not None
+                else None
+            )
         batch_size = obs_t.shape[0]
         q_out = None
-        match self.version:
-            case ModelConstants.MODEL_VERSION_1:
-                mu, logsig = self.brain(obs_t, inv_obs_t)
-                latent = Normal(mu, logsig.exp() + 1e-6).sample() if self.stochastic_latent else mu
-                q_out = self.dqn(latent, masks_t)
-            case ModelConstants.MODEL_VERSION_2 | ModelConstants.MODEL_VERSION_3 | ModelConstants.MODEL_VERSION_4:
-                phi = self.brain(obs_t)
-                q_out = self.dqn(phi, masks_t)
-            case _:
-                raise ValueError(f"Unsupported Mortal version: {self.version}")
-
-        if self.boltzmann_epsilon > 0:
-            is_greedy = (
-                torch.full((batch_size,), 1 - self.boltzmann_epsilon, device=self.device).bernoulli().to(torch.bool)
-            )
-            logits = (q_out / self.boltzmann_temp).masked_fill(~masks_t, -torch.inf)
-            sampled = _sample_top_p(logits, self.top_p)
-            actions = torch.where(is_greedy, q_out.argmax(-1), sampled)
-        else:
-            is_greedy = torch.ones(batch_size, dtype=torch.bool, device=self.device)
-            actions = q_out.argmax(-1)
-
-        result_actions = actions.tolist()
-        result_q_out = q_out.tolist()
-        result_masks = masks_t.tolist()
-        result_is_greedy = is_greedy.tolist()
+        # 仅 Brain 在 bf16 autocast 下执行；Q 值头保持 fp32，保证 -inf mask 与 argmax 精确
+        with decision_profiler.stage("forward"):
+            match self.version:
+                case ModelConstants.MODEL_VERSION_1:
+                    with self._amp_autocast():
+                        mu, logsig = self.brain(obs_t, inv_obs_t)
+                    mu, logsig = mu.float(), logsig.float()
+                    latent = Normal(mu, logsig.exp() + 1e-6).sample() if self.stochastic_latent else mu
+                    q_out = self.dqn(latent, masks_t)
+                case ModelConstants.MODEL_VERSION_2 | ModelConstants.MODEL_VERSION_3 | ModelConstants.MODEL_VERSION_4:
+                    with self._amp_autocast():
+                        phi = self.brain(obs_t)
+                    q_out = self.dqn(phi.float(), masks_t)
+                case _:
+                    raise ValueError(f"Unsupported Mortal version: {self.version}")
+
+        with decision_profiler.stage("select"):
+            if self.boltzmann_epsilon > 0:
+                is_greedy = (
+                    torch.full((batch_size,), 1 - self.boltzmann_epsilon, device=self.device).bernoulli().to(torch.bool)
+                )
+                logits = (q_out / self.boltzmann_temp).masked_fill(~masks_t, -torch.inf)
+                sampled = _sample_top_p(logits, self.top_p)
+                actions = torch.where(is_greedy, q_out.argmax(-1), sampled)
+            else:
+                is_greedy = torch.ones(batch_size, dtype=torch.bool, device=self.device)
+                actions = q_out.argmax(-1)
+
+        with decision_profiler.stage("tolist"):
+            result_actions = actions.tolist()
+            result_q_out = q_out.tolist()
+            result_masks = masks_t.tolist()
+            result_is_greedy = is_greedy.tolist()
 
         self.last_inference_result = {
             "actions": result_actions,
@@ -139,6 +318,22 @@ class MortalEngine(BaseEngine):
         return result_actions, result_q_out, result_masks, result_is_greedy
 
 
+def module_nbytes(module: torch.nn.Module) -> int:
+    """统计模块持有的权重与缓冲区字节数（含冻结 TorchScript 内联的常量与量化后的打包权重）"""
+    tensors: list[object] = list(module.state_dict().values())
+    if isinstance(module, torch.jit.ScriptModule):
+        try:
+            tensors.extend(module.code_with_constants[1].const_mapping.values())
+        except Exception as e:
+            logger.debug(f"Unable to inspect TorchScript constants: {e}")
+    total = 0
+    for value in tensors:
+        for tensor in value if isinstance(value, tuple) else (value,):
+            if isinstance(tensor, torch.Tensor) and not tensor.is_meta:
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
 def _sample_top_p(logits: torch.Tensor, p: float) -> torch.Tensor:
     if p >= 1:
         return Categorical(logits=logits).sample()
@@ -152,35 +347,47 @@ def _sample_top_p(logits: torch.Tensor, p: float) -> torch.Tensor:
     return probs_idx.gather(-1, probs_sort.multinomial(1)).squeeze(-1)
 
 
-def load_local_mortal_engine(
-    model_path: Path,
-    consts: ModuleType,
-    is_3p: bool = False,
-) -> MortalEngine | None:
+def _resolve_precision(device: torch.device) -> str:
     """
-    加载本地 Mortal 模型并返回 MortalEngine。
-    如果文件未找到或加载失败则返回 None。
+    读取配置的推理精度。
+    int8 动态量化仅支持 CPU；bf16 需要设备通过 autocast 能力探测；不满足时回退到 fp32。
     """
-
-    if not model_path.exists():
-        return None
-
-    try:
-        state = torch.load(model_path, map_location=get_inference_device(), weights_only=False)
-
-        # 提取配置版本
-        cfg = state["config"]
-        control_version = cfg["control"]["version"]
-        conv_channels = cfg["resnet"]["conv_channels"]
-        num_blocks = cfg["resnet"]["num_blocks"]
-
-        # 检测是否为 policy_net 模式 (CategoricalPolicy + GroupNorm)
-        is_policy_model = "policy_net" in state
-        norm_type = "GN" if is_policy_model else "BN"
-        dqn_key = "policy_net" if is_policy_model else "current_dqn"
-
-        from akagi_ng.mjai_bot.network import CategoricalPolicy
-
+    precision = local_settings.model_config.precision
+    if precision == "int8" and device.type != "cpu":
+        logger.warning(f"int8 quantization is CPU-only, using fp32 on {device.type}.")
+        return "fp32"
+    if precision == "bf16" and not supports_bf16_autocast(device.type):
+        logger.warning(f"bf16 autocast is not supported on this {device.type}, using fp32.")
+        return "fp32"
+    return precision
+
+
+def _build_eager_artifact(
+    model_path: Path, consts: ModuleType, device: torch.device, variant: str, precision: str
+) -> InferenceArtifact:
+    """
+    从 .pth 检查点重建 eager 模式的 Brain 与 DQN/CategoricalPolicy。
+    variant 为 "fused" 时使用折叠归一化与融合通道注意力的推理版 Brain；
+    precision 为 "int8" 时对 Linear 层进行动态量化。
+    检查点优先从内存映射的扁平权重文件读取；CPU 上直接以映射内存作为模块参数，不复制到堆上。
+    """
+    state, mapped = load_checkpoint(model_path, flat_weights_path(model_path))
+    # 参数直接引用映射内存（零拷贝），仅在 CPU 上且后续不会重写权重时使用
+    assign = mapped and device.type == "cpu"
+
+    # 提取配置版本
+    cfg = state["config"]
+    control_version = cfg["control"]["version"]
+    conv_channels = cfg["resnet"]["conv_channels"]
+    num_blocks = cfg["resnet"]["num_blocks"]
+
+    # 检测是否为 policy_net 模式 (CategoricalPolicy + GroupNorm)
+    is_policy_model = "policy_net" in state
+    norm_type = "GN" if is_policy_model else "BN"
+    dqn_key = "policy_net" if is_policy_model else "current_dqn"
+
+    # 零拷贝加载时参数随后整体替换为映射内存，在 meta 设备上构造以跳过随机初始化
+    with torch.device("meta") if assign else contextlib.nullcontext():
         mortal = Brain(
             obs_shape_func=consts.obs_shape,
             oracle_obs_shape_func=consts.oracle_obs_shape,
@@ -197,19 +404,115 @@ def load_local_mortal_engine(
             dqn = DQN(action_space=consts.ACTION_SPACE, version=control_version).eval()
             engine_name = "mortal"
 
-        mortal.load_state_dict(state["mortal"])
-        dqn.load_state_dict(state[dqn_key])
+    mortal.load_state_dict(state["mortal"], assign=assign)
+    dqn.load_state_dict(state[dqn_key], assign=assign)
+
+    if variant == "fused":
+        mortal = fuse_brain_for_inference(mortal)
+
+    if precision == "int8":
+        try:
+            mortal, dqn = quantize_dynamic_int8(mortal), quantize_dynamic_int8(dqn)
+        except Exception as e:
+            logger.warning(f"Dynamic int8 quantization failed, using fp32: {e}")
+            precision = "fp32"
+
+    meta = {
+        "version": control_version,
+        "engine_name": engine_name,
+        "in_channels": mortal.encoder.net[0].in_channels,
+        "action_space": dqn.action_space,
+        "variant": variant,
+        "precision": precision,
+    }
+    return InferenceArtifact(brain=mortal.to(device), dqn=dqn.to(device), meta=meta)
+
+
+def _load_inference_artifact(
+    model_path: Path, consts: ModuleType, device: torch.device, variant: str, precision: str
+) -> InferenceArtifact:
+    """
+    优先使用缓存的编译产物；缓存缺失或过期时从检查点重建并写入缓存。
+    编译失败时回退到 eager 模块。
+    """
+    # 冻结的 TorchScript 图不受 autocast 影响，bf16 模式直接使用 eager 模块
+    if precision == "bf16":
+        return _build_eager_artifact(model_path, consts, device, variant, precision)
+
+    try:
+        digest = compute_model_digest(model_path)
+    except OSError as e:
+        logger.debug(f"ArtifactCache: Unable to hash {model_path}, skipping cache: {e}")
+        return _build_eager_artifact(model_path, consts, device, variant, precision)
+
+    if artifact := load_artifact(model_path, device, digest, variant, precision):
+        return artifact
+
+    eager = _build_eager_artifact(model_path, consts, device, variant, precision)
+    return build_artifact(model_path, eager, device=device, digest=digest) or eager
+
+
+def _ensemble_member_paths(model_path: Path, is_3p: bool) -> list[Path]:
+    """读取与主模型一同集成的其他检查点（位于同一模型目录），缺失的文件会被跳过"""
+    config = local_settings.model_config
+    names = config.ensemble_3p if is_3p else config.ensemble_4p
+    members = []
+    for name in names:
+        path = model_path.parent / name
+        if path == model_path:
+            continue
+        if not path.exists():
+            logger.warning(f"Ensemble member {name} not found, skipping.")
+            continue
+        members.append(path)
+    return members
+
+
+def load_local_mortal_engine(
+    model_path: Path,
+    consts: ModuleType,
+    is_3p: bool = False,
+) -> MortalEngine | None:
+    """
+    加载本地 Mortal 模型并返回 MortalEngine。
+    如果文件未找到或加载失败则返回 None。
+    """
+
+    if not model_path.exists():
+        return None
+
+    if members := _ensemble_member_paths(model_path, is_3p):
+        from akagi_ng.mjai_bot.engine.ensemble import load_ensemble_engine
+
+        try:
+            engine = load_ensemble_engine([model_path, *members], consts, is_3p)
+            logger.info(
+                f"Local Mortal ({'3P' if is_3p else '4P'}) ensemble loaded successfully "
+                f"({len(members) + 1} members, {engine.aggregation}, {engine.precision})."
+            )
+            return engine
+        except Exception as e:
+            logger.error(f"Failed to load Mortal ensemble, using {model_path.name} only: {e}")
+
+    try:
+        device = get_inference_device()
+        variant = "fused" if local_settings.model_config.fused_inference else "standard"
+        artifact = _load_inference_artifact(model_path, consts, device, variant, _resolve_precision(device))
+        meta = artifact.meta
 
         engine = MortalEngine(
-            mortal,
-            dqn,
+            artifact.brain,
+            artifact.dqn,
             is_oracle=False,
-            version=control_version,
-            name=engine_name,
+            version=meta["version"],
+            name=meta["engine_name"],
             is_3p=is_3p,
+            precision=meta["precision"],
+            q_cache_bytes=int(local_settings.model_config.q_cache_mb * 1024 * 1024),
         )
-        engine.warmup()
-        logger.info(f"Local Mortal ({'3P' if is_3p else '4P'}) model loaded successfully.")
+        engine.warmup(in_channels=meta["in_channels"], action_space=meta["action_space"])
+        mode = f"{'compiled' if artifact.compiled else 'eager'}, {variant}, {engine.precision}"
+        logger.info(f"Local Mortal ({'3P' if is_3p else '4P'}) model loaded successfully ({mode}).")
         return engine
 
     except Exception as e:
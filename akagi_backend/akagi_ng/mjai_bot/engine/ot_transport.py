@@ -0,0 +1,159 @@
+import asyncio
+import atexit
+import threading
+import time
+import weakref
+from collections.abc import Callable, Coroutine
+from concurrent.futures import Future
+from typing import Any
+
+import aiohttp
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from akagi_ng.mjai_bot.logger import logger
+
+# 连接池大小与空闲连接保活时间
+POOL_SIZE = 8
+KEEPALIVE_SECONDS = 60.0
+# 健康探测间隔：空闲超过该时间后发送轻量 OPTIONS，保持连接与 TLS 会话温热（需小于服务端的 keep-alive 超时）
+PING_INTERVAL_SECONDS = 15.0
+PING_TIMEOUT = (2.0, 2.0)
+# 探测时同时预热的连接数，保证主决策与立直前瞻/迟到的对冲请求并发时都有现成的连接可用
+WARM_CONNECTIONS = 2
+
+
+class _IOLoop:
+    """进程内共享的后台事件循环，所有 PooledSession 的网络 IO 都在这个线程中执行"""
+
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+
+    def get(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="AkagiOT-IO", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.get())
+
+
+_io_loop = _IOLoop()
+_sessions: "weakref.WeakSet[PooledSession]" = weakref.WeakSet()
+
+
+class PooledSession(requests.Session):
+    """
+    requests.Session 兼容的同步门面。
+    请求在共享事件循环上经 aiohttp 的 keep-alive 连接池发出，调用线程只阻塞等待结果；
+    多个线程（主决策、立直前瞻、对冲请求）可同时在途，各自复用已预热的连接。
+    返回标准的 requests.Response，网络错误映射为 requests 的异常类型，上层调用方无需改动。
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE, keepalive_seconds: float = KEEPALIVE_SECONDS):
+        super().__init__()
+        self.pool_size = pool_size
+        self.keepalive_seconds = keepalive_seconds
+        self.last_activity = 0.0
+        self._client: aiohttp.ClientSession | None = None
+        self._ping_future: Future | None = None
+        _sessions.add(self)
+
+    async def _get_client(self) -> aiohttp.ClientSession:
+        if self._client is None or self._client.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size, keepalive_timeout=self.keepalive_seconds, ttl_dns_cache=300
+            )
+            self._client = aiohttp.ClientSession(connector=connector)
+        return self._client
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        data: bytes | None = None,
+        headers: dict[str, str | None] | None = None,
+        timeout: float | tuple[float, float] | None = None,
+        **kwargs: object,
+    ) -> requests.Response:
+        # 与 requests 相同的合并规则：请求级头部覆盖会话级头部，值为 None 表示删除
+        merged = {**self.headers, **(headers or {})}
+        merged = {k: v for k, v in merged.items() if v is not None}
+        return _io_loop.submit(self._request(method, url, data, merged, timeout)).result()
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        data: bytes | None,
+        headers: dict[str, str],
+        timeout: float | tuple[float, float] | None,
+    ) -> requests.Response:
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        client_timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+        self.last_activity = time.monotonic()
+        try:
+            client = await self._get_client()
+            async with client.request(method, url, data=data, headers=headers, timeout=client_timeout) as resp:
+                content = await resp.read()
+        except TimeoutError as e:
+            raise requests.Timeout(f"{method} {url} timed out") from e
+        except aiohttp.ClientConnectionError as e:
+            raise requests.ConnectionError(str(e)) from e
+        except aiohttp.ClientError as e:
+            raise requests.RequestException(str(e)) from e
+
+        response = requests.Response()
+        response.status_code = resp.status
+        response.reason = resp.reason
+        response.headers = CaseInsensitiveDict(resp.headers)
+        response.url = str(resp.url)
+        response.encoding = resp.charset
+        response._content = content
+        return response
+
+    def start_health_pings(
+        self, url: str, on_result: Callable[[requests.Response | None], None], interval: float = PING_INTERVAL_SECONDS
+    ):
+        """立即预热连接，此后每当空闲超过 interval 秒时再次探测。重复调用无副作用。"""
+        if self._ping_future is None or self._ping_future.done():
+            self._ping_future = _io_loop.submit(self._ping_loop(url, on_result, interval))
+
+    async def _ping_loop(self, url: str, on_result: Callable[[requests.Response | None], None], interval: float):
+        while True:
+            if self.last_activity == 0.0 or time.monotonic() - self.last_activity >= interval:
+                headers = {k: v for k, v in self.headers.items() if v is not None}
+                results = await asyncio.gather(
+                    *(self._request("OPTIONS", url, None, headers, PING_TIMEOUT) for _ in range(WARM_CONNECTIONS)),
+                    return_exceptions=True,
+                )
+                response = next((r for r in results if isinstance(r, requests.Response)), None)
+                if response is None:
+                    logger.debug(f"AkagiOT: Health ping to {url} failed: {results[0]}")
+                try:
+                    on_result(response)
+                except Exception as e:
+                    logger.warning(f"AkagiOT: Health ping callback failed: {e}")
+            await asyncio.sleep(interval)
+
+    def close(self):
+        if self._ping_future is not None:
+            self._ping_future.cancel()
+            self._ping_future = None
+        client, self._client = self._client, None
+        if client is not None and not client.closed:
+            try:
+                _io_loop.submit(client.close()).result(timeout=2.0)
+            except Exception as e:
+                logger.debug(f"AkagiOT: Error closing connection pool: {e}")
+        super().close()
+
+
+@atexit.register
+def _close_sessions():
+    for session in list(_sessions):
+        session.close()
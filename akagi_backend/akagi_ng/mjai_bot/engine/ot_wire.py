@@ -0,0 +1,151 @@
+"""
+AkagiOT 二进制传输格式（v1）。
+
+请求体（小端）:
+    头部 <3sBBHHHH: magic b"AOT", 版本, 保留标志, 批大小, 通道数, 宽度, 动作空间
+    通道位图: 每个通道 1 bit，置位表示该通道在整个批中只含 0/1
+    二值通道: np.packbits 按位打包
+    其余通道: 原样 float32
+    合法动作掩码: np.packbits 按位打包
+
+响应体（小端）:
+    头部 <3sBBHH: magic b"AOQ", 版本, Q 值类型（0=float32, 1=float16）, 批大小, 动作空间
+    动作: int16 * 批大小
+    is_greedy: np.packbits 按位打包
+    Q 值: 批大小 * 动作空间，类型见头部
+
+客户端与服务端通过 WIRE_HEADER 协商版本，不支持时回退到 JSON 格式。
+"""
+
+import struct
+from dataclasses import dataclass
+
+import numpy as np
+
+WIRE_VERSION = 1
+WIRE_HEADER = "X-AkagiOT-Wire"
+CONTENT_TYPE = "application/x-akagi-ot"
+
+_REQUEST_MAGIC = b"AOT"
+_RESPONSE_MAGIC = b"AOQ"
+_REQUEST_HEADER = struct.Struct("<3sBBHHHH")
+_RESPONSE_HEADER = struct.Struct("<3sBBHH")
+
+Q_DTYPES: dict[int, np.dtype] = {0: np.dtype("<f4"), 1: np.dtype("<f2")}
+_Q_DTYPE_CODES = {dtype: code for code, dtype in Q_DTYPES.items()}
+
+
+class WireFormatError(ValueError):
+    """二进制负载损坏或版本不受支持"""
+
+
+@dataclass
+class InferenceResponse:
+    actions: list[int]
+    q_out: list[list[float]]
+    is_greedy: list[bool]
+
+
+def _packed_len(bits: int) -> int:
+    return (bits + 7) // 8
+
+
+def _take(buf: memoryview, offset: int, nbytes: int) -> tuple[memoryview, int]:
+    if offset + nbytes > len(buf):
+        raise WireFormatError("truncated payload")
+    return buf[offset : offset + nbytes], offset + nbytes
+
+
+def parse_wire_versions(value: str | None) -> set[int]:
+    """解析服务端在 WIRE_HEADER 中声明的版本列表，如 "1" 或 "1, 2"。"""
+    versions = set()
+    for part in (value or "").split(","):
+        if part.strip().isdigit():
+            versions.add(int(part.strip()))
+    return versions
+
+
+def encode_request(obs: np.ndarray, masks: np.ndarray) -> bytes:
+    obs = np.asarray(obs)
+    masks = np.asarray(masks, dtype=bool)
+    batch, channels, width = obs.shape
+    action_space = masks.shape[1]
+
+    binary = ((obs == 0) | (obs == 1)).all(axis=(0, 2))
+    parts = [
+        _REQUEST_HEADER.pack(_REQUEST_MAGIC, WIRE_VERSION, 0, batch, channels, width, action_space),
+        np.packbits(binary).tobytes(),
+        np.packbits(obs[:, binary, :].astype(bool)).tobytes(),
+        np.ascontiguousarray(obs[:, ~binary, :], dtype="<f4").tobytes(),
+        np.packbits(masks).tobytes(),
+    ]
+    return b"".join(parts)
+
+
+def decode_request(data: bytes) -> tuple[np.ndarray, np.ndarray]:
+    """解码请求，返回 (obs: float32 [B, C, W], masks: bool [B, A])。"""
+    buf = memoryview(data)
+    head, offset = _take(buf, 0, _REQUEST_HEADER.size)
+    magic, version, _, batch, channels, width, action_space = _REQUEST_HEADER.unpack(head)
+    if magic != _REQUEST_MAGIC or version != WIRE_VERSION:
+        raise WireFormatError(f"unsupported request: magic={magic!r} version={version}")
+
+    raw, offset = _take(buf, offset, _packed_len(channels))
+    binary = np.unpackbits(np.frombuffer(raw, dtype=np.uint8), count=channels).astype(bool)
+    n_binary = int(binary.sum())
+    n_dense = channels - n_binary
+
+    obs = np.empty((batch, channels, width), dtype=np.float32)
+    bits = batch * n_binary * width
+    raw, offset = _take(buf, offset, _packed_len(bits))
+    obs[:, binary, :] = np.unpackbits(np.frombuffer(raw, dtype=np.uint8), count=bits).reshape(batch, n_binary, width)
+    raw, offset = _take(buf, offset, batch * n_dense * width * 4)
+    obs[:, ~binary, :] = np.frombuffer(raw, dtype="<f4").reshape(batch, n_dense, width)
+
+    bits = batch * action_space
+    raw, offset = _take(buf, offset, _packed_len(bits))
+    masks = np.unpackbits(np.frombuffer(raw, dtype=np.uint8), count=bits).reshape(batch, action_space).astype(bool)
+    if offset != len(buf):
+        raise WireFormatError("trailing bytes in request")
+    return obs, masks
+
+
+def encode_response(
+    actions: list[int], q_out: np.ndarray | list, is_greedy: list[bool], q_dtype: str = "float32"
+) -> bytes:
+    dtype = np.dtype(q_dtype).newbyteorder("<")
+    if dtype not in _Q_DTYPE_CODES:
+        raise WireFormatError(f"unsupported Q dtype: {q_dtype}")
+    q = np.asarray(q_out, dtype=dtype)
+    batch, action_space = q.shape
+    parts = [
+        _RESPONSE_HEADER.pack(_RESPONSE_MAGIC, WIRE_VERSION, _Q_DTYPE_CODES[dtype], batch, action_space),
+        np.asarray(actions, dtype="<i2").tobytes(),
+        np.packbits(np.asarray(is_greedy, dtype=bool)).tobytes(),
+        q.tobytes(),
+    ]
+    return b"".join(parts)
+
+
+def decode_response(data: bytes) -> InferenceResponse:
+    buf = memoryview(data)
+    head, offset = _take(buf, 0, _RESPONSE_HEADER.size)
+    magic, version, dtype_code, batch, action_space = _RESPONSE_HEADER.unpack(head)
+    if magic != _RESPONSE_MAGIC or version != WIRE_VERSION or dtype_code not in Q_DTYPES:
+        raise WireFormatError(f"unsupported response: magic={magic!r} version={version} dtype={dtype_code}")
+
+    raw, offset = _take(buf, offset, batch * 2)
+    actions = np.frombuffer(raw, dtype="<i2")
+    raw, offset = _take(buf, offset, _packed_len(batch))
+    is_greedy = np.unpackbits(np.frombuffer(raw, dtype=np.uint8), count=batch).astype(bool)
+    dtype = Q_DTYPES[dtype_code]
+    raw, offset = _take(buf, offset, batch * action_space * dtype.itemsize)
+    q = np.frombuffer(raw, dtype=dtype).reshape(batch, action_space)
+    if offset != len(buf):
+        raise WireFormatError("trailing bytes in response")
+
+    return InferenceResponse(
+        actions=actions.tolist(),
+        q_out=q.astype(np.float32).tolist(),
+        is_greedy=is_greedy.tolist(),
+    )
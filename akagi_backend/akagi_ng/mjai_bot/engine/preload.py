@@ -0,0 +1,322 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from enum import StrEnum
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+from akagi_ng.core.paths import get_models_dir
+from akagi_ng.mjai_bot.engine.base import BaseEngine
+from akagi_ng.mjai_bot.engine.executor import inference_executor
+from akagi_ng.mjai_bot.engine.mortal import load_local_mortal_engine
+from akagi_ng.mjai_bot.logger import logger
+from akagi_ng.settings import local_settings
+
+# 空闲淘汰的检查间隔
+JANITOR_INTERVAL_SECONDS = 30.0
+# 状态接口中保留的淘汰/重新加载事件数
+EVENT_HISTORY = 32
+
+
+class PreloadStatus(StrEnum):
+    IDLE = "idle"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+    EVICTED = "evicted"
+
+
+@dataclass
+class _PreloadEntry:
+    model_path: Path
+    future: Future = field(default_factory=Future)
+    status: PreloadStatus = PreloadStatus.LOADING
+    elapsed_ms: float | None = None
+    error: str | None = None
+    resident_bytes: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    reloaded: bool = False
+
+
+class EnginePreloader:
+    """
+    本地 Mortal 引擎预加载器，同时是进程内本地引擎的唯一持有者。
+    在后台线程中加载并预热本地模型，使首个真实决策无需承担 torch.load 与 warmup 的开销。
+    同一模型的加载请求会等待正在进行的加载，而不是重复加载。
+
+    按 model_config.engine_idle_ttl_s 淘汰长时间未使用的引擎，
+    并在常驻权重超过 model_config.engine_memory_budget_mb 时淘汰最久未使用的引擎；
+    被淘汰的引擎在下次决策时从磁盘（编译产物缓存）重新加载。
+    """
+
+    def __init__(self):
+        self._entries: dict[bool, _PreloadEntry] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._janitor: threading.Thread | None = None
+        self._events: deque[dict[str, Any]] = deque(maxlen=EVENT_HISTORY)
+        # 热切换时已加载、尚未启用的备用引擎
+        self._standby: dict[bool, _PreloadEntry] = {}
+
+    def start(self):
+        """
+        启动后台预加载线程：加载 4p 模型，以及存在 libriichi3p 时的 3p 模型。
+        启用子进程推理时由子进程加载模型，不在主进程中预加载。
+        """
+        if local_settings.model_config.inference_process:
+            logger.info("EnginePreloader: Inference runs in a worker process, skipping in-process preload.")
+            return
+
+        from akagi_ng.core.lib_loader import libriichi, libriichi3p
+
+        targets = [(False, libriichi.consts, local_settings.model_config.model_4p)]
+        if libriichi3p is not None:
+            targets.append((True, libriichi3p.consts, local_settings.model_config.model_3p))
+
+        pending = []
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            for is_3p, consts, model_filename in targets:
+                model_path = get_models_dir() / model_filename
+                if not model_path.exists():
+                    logger.info(f"EnginePreloader: Model {model_path.name} not found, skipping preload.")
+                    continue
+                entry = self._entries.get(is_3p)
+                if entry and entry.model_path == model_path and entry.status != PreloadStatus.FAILED:
+                    continue
+                entry = _PreloadEntry(model_path=model_path)
+                self._entries[is_3p] = entry
+                pending.append((entry, consts, is_3p))
+
+            if not pending:
+                return
+
+            self._thread = threading.Thread(target=self._run, args=(pending,), name="EnginePreloader", daemon=True)
+            self._thread.start()
+
+    def _run(self, pending: list[tuple[_PreloadEntry, ModuleType, bool]]):
+        for entry, consts, is_3p in pending:
+            self._load(entry, consts, is_3p)
+
+    def _load(self, entry: _PreloadEntry, consts: ModuleType, is_3p: bool):
+        mode = "3P" if is_3p else "4P"
+        logger.info(f"EnginePreloader: Loading {mode} model {entry.model_path.name} in background...")
+        start = time.perf_counter()
+        try:
+            engine = load_local_mortal_engine(entry.model_path, consts, is_3p)
+        except Exception as e:
+            engine = None
+            entry.error = str(e)
+
+        entry.elapsed_ms = (time.perf_counter() - start) * 1000
+        if engine is None:
+            entry.status = PreloadStatus.FAILED
+            entry.error = entry.error or "load failed"
+            logger.warning(f"EnginePreloader: Failed to preload {mode} model {entry.model_path.name}.")
+        else:
+            entry.resident_bytes = int(engine.get_resident_bytes())
+            entry.last_used = time.monotonic()
+            entry.status = PreloadStatus.READY
+            logger.info(f"EnginePreloader: {mode} model ready in {entry.elapsed_ms:.0f} ms.")
+            if entry.reloaded:
+                self._emit("reload", is_3p, entry)
+            inference_executor.schedule_auto_tune(engine)
+        entry.future.set_result(engine)
+        if engine is not None:
+            self._enforce_budget(keep=is_3p)
+            self._ensure_janitor()
+
+    def get_or_load(self, model_path: Path, consts: ModuleType, is_3p: bool) -> BaseEngine | None:
+        """
+        获取本地引擎。
+        如果同一模型正在后台加载则等待其完成；已就绪则直接复用；否则在当前线程加载。
+        """
+        with self._lock:
+            entry = self._entries.get(is_3p)
+            owner = (
+                entry is None
+                or entry.model_path != model_path
+                or entry.status in (PreloadStatus.FAILED, PreloadStatus.EVICTED)
+            )
+            if owner:
+                reloaded = (
+                    entry is not None and entry.model_path == model_path and entry.status == PreloadStatus.EVICTED
+                )
+                entry = _PreloadEntry(model_path=model_path, reloaded=reloaded)
+                self._entries[is_3p] = entry
+            entry.last_used = time.monotonic()
+
+        if owner:
+            self._load(entry, consts, is_3p)
+        elif not entry.future.done():
+            logger.info("EnginePreloader: Waiting for in-flight model load...")
+
+        return entry.future.result()
+
+    def load_standby(self, model_path: Path, consts: ModuleType, is_3p: bool) -> BaseEngine | None:
+        """加载并预热一个备用引擎，不影响当前正在使用的引擎（用于模型热切换）"""
+        entry = _PreloadEntry(model_path=model_path)
+        self._load(entry, consts, is_3p)
+        engine = entry.future.result()
+        if engine is not None:
+            self._standby[is_3p] = entry
+        return engine
+
+    def promote(self, is_3p: bool) -> BaseEngine | None:
+        """将备用引擎设为当前引擎，旧引擎在进行中的决策结束后随引用释放"""
+        with self._lock:
+            entry = self._standby.pop(is_3p, None)
+            if entry is None:
+                return None
+            entry.last_used = time.monotonic()
+            self._entries[is_3p] = entry
+        self._emit("activate", is_3p, entry)
+        _release_device_memory()
+        return entry.future.result()
+
+    def peek(self, model_path: Path, is_3p: bool) -> BaseEngine | None:
+        """返回已就绪的引擎，不触发加载也不刷新空闲计时"""
+        with self._lock:
+            entry = self._entries.get(is_3p)
+        if entry is None or entry.model_path != model_path or entry.status != PreloadStatus.READY:
+            return None
+        return entry.future.result()
+
+    def evict(self, is_3p: bool, reason: str = "manual") -> bool:
+        """释放已就绪的引擎；仍在进行中的决策持有自己的引用，不受影响"""
+        with self._lock:
+            entry = self._entries.get(is_3p)
+            if entry is None or entry.status != PreloadStatus.READY:
+                return False
+            self._entries[is_3p] = _PreloadEntry(
+                model_path=entry.model_path,
+                future=_done_future(None),
+                status=PreloadStatus.EVICTED,
+                elapsed_ms=entry.elapsed_ms,
+                resident_bytes=entry.resident_bytes,
+                last_used=entry.last_used,
+            )
+        self._emit("evict", is_3p, entry, reason=reason)
+        _release_device_memory()
+        return True
+
+    def sweep(self):
+        """淘汰空闲时间超过 TTL 的引擎"""
+        ttl = local_settings.model_config.engine_idle_ttl_s
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            items = list(self._entries.items())
+        for is_3p, entry in items:
+            if entry.status == PreloadStatus.READY and now - entry.last_used >= ttl:
+                self.evict(is_3p, reason="idle")
+
+    def _enforce_budget(self, keep: bool):
+        """常驻权重超出预算时，按最久未使用的顺序淘汰其他引擎"""
+        budget_mb = local_settings.model_config.engine_memory_budget_mb
+        if budget_mb <= 0:
+            return
+        budget = budget_mb * 1024 * 1024
+        with self._lock:
+            items = list(self._entries.items())
+        ready = sorted(
+            ((is_3p, e) for is_3p, e in items if e.status == PreloadStatus.READY),
+            key=lambda item: item[1].last_used,
+        )
+        resident = sum(e.resident_bytes for _, e in ready)
+        for is_3p, entry in ready:
+            if resident <= budget:
+                return
+            if is_3p != keep and self.evict(is_3p, reason="budget"):
+                resident -= entry.resident_bytes
+        if resident > budget:
+            logger.warning(
+                f"EnginePreloader: Active model uses {resident / 2**20:.0f} MB, "
+                f"above the {budget_mb:.0f} MB budget on its own."
+            )
+
+    def _ensure_janitor(self):
+        with self._lock:
+            if self._janitor is not None and self._janitor.is_alive():
+                return
+            self._janitor = threading.Thread(target=self._janitor_loop, name="EngineJanitor", daemon=True)
+            self._janitor.start()
+
+    def _janitor_loop(self):
+        while True:
+            time.sleep(JANITOR_INTERVAL_SECONDS)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.warning(f"EnginePreloader: Idle sweep failed: {e}")
+
+    def _emit(self, kind: str, is_3p: bool, entry: _PreloadEntry, reason: str | None = None):
+        event = {
+            "event": kind,
+            "mode": "3p" if is_3p else "4p",
+            "model": entry.model_path.name,
+            "resident_mb": round(entry.resident_bytes / 2**20, 1),
+            "time": time.time(),
+        }
+        if kind == "evict":
+            event["reason"] = reason
+            event["idle_s"] = round(time.monotonic() - entry.last_used, 1)
+        else:
+            event["elapsed_ms"] = entry.elapsed_ms
+        with self._lock:
+            self._events.append(event)
+        detail = f"reason {reason}" if kind == "evict" else f"in {entry.elapsed_ms:.0f} ms"
+        logger.info(
+            f"EnginePreloader: {kind.capitalize()} {event['mode'].upper()} model {event['model']} "
+            f"({event['resident_mb']} MB, {detail})."
+        )
+
+    def get_status(self) -> dict[str, Any]:
+        """返回各模式模型的预加载状态。"""
+        status = {}
+        with self._lock:
+            entries = dict(self._entries)
+            events = list(self._events)
+        for is_3p, key in ((False, "4p"), (True, "3p")):
+            entry = entries.get(is_3p)
+            if entry is None:
+                status[key] = {"status": PreloadStatus.IDLE.value, "model": None}
+                continue
+            status[key] = {
+                "status": entry.status.value,
+                "model": entry.model_path.name,
+                "elapsed_ms": entry.elapsed_ms,
+                "error": entry.error,
+                "resident_mb": round(entry.resident_bytes / 2**20, 1),
+                "idle_s": round(time.monotonic() - entry.last_used, 1),
+            }
+        status["events"] = events
+        return status
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._standby.clear()
+            self._events.clear()
+
+
+def _done_future(result: object) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def _release_device_memory():
+    import torch
+
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+# 全局预加载器
+engine_preloader = EnginePreloader()
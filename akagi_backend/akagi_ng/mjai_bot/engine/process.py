@@ -0,0 +1,552 @@
+import atexit
+import contextlib
+import multiprocessing as mp
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass
+from functools import partial
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from akagi_ng.mjai_bot.engine.base import BaseEngine
+from akagi_ng.mjai_bot.engine.profiling import decision_profiler
+from akagi_ng.mjai_bot.logger import logger
+
+# 子进程加载模型（含 warmup）的最长等待时间
+WORKER_START_TIMEOUT_SECONDS = 120.0
+# 单次推理请求的最长等待时间，超时视为子进程失去响应
+REQUEST_TIMEOUT_SECONDS = 30.0
+# 连续重启失败超过该次数后停止重启，始终使用进程内推理
+MAX_RESTARTS = 3
+RESTART_BACKOFF_SECONDS = 1.0
+# 共享内存中的请求槽位数（即允许同时在途的请求数）
+DEFAULT_SLOTS = 4
+
+_ALIGN = 64
+# 子进程写回槽位的推理结果字段
+_RESULT_FIELDS = ("actions", "q_out", "is_greedy")
+# 不占用共享内存槽位的控制请求（性能采集等）使用的虚拟槽位
+_CONTROL_SLOT = -1
+
+
+class WorkerUnavailableError(RuntimeError):
+    """推理子进程崩溃、失去响应或尚未就绪"""
+
+
+@dataclass(frozen=True)
+class SlotLayout:
+    """
+    共享内存环形缓冲区的布局。
+    每个槽位依次存放一个请求的观测、合法动作掩码以及推理结果，按 64 字节对齐。
+    """
+
+    slots: int
+    max_batch: int
+    in_channels: int
+    action_space: int
+
+    def _fields(self) -> list[tuple[str, tuple[int, ...], np.dtype]]:
+        b, c, a = self.max_batch, self.in_channels, self.action_space
+        return [
+            ("obs", (b, c, 34), np.dtype(np.float32)),
+            ("masks", (b, a), np.dtype(np.bool_)),
+            ("actions", (b,), np.dtype(np.int64)),
+            ("q_out", (b, a), np.dtype(np.float32)),
+            ("is_greedy", (b,), np.dtype(np.bool_)),
+        ]
+
+    @staticmethod
+    def _aligned(n: int) -> int:
+        return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+    @property
+    def slot_nbytes(self) -> int:
+        return sum(self._aligned(int(np.prod(shape)) * dtype.itemsize) for _, shape, dtype in self._fields())
+
+    @property
+    def total_nbytes(self) -> int:
+        return self.slot_nbytes * self.slots
+
+    def views(self, buf: memoryview, slot: int) -> dict[str, np.ndarray]:
+        offset = slot * self.slot_nbytes
+        views = {}
+        for name, shape, dtype in self._fields():
+            views[name] = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+            offset += self._aligned(int(np.prod(shape)) * dtype.itemsize)
+        return views
+
+
+def _configure_worker_threads():
+    """子进程沿用主进程的线程配置：显式设置优先，否则使用本机调优结果"""
+    import torch
+
+    from akagi_ng.mjai_bot.engine.thread_tuner import load_thread_profile, machine_fingerprint
+    from akagi_ng.mjai_bot.network import get_inference_device
+    from akagi_ng.settings import local_settings
+
+    num_threads = local_settings.model_config.num_threads
+    if num_threads <= 0 and (profile := load_thread_profile(machine_fingerprint(get_inference_device()))):
+        num_threads = profile.num_threads
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+
+
+def load_worker_engine(model_path: str, is_3p: bool) -> BaseEngine | None:
+    """在子进程中加载本地 Mortal 引擎"""
+    from akagi_ng.mjai_bot.engine.mortal import load_local_mortal_engine
+
+    if is_3p:
+        from akagi_ng.core.lib_loader import libriichi3p as libriichi
+    else:
+        from akagi_ng.core.lib_loader import libriichi
+
+    _configure_worker_threads()
+    return load_local_mortal_engine(Path(model_path), libriichi.consts, is_3p)
+
+
+def _worker_main(conn: Connection, engine_loader: Callable[[], BaseEngine | None]):
+    """推理子进程入口：加载模型，挂载共享内存后循环处理请求"""
+    engine = engine_loader()
+    if engine is None:
+        conn.send(("failed", "Failed to load local model in inference worker"))
+        return
+
+    conn.send(
+        (
+            "ready",
+            {
+                "in_channels": engine.in_channels,
+                "action_space": engine.action_space,
+                "name": engine.name,
+                "version": engine.version,
+            },
+        )
+    )
+    _, shm_name, layout = conn.recv()
+    shm = SharedMemory(name=shm_name)
+    _untrack_shared_memory(shm)
+    views = [layout.views(shm.buf, slot) for slot in range(layout.slots)]
+    # 主进程退出时管道断开
+    with contextlib.suppress(EOFError, OSError):
+        _serve(conn, engine, views)
+    # 释放全部视图后才能关闭共享内存
+    views.clear()
+    shm.close()
+
+
+def _control(op: str, arg: int) -> int | dict[str, Any]:
+    """在子进程中执行控制请求：性能采集由子进程中的采集器完成，trace 写入同一日志目录"""
+    from akagi_ng.mjai_bot.engine.profiling import decision_profiler
+
+    if op == "profile":
+        return decision_profiler.request(arg)
+    if op == "profile_status":
+        return decision_profiler.get_status()
+    raise ValueError(f"Unknown control op: {op}")
+
+
+def _serve(conn: Connection, engine: BaseEngine, views: list[dict[str, np.ndarray]]):
+    while True:
+        msg = conn.recv()
+        if msg[0] == "stop":
+            return
+        op, slot, n = msg
+        try:
+            if slot == _CONTROL_SLOT:
+                conn.send(("ok", slot, _control(op, n)))
+                continue
+            v = views[slot]
+            if op == "precompute":
+                conn.send(("ok", slot, {"precomputed": engine.precompute(v["obs"][:n], v["masks"][:n])}))
+                continue
+            actions, q_out, _, is_greedy = engine.react_batch(v["obs"][:n], v["masks"][:n], None)
+            v["actions"][:n] = actions
+            v["q_out"][:n] = q_out
+            v["is_greedy"][:n] = is_greedy
+            conn.send(("ok", slot, engine.get_additional_meta()))
+        except Exception as e:
+            conn.send(("error", slot, str(e)))
+
+
+def _untrack_shared_memory(shm: SharedMemory):
+    """共享内存由主进程创建并负责释放，子进程挂载时不应登记到 resource_tracker"""
+    from multiprocessing import resource_tracker
+
+    with contextlib.suppress(Exception):
+        resource_tracker.unregister(shm._name, "shared_memory")
+
+
+class _WorkerHandle:
+    """一个存活的推理子进程及其共享内存、请求槽位与响应读取线程"""
+
+    def __init__(self, engine_loader: Callable[[], BaseEngine | None], max_batch: int, slots: int):
+        ctx = mp.get_context("spawn")
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, engine_loader), name="MortalInferenceWorker", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+        self.shm: SharedMemory | None = None
+        self.alive = False
+        try:
+            if not self.conn.poll(WORKER_START_TIMEOUT_SECONDS):
+                raise WorkerUnavailableError("inference worker did not become ready in time")
+            status, info = self.conn.recv()
+            if status != "ready":
+                raise WorkerUnavailableError(info)
+
+            self.info = info
+            self.layout = SlotLayout(slots, max_batch, info["in_channels"], info["action_space"])
+            self.shm = SharedMemory(create=True, size=self.layout.total_nbytes)
+            self.views = [self.layout.views(self.shm.buf, slot) for slot in range(slots)]
+            self.conn.send(("attach", self.shm.name, self.layout))
+        except (EOFError, OSError) as e:
+            self.close()
+            raise WorkerUnavailableError(f"inference worker exited during startup: {e}") from e
+        except Exception:
+            self.close()
+            raise
+
+        self.slots = slots
+        self._free: queue.Queue[int] = queue.Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+        self._pending: dict[int, Future] = {}
+        self._send_lock = threading.Lock()
+        self._control_lock = threading.Lock()
+        self.alive = True
+        self._reader = threading.Thread(target=self._read_responses, name="InferenceWorkerReader", daemon=True)
+        self._reader.start()
+
+    def wait_idle(self, timeout: float) -> bool:
+        """等待所有槽位归还（进行中的请求全部完成）"""
+        deadline = time.monotonic() + timeout
+        while self._free.qsize() < self.slots:
+            if not self.alive or time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def _read_responses(self):
+        try:
+            while True:
+                status, slot, payload = self.conn.recv()
+                if future := self._pending.get(slot):
+                    future.set_result((status, payload))
+        except (EOFError, OSError):
+            pass
+        self.alive = False
+        for future in list(self._pending.values()):
+            if not future.done():
+                future.set_exception(WorkerUnavailableError("inference worker exited"))
+
+    def call(self, op: str, obs: np.ndarray, masks: np.ndarray) -> tuple[dict[str, np.ndarray], Any]:
+        """写入一个空闲槽位并等待子进程处理完成，返回推理结果的副本与子进程附带的数据"""
+        if not self.alive:
+            raise WorkerUnavailableError("inference worker is not running")
+        try:
+            slot = self._free.get(timeout=REQUEST_TIMEOUT_SECONDS)
+        except queue.Empty as e:
+            raise WorkerUnavailableError("no free inference slot") from e
+
+        n = len(obs)
+        v = self.views[slot]
+        v["obs"][:n] = obs
+        v["masks"][:n] = masks
+        future: Future = Future()
+        self._pending[slot] = future
+        try:
+            with self._send_lock:
+                self.conn.send((op, slot, n))
+            status, payload = future.result(timeout=REQUEST_TIMEOUT_SECONDS)
+        except (OSError, TimeoutError) as e:
+            # 超时的槽位可能仍会被子进程写入，不再归还
+            self._pending.pop(slot, None)
+            raise WorkerUnavailableError(f"inference worker did not respond: {e}") from e
+        except WorkerUnavailableError:
+            self._pending.pop(slot, None)
+            raise
+
+        self._pending.pop(slot, None)
+        # 槽位归还后可能立即被其他线程（如推测预计算）的请求覆盖，必须在归还前复制结果
+        outputs = {}
+        if status == "ok" and op == "react":
+            outputs = {name: v[name][:n].copy() for name in _RESULT_FIELDS}
+        self._free.put(slot)
+        if status == "error":
+            raise RuntimeError(f"Error during inference: {payload}")
+        return outputs, payload
+
+    def control(self, op: str, arg: int) -> int | dict[str, Any]:
+        """发送不占用槽位的控制请求并等待结果，同一时刻至多一个在途"""
+        if not self.alive:
+            raise WorkerUnavailableError("inference worker is not running")
+        with self._control_lock:
+            future: Future = Future()
+            self._pending[_CONTROL_SLOT] = future
+            try:
+                with self._send_lock:
+                    self.conn.send((op, _CONTROL_SLOT, arg))
+                status, payload = future.result(timeout=REQUEST_TIMEOUT_SECONDS)
+            except (OSError, TimeoutError) as e:
+                raise WorkerUnavailableError(f"inference worker did not respond: {e}") from e
+            finally:
+                self._pending.pop(_CONTROL_SLOT, None)
+        if status == "error":
+            raise RuntimeError(f"Error during {op}: {payload}")
+        return payload
+
+    def close(self):
+        self.alive = False
+        with contextlib.suppress(OSError, ValueError):
+            self.conn.send(("stop",))
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=2.0)
+        self.conn.close()
+        if self.shm is not None:
+            self.views = []
+            try:
+                self.shm.close()
+                self.shm.unlink()
+            except (BufferError, FileNotFoundError) as e:
+                logger.debug(f"ProcessEngine: Failed to release shared memory: {e}")
+
+
+class ProcessEngine(BaseEngine):
+    """
+    进程隔离的本地推理引擎。
+    模型由子进程持有，观测与结果通过预分配的共享内存槽位传递，不经过 pickle，
+    推理期间不会占用主进程的 GIL（MITM、DataServer 线程不受影响）。
+
+    监督逻辑：子进程崩溃或失去响应时，当前及后续请求立即回退到进程内引擎，
+    同时在后台重启子进程；连续失败超过 MAX_RESTARTS 次后不再重启。
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        model_path: Path,
+        is_3p: bool,
+        fallback: BaseEngine,
+        *,
+        max_batch_size: int = 8,
+        slots: int = DEFAULT_SLOTS,
+        engine_loader: Callable[[], BaseEngine | None] | None = None,
+    ):
+        super().__init__(is_3p=is_3p, version=4, name="Mortal(Process)", is_oracle=False)
+        self.model_path = model_path
+        # 子进程中构造引擎的可调用对象，需可被 pickle（spawn 启动方式）
+        self.engine_loader = engine_loader or partial(load_worker_engine, str(model_path), is_3p)
+        self.fallback = fallback
+        self.engine_type = "mortal"
+        self.max_batch_size = max_batch_size
+        self.slots = slots
+
+        self._worker: _WorkerHandle | None = None
+        self._lock = threading.Lock()
+        self._starting = False
+        self._restarts = 0
+        self._gave_up = False
+        self._local = threading.local()
+        # 性能采集请求转发到子进程
+        decision_profiler.attach(self)
+        # 退出时释放共享内存并结束子进程
+        atexit.register(self.shutdown)
+
+    @property
+    def using_fallback(self) -> bool:
+        return self._worker is None or not self._worker.alive
+
+    def set_sync_mode(self, enabled: bool):
+        super().set_sync_mode(enabled)
+        self.fallback.set_sync_mode(enabled)
+
+    def start(self, wait: bool = True):
+        """启动推理子进程。wait=False 时在后台启动，期间请求由进程内引擎处理。"""
+        with self._lock:
+            if self._starting or (self._worker is not None and self._worker.alive) or self._gave_up:
+                return
+            self._starting = True
+        if wait:
+            self._spawn()
+        else:
+            threading.Thread(target=self._spawn, name="ProcessEngineSupervisor", daemon=True).start()
+
+    def _spawn(self):
+        if self._restarts:
+            time.sleep(RESTART_BACKOFF_SECONDS * self._restarts)
+        try:
+            worker = _WorkerHandle(self.engine_loader, self.max_batch_size, self.slots)
+        except Exception as e:
+            worker = None
+            logger.error(f"ProcessEngine: Failed to start inference worker: {e}")
+
+        with self._lock:
+            self._starting = False
+            if worker is None:
+                self._restarts += 1
+                if self._restarts > MAX_RESTARTS:
+                    self._gave_up = True
+                    logger.error("ProcessEngine: Inference worker keeps failing, staying on in-process inference.")
+                return
+            self._worker = worker
+            self._restarts = 0
+        logger.info(f"ProcessEngine: Inference worker ready (pid {worker.process.pid}).")
+        # 子进程启动期间由进程内引擎处理的决策可能已加载模型，子进程就绪后释放，崩溃时再按需加载
+        self.fallback.release()
+
+    def switch_model(self, model_path: Path) -> bool:
+        """
+        在新的子进程中加载并预热另一个模型，就绪后替换当前子进程。
+        替换发生在两次请求之间：旧子进程处理完进行中的请求后才关闭。
+        """
+        engine_loader = partial(load_worker_engine, str(model_path), self.is_3p)
+        try:
+            worker = _WorkerHandle(engine_loader, self.max_batch_size, self.slots)
+        except Exception as e:
+            logger.error(f"ProcessEngine: Failed to start worker for {model_path.name}: {e}")
+            return False
+
+        with self._lock:
+            old, self._worker = self._worker, worker
+            self.model_path = model_path
+            self.engine_loader = engine_loader
+            self._restarts = 0
+            self._gave_up = False
+        logger.info(f"ProcessEngine: Switched to {model_path.name} (pid {worker.process.pid}).")
+        if old is not None:
+            old.wait_idle(REQUEST_TIMEOUT_SECONDS)
+            old.close()
+        return True
+
+    def _on_worker_failure(self, worker: _WorkerHandle, error: Exception):
+        with self._lock:
+            if self._worker is not worker:
+                return
+            self._worker = None
+            self._restarts += 1
+            if self._restarts > MAX_RESTARTS:
+                self._gave_up = True
+        logger.warning(f"ProcessEngine: Inference worker failed ({error}), falling back to in-process inference.")
+        worker.close()
+        if not self._gave_up:
+            self.start(wait=False)
+
+    def _sync_react(self, masks: np.ndarray) -> tuple[list[int], list[list[float]], list[list[bool]], list[bool]]:
+        """同步快进：与 MortalEngine 一致，直接选择最低合法动作，不经过子进程"""
+        batch_size = masks.shape[0]
+        actions = np.argmax(masks, axis=1).tolist()
+        q_out = [[0.0] * masks.shape[1] for _ in range(batch_size)]
+        return actions, q_out, masks.tolist(), [True] * batch_size
+
+    def react_batch(
+        self, obs: np.ndarray, masks: np.ndarray, invisible_obs: np.ndarray
+    ) -> tuple[list[int], list[list[float]], list[list[bool]], list[bool]]:
+        obs = np.asanyarray(obs)
+        masks = np.asanyarray(masks)
+        res = self._sync_react(masks) if self.is_sync_mode else self._react_remote(obs, masks, invisible_obs)
+
+        actions, q_out, clean_masks, is_greedy = res
+        self.last_inference_result = {
+            "actions": actions,
+            "q_out": q_out,
+            "masks": clean_masks,
+            "is_greedy": is_greedy,
+        }
+        return res
+
+    def _react_remote(
+        self, obs: np.ndarray, masks: np.ndarray, invisible_obs: np.ndarray
+    ) -> tuple[list[int], list[list[float]], list[list[bool]], list[bool]]:
+        worker = self._worker
+        if worker is None or not worker.alive:
+            # 子进程启动（spawn、导入 torch、加载与预热模型）期间不阻塞决策，先由进程内引擎处理
+            if worker is not None:
+                self._on_worker_failure(worker, WorkerUnavailableError("inference worker exited"))
+            elif not self._gave_up:
+                self.start(wait=False)
+            worker = self._worker
+
+        if worker is not None and worker.alive:
+            try:
+                return self._call_chunked(worker, obs, masks)
+            except WorkerUnavailableError as e:
+                self._on_worker_failure(worker, e)
+
+        self._local.meta = None
+        return self.fallback.react_batch(obs, masks, invisible_obs)
+
+    def _call_chunked(
+        self, worker: _WorkerHandle, obs: np.ndarray, masks: np.ndarray
+    ) -> tuple[list[int], list[list[float]], list[list[bool]], list[bool]]:
+        actions, q_out, is_greedy = [], [], []
+        meta = None
+        for start in range(0, len(obs), self.max_batch_size):
+            end = start + self.max_batch_size
+            outputs, meta = worker.call("react", obs[start:end], masks[start:end])
+            actions.extend(outputs["actions"].tolist())
+            q_out.extend(outputs["q_out"].tolist())
+            is_greedy.extend(outputs["is_greedy"].tolist())
+        self._local.meta = meta
+        return actions, q_out, masks.tolist(), is_greedy
+
+    def precompute(self, obs: np.ndarray, masks: np.ndarray) -> bool:
+        worker = self._worker
+        if worker is None or not worker.alive:
+            return self.fallback.precompute(obs, masks)
+        try:
+            for start in range(0, len(obs), self.max_batch_size):
+                end = start + self.max_batch_size
+                _, result = worker.call("precompute", obs[start:end], masks[start:end])
+                if not result["precomputed"]:
+                    return False
+        except WorkerUnavailableError as e:
+            self._on_worker_failure(worker, e)
+            return False
+        return True
+
+    def _control(self, op: str, arg: int) -> int | dict[str, Any] | None:
+        """向存活的子进程发送控制请求，子进程不可用时返回 None"""
+        worker = self._worker
+        if worker is None or not worker.alive:
+            return None
+        try:
+            return worker.control(op, arg)
+        except WorkerUnavailableError as e:
+            self._on_worker_failure(worker, e)
+            return None
+
+    def request_profile(self, decisions: int) -> int | None:
+        """在子进程中采集接下来的 decisions 次推理，返回子进程中待采集的次数"""
+        return self._control("profile", decisions)
+
+    def get_profile_status(self) -> dict[str, Any] | None:
+        return self._control("profile_status", 0)
+
+    def get_notification_flags(self) -> dict[str, Any]:
+        return self.fallback.get_notification_flags()
+
+    def get_additional_meta(self) -> dict[str, Any]:
+        meta: dict[str, Any] | None = getattr(self._local, "meta", None)
+        if meta is None:
+            meta = dict(self.fallback.get_additional_meta())
+            meta["inference_process"] = False
+            return meta
+        return {**meta, "inference_process": True}
+
+    def shutdown(self):
+        with self._lock:
+            worker, self._worker = self._worker, None
+            self._gave_up = True
+        if worker is not None:
+            worker.close()
@@ -0,0 +1,216 @@
+import contextlib
+import threading
+import time
+import weakref
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Protocol
+
+import torch
+from torch.profiler import ProfilerActivity, profile, record_function
+
+from akagi_ng.core.paths import ensure_dir, get_logs_dir
+from akagi_ng.mjai_bot.logger import logger
+from akagi_ng.settings import local_settings
+
+# 内存中保留的最近采集摘要条数
+CAPTURE_HISTORY = 32
+# 决策开始标记的有效期：超过该时长的标记不计入本次推理的前置耗时
+_DECISION_MARK_TTL_SECONDS = 5.0
+
+
+def get_profiles_dir() -> Path:
+    """Chrome trace 文件存放目录"""
+    return get_logs_dir() / "profiles"
+
+
+@dataclass
+class _Capture:
+    engine: str
+    batch_size: int
+    stages: dict[str, float] = field(default_factory=dict)
+    pre_engine_ms: float | None = None
+    total_ms: float = 0.0
+
+
+class _Stage:
+    """采集中的阶段计时：同时记录 Python 计时与 torch.profiler 中的同名区间"""
+
+    __slots__ = ("_capture", "_name", "_record", "_start")
+
+    def __init__(self, capture: _Capture, name: str):
+        self._capture = capture
+        self._name = name
+        self._record = record_function(name)
+
+    def __enter__(self):
+        self._record.__enter__()
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc: object):
+        elapsed_ms = (time.perf_counter() - self._start) * 1000
+        self._capture.stages[self._name] = self._capture.stages.get(self._name, 0.0) + elapsed_ms
+        self._record.__exit__(*exc)
+
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class RemoteProfiler(Protocol):
+    """在其他进程中执行推理的引擎（推理子进程），采集请求需要转发过去"""
+
+    def request_profile(self, decisions: int) -> int | None: ...
+
+    def get_profile_status(self) -> dict[str, Any] | None: ...
+
+
+class DecisionProfiler:
+    """
+    按需的单次决策性能采集。
+    每隔 model_config.profile_every_n 次本地推理，或在 request() 请求后的接下来 K 次推理，
+    用 torch.profiler 包裹整次 react_batch，并按阶段（张量转换 / 前向 / 动作选择 / tolist）记录 Python 计时。
+    Chrome trace 写入 logs/profiles，仅保留最近 profile_max_traces 个文件。
+    未采集时 stage() 返回空上下文，对推理热路径几乎没有开销。
+    推理在子进程中执行时，request() 与 get_status() 转发到已登记的子进程，由子进程中的采集器完成采集。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._count = 0
+        self._pending = 0
+        self._decision_start: float | None = None
+        self._captures: deque[dict[str, Any]] = deque(maxlen=CAPTURE_HISTORY)
+        # 导出 trace 较慢，放到单独的线程按采集顺序依次执行，避免拖慢被采集决策的返回
+        self._exporter = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ProfileExport")
+        self._remotes: weakref.WeakSet[RemoteProfiler] = weakref.WeakSet()
+
+    def attach(self, remote: RemoteProfiler):
+        """登记在子进程中推理的引擎"""
+        with self._lock:
+            self._remotes.add(remote)
+
+    def _remote_list(self) -> list[RemoteProfiler]:
+        with self._lock:
+            return list(self._remotes)
+
+    def request(self, decisions: int) -> int:
+        """
+        采集接下来的 decisions 次推理，返回当前待采集的次数。
+        推理子进程可用时转发给子进程；否则推理在本进程中执行（含子进程不可用时的回退），由本进程采集。
+        """
+        forwarded = [
+            pending for remote in self._remote_list() if (pending := remote.request_profile(decisions)) is not None
+        ]
+        if forwarded:
+            return max(forwarded)
+        with self._lock:
+            self._pending += decisions
+            return self._pending
+
+    def mark_decision(self):
+        """Bot 开始处理事件时调用，用于估算推理前的 libriichi 观测编码与调度耗时"""
+        self._decision_start = time.perf_counter()
+
+    def _take(self) -> bool:
+        every_n = local_settings.model_config.profile_every_n
+        with self._lock:
+            if self._pending > 0:
+                self._pending -= 1
+                return True
+            if every_n <= 0:
+                return False
+            self._count += 1
+            return self._count % every_n == 0
+
+    def stage(self, name: str) -> contextlib.AbstractContextManager:
+        """当前线程正在采集时计时该阶段，否则返回空上下文"""
+        capture = getattr(self._local, "capture", None)
+        if capture is None:
+            return _NULL_STAGE
+        return _Stage(capture, name)
+
+    @contextlib.contextmanager
+    def capture(self, engine_name: str, batch_size: int) -> Iterator[None]:
+        """包裹一次 react_batch；命中采集条件时在 torch.profiler 下执行"""
+        if getattr(self._local, "capture", None) is not None or not self._take():
+            yield
+            return
+
+        start = time.perf_counter()
+        capture = _Capture(engine=engine_name, batch_size=batch_size)
+        decision_start, self._decision_start = self._decision_start, None
+        if decision_start is not None and start - decision_start < _DECISION_MARK_TTL_SECONDS:
+            capture.pre_engine_ms = (start - decision_start) * 1000
+
+        activities = [ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(ProfilerActivity.CUDA)
+
+        self._local.capture = capture
+        try:
+            with profile(activities=activities) as prof, record_function("react_batch"):
+                yield
+        finally:
+            self._local.capture = None
+            capture.total_ms = (time.perf_counter() - start) * 1000
+
+        # 秒与纳秒取自同一时刻，文件名按字典序即按时间排序（淘汰旧 trace 依赖此顺序）
+        seconds, nanos = divmod(time.time_ns(), 1_000_000_000)
+        trace_name = f"decision-{time.strftime('%Y%m%d-%H%M%S', time.localtime(seconds))}-{nanos:09d}.json"
+        self._exporter.submit(self._export, prof, capture, trace_name)
+
+    def _export(self, prof: profile, capture: _Capture, trace_name: str):
+        profiles_dir = ensure_dir(get_profiles_dir())
+        path = profiles_dir / trace_name
+        try:
+            prof.export_chrome_trace(str(path))
+        except Exception as e:
+            logger.warning(f"DecisionProfiler: Failed to export trace: {e}")
+            path = None
+
+        summary = {
+            "engine": capture.engine,
+            "batch_size": capture.batch_size,
+            "total_ms": round(capture.total_ms, 3),
+            "pre_engine_ms": round(capture.pre_engine_ms, 3) if capture.pre_engine_ms is not None else None,
+            "stages_ms": {name: round(ms, 3) for name, ms in capture.stages.items()},
+            "trace": path.name if path is not None else None,
+            "time": time.time(),
+        }
+        # 先淘汰旧 trace 再公布摘要，状态接口中可见的采集与磁盘上的 trace 文件保持一致
+        self._prune(profiles_dir)
+        with self._lock:
+            self._captures.append(summary)
+        logger.info(f"DecisionProfiler: {summary}")
+
+    @staticmethod
+    def _prune(profiles_dir: Path):
+        keep = max(local_settings.model_config.profile_max_traces, 1)
+        traces = sorted(profiles_dir.glob("decision-*.json"))
+        for stale in traces[:-keep]:
+            with contextlib.suppress(OSError):
+                stale.unlink()
+
+    def get_status(self) -> dict[str, Any]:
+        """本进程的采集状态，合并推理子进程中的待采集次数与采集摘要"""
+        with self._lock:
+            status = {
+                "every_n": local_settings.model_config.profile_every_n,
+                "pending": self._pending,
+                "captures": list(self._captures),
+            }
+        for remote in self._remote_list():
+            if (remote_status := remote.get_profile_status()) is None:
+                continue
+            status["pending"] += remote_status["pending"]
+            status["captures"].extend(remote_status["captures"])
+        status["captures"] = sorted(status["captures"], key=lambda c: c["time"])[-CAPTURE_HISTORY:]
+        return status
+
+
+# 全局决策性能采集器
+decision_profiler = DecisionProfiler()
@@ -1,3 +1,8 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
 from typing import Any
 
 import numpy as np
@@ -5,15 +10,65 @@ import numpy as np
 from akagi_ng.mjai_bot.engine.base import BaseEngine
 from akagi_ng.mjai_bot.logger import logger
 
+# 本地引擎上报的逐决策元数据字段（精度、合批耗时、是否在子进程中推理）
+_LOCAL_DECISION_META_KEYS = (
+    "precision",
+    "batch_size",
+    "queue_wait_ms",
+    "compute_ms",
+    "inference_process",
+    "ensemble_members",
+    "ensemble_aggregation",
+    "ensemble_q_values",
+)
+# 对冲模式下允许同时在途的在线请求数（超时的请求仍在后台等待响应）
+HEDGE_MAX_INFLIGHT = 4
+
+InferenceResult = tuple[list[int], list[list[float]], list[list[bool]], list[bool]]
+
+
+@dataclass
+class HedgeStats:
+    """
+    对冲请求统计。
+    online_wins: 在线引擎在预算内给出结果并被采用；此时本地推理被浪费（wasted_local_ms）。
+    budget_misses: 超出预算改用本地结果；在线结果随后到达计入 late_responses（被浪费的在线请求）。
+    """
+
+    decisions: int = 0
+    online_wins: int = 0
+    budget_misses: int = 0
+    online_errors: int = 0
+    late_responses: int = 0
+    late_agreements: int = 0
+    wasted_local_ms: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "decisions": self.decisions,
+            "online_wins": self.online_wins,
+            "budget_misses": self.budget_misses,
+            "online_errors": self.online_errors,
+            "late_responses": self.late_responses,
+            "win_rate": self.online_wins / self.decisions if self.decisions else 0.0,
+            "late_agreement_rate": self.late_agreements / self.late_responses if self.late_responses else 0.0,
+            "wasted_local_ms": round(self.wasted_local_ms, 3),
+        }
+
 
 class EngineProvider(BaseEngine):
     """
     引擎调度器 (Engine Hub/Provider)。
     负责管理在线 (AkagiOT) 和本地 (Mortal) 引擎。
     通过显式的状态管理实现稳定的引擎回退。
+
+    配置 hedge_budget_ms 后进入对冲模式：在线请求在后台执行，同时在当前线程进行本地推理；
+    在线引擎未在预算内给出结果时直接采用本地结果，迟到的在线结果只记录用于对比，不阻塞决策。
     """
 
-    def __init__(self, online_engine: BaseEngine | None, local_engine: BaseEngine, is_3p: bool):
+    def __init__(
+        self, online_engine: BaseEngine | None, local_engine: BaseEngine, is_3p: bool, hedge_budget_ms: float = 0.0
+    ):
         # 初始化基类信息
         name = f"Provider({online_engine.name if online_engine else 'None'} -> {local_engine.name})"
         super().__init__(is_3p=is_3p, version=4, name=name)
@@ -25,6 +80,12 @@ class EngineProvider(BaseEngine):
         self.active_engine = self.online_engine if self.online_engine else self.local_engine
         self.fallback_active = False
 
+        # 对冲模式
+        self.hedge_budget_ms = hedge_budget_ms if online_engine else 0.0
+        self.hedge_stats = HedgeStats()
+        self._hedge_lock = threading.Lock()
+        self._hedge_pool: ThreadPoolExecutor | None = None
+
     def set_sync_mode(self, enabled: bool):
         """显式设置同步模式，并应用到所有受管引擎"""
         super().set_sync_mode(enabled)
@@ -42,6 +103,10 @@ class EngineProvider(BaseEngine):
         """
         self.fallback_active = False
 
+        # 同步快进不发起网络请求，无需对冲
+        if self.hedge_budget_ms > 0 and not self.is_sync_mode:
+            return self._react_hedged(obs, masks, invisible_obs)
+
         # 1. 尝试在线引擎 (如果配置了且没有处于熔断状态 - 熔断逻辑由 OTEngine 内部维护)
         if self.online_engine:
             try:
@@ -59,6 +124,84 @@ class EngineProvider(BaseEngine):
         self.last_inference_result = self.local_engine.last_inference_result
         return res
 
+    def _submit_online(self, obs: np.ndarray, masks: np.ndarray, invisible_obs: np.ndarray) -> Future:
+        if self._hedge_pool is None:
+            self._hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_MAX_INFLIGHT, thread_name_prefix="HedgedOnline")
+        return self._hedge_pool.submit(self.online_engine.react_batch, obs, masks, invisible_obs)
+
+    def _react_hedged(self, obs: np.ndarray, masks: np.ndarray, invisible_obs: np.ndarray) -> InferenceResult:
+        deadline = time.perf_counter() + self.hedge_budget_ms / 1000
+        future = self._submit_online(obs, masks, invisible_obs)
+
+        local_start = time.perf_counter()
+        try:
+            local_res = self.local_engine.react_batch(obs, masks, invisible_obs)
+            local_result = self.local_engine.last_inference_result
+        except Exception as e:
+            # 本地推理失败时只能等待在线结果（受在线引擎自身超时约束）
+            logger.warning(f"EngineProvider: Local engine failed during hedged request ({e}). Waiting for online.")
+            return self._use_online(future.result(), local_ms=0.0)
+        local_ms = (time.perf_counter() - local_start) * 1000
+
+        try:
+            online_res = future.result(timeout=max(deadline - time.perf_counter(), 0.0))
+        except FutureTimeoutError:
+            with self._hedge_lock:
+                self.hedge_stats.decisions += 1
+                self.hedge_stats.budget_misses += 1
+            future.add_done_callback(lambda f: self._on_late_response(f, local_res[0]))
+        except Exception as e:
+            logger.warning(f"EngineProvider: Online engine failed ({e}). Using local result.")
+            self.fallback_active = True
+            with self._hedge_lock:
+                self.hedge_stats.decisions += 1
+                self.hedge_stats.online_errors += 1
+        else:
+            return self._use_online(online_res, local_ms=local_ms)
+
+        self.active_engine = self.local_engine
+        self.last_inference_result = local_result
+        return local_res
+
+    def _use_online(self, online_res: InferenceResult, local_ms: float) -> InferenceResult:
+        with self._hedge_lock:
+            self.hedge_stats.decisions += 1
+            self.hedge_stats.online_wins += 1
+            self.hedge_stats.wasted_local_ms += local_ms
+        self.active_engine = self.online_engine
+        # 在线引擎的 last_inference_result 可能被并发的迟到请求覆盖，直接使用本次结果
+        actions, q_out, clean_masks, is_greedy = online_res
+        self.last_inference_result = {
+            "actions": actions,
+            "q_out": q_out,
+            "masks": clean_masks,
+            "is_greedy": is_greedy,
+        }
+        return online_res
+
+    def _on_late_response(self, future: Future, local_actions: list[int]):
+        if future.cancelled() or future.exception() is not None:
+            return
+        online_actions = future.result()[0]
+        agreed = list(online_actions) == list(local_actions)
+        with self._hedge_lock:
+            self.hedge_stats.late_responses += 1
+            self.hedge_stats.late_agreements += int(agreed)
+        logger.debug(
+            f"EngineProvider: Late online response {online_actions} vs local {local_actions} "
+            f"({'agree' if agreed else 'disagree'})."
+        )
+
+    def get_hedge_stats(self) -> dict[str, Any]:
+        with self._hedge_lock:
+            return self.hedge_stats.to_dict()
+
+    def precompute(self, obs: np.ndarray, masks: np.ndarray) -> bool:
+        # 配置了在线引擎时真实决策不经过本地模型，预计算没有意义（对冲模式下每次决策都会本地推理）
+        if self.online_engine and self.hedge_budget_ms <= 0:
+            return False
+        return self.local_engine.precompute(obs, masks)
+
     def get_notification_flags(self) -> dict[str, Any]:
         """聚合所有受管引擎的通知标志"""
         flags = {}
@@ -80,5 +223,11 @@ class EngineProvider(BaseEngine):
         if self.online_engine:
             meta.update(self.online_engine.get_additional_meta())
         meta.update(self.local_engine.get_additional_meta())
+        # 这些字段仅描述本地推理，由在线引擎给出的决策不携带
+        if self.active_engine is not self.local_engine:
+            for key in _LOCAL_DECISION_META_KEYS:
+                meta.pop(key, None)
+        if self.hedge_budget_ms > 0:
+            meta["hedge_win_rate"] = self.get_hedge_stats()["win_rate"]
 
         return meta
@@ -0,0 +1,91 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+# 每个缓存条目除数组数据外的估算开销（键、元组与 ndarray 对象头）
+_ENTRY_OVERHEAD_BYTES = 256
+
+
+@dataclass(frozen=True)
+class CachedDecision:
+    action: int
+    q_out: np.ndarray
+    masks: np.ndarray
+
+    @property
+    def nbytes(self) -> int:
+        return self.q_out.nbytes + self.masks.nbytes + _ENTRY_OVERHEAD_BYTES
+
+
+class QValueCache:
+    """
+    以观测为键的 Q 值 LRU 缓存。
+    键为观测字节与合法动作掩码的摘要；超出内存预算时淘汰最久未使用的条目。
+    仅适用于确定性推理（关闭 Boltzmann 采样），由调用方保证。
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, CachedDecision] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(obs: np.ndarray, masks: np.ndarray, invisible_obs: np.ndarray | None, tag: str = "") -> bytes:
+        """计算单条观测的摘要。tag 用于区分同一引擎的不同推理配置（如精度）。"""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(tag.encode())
+        h.update(str(obs.shape).encode())
+        h.update(np.ascontiguousarray(obs, dtype=np.float32).tobytes())
+        h.update(np.packbits(np.asarray(masks, dtype=bool)).tobytes())
+        if invisible_obs is not None:
+            h.update(np.ascontiguousarray(invisible_obs, dtype=np.float32).tobytes())
+        return h.digest()
+
+    def get(self, key: bytes) -> CachedDecision | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def __contains__(self, key: bytes) -> bool:
+        """仅检查条目是否存在，不计入命中统计，也不调整 LRU 顺序"""
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: bytes, entry: CachedDecision):
+        if entry.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old.nbytes
+            self._entries[key] = entry
+            self._size += entry.nbytes
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.nbytes
+
+    def clear(self):
+        """清空缓存条目并重置命中统计"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
@@ -0,0 +1,141 @@
+import json
+import os
+import platform
+import statistics
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import torch
+
+from akagi_ng.core.paths import ensure_dir, get_settings_dir
+from akagi_ng.mjai_bot.engine.mortal import MortalEngine
+from akagi_ng.mjai_bot.logger import logger
+
+PROFILE_FILENAME = "inference_profile.json"
+TUNE_BATCH_SIZES = (1, 8)
+TUNE_ROUNDS = 5
+# 延迟差距在该比例以内时优先选择更少的线程，给 MITM/DataServer 线程留出 CPU
+TUNE_TOLERANCE = 1.05
+
+
+@dataclass(frozen=True)
+class ThreadProfile:
+    num_threads: int
+    num_interop_threads: int = 0
+
+
+@dataclass
+class TuneResult:
+    profile: ThreadProfile
+    # 线程数 -> 批大小 -> 单次前向耗时（毫秒，取中位数）
+    measurements: dict[int, dict[int, float]]
+
+
+def machine_fingerprint(device: torch.device) -> str:
+    """标识调优结果适用的机器：CPU 型号与核数、torch 版本、推理设备"""
+    processor = platform.processor() or platform.machine()
+    return f"{platform.system()}-{processor}-{os.cpu_count()}cpu-torch{torch.__version__}-{device.type}"
+
+
+def candidate_thread_counts(cpu_count: int) -> list[int]:
+    """候选线程数：不超过核数的 2 的幂，以及核数本身"""
+    counts = []
+    n = 1
+    while n < cpu_count:
+        counts.append(n)
+        n *= 2
+    counts.append(max(cpu_count, 1))
+    return counts
+
+
+def _profile_path() -> Path:
+    return get_settings_dir() / PROFILE_FILENAME
+
+
+def _read_profiles() -> dict[str, Any]:
+    path = _profile_path()
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"ThreadTuner: Ignoring unreadable profile file {path}: {e}")
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def load_thread_profile(fingerprint: str) -> ThreadProfile | None:
+    entry = _read_profiles().get(fingerprint)
+    if not isinstance(entry, dict) or not isinstance(entry.get("num_threads"), int):
+        return None
+    return ThreadProfile(entry["num_threads"], entry.get("num_interop_threads", 0))
+
+
+def save_thread_profile(fingerprint: str, result: TuneResult):
+    profiles = _read_profiles()
+    profiles[fingerprint] = {
+        "num_threads": result.profile.num_threads,
+        "num_interop_threads": result.profile.num_interop_threads,
+        "measurements": {
+            str(threads): {str(batch): round(ms, 3) for batch, ms in by_batch.items()}
+            for threads, by_batch in result.measurements.items()
+        },
+        "tuned_at": datetime.now(UTC).isoformat(timespec="seconds"),
+    }
+    try:
+        path = ensure_dir(get_settings_dir()) / PROFILE_FILENAME
+        path.write_text(json.dumps(profiles, indent=2, ensure_ascii=False), encoding="utf-8")
+    except OSError as e:
+        logger.warning(f"ThreadTuner: Failed to save profile: {e}")
+
+
+def _benchmark(engine: MortalEngine, obs: np.ndarray, masks: np.ndarray, rounds: int) -> float:
+    # 直接调用 _infer，绕过同步快进与 Q 值缓存
+    engine._infer(obs, masks, None)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        engine._infer(obs, masks, None)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def tune_threads(
+    engine: MortalEngine,
+    fingerprint: str | None = None,
+    batch_sizes: tuple[int, ...] = TUNE_BATCH_SIZES,
+    rounds: int = TUNE_ROUNDS,
+) -> TuneResult:
+    """
+    在已加载的 MortalEngine 上测量各线程数与批大小下的前向耗时，
+    以单条决策（批大小 1）的延迟为准选出最佳线程数；给出 fingerprint 时保存结果。
+    """
+    if engine.in_channels is None or engine.action_space is None:
+        raise RuntimeError("engine must be warmed up before tuning")
+
+    original = torch.get_num_threads()
+    measurements: dict[int, dict[int, float]] = {}
+    try:
+        for threads in candidate_thread_counts(os.cpu_count() or 1):
+            torch.set_num_threads(threads)
+            measurements[threads] = {}
+            for batch in batch_sizes:
+                obs = np.zeros((batch, engine.in_channels, 34), dtype=np.float32)
+                masks = np.ones((batch, engine.action_space), dtype=bool)
+                measurements[threads][batch] = _benchmark(engine, obs, masks, rounds)
+    finally:
+        torch.set_num_threads(original)
+
+    latency = {threads: by_batch[min(batch_sizes)] for threads, by_batch in measurements.items()}
+    fastest = min(latency.values())
+    best = min(threads for threads, ms in latency.items() if ms <= fastest * TUNE_TOLERANCE)
+    result = TuneResult(profile=ThreadProfile(num_threads=best), measurements=measurements)
+    logger.info(f"ThreadTuner: Selected {best} threads ({latency[best]:.2f} ms per decision, was {original}).")
+
+    if fingerprint:
+        save_thread_profile(fingerprint, result)
+    return result
@@ -0,0 +1,80 @@
+from mjai.mlibriichi.state import ActionCandidate, PlayerState
+
+from akagi_ng.core import EncodedEvent, encode_event
+from akagi_ng.mjai_bot.logger import logger
+
+
+class GameState:
+    """
+    一个对局会话的权威游戏状态。
+    StateTrackerBot 把每个事件应用到这里一次，MortalBot（立直前瞻、推测预计算）与推荐 / 自动打牌层
+    读取同一份 PlayerState 与本局事件历史，不再各自维护一份。
+    """
+
+    def __init__(self, player_id: int = 0):
+        self.player_id = player_id
+        self.is_3p = False
+        self.player_state = PlayerState(player_id)
+        self.action_candidate: ActionCandidate | None = None
+        # 本局事件（自最近一次 start_kyoku 起），history_json 为其 JSON 编码，供 libriichi 重放
+        # start_kyoku 时替换为新列表，下游按列表身份判断是否进入了新的一局
+        self.history: list[EncodedEvent] = []
+        self.history_json: list[str] = []
+        self.discard_events: list[dict] = []
+        self.call_events: list[dict] = []
+        self.dora_indicators: list[str] = []
+
+    def apply(self, event: dict):
+        """将单个事件应用到状态"""
+        if not event:
+            raise ValueError("Empty event")
+
+        event = encode_event(event)
+        e_type = event["type"]
+        if e_type == "start_game":
+            self.player_id = event["id"]
+            self.player_state = PlayerState(self.player_id)
+            self.is_3p = False
+            self.discard_events = []
+            self.call_events = []
+            self.dora_indicators = []
+        # 使用 Bridge 传递的 is_3p 字段判断游戏是四麻还是三麻对局
+        if e_type == "start_kyoku":
+            self.is_3p = event.get("is_3p")
+        if e_type in ("start_kyoku", "dora"):
+            self.dora_indicators.append(event["dora_marker"])
+        if e_type == "dahai":
+            self.discard_events.append(event)
+        if e_type in ("chi", "pon", "daiminkan", "kakan", "ankan"):
+            self.call_events.append(event)
+
+        logger.debug(f"Event: {event}")
+        try:
+            # 三麻兼容：mjai.mlibriichi 状态追踪库不支持 nukidora，转换为 dahai 事件
+            if e_type == "nukidora":
+                last_self_tsumo = self.player_state.last_self_tsumo() or ""
+                replace_event = EncodedEvent(
+                    type="dahai",
+                    actor=event["actor"],
+                    pai="N",
+                    tsumogiri=last_self_tsumo == "N" and event["actor"] == self.player_id,
+                )
+                self.discard_events.append(replace_event)
+                self.action_candidate = self.player_state.update(replace_event.json)
+            else:
+                # 复用事件在 Bridge 输出处生成的编码
+                self.action_candidate = self.player_state.update(event.json)
+        finally:
+            # 事件已经发生：即使 PlayerState 拒绝该事件，本局历史也要与打牌 / 副露记录保持一致，
+            # 否则依赖历史回放的立直前瞻与推测预计算会缺少这一事件
+            self.record(event)
+
+    def record(self, event: EncodedEvent):
+        """只记录本局事件历史，不更新 PlayerState"""
+        e_type = event["type"]
+        if e_type in ("start_game", "start_kyoku"):
+            self.history = []
+            self.history_json = []
+        if e_type != "start_game":
+            self.history.append(event)
+            self.history_json.append(event.json)
@@ -1,9 +1,13 @@
 import json
 
-from akagi_ng.core import NotificationCode
-from akagi_ng.mjai_bot.engine import MortalEngine
+from akagi_ng.core import NotificationCode, encode_event
+from akagi_ng.mjai_bot.engine import MortalEngine, decision_profiler
+from akagi_ng.mjai_bot.game_state import GameState
+from akagi_ng.mjai_bot.mortal.shadow import ShadowSimulator
+from akagi_ng.mjai_bot.mortal.speculation import TsumoSpeculator
 from akagi_ng.mjai_bot.protocols import Bot
 from akagi_ng.mjai_bot.utils import make_error_response
+from akagi_ng.settings import local_settings
 
 
 class MortalBot:
@@ -16,13 +20,17 @@ class MortalBot:
         self.is_3p = is_3p
         self.player_id: int | None = None
         self.riichi_candidates = []
-        self.history = []
-        self.history_json = []  # 缓存已序列化的事件以提升性能
+        # 游戏状态与本局事件历史。由 Controller 挂接 StateTrackerBot 的 GameState 时共用同一份，
+        # 事件由 StateTrackerBot 应用；单独使用时自行维护
+        self.state = GameState()
+        self._owns_state = True
         self.model: Bot | None = None
         self.game_start_event = None
         self.meta = {}
         self.notification_flags = {}  # 系统状态通知标志
         self._pending_notifications = {}  # 暂存的通知标志（如模型加载事件）
+        self.shadow: ShadowSimulator | None = None  # 立直前瞻用的影子模拟器
+        self.speculator: TsumoSpeculator | None = None  # 下一巡摸牌的推测预计算
 
         from akagi_ng.mjai_bot.engine.factory import load_bot_and_engine
         from akagi_ng.mjai_bot.mortal.logger import logger
@@ -49,9 +57,18 @@ class MortalBot:
         """
         return_action = None
         is_game_start_batch = False
+        sync_engine_active = False
 
-        for e in events:
+        for e in map(encode_event, events):
             e_type = e["type"]
+            # 单独使用时只需本局事件历史，手牌状态由 libriichi 内部维护
+            if self._owns_state:
+                self.state.record(e)
+
+            # 对局开始/结束会替换或释放引擎，先退出同步模式
+            if e_type in ("start_game", "end_game"):
+                sync_engine_active = self._switch_sync_mode(sync_engine_active, False)
+
             if e_type == "start_game":
                 self._handle_start_game(e)
                 is_game_start_batch = True
@@ -61,38 +78,58 @@ class MortalBot:
                 self.logger.error(f"Model is not loaded yet, skipping event: {e_type}")
                 continue
 
-            if e_type == "start_kyoku":
-                self.history = []
-                self.history_json = []
+            if self.speculator is not None:
+                self.speculator.observe(e)
 
-            # 预备序列化数据并缓存
-            e_json = json.dumps(e, separators=(",", ":"))
-            self.history.append(e)
-            self.history_json.append(e_json)
+            # 复用事件在 Bridge 输出处生成的编码
+            e_json = e.json
 
             if e_type == "end_game":
                 self._handle_end_game()
                 continue
 
             # 处理同步/回放模式。启用同步模式会使引擎进入快进状态，跳过神经网络推理。
+            # 连续的同步事件（重连回放）只切换一次同步模式
             is_sync = e.get("sync", False)
-            if is_sync:
-                self.engine.set_sync_mode(True)
+            sync_engine_active = self._switch_sync_mode(sync_engine_active, is_sync)
+            if not is_sync:
+                decision_profiler.mark_decision()
 
             return_action = self.model.react(e_json)
 
-            if is_sync:
-                self.engine.set_sync_mode(False)
-
+        self._switch_sync_mode(sync_engine_active, False)
         return return_action, is_game_start_batch
 
+    def _switch_sync_mode(self, active: bool, target: bool) -> bool:
+        """仅在状态变化时切换引擎同步模式，返回切换后的状态"""
+        if active != target:
+            self.engine.set_sync_mode(target)
+        return target
+
+    def attach_state(self, state: GameState):
+        """共用 StateTrackerBot 的游戏状态，此后事件只由其应用一次"""
+        self.state = state
+        self._owns_state = False
+
+    @property
+    def history(self) -> list[dict]:
+        return self.state.history
+
+    @property
+    def history_json(self) -> list[str]:
+        return self.state.history_json
+
     def _handle_start_game(self, e: dict):
         """处理游戏开始事件，初始化模型和引擎"""
         self.player_id = e["id"]
         self.model, self.engine = self.model_loader(self.player_id, self.is_3p)
-        self.history = []
-        self.history_json = []
         self.game_start_event = e
+        self.shadow = None
+        self._reset_speculator()
+        if local_settings.model_config.speculative_tsumo:
+            self.speculator = TsumoSpeculator(
+                self.libriichi.mjai.Bot, self.engine, self.player_id, self.is_3p, self.game_start_event
+            )
 
         # 检测加载的模型类型并设置通知
         # EngineProvider 会在元数据中包含真实的引擎类型
@@ -112,6 +149,24 @@ class MortalBot:
         self.model = None
         self.engine = None
         self.game_start_event = None
+        self.shadow = None
+        self._reset_speculator()
+
+    def _update_speculation(self, meta: dict):
+        """上家打牌后开始推测下一巡摸牌，并附加推测命中率与回放开销"""
+        if self.speculator is None:
+            return
+        self.speculator.maybe_start(self.history, self.history_json)
+        stats = self.speculator.stats
+        meta["speculation_hits"] = stats.hits
+        meta["speculation_misses"] = stats.misses
+        meta["speculation_hit_rate"] = round(stats.hit_rate, 3)
+        meta["speculation_replay_ms"] = round(stats.replay_ms_per_speculation, 3)
+
+    def _reset_speculator(self):
+        if self.speculator is not None:
+            self.speculator.cancel()
+            self.speculator = None
 
     def _handle_riichi_lookahead(self, meta: dict):
         """
@@ -168,14 +223,20 @@ class MortalBot:
 
     def react(self, events: str) -> str:
         """
-        处理事件。必须先发送 `start_game` 事件初始化 Bot。
+        处理 JSON 编码的事件列表并返回 JSON 响应。必须先发送 `start_game` 事件初始化 Bot。
+        进程内调用应使用 react_events，避免重复序列化。
         """
         try:
             events = json.loads(events)
         except json.JSONDecodeError as e:
             self.logger.error(f"Failed to parse events: {events}, {e}")
             return json.dumps(make_error_response(NotificationCode.PARSE_ERROR), separators=(",", ":"))
+        return json.dumps(self.react_events(events), separators=(",", ":"))
 
+    def react_events(self, events: list[dict]) -> dict:
+        """
+        处理事件列表并以字典返回响应。事件可以是 EncodedEvent，其 JSON 编码会直接传给 libriichi。
+        """
         try:
             # 1. 处理事件并获取模型响应
             return_action, is_game_start_batch = self._process_events(events)
@@ -208,58 +269,38 @@ class MortalBot:
             if is_game_start_batch:
                 meta["game_start"] = True
 
-            # 5. 处理立直前瞻逻辑
+            # 5. 处理立直前瞻逻辑；无需决策时利用空闲重建已失效的影子模拟器
             self._handle_riichi_lookahead(meta)
+            if "q_values" not in meta and self.shadow is not None:
+                self.shadow.prepare(self.history_json)
+            self._update_speculation(meta)
 
             # 6. 设置 meta 到响应中
             self._set_meta_to_response(raw_data, meta)
 
-            return json.dumps(raw_data, separators=(",", ":"))
+            return raw_data
 
         except Exception as e:
             self.logger.error(f"MortalBot error: {e}")
             import traceback
 
             self.logger.error(traceback.format_exc())
-            return json.dumps(make_error_response(NotificationCode.BOT_RUNTIME_ERROR), separators=(",", ":"))
+            return make_error_response(NotificationCode.BOT_RUNTIME_ERROR)
 
     def _run_riichi_lookahead(self) -> dict[str, object]:
         """
         运行立直前瞻模拟。
-        返回模拟元数据，失败时返回 None。
+        影子模拟器与主 Bot 保持同步，只需增量喂入新事件并施加立直，无需回放整局历史。
+        返回模拟元数据，失败时返回 {"error": True}。
         """
         try:
-            # 获取一个新的、独立的模拟环境
-            # 这里重用 model_loader 确保模拟环境与当前环境配置一致
-            sim_bot, sim_engine = self.model_loader(self.player_id, self.is_3p)
-
-            self.logger.debug("Riichi Lookahead: Starting simulation with fresh environment.")
-
-            # 开启同步快进模式以加速历史回放
-            sim_engine.set_sync_mode(True)
-
-            # 三麻需要先回放 game_start 事件以初始化模式
-            if self.is_3p and self.game_start_event:
-                sim_bot.react(json.dumps(self.game_start_event, separators=(",", ":")))
-
-            for h_json in self.history_json:
-                sim_bot.react(h_json)
+            if self.shadow is None:
+                # 这里重用 model_loader 确保模拟环境与当前环境配置一致
+                self.shadow = ShadowSimulator(self.model_loader, self.player_id, self.is_3p, self.game_start_event)
 
-            # 停止快进模式，准备对立直动作进行正式推理
-            sim_engine.set_sync_mode(False)
-
-            # 应用立直事件
-            reach_event = {"type": "reach", "actor": self.player_id}
-            self.logger.debug("Riichi Lookahead: Applying reach event simulation.")
-            sim_resp = sim_bot.react(json.dumps(reach_event, separators=(",", ":")))
-
-            # 从响应中提取模拟元数据
-            try:
-                sim_data = json.loads(sim_resp)
-            except json.JSONDecodeError as e:
-                self.logger.error(f"Failed to parse simulation response: {e}")
-                return {"error": True}
-            sim_meta = sim_data.get("meta", {})
+            sim_meta = self.shadow.lookahead(self.history_json)
+            if sim_meta.get("error"):
+                return sim_meta
 
             # 记录成功 - 防御性检查: 确保 sim_meta 包含必需字段
             if "q_values" in sim_meta and "mask_bits" in sim_meta:
@@ -0,0 +1,148 @@
+import json
+from collections.abc import Callable
+
+from akagi_ng.mjai_bot.engine.base import BaseEngine
+from akagi_ng.mjai_bot.mortal.logger import logger
+from akagi_ng.mjai_bot.protocols import Bot
+
+
+class ShadowSimulator:
+    """
+    立直前瞻用的影子模拟器。
+    维护一个与主 Bot 同步的影子 Bot，按增量方式喂入主 Bot 已处理的事件（同步快进模式，不做推理），
+    需要前瞻时只需在影子 Bot 上施加假设的立直事件，执行一次前向推理。
+
+    影子 Bot 施加立直后即偏离真实对局：
+    - 如果下一个真实事件正是该立直，影子 Bot 仍然有效，直接跳过该事件；
+    - 新的一局 (start_kyoku) 会重置牌局状态，影子 Bot 也随之恢复有效；
+    - 否则丢弃影子 Bot，在下次需要时（优先在空闲时）重新回放本局历史。
+    同一决策点的前瞻结果会被缓存。
+    """
+
+    def __init__(
+        self,
+        model_loader: Callable[[int, bool], tuple[Bot, BaseEngine]],
+        player_id: int,
+        is_3p: bool,
+        game_start_event: dict | None = None,
+    ):
+        self.model_loader = model_loader
+        self.player_id = player_id
+        self.is_3p = is_3p
+        self.game_start_event = game_start_event
+
+        self._bot: Bot | None = None
+        self._engine: BaseEngine | None = None
+        # 当前跟踪的本局事件列表（MortalBot 每局重新创建）及已喂入的事件数
+        self._history: list[str] | None = None
+        self._fed = 0
+        # 已施加到影子 Bot 上的假设立直事件
+        self._pending_reach: dict | None = None
+        # 前瞻结果缓存：键为决策点在本局事件列表中的位置
+        self._memo_key: int | None = None
+        self._memo_result: dict | None = None
+
+    @property
+    def reach_event(self) -> dict:
+        return {"type": "reach", "actor": self.player_id}
+
+    def _build(self):
+        """创建新的影子 Bot（三麻需要先回放 start_game 以初始化模式）"""
+        self._bot, self._engine = self.model_loader(self.player_id, self.is_3p)
+        self._fed = 0
+        self._pending_reach = None
+        if self.is_3p and self.game_start_event:
+            self._feed([json.dumps(self.game_start_event, separators=(",", ":"))])
+
+    def _feed(self, events: list[str]):
+        self._engine.set_sync_mode(True)
+        try:
+            for e_json in events:
+                self._bot.react(e_json)
+        finally:
+            self._engine.set_sync_mode(False)
+
+    def invalidate(self):
+        self._bot = None
+        self._engine = None
+        self._memo_key = None
+        self._memo_result = None
+
+    def _reconcile(self, history_json: list[str]) -> bool:
+        """
+        检查影子 Bot 是否仍与主 Bot 一致。
+        返回 False 表示影子 Bot 已偏离且尚无法判断（同一决策点未有新事件）。
+        """
+        if history_json is not self._history:
+            # 新的一局：start_kyoku 会重置牌局状态，无需重建影子 Bot
+            self._history = history_json
+            self._fed = 0
+            self._pending_reach = None
+            self._memo_key = None
+            return True
+
+        if self._pending_reach is None:
+            return True
+        if self._fed >= len(history_json):
+            return False
+
+        if json.loads(history_json[self._fed]) == self._pending_reach:
+            self._fed += 1
+            self._pending_reach = None
+        else:
+            logger.debug("ShadowSimulator: Real events diverged from simulated reach, rebuilding shadow bot.")
+            self.invalidate()
+        return True
+
+    def sync(self, history_json: list[str]):
+        """将影子 Bot 追赶到主 Bot 的当前状态（仅喂入尚未处理的事件）"""
+        if self._bot is not None and not self._reconcile(history_json):
+            self.invalidate()
+        self._history = history_json
+        if self._bot is None:
+            self._build()
+        if self._fed < len(history_json):
+            self._feed(history_json[self._fed :])
+            self._fed = len(history_json)
+
+    def prepare(self, history_json: list[str]):
+        """
+        在主 Bot 无需决策的空闲时机调用：
+        若影子 Bot 已偏离真实对局，则提前重建，避免下一次前瞻时承担完整回放的开销。
+        """
+        if self._bot is not None:
+            if self._pending_reach is None or not self._reconcile(history_json):
+                return
+            if self._bot is not None:
+                return
+        try:
+            self.sync(history_json)
+        except Exception as e:
+            logger.warning(f"ShadowSimulator: Failed to prepare shadow bot: {e}")
+            self.invalidate()
+
+    def lookahead(self, history_json: list[str]) -> dict:
+        """在当前决策点施加立直事件并返回模拟得到的元数据"""
+        key = len(history_json)
+        if history_json is self._history and self._memo_key == key and self._memo_result is not None:
+            logger.debug("ShadowSimulator: Reusing lookahead result for this decision.")
+            return self._memo_result
+
+        try:
+            self.sync(history_json)
+            logger.debug("Riichi Lookahead: Applying reach event simulation.")
+            self._pending_reach = self.reach_event
+            sim_resp = self._bot.react(json.dumps(self.reach_event, separators=(",", ":")))
+        except Exception:
+            self.invalidate()
+            raise
+
+        try:
+            sim_data = json.loads(sim_resp)
+        except (json.JSONDecodeError, TypeError) as e:
+            logger.error(f"Failed to parse simulation response: {e}")
+            return {"error": True}
+
+        self._memo_key = key
+        self._memo_result = sim_data.get("meta", {})
+        return self._memo_result
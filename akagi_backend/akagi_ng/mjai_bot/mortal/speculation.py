@@ -0,0 +1,445 @@
+import json
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from akagi_ng.mjai_bot.engine.base import BaseEngine
+from akagi_ng.mjai_bot.engine.executor import inference_executor
+from akagi_ng.mjai_bot.mortal.logger import logger
+from akagi_ng.mjai_bot.protocols import Bot
+
+_SUIT_TILES = [f"{n}{s}" for s in "mps" for n in range(1, 10)]
+_HONOR_TILES = ["E", "S", "W", "N", "P", "F", "C"]
+_RED_FIVES = ["5mr", "5pr", "5sr"]
+
+# 三麻不使用 2m-8m（也就没有赤 5m）
+_TILES_3P_EXCLUDED = {f"{n}m" for n in range(2, 9)} | {"5mr"}
+
+DRAW_CANDIDATES_4P = _SUIT_TILES + _HONOR_TILES + _RED_FIVES
+DRAW_CANDIDATES_3P = [t for t in DRAW_CANDIDATES_4P if t not in _TILES_3P_EXCLUDED]
+
+TILE_COPIES = 4
+# 每凑满这么多个假设观测就预计算一次：推测中途作废时，排在前面的摸牌已经就绪
+PRECOMPUTE_CHUNK = 8
+# 等待真实决策结束时检查推测是否作废的间隔
+IDLE_POLL_SECONDS = 0.05
+# 与手牌中同花色相距不超过该值的数牌视为相连
+_CONNECT_DISTANCE = 2
+
+
+def _base_tile(tile: str) -> str:
+    return tile.removesuffix("r")
+
+
+def visible_tiles(history: list[dict], player_id: int) -> Counter[str]:
+    """
+    统计本局中对玩家可见的牌（赤宝牌单独计数）：
+    自家配牌与摸牌、他家舍牌、他家副露中来自手牌的牌、宝牌指示牌。
+    """
+    seen: Counter[str] = Counter()
+    for e in history:
+        e_type = e.get("type")
+        actor = e.get("actor")
+        if e_type == "start_kyoku":
+            seen.update(t for t in e["tehais"][player_id] if t != "?")
+            seen[e["dora_marker"]] += 1
+        elif e_type == "dora":
+            seen[e["dora_marker"]] += 1
+        elif actor == player_id:
+            # 自家舍牌与副露的牌都已经在配牌或摸牌中计过
+            if e_type == "tsumo":
+                seen[e["pai"]] += 1
+        elif e_type == "dahai":
+            seen[e["pai"]] += 1
+        elif e_type in ("chi", "pon", "daiminkan", "ankan"):
+            seen.update(e["consumed"])
+        elif e_type in ("kakan", "nukidora"):
+            seen[e["pai"]] += 1
+    return seen
+
+
+def plausible_draws(history: list[dict], player_id: int, is_3p: bool) -> list[str]:
+    """返回仍可能摸到的牌。只排除四枚均已可见的牌种和已见过的赤宝牌，对规则差异保持保守。"""
+    seen = visible_tiles(history, player_id)
+    base_seen: Counter[str] = Counter()
+    for tile, count in seen.items():
+        base_seen[_base_tile(tile)] += count
+
+    candidates = DRAW_CANDIDATES_3P if is_3p else DRAW_CANDIDATES_4P
+    plausible = []
+    for tile in candidates:
+        if tile.endswith("r"):
+            if seen[tile] == 0 and base_seen[_base_tile(tile)] < TILE_COPIES:
+                plausible.append(tile)
+        elif base_seen[tile] < TILE_COPIES:
+            plausible.append(tile)
+    return plausible
+
+
+def own_hand(history: list[dict], player_id: int) -> Counter[str]:
+    """从本局事件还原自家手牌（赤宝牌按普通牌计数）"""
+    hand: Counter[str] = Counter()
+    for e in history:
+        e_type = e.get("type")
+        if e_type == "start_kyoku":
+            hand = Counter(_base_tile(t) for t in e["tehais"][player_id] if t != "?")
+        elif e.get("actor") != player_id:
+            continue
+        elif e_type == "tsumo":
+            hand[_base_tile(e["pai"])] += 1
+        elif e_type in ("dahai", "kakan", "nukidora"):
+            hand[_base_tile(e["pai"])] -= 1
+        elif e_type in ("chi", "pon", "daiminkan", "ankan"):
+            hand.subtract(_base_tile(t) for t in e["consumed"])
+    return +hand
+
+
+def _connection(tile: str, hand: Counter[str]) -> int:
+    """手牌中与该牌相同或（同花色）相距 2 以内的枚数"""
+    tile = _base_tile(tile)
+    if tile in _HONOR_TILES:
+        return hand[tile]
+    number, suit = int(tile[0]), tile[1]
+    return sum(
+        hand[f"{n}{suit}"] for n in range(max(1, number - _CONNECT_DISTANCE), min(9, number + _CONNECT_DISTANCE) + 1)
+    )
+
+
+def likely_draws(history: list[dict], player_id: int, is_3p: bool, limit: int | None = None) -> list[str]:
+    """
+    按摸到的概率从高到低排列仍可能摸到的牌（至多 limit 种）。
+    概率正比于剩余枚数：赤宝牌未见时只算一枚，同种普通 5 相应少一枚。
+    剩余枚数相同（概率相同）时优先与手牌相连的牌，这些摸牌会改变手牌形状，是最值得提前算好的局面。
+    """
+    seen = visible_tiles(history, player_id)
+    base_seen: Counter[str] = Counter()
+    for tile, count in seen.items():
+        base_seen[_base_tile(tile)] += count
+    hand = own_hand(history, player_id)
+    plausible = plausible_draws(history, player_id, is_3p)
+    red_left = {_base_tile(tile) for tile in plausible if tile.endswith("r")}
+
+    def rank(tile: str) -> tuple[int, int]:
+        remaining = 1 if tile.endswith("r") else TILE_COPIES - base_seen[tile] - (tile in red_left)
+        return remaining, _connection(tile, hand)
+
+    return sorted(plausible, key=rank, reverse=True)[:limit]
+
+
+class _RecordingEngine(BaseEngine):
+    """
+    推测用的私有引擎。
+    拥有独立的同步模式标志，回放历史时不会影响主 Bot 共享的引擎；
+    非同步模式下只记录观测与合法动作掩码，返回占位动作，不执行推理。
+    """
+
+    def __init__(self, engine: BaseEngine):
+        super().__init__(
+            is_3p=engine.is_3p, version=engine.version, name=f"Speculative({engine.name})", is_oracle=engine.is_oracle
+        )
+        self.engine = engine
+        self.engine_type = engine.engine_type
+        self.recorded: tuple[np.ndarray, np.ndarray] | None = None
+
+    @property
+    def enable_rule_based_agari_guard(self) -> bool:
+        return self.engine.enable_rule_based_agari_guard
+
+    @property
+    def enable_amp(self) -> bool:
+        return self.engine.enable_amp
+
+    @property
+    def enable_quick_eval(self) -> bool:
+        return self.engine.enable_quick_eval
+
+    def react_batch(
+        self, obs: np.ndarray, masks: np.ndarray, invisible_obs: np.ndarray
+    ) -> tuple[list[int], list[list[float]], list[list[bool]], list[bool]]:
+        obs = np.asanyarray(obs)
+        masks = np.asanyarray(masks)
+        if not self.is_sync_mode:
+            self.recorded = (obs[0].copy(), masks[0].copy())
+
+        batch_size = obs.shape[0]
+        actions = np.argmax(masks, axis=1).tolist()
+        q_out = [[0.0] * masks.shape[1] for _ in range(batch_size)]
+        return actions, q_out, masks.tolist(), [True] * batch_size
+
+
+@dataclass
+class SpeculationStats:
+    """推测命中统计：命中/未命中只在真实摸牌时计数，中途被其他事件作废的推测计入 cancelled"""
+
+    started: int = 0
+    completed: int = 0
+    cancelled: int = 0
+    hits: int = 0
+    misses: int = 0
+    hypotheses: int = 0
+    # 未命中的推测 Bot 已偏离真实对局，需要重新回放本局历史：回放的事件数与耗时
+    replayed_events: int = 0
+    replay_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        resolved = self.hits + self.misses
+        return self.hits / resolved if resolved else 0.0
+
+    @property
+    def replay_ms_per_speculation(self) -> float:
+        return self.replay_seconds * 1e3 / self.started if self.started else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "started": self.started,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "avg_hypotheses": self.hypotheses / self.started if self.started else 0.0,
+            "replayed_events": self.replayed_events,
+            "replay_ms_per_speculation": round(self.replay_ms_per_speculation, 3),
+        }
+
+
+@dataclass
+class _SpeculationJob:
+    # 主 Bot 的本局事件列表（只会追加，新的一局时整体替换）及推测开始时的长度
+    history_json: list[str]
+    length: int
+    tiles: list[str]
+    cancelled: threading.Event = field(default_factory=threading.Event)
+    # 已成功写入预计算表的假设摸牌（按批追加）
+    ready: frozenset[str] = frozenset()
+
+
+class _HypothesisBot:
+    """
+    持续跟随本局事件的推测用 Bot。
+    每次推测前只喂入上次之后的新事件（同步快进，不推理），再施加一个假设的自家摸牌。
+    若下一个真实事件正是该摸牌，Bot 仍然有效；新的一局 (start_kyoku) 会重置牌局状态，也恢复有效；
+    否则已偏离真实对局，需要重新回放本局历史。回放可被作废的推测中断，已喂入的部分下次继续使用。
+    """
+
+    def __init__(self, bot_factory: Callable[[BaseEngine, int], Bot], engine: BaseEngine, player_id: int):
+        self.bot_factory = bot_factory
+        self.engine = _RecordingEngine(engine)
+        self.player_id = player_id
+        self.bot: Bot | None = None
+        self._history: list[str] | None = None
+        self._fed = 0
+        # 已施加的假设摸牌
+        self._pending: dict | None = None
+
+    def _reconcile(self, history_json: list[str]):
+        if history_json is not self._history:
+            # 新的一局：start_kyoku 会重置牌局状态
+            self._history = history_json
+            self._fed = 0
+            self._pending = None
+            return
+        if self._pending is None:
+            return
+        if self._fed < len(history_json) and _is_same_tsumo(json.loads(history_json[self._fed]), self._pending):
+            self._fed += 1
+            self._pending = None
+            return
+        self.bot = None
+
+    def sync(self, job: _SpeculationJob, game_start_json: str | None, stats: SpeculationStats) -> bool:
+        """追赶到推测开始时的局面，推测被作废时返回 False。重新回放的事件数与耗时计入 stats"""
+        if self.bot is not None:
+            self._reconcile(job.history_json)
+        # 同一局内已偏离真实对局的 Bot 需要从头回放；首次创建或新的一局属于正常的追赶
+        replay = self.bot is None and self._history is job.history_json
+        if self.bot is None:
+            self.bot = self.bot_factory(self.engine, self.player_id)
+            self._history = job.history_json
+            self._fed = 0
+            self._pending = None
+            if game_start_json:
+                self._feed([game_start_json])
+
+        start = time.perf_counter()
+        fed = self._fed
+        try:
+            while self._fed < job.length:
+                if job.cancelled.is_set():
+                    return False
+                self._feed([job.history_json[self._fed]])
+                self._fed += 1
+            return True
+        finally:
+            if replay:
+                stats.replayed_events += self._fed - fed
+                stats.replay_seconds += time.perf_counter() - start
+
+    def _feed(self, events: list[str]):
+        self.engine.set_sync_mode(True)
+        try:
+            for e_json in events:
+                self.bot.react(e_json)
+        finally:
+            self.engine.set_sync_mode(False)
+
+    def hypothesize(self, tile: str) -> tuple[np.ndarray, np.ndarray] | None:
+        """施加假设的摸牌，返回主 Bot 将看到的观测与合法动作掩码"""
+        self._pending = {"type": "tsumo", "actor": self.player_id, "pai": tile}
+        self.engine.recorded = None
+        self.bot.react(json.dumps(self._pending, separators=(",", ":")))
+        return self.engine.recorded
+
+
+def _is_same_tsumo(event: dict, tsumo: dict) -> bool:
+    return all(event.get(k) == v for k, v in tsumo.items())
+
+
+class TsumoSpeculator:
+    """
+    下一巡摸牌的推测预计算。
+    上家打牌后到自家摸牌之间通常有数秒空闲：在后台线程中按摸到的概率依次为所有可能摸到的牌施加假设的 tsumo 事件，
+    每凑满一批假设观测就前向推理一次，结果写入引擎的 Q 值缓存。真实摸牌到达时，主 Bot 的推理直接命中缓存。
+    每个假设使用一个持续跟随对局的推测 Bot：命中的 Bot 只需增量喂入新事件，其余 Bot 需要重新回放本局历史，
+    回放开销与命中率一起计入统计。
+    后台工作只在没有真实决策进行时推进，任何其他事件都会使推测作废。
+    """
+
+    def __init__(
+        self,
+        bot_factory: Callable[[BaseEngine, int], Bot],
+        engine: BaseEngine,
+        player_id: int,
+        is_3p: bool,
+        game_start_event: dict | None = None,
+    ):
+        self.bot_factory = bot_factory
+        self.engine = engine
+        self.player_id = player_id
+        self.is_3p = is_3p
+        self.game_start_event = game_start_event
+        self.num_players = 3 if is_3p else 4
+        # 引擎不支持预计算（在线引擎、未启用 Q 值缓存等）时停止推测
+        self.supported = True
+
+        self.stats = SpeculationStats()
+        self._hypothesis_bots: list[_HypothesisBot] = []
+        self._job: _SpeculationJob | None = None
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def kamicha(self) -> int:
+        return (self.player_id - 1) % self.num_players
+
+    def observe(self, event: dict):
+        """主 Bot 处理每个事件前调用：自家摸牌时结算命中，其他事件使推测作废"""
+        with self._lock:
+            job, self._job = self._job, None
+        if job is None:
+            return
+
+        job.cancelled.set()
+        if event.get("type") == "tsumo" and event.get("actor") == self.player_id:
+            if event.get("pai") in job.ready:
+                self.stats.hits += 1
+                logger.debug(f"TsumoSpeculator: Draw {event['pai']} answered from precomputed table.")
+            else:
+                self.stats.misses += 1
+        else:
+            self.stats.cancelled += 1
+
+    def maybe_start(self, history: list[dict], history_json: list[str]):
+        """主 Bot 处理完一批事件后调用：最后一个事件是上家打牌时开始推测"""
+        if not self.supported or not history or self._job is not None:
+            return
+        # 已作废的上一次推测仍在退出中时跳过，推测 Bot 不能被两个线程同时使用
+        if self._thread is not None and self._thread.is_alive():
+            return
+        last = history[-1]
+        if last.get("sync") or last.get("type") != "dahai" or last.get("actor") != self.kamicha:
+            return
+        # 上家立直宣言牌之后必然先有 reach_accepted，推测的局面不会与真实局面一致
+        if len(history) > 1 and history[-2].get("type") == "reach":
+            return
+
+        job = _SpeculationJob(
+            history_json=history_json,
+            length=len(history_json),
+            tiles=likely_draws(history, self.player_id, self.is_3p),
+        )
+        with self._lock:
+            self._job = job
+        self.stats.started += 1
+        self._thread = threading.Thread(target=self._run, args=(job,), name="TsumoSpeculator", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        with self._lock:
+            job, self._job = self._job, None
+        if job is not None:
+            job.cancelled.set()
+            self.stats.cancelled += 1
+
+    @staticmethod
+    def _wait_for_idle(job: _SpeculationJob) -> bool:
+        """等待真实决策结束，推测被作废时返回 False"""
+        while not inference_executor.wait_idle(IDLE_POLL_SECONDS):
+            if job.cancelled.is_set():
+                return False
+        return not job.cancelled.is_set()
+
+    def _hypothesis_bot(self, index: int) -> _HypothesisBot:
+        while len(self._hypothesis_bots) <= index:
+            self._hypothesis_bots.append(_HypothesisBot(self.bot_factory, self.engine, self.player_id))
+        return self._hypothesis_bots[index]
+
+    def _run(self, job: _SpeculationJob):
+        game_start_json = None
+        if self.is_3p and self.game_start_event:
+            game_start_json = json.dumps(self.game_start_event, separators=(",", ":"))
+        try:
+            tiles, obs, masks = [], [], []
+            for index, tile in enumerate(job.tiles):
+                hypothesis = self._hypothesis_bot(index)
+                if not self._wait_for_idle(job) or not hypothesis.sync(job, game_start_json, self.stats):
+                    return
+                # 部分摸牌无需模型决策（如立直后自动摸切、规则判定和了），没有需要预计算的观测
+                if (recorded := hypothesis.hypothesize(tile)) is not None:
+                    tiles.append(tile)
+                    obs.append(recorded[0])
+                    masks.append(recorded[1])
+                if len(tiles) == PRECOMPUTE_CHUNK:
+                    if not self._precompute(job, tiles, obs, masks):
+                        return
+                    tiles, obs, masks = [], [], []
+
+            if not self._precompute(job, tiles, obs, masks):
+                return
+            self.stats.completed += 1
+            logger.trace(f"TsumoSpeculator: Precomputed {len(job.ready)} draw hypotheses.")
+        except Exception as e:
+            logger.warning(f"TsumoSpeculator: Speculation failed: {e}")
+            # 出错的推测 Bot 状态未知，全部重建
+            self._hypothesis_bots = []
+
+    def _precompute(self, job: _SpeculationJob, tiles: list[str], obs: list, masks: list) -> bool:
+        """预计算一批假设观测并标记为就绪，推测被作废或引擎不支持时返回 False"""
+        if not self._wait_for_idle(job):
+            return False
+        if tiles and not self.engine.precompute(np.stack(obs), np.stack(masks)):
+            logger.info("TsumoSpeculator: Engine does not support precomputation, speculation disabled.")
+            self.supported = False
+            return False
+        job.ready |= frozenset(tiles)
+        self.stats.hypotheses += len(tiles)
+        return True
+
+    def get_stats(self) -> dict[str, Any]:
+        return self.stats.to_dict()
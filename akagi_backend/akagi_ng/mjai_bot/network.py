@@ -1,8 +1,11 @@
+import copy
+import warnings
 from collections.abc import Callable
-from functools import partial
+from functools import cache, partial
 
 import torch
 from torch import Tensor, nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval
 
 from akagi_ng.core.constants import ModelConstants
 
@@ -16,6 +19,24 @@ def get_inference_device() -> torch.device:
     return torch.device("cuda") if torch.cuda.is_available() else torch.device("cpu")
 
 
+@cache
+def supports_bf16_autocast(device_type: str) -> bool:
+    """探测设备能否以 bf16 autocast 执行 Conv1d/Linear 推理（结果按设备类型缓存）"""
+    try:
+        if device_type == "cuda":
+            return torch.cuda.is_bf16_supported()
+        if device_type == "cpu" and not torch.ops.mkldnn._is_mkldnn_bf16_supported():
+            return False
+        conv = nn.Conv1d(4, 4, 3, padding=1).to(device_type)
+        linear = nn.Linear(4 * 34, 8).to(device_type)
+        x = torch.ones(1, 4, 34, device=device_type)
+        with torch.inference_mode(), torch.autocast(device_type, dtype=torch.bfloat16):
+            y = linear(conv(x).flatten(1))
+        return y.dtype == torch.bfloat16 and bool(torch.isfinite(y).all())
+    except Exception:
+        return False
+
+
 class ChannelAttention(nn.Module):
     def __init__(self, channels: int, ratio: int = 16, actv_builder: type[nn.Module] = nn.ReLU, bias: bool = True):
         super().__init__()
@@ -36,6 +57,47 @@ class ChannelAttention(nn.Module):
         return weight.unsqueeze(-1) * x
 
 
+class FusedChannelAttention(nn.Module):
+    """
+    推理专用的 ChannelAttention。
+    avg/max 池化结果拼接后一次通过第一层 MLP；由于第二层是线性的，
+    fc2(a) + fc2(b) 合并为 fc2(a + b) 并将偏置加倍。
+    """
+
+    def __init__(self, ca: ChannelAttention):
+        super().__init__()
+        fc1, actv, fc2 = ca.shared_mlp
+        self.fc1 = copy.deepcopy(fc1)
+        self.actv = copy.deepcopy(actv)
+        self.fc2 = copy.deepcopy(fc2)
+        if self.fc2.bias is not None:
+            with torch.no_grad():
+                self.fc2.bias.mul_(2)
+
+    def forward(self, x: Tensor) -> Tensor:
+        pooled = torch.cat((x.mean(-1), x.amax(-1)), dim=0)
+        avg_hidden, max_hidden = self.actv(self.fc1(pooled)).chunk(2, dim=0)
+        weight = self.fc2(avg_hidden + max_hidden).sigmoid()
+        return weight.unsqueeze(-1) * x
+
+
+class ChannelAffine(nn.Module):
+    """推理阶段的 BatchNorm1d：折叠为逐通道 y = x * scale + shift"""
+
+    def __init__(self, bn: nn.BatchNorm1d):
+        super().__init__()
+        scale = torch.rsqrt(bn.running_var + bn.eps)
+        shift = -bn.running_mean * scale
+        if bn.affine:
+            scale = scale * bn.weight
+            shift = shift * bn.weight + bn.bias
+        self.register_buffer("scale", scale.detach().unsqueeze(-1))
+        self.register_buffer("shift", shift.detach().unsqueeze(-1))
+
+    def forward(self, x: Tensor) -> Tensor:
+        return torch.addcmul(self.shift, x, self.scale)
+
+
 class ResBlock(nn.Module):
     def __init__(
         self,
@@ -251,3 +313,46 @@ class DQN(nn.Module):
         mask_sum = mask.sum(-1, keepdim=True)
         a_mean = a_sum / mask_sum
         return (v + a - a_mean).masked_fill(~mask, -torch.inf)
+
+
+def _fuse_sequential(seq: nn.Sequential) -> nn.Sequential:
+    """将 Conv1d 之后的 BatchNorm1d 折叠进卷积，其余 BatchNorm1d 转换为逐通道仿射"""
+    layers: list[nn.Module] = []
+    for layer in seq:
+        if isinstance(layer, nn.BatchNorm1d):
+            if layers and isinstance(layers[-1], nn.Conv1d):
+                layers[-1] = fuse_conv_bn_eval(layers[-1], layer)
+            else:
+                layers.append(ChannelAffine(layer))
+        elif isinstance(layer, ResBlock):
+            layer.res_unit = _fuse_sequential(layer.res_unit)
+            layer.ca = FusedChannelAttention(layer.ca)
+            layers.append(layer)
+        else:
+            layers.append(layer)
+    return nn.Sequential(*layers)
+
+
+def fuse_brain_for_inference(brain: Brain) -> Brain:
+    """
+    构造推理优化版本的 Brain（加载时变换，不修改原模型）：
+    - 非预激活路径 (v1)：BatchNorm1d 折叠进前一个 Conv1d
+    - 预激活路径 (v2~v4)：conv -> BN 折叠进卷积，残差相加后的 BN 转换为仿射
+    - ChannelAttention 的 avg/max 两次 MLP 合并为一次批量计算
+    GroupNorm 依赖运行时统计量，保持不变。
+    """
+    fused = copy.deepcopy(brain).eval()
+    with torch.no_grad():
+        fused.encoder.net = _fuse_sequential(fused.encoder.net)
+    return fused
+
+
+def quantize_dynamic_int8(module: nn.Module) -> nn.Module:
+    """
+    对模块中的 nn.Linear 层进行动态 int8 量化（仅 CPU 推理可用），返回新模块，不修改原模型。
+    覆盖 Brain 的 32*34 -> 1024 投影、ChannelAttention MLP 以及 DQN/策略头。
+    """
+    # torch.ao 的 eager 量化接口在新版 torch 中会发出迁移提示，这里的使用是有意的
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return torch.ao.quantization.quantize_dynamic(copy.deepcopy(module).eval(), {nn.Linear}, dtype=torch.qint8)
@@ -3,3 +3,7 @@ from typing import Protocol
 
 class Bot(Protocol):
     def react(self, events: str) -> str: ...
+
+
+class EventBot(Protocol):
+    def react_events(self, events: list[dict]) -> dict: ...
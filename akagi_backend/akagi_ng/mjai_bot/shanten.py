@@ -0,0 +1,328 @@
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import numpy as np
+
+# 牌种索引与 mjai.bot.tools 的 vec34 一致：1m-9m, 1p-9p, 1s-9s, E S W N P F C
+TILES_34 = [f"{n}{s}" for s in "mps" for n in range(1, 10)] + ["E", "S", "W", "N", "P", "F", "C"]
+TILE_INDEX = {tile: i for i, tile in enumerate(TILES_34)}
+TILE_COPIES = 4
+
+_SUIT_SIZE = 9
+_HONOR_START = 27
+_SUIT_SLICES = (slice(0, 9), slice(9, 18), slice(18, _HONOR_START))
+_HONOR_SLICE = slice(_HONOR_START, 34)
+# 顺子最晚从 7 起始
+_LAST_SEQ_START = 6
+_PAIR_SIZE = 2
+# 门清手牌的张数下限（13 张或摸牌后 14 张）
+_CLOSED_TILES = 13
+_YAOCHU = (0, 8, 9, 17, 18, 26, 27, 28, 29, 30, 31, 32, 33)
+_MAX_MELDS = 4
+# 表中以 pair * _PAIR_STRIDE + melds 为下标，不可达的组合记为 _INF
+_PAIR_STRIDE = _MAX_MELDS + 1
+_INF = 99
+# 从零张起组成 4 面子 1 雀头最多缺 14 张
+_MAX_DEFICIT = 3 * _MAX_MELDS + _PAIR_SIZE
+
+
+def tile_index(tile: str) -> int:
+    """mjai 牌名转为 vec34 索引，赤宝牌视同普通牌"""
+    return TILE_INDEX[tile.removesuffix("r")]
+
+
+def tiles_to_counts(tiles: Sequence[str]) -> list[int]:
+    counts = [0] * 34
+    for tile in tiles:
+        counts[tile_index(tile)] += 1
+    return counts
+
+
+def _suit_key(counts: Sequence[int]) -> int:
+    """将单色的各牌张数编码为 5 进制整数，作为拆解表的下标"""
+    key = 0
+    for c in counts:
+        key = key * 5 + c
+    return key
+
+
+def _targets(size: int, melds: list[tuple[int, ...]]) -> np.ndarray:
+    """
+    标记恰好由 m 个面子与 p 个雀头组成的张数向量：返回形状为 (5,) * size 的位掩码，
+    第 p * _PAIR_STRIDE + m 位表示可拆解为该组合（每种牌不超过 4 枚）。
+    """
+    pairs = [tuple(_PAIR_SIZE if j == i else 0 for j in range(size)) for i in range(size)]
+    mask = np.zeros((5,) * size, dtype=np.uint16)
+    level = {(0,) * size}
+    for m in range(_MAX_MELDS + 1):
+        for counts in level:
+            mask[counts] |= 1 << m
+            for pair in pairs:
+                with_pair = tuple(a + b for a, b in zip(counts, pair, strict=True))
+                if max(with_pair) <= TILE_COPIES:
+                    mask[with_pair] |= 1 << (_PAIR_STRIDE + m)
+        level = {
+            grown
+            for counts in level
+            for meld in melds
+            if max(grown := tuple(a + b for a, b in zip(counts, meld, strict=True))) <= TILE_COPIES
+        }
+    return mask
+
+
+def _build_table(size: int, *, sequences: bool) -> np.ndarray:
+    """
+    拆解表：对每个 5 进制下标（各牌张数 0-4），给出组成 m 个面子（及 0/1 个雀头）最少还需摸入的张数。
+    先把恰好可拆解的向量沿各牌种向上闭包（张数更多的手牌同样可拆解），
+    再逐轮反向扩展一张牌：第 k 轮新满足的组合即缺 k 张。整张表在导入时一次构建，查表不再有冷启动开销。
+    """
+    melds = [tuple(3 if j == i else 0 for j in range(size)) for i in range(size)]
+    if sequences:
+        melds += [tuple(1 if i <= j < i + 3 else 0 for j in range(size)) for i in range(_LAST_SEQ_START + 1)]
+    mask = _targets(size, melds)
+    for axis in range(size):
+        mask = np.bitwise_or.accumulate(mask, axis=axis)
+
+    full = (1 << (2 * _PAIR_STRIDE)) - 1
+    table = np.zeros((2 * _PAIR_STRIDE, mask.size), dtype=np.int8)
+    for _ in range(_MAX_DEFICIT + 1):
+        flat = mask.reshape(-1)
+        if (flat == full).all():
+            break
+        for bit in range(2 * _PAIR_STRIDE):
+            table[bit] += (flat >> bit & 1) == 0
+        grown = mask.copy()
+        for axis in range(size):
+            # 缺 k-1 张的向量少一张该牌种即缺 k 张
+            target = [slice(None)] * size
+            source = [slice(None)] * size
+            target[axis] = slice(None, TILE_COPIES)
+            source[axis] = slice(1, None)
+            grown[tuple(target)] |= mask[tuple(source)]
+        mask = grown
+    return np.ascontiguousarray(table.T)
+
+
+# 数牌单色（5^9 项，约 20 MB）与字牌（5^7 项）拆解表，字牌只能组成刻子与雀头
+_SUIT_TABLE = _build_table(_SUIT_SIZE, sequences=True)
+_HONOR_TABLE = _build_table(34 - _HONOR_START, sequences=False)
+
+
+def _suit_table(key: int) -> tuple[int, ...]:
+    return tuple(_SUIT_TABLE[key].tolist())
+
+
+def _honor_table(key: int) -> tuple[int, ...]:
+    return tuple(_HONOR_TABLE[key].tolist())
+
+
+@lru_cache(maxsize=4096)
+def _combine(left: tuple[int, ...], right: tuple[int, ...]) -> tuple[int, ...]:
+    """合并两部分的拆解表：面子数相加、雀头至多一个，取最少缺张。同一手牌的各打牌选择间大量复用"""
+    out = [_INF] * (2 * _PAIR_STRIDE)
+    for lp in (0, 1):
+        for lm in range(_PAIR_STRIDE):
+            lv = left[lp * _PAIR_STRIDE + lm]
+            if lv >= _INF:
+                continue
+            for rp in (0, 1 - lp):
+                base = rp * _PAIR_STRIDE
+                for rm in range(_PAIR_STRIDE - lm):
+                    total = lv + right[base + rm]
+                    idx = (lp + rp) * _PAIR_STRIDE + lm + rm
+                    out[idx] = min(out[idx], total)
+    return tuple(out)
+
+
+def _complete(left: Sequence[int], right: Sequence[int], melds: int) -> int:
+    """两部分合计组成 melds 个面子与一个雀头的最少缺张"""
+    best = _INF
+    for m in range(melds + 1):
+        best = min(
+            best,
+            left[m] + right[_PAIR_STRIDE + melds - m],
+            left[_PAIR_STRIDE + m] + right[melds - m],
+        )
+    return best
+
+
+def _chiitoi(counts: Sequence[int]) -> tuple[int, int]:
+    """七对子统计：对子数与牌种数"""
+    pairs = sum(1 for c in counts if c >= _PAIR_SIZE)
+    kinds = sum(1 for c in counts if c > 0)
+    return pairs, kinds
+
+
+def _chiitoi_shanten(pairs: int, kinds: int) -> int:
+    # 同种 4 枚不能算两个对子，牌种不足 7 种时需要额外摸入
+    return 6 - pairs + max(0, 7 - kinds)
+
+
+def _kokushi(counts: Sequence[int]) -> tuple[int, int]:
+    """国士无双统计：幺九牌种数与幺九对子数"""
+    kinds = sum(1 for i in _YAOCHU if counts[i] > 0)
+    pairs = sum(1 for i in _YAOCHU if counts[i] >= _PAIR_SIZE)
+    return kinds, pairs
+
+
+def _kokushi_shanten(kinds: int, pairs: int) -> int:
+    return 13 - kinds - (1 if pairs else 0)
+
+
+# 每张牌所在的部分（万 / 筒 / 索 / 字）及其在该部分 5 进制下标中的权重
+_TILE_PART = [min(t // _SUIT_SIZE, 3) for t in range(34)]
+_TILE_WEIGHT = [5 ** (8 - t % _SUIT_SIZE) if t < _HONOR_START else 5 ** (33 - t) for t in range(34)]
+_PART_TABLES = (_suit_table, _suit_table, _suit_table, _honor_table)
+_YAOCHU_SET = frozenset(_YAOCHU)
+
+
+def _part_keys(counts: Sequence[int]) -> list[int]:
+    return [_suit_key(counts[s]) for s in _SUIT_SLICES] + [_suit_key(counts[_HONOR_SLICE])]
+
+
+class _Hand:
+    """
+    一手牌的拆解上下文。
+    各部分以 5 进制下标查表，增减一张牌只需调整对应部分下标的一位，其余部分的表直接复用。
+    """
+
+    def __init__(self, counts: Sequence[int]):
+        self.counts = list(counts)
+        self.tiles = sum(self.counts)
+        self.melds = self.tiles // 3
+        # 门清（无副露）时才考虑七对子与国士无双
+        self.closed = self.tiles >= _CLOSED_TILES
+        self.keys = _part_keys(self.counts)
+
+    def _tables(self, deltas: dict[int, int]) -> list[tuple[int, ...]]:
+        keys = list(self.keys)
+        for tile, delta in deltas.items():
+            keys[_TILE_PART[tile]] += delta * _TILE_WEIGHT[tile]
+        return [table(key) for table, key in zip(_PART_TABLES, keys, strict=True)]
+
+    def _special_stats(self, deltas: dict[int, int]) -> tuple[int, int, int, int]:
+        """七对子与国士无双的统计量：对子数、牌种数、幺九牌种数、幺九对子数"""
+        counts = self.counts
+        if deltas:
+            counts = counts.copy()
+            for tile, delta in deltas.items():
+                counts[tile] += delta
+        pairs, kinds = _chiitoi(counts)
+        yaochu_kinds, yaochu_pairs = _kokushi(counts)
+        return pairs, kinds, yaochu_kinds, yaochu_pairs
+
+    @staticmethod
+    def _special_shanten(stats: tuple[int, int, int, int]) -> int:
+        pairs, kinds, yaochu_kinds, yaochu_pairs = stats
+        return min(_chiitoi_shanten(pairs, kinds), _kokushi_shanten(yaochu_kinds, yaochu_pairs))
+
+    def shanten(self, deltas: dict[int, int] | None = None) -> int:
+        """增减若干张牌后的向听数（和牌为 -1）"""
+        deltas = deltas or {}
+        parts = self._tables(deltas)
+        regular = _complete(_combine(_combine(parts[0], parts[1]), parts[2]), parts[3], self.melds) - 1
+        if not self.closed:
+            return regular
+        return min(regular, self._special_shanten(self._special_stats(deltas)))
+
+    def ukeire(self, shanten: int, visible: Sequence[int], removed: int | None = None) -> tuple[int, list[int]]:
+        """
+        3n+1 张手牌（可指定先打出 removed）的进张：摸入后向听数下降的牌种及其剩余枚数之和。
+        预先合并其余三部分，每张摸牌只需重新查摸牌所在部分的表。
+        """
+        base = {removed: -1} if removed is not None else {}
+        parts = self._tables(base)
+        keys = list(self.keys)
+        if removed is not None:
+            keys[_TILE_PART[removed]] -= _TILE_WEIGHT[removed]
+        rest = []
+        for part in range(4):
+            a, b, c = (parts[j] for j in range(4) if j != part)
+            rest.append(_combine(_combine(a, b), c))
+        stats = self._special_stats(base) if self.closed else None
+
+        total = 0
+        tiles: list[int] = []
+        for tile in range(34):
+            held = self.counts[tile] - (1 if tile == removed else 0)
+            if held >= TILE_COPIES:
+                continue
+            part = _TILE_PART[tile]
+            table = _PART_TABLES[part](keys[part] + _TILE_WEIGHT[tile])
+            after = _complete(rest[part], table, self.melds) - 1
+            if stats is not None:
+                pairs, kinds, yaochu_kinds, yaochu_pairs = stats
+                is_yaochu = tile in _YAOCHU_SET
+                after = min(
+                    after,
+                    self._special_shanten(
+                        (
+                            pairs + (held == 1),
+                            kinds + (held == 0),
+                            yaochu_kinds + (is_yaochu and held == 0),
+                            yaochu_pairs + (is_yaochu and held == 1),
+                        )
+                    ),
+                )
+            if after < shanten:
+                tiles.append(tile)
+                total += max(0, TILE_COPIES - visible[tile])
+        return total, tiles
+
+
+@dataclass
+class DiscardOption:
+    tile: str
+    shanten: int
+    ukeire: int
+    improving_tiles: list[str] = field(default_factory=list)
+
+
+@dataclass
+class HandAnalysis:
+    shanten: int
+    ukeire: int
+    improving_tiles: list[str] = field(default_factory=list)
+    discards: list[DiscardOption] = field(default_factory=list)
+
+
+def _visible(counts: Sequence[int], visible: Sequence[int] | None) -> Sequence[int]:
+    """可见牌数至少包含自己的手牌"""
+    if visible is None or len(visible) != len(counts):
+        return counts
+    return [max(v, c) for v, c in zip(visible, counts, strict=True)]
+
+
+def calc_shanten(counts: Sequence[int]) -> int:
+    """
+    vec34 手牌的向听数，和牌为 -1。副露的面子不计入 counts，按手牌张数推算所需面子数。
+    """
+    return _Hand(counts).shanten()
+
+
+def analyze_hand(counts: Sequence[int], visible: Sequence[int] | None = None) -> HandAnalysis:
+    """
+    计算手牌的向听数与进张。
+    3n+1 张时直接计算；3n+2 张时一次性计算全部打牌选择（至多 14 种）各自的向听数与进张，
+    整手的向听数与进张取最优打牌。visible 为 vec34 可见牌数（含手牌），缺省时只扣除手牌。
+    """
+    hand = _Hand(counts)
+    visible = _visible(hand.counts, visible)
+
+    if hand.tiles % 3 != _PAIR_SIZE:
+        shanten = hand.shanten()
+        ukeire, tiles = hand.ukeire(shanten, visible)
+        return HandAnalysis(shanten, ukeire, [TILES_34[t] for t in tiles])
+
+    discards = []
+    for tile in range(34):
+        if hand.counts[tile] == 0:
+            continue
+        shanten = hand.shanten({tile: -1})
+        ukeire, tiles = hand.ukeire(shanten, visible, removed=tile)
+        discards.append(DiscardOption(TILES_34[tile], shanten, ukeire, [TILES_34[t] for t in tiles]))
+
+    discards.sort(key=lambda d: (d.shanten, -d.ukeire))
+    best = discards[0]
+    return HandAnalysis(best.shanten, best.ukeire, best.improving_tiles, discards)
@@ -0,0 +1,3 @@
+from akagi_ng.serve.server import InferenceServer, KeyLimiter, LatencyHistogram
+
+__all__ = ["InferenceServer", "KeyLimiter", "LatencyHistogram"]
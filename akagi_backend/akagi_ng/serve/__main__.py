@@ -0,0 +1,84 @@
+"""
+局域网推理服务入口：python -m akagi_ng.serve
+
+在一台机器上加载 4p/3p Mortal 模型，对外提供与 AkagiOT 兼容的 /react_batch、/react_batch_3p 接口，
+其他 Akagi 客户端将 ot.server 指向本服务即可；也可用于在没有真实服务时压测在线引擎路径。
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from aiohttp import web
+
+from akagi_ng.core import configure_logging
+from akagi_ng.core.paths import get_models_dir
+from akagi_ng.mjai_bot.engine.base import BaseEngine
+from akagi_ng.serve.logger import logger
+from akagi_ng.serve.server import (
+    DEFAULT_BATCH_WINDOW_MS,
+    DEFAULT_MAX_BATCH_SIZE,
+    DEFAULT_MAX_CONCURRENCY,
+    InferenceServer,
+)
+from akagi_ng.settings import local_settings
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m akagi_ng.serve", description="AkagiOT-compatible inference server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--model-4p", default=local_settings.model_config.model_4p)
+    parser.add_argument("--model-3p", default=local_settings.model_config.model_3p)
+    parser.add_argument(
+        "--api-key", action="append", default=[], help="Allowed API key (repeatable). Omit to disable auth."
+    )
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help="Per-key in-flight limit")
+    parser.add_argument("--batch-window-ms", type=float, default=DEFAULT_BATCH_WINDOW_MS)
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument("--q-dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--log-level", default=local_settings.log_level)
+    return parser.parse_args(argv)
+
+
+def _load_engines(model_4p: str, model_3p: str) -> dict[bool, BaseEngine]:
+    from akagi_ng.core.lib_loader import libriichi, libriichi3p
+    from akagi_ng.mjai_bot.engine.mortal import load_local_mortal_engine
+
+    engines: dict[bool, BaseEngine] = {}
+    for is_3p, lib, filename in ((False, libriichi, model_4p), (True, libriichi3p, model_3p)):
+        if lib is None:
+            logger.warning(f"Serve: libriichi{'3p' if is_3p else ''} is unavailable, skipping.")
+            continue
+        engine = load_local_mortal_engine(get_models_dir() / Path(filename), lib.consts, is_3p)
+        if engine is not None:
+            engines[is_3p] = engine
+    return engines
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+    configure_logging(args.log_level)
+    logger.add(sys.stderr, level=args.log_level)
+
+    engines = _load_engines(args.model_4p, args.model_3p)
+    if not engines:
+        logger.error("Serve: No model could be loaded, exiting.")
+        return 1
+
+    server = InferenceServer(
+        engines,
+        api_keys=set(args.api_key),
+        max_concurrency=args.max_concurrency,
+        batch_window_ms=args.batch_window_ms,
+        max_batch_size=args.max_batch_size,
+        q_dtype=args.q_dtype,
+    )
+    modes = ", ".join("3P" if is_3p else "4P" for is_3p in engines)
+    logger.info(f"Serve: Listening on {args.host}:{args.port} ({modes}, auth {'on' if args.api_key else 'off'}).")
+    web.run_app(server.create_app(), host=args.host, port=args.port, print=None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
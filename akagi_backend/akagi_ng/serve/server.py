@@ -0,0 +1,212 @@
+import asyncio
+import bisect
+import gzip
+import json
+import time
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+from aiohttp import web
+
+from akagi_ng.mjai_bot.engine import ot_wire
+from akagi_ng.mjai_bot.engine.base import BaseEngine
+from akagi_ng.mjai_bot.engine.batching import BatchingEngine
+from akagi_ng.mjai_bot.engine.latency import LatencyWindow
+from akagi_ng.serve.logger import logger
+
+# 延迟直方图桶上界（毫秒），最后一个桶收纳所有更慢的请求
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_BATCH_WINDOW_MS = 2.0
+DEFAULT_MAX_BATCH_SIZE = 32
+
+_GZIP_MAGIC = b"\x1f\x8b"
+# 请求中 obs 为 [批, 通道, 34]，masks 为 [批, 动作空间]
+_OBS_NDIM = 3
+_MASKS_NDIM = 2
+_ENDPOINTS = {"/react_batch": False, "/react_batch_3p": True}
+
+
+class LatencyHistogram:
+    """固定桶的累计延迟直方图，配合滚动窗口给出近期分位数"""
+
+    def __init__(self, buckets: tuple[int, ...] = HISTOGRAM_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.recent = LatencyWindow()
+
+    def record(self, latency_ms: float):
+        self.counts[bisect.bisect_left(self.buckets, latency_ms)] += 1
+        self.total += 1
+        self.sum_ms += latency_ms
+        self.recent.record(latency_ms)
+
+    def to_dict(self) -> dict[str, Any]:
+        labels = [f"le_{b}ms" for b in self.buckets] + ["inf"]
+        return {
+            "count": self.total,
+            "avg_ms": round(self.sum_ms / self.total, 3) if self.total else 0.0,
+            "buckets": dict(zip(labels, self.counts, strict=True)),
+            **self.recent.snapshot(),
+        }
+
+
+@dataclass
+class ServerStats:
+    histograms: dict[str, LatencyHistogram] = field(default_factory=dict)
+    rejected: dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+
+    def record(self, endpoint: str, latency_ms: float):
+        self.histograms.setdefault(endpoint, LatencyHistogram()).record(latency_ms)
+
+
+class KeyLimiter:
+    """按 API Key 限制同时在途的请求数，超限请求直接拒绝（客户端随即回退到本地模型）"""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._inflight: dict[str, int] = {}
+
+    def try_acquire(self, key: str) -> bool:
+        if self._inflight.get(key, 0) >= self.max_concurrency:
+            return False
+        self._inflight[key] = self._inflight.get(key, 0) + 1
+        return True
+
+    def release(self, key: str):
+        self._inflight[key] -= 1
+        if self._inflight[key] <= 0:
+            del self._inflight[key]
+
+
+class InferenceServer:
+    """
+    与 AkagiOT 接口兼容的推理服务。
+    - /react_batch、/react_batch_3p：接受 gzip JSON 或二进制传输格式，返回相同格式的结果；
+    - 不同连接的并发请求经 BatchingEngine 合并为一次前向计算；
+    - 按 API Key 限制并发，/stats 返回各端点的延迟直方图。
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        engines: dict[bool, BaseEngine],
+        *,
+        api_keys: set[str] | None = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        batch_window_ms: float = DEFAULT_BATCH_WINDOW_MS,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        q_dtype: str = "float32",
+    ):
+        self.engines = {
+            is_3p: BatchingEngine(engine, window_ms=batch_window_ms, max_batch_size=max_batch_size)
+            if batch_window_ms > 0
+            else engine
+            for is_3p, engine in engines.items()
+        }
+        self.api_keys = api_keys or set()
+        self.limiter = KeyLimiter(max_concurrency)
+        self.q_dtype = q_dtype
+        self.stats = ServerStats()
+        # 每个在途请求占用一个线程阻塞等待合批结果，线程数需足以填满一个批次
+        self._executor = ThreadPoolExecutor(max_workers=max_batch_size * 2, thread_name_prefix="ServeInference")
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._wire_header_middleware])
+        for path in _ENDPOINTS:
+            app.router.add_post(path, self.handle_react_batch)
+        app.router.add_get("/stats", self.handle_stats)
+        app.router.add_route("OPTIONS", "/", self.handle_options)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    @web.middleware
+    async def _wire_header_middleware(
+        self, request: web.Request, handler: Callable[[web.Request], Awaitable[web.StreamResponse]]
+    ) -> web.StreamResponse:
+        # 在所有响应（含预热用的 OPTIONS）中声明支持的二进制传输格式版本
+        response = await handler(request)
+        response.headers[ot_wire.WIRE_HEADER] = str(ot_wire.WIRE_VERSION)
+        return response
+
+    async def _on_cleanup(self, app: web.Application):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def handle_options(self, request: web.Request) -> web.Response:
+        return web.Response(status=204)
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "endpoints": {path: hist.to_dict() for path, hist in self.stats.histograms.items()},
+                "rejected": self.stats.rejected,
+                "errors": self.stats.errors,
+                "batching": {
+                    "3p" if is_3p else "4p": engine.get_stats()
+                    for is_3p, engine in self.engines.items()
+                    if isinstance(engine, BatchingEngine)
+                },
+            }
+        )
+
+    async def handle_react_batch(self, request: web.Request) -> web.Response:
+        key = request.headers.get("Authorization", "")
+        if self.api_keys and key not in self.api_keys:
+            return web.json_response({"error": "invalid api key"}, status=401)
+
+        engine = self.engines.get(_ENDPOINTS[request.path])
+        if engine is None:
+            return web.json_response({"error": f"no model loaded for {request.path}"}, status=503)
+
+        if not self.limiter.try_acquire(key):
+            self.stats.rejected[key] = self.stats.rejected.get(key, 0) + 1
+            return web.json_response({"error": "too many concurrent requests"}, status=429)
+
+        start = time.perf_counter()
+        try:
+            return await self._react(request, engine)
+        finally:
+            self.limiter.release(key)
+            self.stats.record(request.path, (time.perf_counter() - start) * 1000)
+
+    async def _react(self, request: web.Request, engine: BaseEngine) -> web.Response:
+        body = await request.read()
+        binary = request.content_type == ot_wire.CONTENT_TYPE
+        try:
+            obs, masks = _decode_body(body, binary)
+        except (ValueError, OSError, KeyError) as e:
+            return web.json_response({"error": f"invalid request body: {e}"}, status=400)
+
+        loop = asyncio.get_running_loop()
+        try:
+            actions, q_out, clean_masks, is_greedy = await loop.run_in_executor(
+                self._executor, engine.react_batch, obs, masks, None
+            )
+        except Exception as e:
+            self.stats.errors += 1
+            logger.error(f"Serve: Inference failed on {request.path}: {e}")
+            return web.json_response({"error": "inference failed"}, status=500)
+
+        if binary:
+            payload = ot_wire.encode_response(actions, q_out, is_greedy, q_dtype=self.q_dtype)
+            return web.Response(body=payload, content_type=ot_wire.CONTENT_TYPE)
+        return web.json_response({"actions": actions, "q_out": q_out, "masks": clean_masks, "is_greedy": is_greedy})
+
+
+def _decode_body(body: bytes, binary: bool) -> tuple[np.ndarray, np.ndarray]:
+    if binary:
+        return ot_wire.decode_request(body)
+    # aiohttp 不一定已按 Content-Encoding 解压，按 gzip 魔数判断
+    if body.startswith(_GZIP_MAGIC):
+        body = gzip.decompress(body)
+    data = json.loads(body)
+    obs = np.asarray(data["obs"], dtype=np.float32)
+    masks = np.asarray(data["masks"], dtype=bool)
+    if obs.ndim != _OBS_NDIM or masks.ndim != _MASKS_NDIM or len(obs) != len(masks) or len(obs) == 0:
+        raise ValueError(f"shape mismatch: obs {obs.shape}, masks {masks.shape}")
+    return obs, masks
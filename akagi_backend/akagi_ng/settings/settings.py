@@ -2,7 +2,7 @@ import ctypes
 import json
 import locale
 import os
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
 
 import jsonschema
@@ -30,6 +30,7 @@ class OTConfig:
     online: bool
     server: str = ""
     api_key: str = ""
+    hedge_budget_ms: float = 0.0
 
 
 @dataclass
@@ -52,6 +53,23 @@ class ModelConfig:
     rule_based_agari_guard: bool
     model_4p: str = "mortal.pth"
     model_3p: str = "mortal3p.pth"
+    fused_inference: bool = False
+    precision: str = "fp32"
+    batch_window_ms: float = 0.0
+    max_batch_size: int = 8
+    q_cache_mb: float = 16.0
+    speculative_tsumo: bool = False
+    num_threads: int = 0
+    num_interop_threads: int = 0
+    inference_process: bool = False
+    ensemble_4p: list[str] = field(default_factory=list)
+    ensemble_3p: list[str] = field(default_factory=list)
+    ensemble_aggregation: str = "mean"
+    ensemble_weights: list[float] = field(default_factory=list)
+    engine_memory_budget_mb: float = 0.0
+    engine_idle_ttl_s: float = 0.0
+    profile_every_n: int = 0
+    profile_max_traces: int = 20
 
 
 @dataclass
@@ -135,12 +153,30 @@ class Settings:
                 online=ot_data.get("online", False),
                 server=ot_data.get("server", ""),
                 api_key=ot_data.get("api_key", ""),
+                hedge_budget_ms=ot_data.get("hedge_budget_ms", 0.0),
             ),
             model_config=ModelConfig(
                 model_4p=model_config_data.get("model_4p", "mortal.pth"),
                 model_3p=model_config_data.get("model_3p", "mortal3p.pth"),
                 temperature=model_config_data.get("temperature", 0.3),
                 rule_based_agari_guard=model_config_data.get("rule_based_agari_guard", True),
+                fused_inference=model_config_data.get("fused_inference", False),
+                precision=model_config_data.get("precision", "fp32"),
+                batch_window_ms=model_config_data.get("batch_window_ms", 0.0),
+                max_batch_size=model_config_data.get("max_batch_size", 8),
+                q_cache_mb=model_config_data.get("q_cache_mb", 16.0),
+                speculative_tsumo=model_config_data.get("speculative_tsumo", False),
+                num_threads=model_config_data.get("num_threads", 0),
+                num_interop_threads=model_config_data.get("num_interop_threads", 0),
+                inference_process=model_config_data.get("inference_process", False),
+                ensemble_4p=model_config_data.get("ensemble_4p", []),
+                ensemble_3p=model_config_data.get("ensemble_3p", []),
+                ensemble_aggregation=model_config_data.get("ensemble_aggregation", "mean"),
+                ensemble_weights=model_config_data.get("ensemble_weights", []),
+                engine_memory_budget_mb=model_config_data.get("engine_memory_budget_mb", 0.0),
+                engine_idle_ttl_s=model_config_data.get("engine_idle_ttl_s", 0.0),
+                profile_every_n=model_config_data.get("profile_every_n", 0),
+                profile_max_traces=model_config_data.get("profile_max_traces", 20),
             ),
             autoplay=AutoPlayConfig(
                 enabled=autoplay_data.get("enabled", False),
@@ -221,12 +257,34 @@ def get_default_settings_dict() -> dict:
             "upstream": "",
         },
         "server": {"host": "127.0.0.1", "port": 8765},
-        "ot": {"online": False, "server": "http://127.0.0.1:5000", "api_key": "<YOUR_API_KEY>"},
+        "ot": {
+            "online": False,
+            "server": "http://127.0.0.1:5000",
+            "api_key": "<YOUR_API_KEY>",
+            "hedge_budget_ms": 0.0,
+        },
         "model_config": {
             "model_4p": "mortal.pth",
             "model_3p": "mortal3p.pth",
             "temperature": 0.3,
             "rule_based_agari_guard": True,
+            "fused_inference": False,
+            "precision": "fp32",
+            "batch_window_ms": 0.0,
+            "max_batch_size": 8,
+            "q_cache_mb": 16.0,
+            "speculative_tsumo": False,
+            "num_threads": 0,
+            "num_interop_threads": 0,
+            "inference_process": False,
+            "ensemble_4p": [],
+            "ensemble_3p": [],
+            "ensemble_aggregation": "mean",
+            "ensemble_weights": [],
+            "engine_memory_budget_mb": 0.0,
+            "engine_idle_ttl_s": 0.0,
+            "profile_every_n": 0,
+            "profile_max_traces": 20,
         },
         "autoplay": {
             "enabled": False,
@@ -317,11 +375,29 @@ def _update_settings(settings: Settings, data: dict):
     settings.model_config.model_3p = model_config_data.get("model_3p", "mortal3p.pth")
     settings.model_config.temperature = model_config_data.get("temperature", 0.3)
     settings.model_config.rule_based_agari_guard = model_config_data.get("rule_based_agari_guard", True)
+    settings.model_config.fused_inference = model_config_data.get("fused_inference", False)
+    settings.model_config.precision = model_config_data.get("precision", "fp32")
+    settings.model_config.batch_window_ms = model_config_data.get("batch_window_ms", 0.0)
+    settings.model_config.max_batch_size = model_config_data.get("max_batch_size", 8)
+    settings.model_config.q_cache_mb = model_config_data.get("q_cache_mb", 16.0)
+    settings.model_config.speculative_tsumo = model_config_data.get("speculative_tsumo", False)
+    settings.model_config.num_threads = model_config_data.get("num_threads", 0)
+    settings.model_config.num_interop_threads = model_config_data.get("num_interop_threads", 0)
+    settings.model_config.inference_process = model_config_data.get("inference_process", False)
+    settings.model_config.ensemble_4p = model_config_data.get("ensemble_4p", [])
+    settings.model_config.ensemble_3p = model_config_data.get("ensemble_3p", [])
+    settings.model_config.ensemble_aggregation = model_config_data.get("ensemble_aggregation", "mean")
+    settings.model_config.ensemble_weights = model_config_data.get("ensemble_weights", [])
+    settings.model_config.engine_memory_budget_mb = model_config_data.get("engine_memory_budget_mb", 0.0)
+    settings.model_config.engine_idle_ttl_s = model_config_data.get("engine_idle_ttl_s", 0.0)
+    settings.model_config.profile_every_n = model_config_data.get("profile_every_n", 0)
+    settings.model_config.profile_max_traces = model_config_data.get("profile_max_traces", 20)
 
     ot_data = data.get("ot", {})
     settings.ot.online = ot_data.get("online", False)
     settings.ot.server = ot_data.get("server", "")
     settings.ot.api_key = ot_data.get("api_key", "")
+    settings.ot.hedge_budget_ms = ot_data.get("hedge_budget_ms", 0.0)
 
     autoplay_data = data.get("autoplay", {})
     settings.autoplay.enabled = autoplay_data.get("enabled", False)
@@ -92,3 +92,21 @@ def test_provider_sync_mode(mock_engines):
 
     online.set_sync_mode.assert_called_with(True)
     local.set_sync_mode.assert_called_with(True)
+
+
+def test_provider_precision_only_for_local_decisions(mock_engines):
+    online, local = mock_engines
+    local.get_additional_meta.return_value = {"precision": "int8"}
+    provider = EngineProvider(online, local, is_3p=False)
+
+    obs = np.zeros((1, 200, 34))
+    masks = np.zeros((1, 46), dtype=bool)
+
+    online.react_batch.return_value = ([0], [[1.0]], [[True]], [False])
+    provider.react_batch(obs, masks, obs)
+    assert "precision" not in provider.get_additional_meta()
+
+    online.react_batch.side_effect = RuntimeError("Connection timeout")
+    local.react_batch.return_value = ([1], [[0.9]], [[True]], [False])
+    provider.react_batch(obs, masks, obs)
+    assert provider.get_additional_meta()["precision"] == "int8"
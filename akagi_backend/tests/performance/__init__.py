@@ -0,0 +1 @@
+"""__init__.py for performance tests"""
@@ -0,0 +1,111 @@
+import json
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from akagi_ng.core import encode_event
+from akagi_ng.mjai_bot.controller import Controller
+from akagi_ng.mjai_bot.mortal.bot import MortalBot
+
+pytestmark = pytest.mark.performance
+
+ROUNDS = 200
+
+
+def _event_stream() -> list[dict]:
+    events = [
+        {"type": "start_game", "id": 0},
+        {
+            "type": "start_kyoku",
+            "bakaze": "E",
+            "kyoku": 1,
+            "honba": 0,
+            "kyotaku": 0,
+            "oya": 0,
+            "dora_marker": "1p",
+            "scores": [25000] * 4,
+            "tehais": [["?"] * 13] * 4,
+        },
+    ]
+    for i in range(ROUNDS):
+        actor = i % 4
+        events.append({"type": "tsumo", "actor": actor, "pai": "?" if actor else "5m"})
+        events.append({"type": "dahai", "actor": actor, "pai": "9s", "tsumogiri": True})
+    return events
+
+
+class _Counter:
+    def __init__(self):
+        self.dumps = 0
+        self.loads = 0
+        self._dumps = json.dumps
+        self._loads = json.loads
+
+    def count_dumps(self, *args, **kwargs):
+        self.dumps += 1
+        return self._dumps(*args, **kwargs)
+
+    def count_loads(self, *args, **kwargs):
+        self.loads += 1
+        return self._loads(*args, **kwargs)
+
+
+@pytest.fixture
+def mock_model():
+    mock_lib_loader = MagicMock()
+    mock_lib_loader.libriichi.mjai.Bot = MagicMock
+    with (
+        patch.dict(sys.modules, {"akagi_ng.core.lib_loader": mock_lib_loader}),
+        patch("akagi_ng.mjai_bot.engine.factory.load_bot_and_engine") as mock_loader,
+    ):
+        model = MagicMock()
+        # libriichi 只在轮到自己行动时返回动作
+        model.react.side_effect = lambda e: (
+            '{"type":"dahai","actor":0,"pai":"5m","tsumogiri":true}'
+            if e.startswith('{"type":"tsumo","actor":0,')
+            else None
+        )
+        engine = MagicMock()
+        engine.get_additional_meta.return_value = {"engine_type": "mortal"}
+        engine.get_notification_flags.return_value = {}
+        mock_loader.return_value = (model, engine)
+        yield model
+
+
+def _run_string_pipeline(events: list[dict]) -> None:
+    """原流程：Controller 序列化事件列表，Bot 解析后逐个重新编码，响应再次序列化与解析，状态追踪另行编码"""
+    bot = MortalBot()
+    for event in events:
+        json.dumps(event)  # StateTrackerBot 的 PlayerState.update
+        json.loads(bot.react(json.dumps([event])))
+
+
+def _run_encoded_pipeline(events: list[dict]) -> None:
+    """新流程：事件在 Bridge 输出处编码一次，之后各环节共用编码并以字典传递"""
+    controller = Controller()
+    controller.available_bots = [MortalBot]
+    controller.available_bots_names = ["mortal"]
+    for event in map(encode_event, events):
+        _ = event.json  # StateTrackerBot 的 PlayerState.update
+        controller.react(event)
+
+
+def _count(pipeline, events: list[dict]) -> _Counter:
+    counter = _Counter()
+    with patch.object(json, "dumps", counter.count_dumps), patch.object(json, "loads", counter.count_loads):
+        pipeline(events)
+    return counter
+
+
+def test_serializations_per_event(mock_model):
+    """统计每个 MJAI 事件经过 Controller / MortalBot / 状态追踪时的 JSON 编解码次数。"""
+    events = _event_stream()
+    string_counter = _count(_run_string_pipeline, events)
+    encoded_counter = _count(_run_encoded_pipeline, events)
+
+    # 每个事件只编码一次；只有 libriichi 返回的动作需要解析
+    assert encoded_counter.dumps == len(events)
+    assert encoded_counter.loads == ROUNDS // 4
+    assert string_counter.dumps > 3 * len(events)
+    assert string_counter.loads > 2 * len(events)
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+import torch
+
+from akagi_ng.mjai_bot.network import DQN, Brain, fuse_brain_for_inference, quantize_dynamic_int8
+
+pytestmark = pytest.mark.performance
+
+IN_CHANNELS = 1012
+ACTION_SPACE = 46
+ROUNDS = 50
+
+
+def _per_decision_ms(brain: torch.nn.Module, dqn: torch.nn.Module, obs: torch.Tensor, masks: torch.Tensor) -> float:
+    with torch.inference_mode():
+        for _ in range(5):
+            dqn(brain(obs), masks)
+        start = time.process_time()
+        for _ in range(ROUNDS):
+            dqn(brain(obs), masks)
+        return (time.process_time() - start) * 1000 / ROUNDS
+
+
+def test_fused_brain_per_decision_cpu_time():
+    """对比原始 Brain 与推理版 Brain 的单次决策 CPU 耗时，并确认 argmax 一致。"""
+    torch.manual_seed(0)
+    brain = Brain(
+        obs_shape_func=lambda _v: (IN_CHANNELS, 34),
+        oracle_obs_shape_func=lambda _v: (217, 34),
+        conv_channels=192,
+        num_blocks=40,
+        version=4,
+    ).eval()
+    fused = fuse_brain_for_inference(brain)
+    dqn = DQN(action_space=ACTION_SPACE, version=4).eval()
+
+    obs = torch.randint(0, 2, (1, IN_CHANNELS, 34)).float()
+    masks = torch.ones(1, ACTION_SPACE, dtype=torch.bool)
+
+    standard_ms = _per_decision_ms(brain, dqn, obs, masks)
+    fused_ms = _per_decision_ms(fused, dqn, obs, masks)
+
+    with torch.inference_mode():
+        assert torch.equal(dqn(brain(obs), masks).argmax(-1), dqn(fused(obs), masks).argmax(-1))
+    assert fused_ms < standard_ms * 1.1, f"standard: {standard_ms:.2f} ms/decision, fused: {fused_ms:.2f} ms/decision"
+
+
+def test_int8_per_decision_cpu_time():
+    """对比 fp32 与动态 int8 量化的单次决策 CPU 耗时。"""
+    torch.manual_seed(0)
+    brain = Brain(
+        obs_shape_func=lambda _v: (IN_CHANNELS, 34),
+        oracle_obs_shape_func=lambda _v: (217, 34),
+        conv_channels=192,
+        num_blocks=40,
+        version=4,
+    ).eval()
+    dqn = DQN(action_space=ACTION_SPACE, version=4).eval()
+
+    obs = torch.randint(0, 2, (1, IN_CHANNELS, 34)).float()
+    masks = torch.ones(1, ACTION_SPACE, dtype=torch.bool)
+
+    fp32_ms = _per_decision_ms(brain, dqn, obs, masks)
+    int8_ms = _per_decision_ms(quantize_dynamic_int8(brain), quantize_dynamic_int8(dqn), obs, masks)
+    # 没有 VNNI 等整数指令的 CPU 上 int8 未必更快，只确认不会明显变慢
+    assert int8_ms < fp32_ms * 1.5, f"fp32: {fp32_ms:.2f} ms/decision, int8: {int8_ms:.2f} ms/decision"
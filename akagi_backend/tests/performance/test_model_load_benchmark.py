@@ -0,0 +1,99 @@
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+import torch
+
+from akagi_ng.mjai_bot.engine.artifact_cache import compute_model_digest
+from akagi_ng.mjai_bot.engine.flat_weights import flat_weights_path
+from akagi_ng.mjai_bot.engine.mortal import _build_eager_artifact, load_local_mortal_engine
+from akagi_ng.mjai_bot.network import DQN, Brain
+
+pytestmark = pytest.mark.performance
+
+IN_CHANNELS = 1012
+ACTION_SPACE = 46
+_STATUS_PATH = Path("/proc/self/status")
+
+
+def _rss_anon_kb() -> int:
+    """进程匿名常驻内存（堆），不含文件映射页"""
+    for line in _STATUS_PATH.read_text().splitlines():
+        if line.startswith("RssAnon:"):
+            return int(line.split()[1])
+    raise RuntimeError("RssAnon not available")
+
+
+def _measure_load(model_path: Path, consts: SimpleNamespace) -> tuple[float, int]:
+    before = _rss_anon_kb()
+    start = time.perf_counter()
+    artifact = _build_eager_artifact(model_path, consts, torch.device("cpu"), "standard", "fp32")
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    delta_kb = _rss_anon_kb() - before
+    del artifact
+    return elapsed_ms, delta_kb
+
+
+def _save_checkpoint(model_path: Path) -> SimpleNamespace:
+    consts = SimpleNamespace(
+        obs_shape=lambda _v: (IN_CHANNELS, 34), oracle_obs_shape=lambda _v: (217, 34), ACTION_SPACE=ACTION_SPACE
+    )
+    torch.manual_seed(0)
+    brain = Brain(consts.obs_shape, consts.oracle_obs_shape, conv_channels=192, num_blocks=40, version=4)
+    torch.save(
+        {
+            "config": {"control": {"version": 4}, "resnet": {"conv_channels": 192, "num_blocks": 40}},
+            "mortal": brain.state_dict(),
+            "current_dqn": DQN(ACTION_SPACE, version=4).state_dict(),
+        },
+        model_path,
+    )
+    return consts
+
+
+@pytest.mark.skipif(not _STATUS_PATH.exists(), reason="requires /proc/self/status")
+def test_flat_weights_load_time_and_rss(tmp_path):
+    """对比 .pth 与内存映射扁平权重的加载耗时与新增匿名常驻内存。"""
+    model_path = tmp_path / "mortal.pth"
+    consts = _save_checkpoint(model_path)
+
+    with patch("akagi_ng.mjai_bot.engine.artifact_cache.get_cache_dir", return_value=tmp_path / "cache"):
+        with patch("akagi_ng.mjai_bot.engine.mortal.flat_weights_path", return_value=None):
+            pth_ms, pth_kb = _measure_load(model_path, consts)
+        # 第一次写出扁平文件，第二次才是映射加载
+        _build_eager_artifact(model_path, consts, torch.device("cpu"), "standard", "fp32")
+        assert flat_weights_path(model_path).exists()
+        flat_ms, flat_kb = _measure_load(model_path, consts)
+
+    assert flat_kb < pth_kb, (
+        f".pth: {pth_ms:.0f} ms, +{pth_kb / 1024:.1f} MB anon; flat: {flat_ms:.0f} ms, +{flat_kb / 1024:.1f} MB anon"
+    )
+
+
+def test_artifact_cache_hit_skips_checkpoint_hash(tmp_path):
+    """
+    默认 fp32 配置下的完整启动路径：缓存命中时加载 TorchScript 产物，不经过扁平权重；
+    摘要按文件大小与修改时间复用，命中路径不再整读检查点，耗时应明显低于首次构建。
+    """
+    model_path = tmp_path / "mortal.pth"
+    consts = _save_checkpoint(model_path)
+
+    with patch("akagi_ng.mjai_bot.engine.artifact_cache.get_cache_dir", return_value=tmp_path / "cache"):
+        start = time.perf_counter()
+        load_local_mortal_engine(model_path, consts)
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        digest = compute_model_digest(model_path)
+        digest_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        engine = load_local_mortal_engine(model_path, consts)
+        warm_ms = (time.perf_counter() - start) * 1000
+
+    assert isinstance(engine.brain, torch.jit.ScriptModule)
+    assert len(digest) == 64
+    assert digest_ms < 10, f"digest lookup: {digest_ms:.1f} ms"
+    assert warm_ms < cold_ms, f"cache hit {warm_ms:.0f} ms vs cold {cold_ms:.0f} ms"
@@ -0,0 +1,38 @@
+import random
+import time
+
+import pytest
+
+from akagi_ng.mjai_bot.shanten import _combine, analyze_hand
+
+pytestmark = pytest.mark.performance
+
+HANDS = 200
+
+
+def _fresh_hands(size: int) -> list[list[int]]:
+    """生成互不相同的随机手牌，每手只计时一次，不会命中之前的计算结果"""
+    rng = random.Random(size)
+    wall = [t for t in range(34) for _ in range(4)]
+    hands: dict[tuple[int, ...], list[int]] = {}
+    while len(hands) < HANDS:
+        counts = [0] * 34
+        for t in rng.sample(wall, size):
+            counts[t] += 1
+        hands.setdefault(tuple(counts), counts)
+    return list(hands.values())
+
+
+@pytest.mark.parametrize(("size", "budget_ms"), [(13, 2), (14, 10)])
+def test_analyze_hand_latency_on_fresh_hands(size, budget_ms):
+    """统计未见过的手牌（14 张时含全部打牌选择）向听数与进张计算的耗时：拆解表在导入时构建，不存在冷启动。"""
+    hands = _fresh_hands(size)
+    _combine.cache_clear()
+
+    start = time.perf_counter()
+    for counts in hands:
+        analyze_hand(counts)
+    per_hand_ms = (time.perf_counter() - start) * 1e3 / HANDS
+
+    # 每次生成推荐都会调用，应远低于一次模型推理
+    assert per_hand_ms < budget_ms, f"{size} tiles: {per_hand_ms:.2f} ms/hand"
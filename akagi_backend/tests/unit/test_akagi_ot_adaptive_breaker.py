@@ -0,0 +1,126 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from akagi_ng.mjai_bot.engine import akagi_ot
+from akagi_ng.mjai_bot.engine.akagi_ot import AkagiOTClient, AkagiOTEngine
+from akagi_ng.mjai_bot.engine.latency import LatencyWindow
+
+OBS = np.zeros((1, 4, 34))
+MASKS = np.ones((1, 3), dtype=bool)
+
+
+@pytest.fixture
+def client():
+    with patch.object(AkagiOTClient, "_pre_warm_connection"):
+        return AkagiOTClient("http://fake-server", "fake-key")
+
+
+def _ok_response():
+    resp = MagicMock(status_code=200)
+    resp.json.return_value = {"actions": [0], "q_out": [[0.0] * 3], "masks": [[True] * 3], "is_greedy": [True]}
+    return resp
+
+
+def _reopen_after_recovery(client: AkagiOTClient):
+    """把熔断器时间线推进到恢复期之后"""
+    client._last_failure_time -= client._circuit_recovery_period + 1
+
+
+def test_latency_window_percentiles() -> None:
+    """测试滚动窗口按最近秩计算分位数，只保留最近 N 个样本。"""
+    window = LatencyWindow(size=100)
+    assert window.percentile(50) is None
+    for ms in range(1, 201):
+        window.record(float(ms))
+
+    assert len(window) == 100
+    snapshot = window.snapshot()
+    assert snapshot["p50_ms"] == 150.0
+    assert snapshot["p95_ms"] == 195.0
+    assert snapshot["p99_ms"] == 199.0
+
+
+def test_sustained_slo_violations_open_circuit(client) -> None:
+    """测试成功但持续超出延迟 SLO 的响应也会触发熔断，偶发慢响应不会。"""
+    for _ in range(akagi_ot.SLO_WINDOW_SIZE):
+        client._record_success("/react_batch", 100.0)
+    client._record_success("/react_batch", 3900.0)
+    assert client.circuit_state == "closed"
+
+    for _ in range(akagi_ot.SLO_WINDOW_SIZE):
+        client._record_success("/react_batch", 3900.0)
+
+    assert client.circuit_state == "open"
+    assert "SLO" in client.get_breaker_state()["reason"]
+    with pytest.raises(RuntimeError, match="OPEN"):
+        client.predict(False, OBS, MASKS)
+
+
+def test_timeout_adapts_to_observed_latency(client) -> None:
+    """测试读取超时按端点 p99 收紧，并限制在下限与硬超时之间。"""
+    assert client.timeout_for("/react_batch") == client.timeout
+
+    for _ in range(akagi_ot.ADAPTIVE_TIMEOUT_MIN_SAMPLES):
+        client._record_success("/react_batch", 100.0)
+        client._record_success("/react_batch_3p", 1200.0)
+
+    assert client.timeout_for("/react_batch") == (2.0, akagi_ot.MIN_READ_TIMEOUT_SECONDS)
+    assert client.timeout_for("/react_batch_3p") == (2.0, 2.4)
+
+    with patch.object(client.session, "post", return_value=_ok_response()) as mock_post:
+        client.predict(True, OBS, MASKS)
+    assert mock_post.call_args.kwargs["timeout"] == (2.0, 2.4)
+
+
+def test_half_open_allows_single_probe_until_recovered(client) -> None:
+    """测试半开状态下同一时间只放行一个探测，连续成功后闭合。"""
+    for _ in range(client._failure_threshold):
+        client._record_failure()
+    assert client.circuit_state == "open"
+    _reopen_after_recovery(client)
+
+    def probe(*args, **kwargs):
+        # 探测在途时其他请求被拒绝
+        with pytest.raises(RuntimeError, match="HALF-OPEN"):
+            client.predict(False, OBS, MASKS)
+        return _ok_response()
+
+    with patch.object(client.session, "post", side_effect=probe) as mock_post:
+        client.predict(False, OBS, MASKS)
+        assert client.circuit_state == "half_open"
+        client.predict(False, OBS, MASKS)
+
+    assert mock_post.call_count == akagi_ot.HALF_OPEN_PROBES
+    assert client.circuit_state == "closed"
+    assert client._just_restored is True
+
+
+def test_slow_probe_reopens_with_backoff(client) -> None:
+    """测试半开探测违约时重新熔断，恢复等待时间加倍。"""
+    for _ in range(client._failure_threshold):
+        client._record_failure()
+    _reopen_after_recovery(client)
+
+    with (
+        patch.object(client.session, "post", return_value=_ok_response()),
+        patch.object(akagi_ot.time, "perf_counter", side_effect=[0.0, 3.0]),
+    ):
+        client.predict(False, OBS, MASKS)
+
+    assert client.circuit_state == "open"
+    assert client._circuit_recovery_period == 60.0
+    assert client._probe_in_flight is False
+
+
+def test_engine_exposes_breaker_state() -> None:
+    """测试引擎元数据包含熔断状态与延迟分位数，供 UI 展示。"""
+    with patch.object(AkagiOTClient, "_pre_warm_connection"):
+        engine = AkagiOTEngine(is_3p=False, url="http://fake-server", api_key="fake-key")
+    engine.client._record_success("/react_batch", 120.0)
+
+    meta = engine.get_additional_meta()
+
+    assert meta["circuit_state"] == "closed"
+    assert meta["online_latency"]["endpoints"]["/react_batch"]["p50_ms"] == 120.0
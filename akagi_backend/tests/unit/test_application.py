@@ -22,6 +22,7 @@ def test_app_initialization(app) -> None:
         patch("akagi_ng.mjai_bot.StateTrackerBot"),
         patch("akagi_ng.electron_client.create_electron_client"),
         patch("akagi_ng.application.set_app_context") as mock_set_ctx,
+        patch("akagi_ng.mjai_bot.engine.inference_executor"),
     ):
         app.initialize()
 
@@ -100,6 +101,7 @@ def test_app_cleanup(app) -> None:
 def test_process_message_batch_error_handling(app) -> None:
     """测试消息处理中的异常捕获。"""
     mock_bot = MagicMock()
+    mock_bot.notification_flags = {}
     mock_ctrl = MagicMock()
 
     # 模拟 Controller 抛出异常
@@ -155,3 +157,77 @@ def get_stop_event(self):
 
 
 AkagiApp.get_stop_event = get_stop_event
+
+
+def test_dispatch_events_runs_on_executor(app) -> None:
+    """测试事件处理提交到推理执行器，主循环等待其结果。"""
+    from akagi_ng.mjai_bot.engine.executor import InferenceExecutor
+
+    app.executor = InferenceExecutor()
+    with patch("akagi_ng.mjai_bot.engine.executor.get_inference_device") as mock_device:
+        mock_device.return_value.type = "cuda"
+        app.executor.start()
+
+    worker_names = []
+
+    def process(*_args):
+        worker_names.append(threading.current_thread().name)
+        return {"mjai_responses": [], "batch_notifications": [], "is_sync": False}
+
+    try:
+        with patch.object(app, "_process_events", side_effect=process):
+            result = app._dispatch_events([{"type": "tsumo"}], None, None)
+    finally:
+        app.executor.shutdown()
+
+    assert result["mjai_responses"] == []
+    assert worker_names[0].startswith("InferenceExecutor")
+
+
+def test_dispatch_events_stops_waiting_on_shutdown(app) -> None:
+    """测试决策进行中收到停止信号时放弃等待。"""
+    from concurrent.futures import Future
+
+    app.executor = MagicMock()
+    app.executor.submit.return_value = Future()
+    app.stop()
+
+    assert app._dispatch_events([{"type": "tsumo"}], None, None) is None
+
+
+def test_collect_sync_burst_holds_system_message(app) -> None:
+    """测试同步事件连同其后第一个实时事件作为一批收集，系统消息留给下一轮处理。"""
+    burst = [{"type": "tsumo", "actor": 1, "sync": True}, {"type": "dahai", "actor": 1, "sync": True}]
+    live = {"type": "tsumo", "actor": 0}
+    system = {"type": "system_event", "code": "TEST"}
+    for msg in [*burst[1:], live, {"type": "dahai", "actor": 0}]:
+        app.message_queue.put(msg)
+    assert app._collect_sync_burst(burst[0]) == [*burst, live]
+
+    app.message_queue.get_nowait()
+    app.message_queue.put(system)
+    assert app._collect_sync_burst({"type": "tsumo", "sync": True}) == [{"type": "tsumo", "sync": True}]
+    assert app._get_next_message(timeout=0) is system
+
+
+def test_process_sync_burst_replays_once(app) -> None:
+    """测试同步批次整批交给 Controller 与 StateTrackerBot，通知只采集一次且不构建推荐。"""
+    app.ds = MagicMock()
+    mock_bot = MagicMock()
+    mock_bot.notification_flags = {}
+    mock_ctrl = MagicMock()
+    mock_ctrl.react_batch.return_value = {"type": "none"}
+    mock_ctrl.notification_flags = {}
+    msgs = [{"type": "tsumo", "actor": 1, "sync": True}, {"type": "dahai", "actor": 1, "sync": True}]
+
+    with patch("akagi_ng.application.build_dataserver_payload") as mock_build:
+        result = app._process_events(msgs, mock_bot, mock_ctrl)
+        app._emit_outputs(result, mock_bot)
+
+    assert result["is_sync"] is True
+    mock_ctrl.react_batch.assert_called_once_with(msgs)
+    mock_ctrl.react.assert_not_called()
+    mock_bot.react_batch.assert_called_once_with(msgs)
+    mock_bot.react.assert_not_called()
+    mock_build.assert_not_called()
+    assert not app.ds.send_recommendations.called
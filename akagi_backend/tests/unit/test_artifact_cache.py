@@ -0,0 +1,254 @@
+import hashlib
+import os
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+import torch
+
+from akagi_ng.mjai_bot.engine.artifact_cache import compute_model_digest, load_artifact
+from akagi_ng.mjai_bot.engine.mortal import _resolve_precision, load_local_mortal_engine
+from akagi_ng.mjai_bot.network import DQN, Brain
+
+IN_CHANNELS = 16
+ACTION_SPACE = 46
+
+
+@pytest.fixture
+def consts():
+    return SimpleNamespace(
+        obs_shape=lambda _v: (IN_CHANNELS, 34),
+        oracle_obs_shape=lambda _v: (8, 34),
+        ACTION_SPACE=ACTION_SPACE,
+    )
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path):
+    with patch("akagi_ng.mjai_bot.engine.artifact_cache.get_cache_dir", return_value=tmp_path / "cache"):
+        yield tmp_path / "cache" / "models"
+
+
+def _save_checkpoint(path, consts, seed: int = 0, version: int = 4):
+    torch.manual_seed(seed)
+    brain = Brain(consts.obs_shape, consts.oracle_obs_shape, conv_channels=32, num_blocks=1, version=version)
+    dqn = DQN(ACTION_SPACE, version=version)
+    state = {
+        "config": {"control": {"version": version}, "resnet": {"conv_channels": 32, "num_blocks": 1}},
+        "mortal": brain.state_dict(),
+        "current_dqn": dqn.state_dict(),
+    }
+    torch.save(state, path)
+
+
+def _inputs(batch_size: int = 2):
+    generator = torch.Generator().manual_seed(0)
+    obs = torch.randint(0, 2, (batch_size, IN_CHANNELS, 34), generator=generator).float().numpy()
+    masks = torch.randint(0, 2, (batch_size, ACTION_SPACE), generator=generator).bool().numpy()
+    masks[:, 0] = True
+    return obs, masks
+
+
+def test_first_load_builds_compiled_artifact(tmp_path, consts, cache_dir) -> None:
+    """测试首次加载编译并缓存推理产物，且结果与 eager 模型一致。"""
+    model_path = tmp_path / "mortal.pth"
+    _save_checkpoint(model_path, consts)
+
+    engine = load_local_mortal_engine(model_path, consts)
+    assert isinstance(engine.brain, torch.jit.ScriptModule)
+    assert list(cache_dir.glob("mortal/*/meta.json"))
+
+    with patch("akagi_ng.mjai_bot.engine.mortal.compute_model_digest", side_effect=OSError):
+        eager_engine = load_local_mortal_engine(model_path, consts)
+    assert not isinstance(eager_engine.brain, torch.jit.ScriptModule)
+
+    obs, masks = _inputs()
+    actions, q_out, _, _ = engine.react_batch(obs, masks, None)
+    eager_actions, eager_q_out, _, _ = eager_engine.react_batch(obs, masks, None)
+    assert actions == eager_actions
+    legal = torch.from_numpy(masks)
+    assert torch.allclose(torch.tensor(q_out)[legal], torch.tensor(eager_q_out)[legal], atol=1e-4)
+
+
+def test_v1_model_is_not_compiled(tmp_path, consts, cache_dir) -> None:
+    """测试 v1 模型（Brain 以 obs 与 invisible_obs 调用）使用 eager 模块且不写入缓存，推理正常。"""
+    model_path = tmp_path / "mortal.pth"
+    _save_checkpoint(model_path, consts, version=1)
+
+    engine = load_local_mortal_engine(model_path, consts)
+    assert engine.version == 1
+    assert not isinstance(engine.brain, torch.jit.ScriptModule)
+    assert not list(cache_dir.glob("mortal/*/meta.json"))
+
+    obs, masks = _inputs()
+    actions, _, _, _ = engine.react_batch(obs, masks, None)
+    assert all(masks[i, action] for i, action in enumerate(actions))
+
+
+def test_second_load_uses_cache(tmp_path, consts) -> None:
+    """测试再次加载时直接使用缓存产物，不再读取检查点。"""
+    model_path = tmp_path / "mortal.pth"
+    _save_checkpoint(model_path, consts)
+    load_local_mortal_engine(model_path, consts)
+
+    with patch("akagi_ng.mjai_bot.engine.mortal.torch.load", side_effect=AssertionError("pth should not be read")):
+        engine = load_local_mortal_engine(model_path, consts)
+
+    assert engine is not None
+    assert engine.version == 4
+    assert engine.name == "mortal"
+
+
+def test_cache_hit_does_not_hash_checkpoint(tmp_path, consts) -> None:
+    """测试模型文件未变化时复用记录的摘要，修改时间变化后重新计算且内容相同时仍命中缓存。"""
+    model_path = tmp_path / "mortal.pth"
+    _save_checkpoint(model_path, consts)
+    digest = compute_model_digest(model_path)
+
+    with patch(
+        "akagi_ng.mjai_bot.engine.artifact_cache.hashlib.file_digest",
+        side_effect=AssertionError("pth should not be hashed"),
+    ):
+        assert compute_model_digest(model_path) == digest
+
+    stat = model_path.stat()
+    os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    with patch("akagi_ng.mjai_bot.engine.artifact_cache.hashlib.file_digest", wraps=hashlib.file_digest) as hashed:
+        assert compute_model_digest(model_path) == digest
+    assert hashed.call_count == 1
+
+
+def test_stale_artifact_is_rebuilt(tmp_path, consts, cache_dir) -> None:
+    """测试模型文件变更后旧缓存失效并被清理。"""
+    model_path = tmp_path / "mortal.pth"
+    _save_checkpoint(model_path, consts, seed=0)
+    load_local_mortal_engine(model_path, consts)
+    old_dirs = list((cache_dir / "mortal").iterdir())
+
+    _save_checkpoint(model_path, consts, seed=1)
+    load_local_mortal_engine(model_path, consts)
+    new_dirs = list((cache_dir / "mortal").iterdir())
+
+    assert len(old_dirs) == 1
+    assert len(new_dirs) == 1
+    assert old_dirs[0] != new_dirs[0]
+
+
+def test_corrupt_artifact_falls_back(tmp_path, consts, cache_dir) -> None:
+    """测试缓存损坏时回退并重建。"""
+    model_path = tmp_path / "mortal.pth"
+    _save_checkpoint(model_path, consts)
+    load_local_mortal_engine(model_path, consts)
+
+    artifact_dir = next((cache_dir / "mortal").iterdir())
+    (artifact_dir / "brain.pt").write_bytes(b"corrupt")
+    assert load_artifact(model_path, torch.device("cpu"), compute_model_digest(model_path), "standard", "fp32") is None
+    assert not artifact_dir.exists()
+
+    engine = load_local_mortal_engine(model_path, consts)
+    assert isinstance(engine.brain, torch.jit.ScriptModule)
+
+
+def test_fused_variant_uses_separate_artifact(tmp_path, consts, cache_dir) -> None:
+    """测试启用推理版 Brain 时使用独立缓存，且决策与标准版一致。"""
+    model_path = tmp_path / "mortal.pth"
+    _save_checkpoint(model_path, consts)
+    engine = load_local_mortal_engine(model_path, consts)
+
+    with patch("akagi_ng.mjai_bot.engine.mortal.local_settings") as mock_settings:
+        mock_settings.model_config.fused_inference = True
+        mock_settings.model_config.precision = "fp32"
+        mock_settings.model_config.q_cache_mb = 0
+        fused_engine = load_local_mortal_engine(model_path, consts)
+
+    names = [path.name for path in (cache_dir / "mortal").iterdir()]
+    # 切换变体不会清理同一检查点的标准版产物
+    assert any("-fused-" in name for name in names)
+    assert any("-standard-" in name for name in names)
+    obs, masks = _inputs()
+    assert engine.react_batch(obs, masks, None)[0] == fused_engine.react_batch(obs, masks, None)[0]
+
+
+def test_int8_precision_builds_quantized_artifact(tmp_path, consts, cache_dir) -> None:
+    """测试 int8 模式构建并缓存动态量化产物，且在元数据中上报精度。"""
+    model_path = tmp_path / "mortal.pth"
+    _save_checkpoint(model_path, consts)
+    engine = load_local_mortal_engine(model_path, consts)
+    assert engine.get_additional_meta()["precision"] == "fp32"
+
+    with patch("akagi_ng.mjai_bot.engine.mortal.local_settings") as mock_settings:
+        mock_settings.model_config.fused_inference = False
+        mock_settings.model_config.precision = "int8"
+        mock_settings.model_config.q_cache_mb = 0
+        int8_engine = load_local_mortal_engine(model_path, consts)
+        assert [path.name for path in (cache_dir / "mortal").iterdir() if "-int8-" in path.name]
+
+        with patch("akagi_ng.mjai_bot.engine.mortal.torch.load", side_effect=AssertionError("pth should not be read")):
+            cached_engine = load_local_mortal_engine(model_path, consts)
+
+    assert int8_engine.get_additional_meta()["precision"] == "int8"
+    assert cached_engine.get_additional_meta()["precision"] == "int8"
+    assert isinstance(cached_engine.brain, torch.jit.ScriptModule)
+
+    obs, masks = _inputs(batch_size=16)
+    actions = engine.react_batch(obs, masks, None)[0]
+    int8_actions = cached_engine.react_batch(obs, masks, None)[0]
+    assert sum(a == b for a, b in zip(actions, int8_actions, strict=True)) >= 14
+
+
+def test_int8_precision_falls_back_on_gpu() -> None:
+    """测试 int8 仅在 CPU 上启用，其他设备回退到 fp32。"""
+    with patch("akagi_ng.mjai_bot.engine.mortal.local_settings") as mock_settings:
+        mock_settings.model_config.precision = "int8"
+        assert _resolve_precision(torch.device("cpu")) == "int8"
+        assert _resolve_precision(torch.device("cuda")) == "fp32"
+
+
+def test_bf16_precision_requires_capability() -> None:
+    """测试 bf16 仅在能力探测通过时启用。"""
+    with patch("akagi_ng.mjai_bot.engine.mortal.local_settings") as mock_settings:
+        mock_settings.model_config.precision = "bf16"
+        with patch("akagi_ng.mjai_bot.engine.mortal.supports_bf16_autocast", return_value=True):
+            assert _resolve_precision(torch.device("cpu")) == "bf16"
+        with patch("akagi_ng.mjai_bot.engine.mortal.supports_bf16_autocast", return_value=False):
+            assert _resolve_precision(torch.device("cpu")) == "fp32"
+
+
+def test_bf16_precision_skips_compiled_artifact(tmp_path, consts, cache_dir) -> None:
+    """测试 bf16 模式使用 eager 模块（冻结的 TorchScript 图不受 autocast 影响）。"""
+    model_path = tmp_path / "mortal.pth"
+    _save_checkpoint(model_path, consts)
+
+    with (
+        patch("akagi_ng.mjai_bot.engine.mortal.local_settings") as mock_settings,
+        patch("akagi_ng.mjai_bot.engine.mortal.supports_bf16_autocast", return_value=True),
+    ):
+        mock_settings.model_config.fused_inference = False
+        mock_settings.model_config.precision = "bf16"
+        mock_settings.model_config.q_cache_mb = 0
+        engine = load_local_mortal_engine(model_path, consts)
+
+    assert not isinstance(engine.brain, torch.jit.ScriptModule)
+    assert not cache_dir.exists()
+    assert engine.amp_speedup is not None
+
+
+def test_switching_variant_keeps_sibling_artifacts(tmp_path, consts, cache_dir) -> None:
+    """测试在标准版与推理版之间切换时复用各自的缓存，只清理其他检查点或 torch 版本的产物。"""
+    model_path = tmp_path / "mortal.pth"
+    _save_checkpoint(model_path, consts)
+    load_local_mortal_engine(model_path, consts)
+    fp32_dir = next((cache_dir / "mortal").iterdir())
+
+    stale_dir = cache_dir / "mortal" / "0000000000000000-torch0.0-cpu-standard-fp32-v1"
+    stale_dir.mkdir()
+    with patch("akagi_ng.mjai_bot.engine.mortal.local_settings") as mock_settings:
+        mock_settings.model_config.fused_inference = True
+        mock_settings.model_config.precision = "fp32"
+        mock_settings.model_config.q_cache_mb = 0
+        load_local_mortal_engine(model_path, consts)
+
+    assert fp32_dir.exists()
+    assert not stale_dir.exists()
+    with patch("akagi_ng.mjai_bot.engine.mortal.torch.load", side_effect=AssertionError("pth should not be read")):
+        assert load_local_mortal_engine(model_path, consts) is not None
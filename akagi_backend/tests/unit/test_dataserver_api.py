@@ -103,3 +103,60 @@ async def test_ingest_mjai_no_client(cli):
     with patch("akagi_ng.core.get_app_context", return_value=mock_app):
         resp = await cli.post("/api/ingest", json={"type": "tsumo"})
         assert resp.status == 503
+
+
+async def test_get_models_status(cli):
+    status = {"4p": {"status": "ready", "model": "mortal.pth"}, "3p": {"status": "idle", "model": None}}
+    with patch("akagi_ng.mjai_bot.engine.engine_preloader") as mock_preloader:
+        mock_preloader.get_status.return_value = status
+        resp = await cli.get("/api/models/status")
+        assert resp.status == 200
+        data = await resp.json()
+        assert data["ok"] is True
+        assert data["data"] == status
+
+
+async def test_activate_model(cli, tmp_path):
+    (tmp_path / "second.pth").touch()
+    with (
+        patch("akagi_ng.core.paths.get_models_dir", return_value=tmp_path),
+        patch("akagi_ng.mjai_bot.engine.model_activator") as mock_activator,
+    ):
+        mock_activator.activate.return_value = True
+        resp = await cli.post("/api/models/activate", json={"model": "second.pth", "mode": "4p"})
+        assert resp.status == 202
+        mock_activator.activate.assert_called_once_with("second.pth", False)
+
+        mock_activator.activate.return_value = False
+        resp = await cli.post("/api/models/activate", json={"model": "second.pth"})
+        assert resp.status == 409
+
+
+async def test_activate_model_rejects_invalid_model(cli, tmp_path):
+    with (
+        patch("akagi_ng.core.paths.get_models_dir", return_value=tmp_path),
+        patch("akagi_ng.mjai_bot.engine.model_activator") as mock_activator,
+    ):
+        resp = await cli.post("/api/models/activate", json={"model": "../mortal.pth"})
+        assert resp.status == 400
+        resp = await cli.post("/api/models/activate", json={"model": "missing.pth"})
+        assert resp.status == 404
+        resp = await cli.post("/api/models/activate", json={"model": "second.pth", "mode": "5p"})
+        assert resp.status == 400
+        mock_activator.activate.assert_not_called()
+
+
+async def test_capture_profile(cli):
+    with patch("akagi_ng.mjai_bot.engine.decision_profiler") as mock_profiler:
+        mock_profiler.request.return_value = 5
+        resp = await cli.post("/api/profile/capture", json={"decisions": 5})
+        assert resp.status == 202
+        assert (await resp.json())["pending"] == 5
+        mock_profiler.request.assert_called_once_with(5)
+
+        resp = await cli.post("/api/profile/capture", json={"decisions": 0})
+        assert resp.status == 400
+
+        mock_profiler.get_status.return_value = {"every_n": 0, "pending": 5, "captures": []}
+        resp = await cli.get("/api/profile")
+        assert (await resp.json())["data"]["pending"] == 5
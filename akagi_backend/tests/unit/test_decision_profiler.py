@@ -0,0 +1,140 @@
+import json
+import sys
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+import torch
+
+from akagi_ng.mjai_bot.engine.mortal import MortalEngine
+from akagi_ng.mjai_bot.engine.profiling import DecisionProfiler
+from akagi_ng.mjai_bot.network import DQN, Brain
+
+IN_CHANNELS = 16
+ACTION_SPACE = 46
+
+
+@pytest.fixture
+def profile_settings(tmp_path, monkeypatch):
+    # torch.profiler 首次启动时才导入 torch._dynamo，其他测试可能已将 numpy 替换为 mock
+    monkeypatch.setitem(sys.modules, "numpy", np)
+    with (
+        patch("akagi_ng.mjai_bot.engine.profiling.get_logs_dir", return_value=tmp_path),
+        patch("akagi_ng.mjai_bot.engine.profiling.local_settings") as mock_settings,
+    ):
+        mock_settings.model_config.profile_every_n = 0
+        mock_settings.model_config.profile_max_traces = 20
+        yield mock_settings.model_config
+
+
+@pytest.fixture
+def profiler(profile_settings):
+    profiler = DecisionProfiler()
+    with patch("akagi_ng.mjai_bot.engine.mortal.decision_profiler", profiler):
+        yield profiler
+
+
+@pytest.fixture
+def engine():
+    consts = SimpleNamespace(obs_shape=lambda _v: (IN_CHANNELS, 34), oracle_obs_shape=lambda _v: (8, 34))
+    torch.manual_seed(0)
+    brain = Brain(consts.obs_shape, consts.oracle_obs_shape, conv_channels=32, num_blocks=1, version=4)
+    return MortalEngine(brain.eval(), DQN(ACTION_SPACE, version=4).eval(), version=4, name="mortal")
+
+
+def _decide(engine: MortalEngine):
+    obs = np.linspace(0, 1, IN_CHANNELS * 34, dtype=np.float32).reshape(1, IN_CHANNELS, 34)
+    masks = np.ones((1, ACTION_SPACE), dtype=bool)
+    return engine.react_batch(obs, masks, None)
+
+
+def _wait_captures(profiler: DecisionProfiler, count: int) -> list[dict]:
+    deadline = time.monotonic() + 10
+    while len(captures := profiler.get_status()["captures"]) < count:
+        assert time.monotonic() < deadline, "profiler trace was not exported"
+        time.sleep(0.01)
+    return captures
+
+
+def test_every_nth_decision_writes_chrome_trace(profiler, profile_settings, engine, tmp_path) -> None:
+    """测试每 N 次推理采集一次，记录各阶段耗时并写出包含阶段区间的 Chrome trace。"""
+    profile_settings.profile_every_n = 2
+    for _ in range(5):
+        _decide(engine)
+    captures = _wait_captures(profiler, 2)
+
+    assert len(captures) == 2
+    summary = captures[0]
+    assert summary["engine"] == "mortal"
+    assert summary["batch_size"] == 1
+    assert set(summary["stages_ms"]) == {"to_tensor", "forward", "select", "tolist"}
+    assert summary["total_ms"] >= sum(summary["stages_ms"].values())
+
+    trace = json.loads((tmp_path / "profiles" / summary["trace"]).read_text())
+    names = {event.get("name") for event in trace["traceEvents"]}
+    assert {"react_batch", "forward", "tolist"} <= names
+
+
+def test_requested_capture_and_ring_buffer(profiler, profile_settings, engine, tmp_path) -> None:
+    """测试按需采集接下来 K 次推理，记录推理前耗时，且只保留最近的 trace 文件。"""
+    profile_settings.profile_max_traces = 2
+    assert profiler.request(3) == 3
+    profiler.mark_decision()
+    for _ in range(5):
+        _decide(engine)
+    captures = _wait_captures(profiler, 3)
+
+    assert len(profiler.get_status()["captures"]) == 3
+    assert profiler.get_status()["pending"] == 0
+    assert captures[0]["pre_engine_ms"] is not None
+    # 标记只计入其后的第一次推理
+    assert captures[1]["pre_engine_ms"] is None
+    assert sorted(p.name for p in (tmp_path / "profiles").glob("*.json")) == [c["trace"] for c in captures[1:]]
+
+
+def test_stage_is_noop_without_capture(profiler) -> None:
+    """测试未采集时阶段计时返回空上下文，不记录任何数据。"""
+    with profiler.stage("forward"):
+        pass
+    with profiler.capture("mortal", 1):
+        pass
+    assert profiler.get_status()["captures"] == []
+
+
+class FakeRemote:
+    """模拟推理子进程：记录转发的采集请求，available 为 False 时表示子进程不可用"""
+
+    def __init__(self, available: bool = True):
+        self.available = available
+        self.pending = 0
+
+    def request_profile(self, decisions: int) -> int | None:
+        if not self.available:
+            return None
+        self.pending += decisions
+        return self.pending
+
+    def get_profile_status(self) -> dict | None:
+        if not self.available:
+            return None
+        capture = {"engine": "child", "time": time.time(), "trace": None}
+        return {"every_n": 0, "pending": self.pending, "captures": [capture]}
+
+
+def test_request_is_forwarded_to_inference_process(profiler) -> None:
+    """测试推理在子进程中执行时采集请求转发给子进程，状态合并子进程的采集结果。"""
+    remote = FakeRemote()
+    profiler.attach(remote)
+
+    assert profiler.request(2) == 2
+    status = profiler.get_status()
+    assert remote.pending == 2
+    assert status["pending"] == 2
+    assert [c["engine"] for c in status["captures"]] == ["child"]
+
+    # 子进程不可用时由本进程（回退引擎）采集
+    remote.available = False
+    assert profiler.request(1) == 1
+    assert profiler.get_status()["pending"] == 1
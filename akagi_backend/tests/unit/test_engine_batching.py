@@ -0,0 +1,141 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from akagi_ng.mjai_bot.engine.base import BaseEngine
+from akagi_ng.mjai_bot.engine.batching import BatchingEngine
+
+ACTION_SPACE = 4
+
+
+class RecordingEngine(BaseEngine):
+    """按观测首元素返回动作的假引擎，并记录每次前向的批大小"""
+
+    def __init__(self):
+        super().__init__(is_3p=False, version=4, name="recording")
+        self.engine_type = "mortal"
+        self.batch_sizes = []
+
+    def react_batch(self, obs, masks, invisible_obs):
+        self.batch_sizes.append(len(obs))
+        actions = [int(o[0, 0]) for o in obs]
+        q_out = [[float(a)] * ACTION_SPACE for a in actions]
+        return actions, q_out, masks.tolist(), [True] * len(obs)
+
+    def get_additional_meta(self):
+        return {"precision": "fp32"}
+
+
+def _request(action: int):
+    obs = np.full((1, 2, 34), action, dtype=np.float32)
+    masks = np.ones((1, ACTION_SPACE), dtype=bool)
+    return obs, masks
+
+
+@pytest.fixture
+def inner():
+    return RecordingEngine()
+
+
+def test_concurrent_requests_share_one_forward(inner) -> None:
+    """测试窗口内的并发请求合并为一次前向，并将结果分发回各调用方。"""
+    engine = BatchingEngine(inner, window_ms=500, max_batch_size=4)
+    barrier = threading.Barrier(4)
+    results = {}
+    metas = {}
+
+    def worker(action: int):
+        obs, masks = _request(action)
+        barrier.wait()
+        results[action] = engine.react_batch(obs, masks, None)
+        metas[action] = engine.get_additional_meta()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+
+    assert inner.batch_sizes == [4]
+    for action in range(4):
+        actions, q_out, masks, is_greedy = results[action]
+        assert actions == [action]
+        assert q_out == [[float(action)] * ACTION_SPACE]
+        assert masks == [[True] * ACTION_SPACE]
+        assert is_greedy == [True]
+        assert metas[action]["batch_size"] == 4
+        assert metas[action]["precision"] == "fp32"
+        assert metas[action]["queue_wait_ms"] >= 0
+
+    stats = engine.get_stats()
+    assert stats["batches"] == 1
+    assert stats["requests"] == 4
+    assert stats["max_batch_rows"] == 4
+
+
+def test_single_request_flushes_after_window(inner) -> None:
+    """测试单个请求在窗口结束后单独执行。"""
+    engine = BatchingEngine(inner, window_ms=1, max_batch_size=8)
+    obs, masks = _request(2)
+    assert engine.react_batch(obs, masks, None)[0] == [2]
+    assert engine.react_batch(obs, masks, None)[0] == [2]
+    assert inner.batch_sizes == [1, 1]
+    assert engine.last_inference_result["actions"] == [2]
+
+
+def test_sync_mode_bypasses_batching(inner) -> None:
+    """测试同步快进模式直接调用底层引擎，不进入合批队列。"""
+    engine = BatchingEngine(inner, window_ms=1000)
+    engine.set_sync_mode(True)
+    assert inner.is_sync_mode
+
+    obs, masks = _request(1)
+    with patch.object(engine, "_ensure_worker") as mock_worker:
+        assert engine.react_batch(obs, masks, None)[0] == [1]
+        mock_worker.assert_not_called()
+    assert "queue_wait_ms" not in engine.get_additional_meta()
+
+
+def test_inference_error_propagates_to_callers() -> None:
+    """测试批量前向失败时异常返回给调用方。"""
+    failing = MagicMock(spec=BaseEngine)
+    failing.is_3p = False
+    failing.version = 4
+    failing.name = "failing"
+    failing.is_oracle = False
+    failing.engine_type = "mortal"
+    failing.react_batch.side_effect = RuntimeError("boom")
+
+    engine = BatchingEngine(failing, window_ms=1)
+    obs, masks = _request(0)
+    with pytest.raises(RuntimeError, match="boom"):
+        engine.react_batch(obs, masks, None)
+
+
+def test_malformed_batch_fails_callers_and_keeps_worker(inner) -> None:
+    """测试拼接失败（观测形状不一致）时异常返回给该批调用方，工作线程继续处理后续请求。"""
+    engine = BatchingEngine(inner, window_ms=200)
+    mismatched = np.zeros((1, 3, 34), dtype=np.float32)
+    masks = np.ones((1, ACTION_SPACE), dtype=bool)
+    errors = []
+    barrier = threading.Barrier(2)
+
+    def call(obs):
+        barrier.wait()
+        try:
+            engine.react_batch(obs, masks, None)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call, args=(o,)) for o in (_request(1)[0], mismatched)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+
+    assert len(errors) == 2
+    assert inner.batch_sizes == []
+    # 工作线程仍然存活，后续请求正常完成
+    assert engine.react_batch(*_request(2), None)[0] == [2]
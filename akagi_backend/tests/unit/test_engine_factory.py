@@ -4,7 +4,10 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
+from akagi_ng.mjai_bot.engine.batching import BatchingEngine
 from akagi_ng.mjai_bot.engine.factory import _ENGINE_CACHE, LazyLocalEngine, load_bot_and_engine
+from akagi_ng.mjai_bot.engine.preload import engine_preloader
+from akagi_ng.mjai_bot.engine.process import ProcessEngine
 
 
 @pytest.fixture(autouse=True)
@@ -22,6 +25,7 @@ def mock_lib_loader_module():
 def clear_cache():
     """每个测试前清理缓存。"""
     _ENGINE_CACHE.clear()
+    engine_preloader.clear()
 
 
 @pytest.fixture
@@ -42,7 +46,7 @@ def test_lazy_local_engine_ensure_engine(mock_consts) -> None:
     path = Path("mortal.pth")
     engine = LazyLocalEngine(path, mock_consts, is_3p=False)
 
-    with patch("akagi_ng.mjai_bot.engine.factory.load_local_mortal_engine") as mock_load:
+    with patch("akagi_ng.mjai_bot.engine.preload.load_local_mortal_engine") as mock_load:
         mock_real = MagicMock()
         mock_load.return_value = mock_real
 
@@ -75,6 +79,8 @@ def test_load_bot_and_engine_4p(mock_lib_loader_module) -> None:
     """测试加载 4 人麻将引擎和机器人。"""
     with patch("akagi_ng.mjai_bot.engine.factory.local_settings") as mock_settings:
         mock_settings.ot.online = False
+        mock_settings.model_config.batch_window_ms = 0
+        mock_settings.model_config.inference_process = False
 
         # Setup mock
         mock_lib_loader_module.libriichi.mjai.Bot = MagicMock()
@@ -91,6 +97,8 @@ def test_load_bot_and_engine_3p(mock_lib_loader_module) -> None:
     """测试加载 3 人麻将引擎和机器人。"""
     with patch("akagi_ng.mjai_bot.engine.factory.local_settings") as mock_settings:
         mock_settings.ot.online = False
+        mock_settings.model_config.batch_window_ms = 0
+        mock_settings.model_config.inference_process = False
 
         mock_lib_loader_module.libriichi3p.mjai.Bot = MagicMock()
 
@@ -109,6 +117,9 @@ def test_load_bot_and_engine_online(mock_lib_loader_module) -> None:
         mock_settings.ot.online = True
         mock_settings.ot.server = "http://localhost"
         mock_settings.ot.api_key = "key"
+        mock_settings.ot.hedge_budget_ms = 0.0
+        mock_settings.model_config.batch_window_ms = 0
+        mock_settings.model_config.inference_process = False
 
         mock_lib_loader_module.libriichi.mjai.Bot = MagicMock()
 
@@ -117,3 +128,59 @@ def test_load_bot_and_engine_online(mock_lib_loader_module) -> None:
         # 应该创建了 AkagiOTEngine
         mock_ot.assert_called_once()
         assert engine.name.startswith("Provider")
+
+
+def test_lazy_local_engine_reuses_preloaded_engine(mock_consts) -> None:
+    """测试延迟加载引擎复用预加载器中已就绪的引擎。"""
+    mock_real = MagicMock()
+    with patch("akagi_ng.mjai_bot.engine.factory.engine_preloader") as mock_preloader:
+        mock_preloader.get_or_load.return_value = mock_real
+        engine = LazyLocalEngine(Path("mortal.pth"), mock_consts, is_3p=False)
+        engine.set_sync_mode(True)
+
+        assert engine._ensure_engine() is mock_real
+        mock_preloader.get_or_load.assert_called_once_with(Path("mortal.pth"), mock_consts, False)
+        mock_real.set_sync_mode.assert_called_with(True)
+
+
+def test_lazy_local_engine_load_failure(mock_consts) -> None:
+    """测试本地模型加载失败时抛出异常。"""
+    with patch("akagi_ng.mjai_bot.engine.factory.engine_preloader") as mock_preloader:
+        mock_preloader.get_or_load.return_value = None
+        engine = LazyLocalEngine(Path("mortal.pth"), mock_consts, is_3p=False)
+
+        with pytest.raises(RuntimeError):
+            engine._ensure_engine()
+
+
+def test_load_bot_and_engine_wraps_local_engine_with_batching(mock_lib_loader_module) -> None:
+    """测试配置合批窗口时本地引擎由 BatchingEngine 包装。"""
+    with patch("akagi_ng.mjai_bot.engine.factory.local_settings") as mock_settings:
+        mock_settings.ot.online = False
+        mock_settings.model_config.batch_window_ms = 2.0
+        mock_settings.model_config.max_batch_size = 4
+        mock_settings.model_config.inference_process = False
+
+        _, engine = load_bot_and_engine(0, is_3p=False)
+
+    assert isinstance(engine.local_engine, BatchingEngine)
+    assert isinstance(engine.local_engine.engine, LazyLocalEngine)
+    assert engine.local_engine.max_batch_size == 4
+
+
+def test_load_bot_and_engine_wraps_local_engine_in_process(mock_lib_loader_module) -> None:
+    """测试启用子进程推理时本地引擎由 ProcessEngine 包装，进程内引擎作为保底。"""
+    with patch("akagi_ng.mjai_bot.engine.factory.local_settings") as mock_settings:
+        mock_settings.ot.online = False
+        mock_settings.model_config.batch_window_ms = 0
+        mock_settings.model_config.inference_process = True
+        mock_settings.model_config.max_batch_size = 4
+
+        with patch.object(ProcessEngine, "start") as mock_start:
+            _, engine = load_bot_and_engine(0, is_3p=False)
+
+    assert isinstance(engine.local_engine, ProcessEngine)
+    assert isinstance(engine.local_engine.fallback, LazyLocalEngine)
+    assert engine.local_engine.max_batch_size == 4
+    # 创建时即在后台启动子进程，不阻塞
+    mock_start.assert_called_once_with(wait=False)
@@ -0,0 +1,212 @@
+import threading
+import weakref
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from akagi_ng.mjai_bot.engine.base import BaseEngine
+from akagi_ng.mjai_bot.engine.factory import LazyLocalEngine
+from akagi_ng.mjai_bot.engine.preload import EnginePreloader, PreloadStatus
+
+
+@pytest.fixture
+def preloader():
+    return EnginePreloader()
+
+
+@pytest.fixture
+def mock_lib_loader():
+    mock_module = MagicMock()
+    mock_module.libriichi3p = None
+    with patch.dict("sys.modules", {"akagi_ng.core.lib_loader": mock_module}):
+        yield mock_module
+
+
+def test_get_or_load_loads_once(preloader) -> None:
+    """测试同一模型只加载一次。"""
+    mock_engine = MagicMock()
+    with patch("akagi_ng.mjai_bot.engine.preload.load_local_mortal_engine", return_value=mock_engine) as mock_load:
+        path = Path("mortal.pth")
+        assert preloader.get_or_load(path, MagicMock(), is_3p=False) is mock_engine
+        assert preloader.get_or_load(path, MagicMock(), is_3p=False) is mock_engine
+        assert mock_load.call_count == 1
+
+    status = preloader.get_status()
+    assert status["4p"]["status"] == PreloadStatus.READY
+    assert status["4p"]["model"] == "mortal.pth"
+    assert status["3p"]["status"] == PreloadStatus.IDLE
+
+
+def test_get_or_load_waits_for_in_flight_preload(preloader, mock_lib_loader, tmp_path) -> None:
+    """测试首个决策等待正在进行的后台加载，而不是再次加载。"""
+    model_path = tmp_path / "mortal.pth"
+    model_path.touch()
+    release = threading.Event()
+    started = threading.Event()
+    mock_engine = MagicMock()
+
+    def slow_load(*_args):
+        started.set()
+        release.wait(timeout=5)
+        return mock_engine
+
+    with (
+        patch("akagi_ng.mjai_bot.engine.preload.load_local_mortal_engine", side_effect=slow_load) as mock_load,
+        patch("akagi_ng.mjai_bot.engine.preload.get_models_dir", return_value=tmp_path),
+        patch("akagi_ng.mjai_bot.engine.preload.local_settings") as mock_settings,
+    ):
+        mock_settings.model_config.model_4p = "mortal.pth"
+        mock_settings.model_config.engine_memory_budget_mb = 0.0
+        mock_settings.model_config.inference_process = False
+        preloader.start()
+        assert started.wait(timeout=5)
+        assert preloader.get_status()["4p"]["status"] == PreloadStatus.LOADING
+
+        result = {}
+        waiter = threading.Thread(target=lambda: result.update(engine=preloader.get_or_load(model_path, None, False)))
+        waiter.start()
+        release.set()
+        waiter.join(timeout=5)
+
+        assert result["engine"] is mock_engine
+        assert mock_load.call_count == 1
+        assert preloader.get_status()["4p"]["status"] == PreloadStatus.READY
+
+
+def test_start_skips_missing_model(preloader, mock_lib_loader, tmp_path) -> None:
+    """测试模型文件不存在时跳过预加载。"""
+    with (
+        patch("akagi_ng.mjai_bot.engine.preload.load_local_mortal_engine") as mock_load,
+        patch("akagi_ng.mjai_bot.engine.preload.get_models_dir", return_value=tmp_path),
+        patch("akagi_ng.mjai_bot.engine.preload.local_settings") as mock_settings,
+    ):
+        mock_settings.model_config.model_4p = "missing.pth"
+        mock_settings.model_config.inference_process = False
+        preloader.start()
+
+        mock_load.assert_not_called()
+        assert preloader.get_status()["4p"]["status"] == PreloadStatus.IDLE
+
+
+def test_start_skips_preload_in_process_mode(preloader, mock_lib_loader, tmp_path) -> None:
+    """测试启用子进程推理时不在主进程中预加载模型。"""
+    (tmp_path / "mortal.pth").touch()
+    with (
+        patch("akagi_ng.mjai_bot.engine.preload.load_local_mortal_engine") as mock_load,
+        patch("akagi_ng.mjai_bot.engine.preload.get_models_dir", return_value=tmp_path),
+        patch("akagi_ng.mjai_bot.engine.preload.local_settings") as mock_settings,
+    ):
+        mock_settings.model_config.model_4p = "mortal.pth"
+        mock_settings.model_config.inference_process = True
+        preloader.start()
+
+        mock_load.assert_not_called()
+        assert preloader.get_status()["4p"]["status"] == PreloadStatus.IDLE
+
+
+def test_failed_load_is_retried(preloader) -> None:
+    """测试加载失败后再次请求会重新加载。"""
+    mock_engine = MagicMock()
+    with patch(
+        "akagi_ng.mjai_bot.engine.preload.load_local_mortal_engine", side_effect=[None, mock_engine]
+    ) as mock_load:
+        path = Path("mortal.pth")
+        assert preloader.get_or_load(path, MagicMock(), is_3p=False) is None
+        assert preloader.get_status()["4p"]["status"] == PreloadStatus.FAILED
+
+        assert preloader.get_or_load(path, MagicMock(), is_3p=False) is mock_engine
+        assert mock_load.call_count == 2
+
+
+class SizedEngine(BaseEngine):
+    """上报固定常驻字节数的假引擎"""
+
+    def __init__(self, resident_mb: float):
+        super().__init__(is_3p=False, version=4, name="sized")
+        self.resident_bytes = int(resident_mb * 1024 * 1024)
+
+    def get_resident_bytes(self) -> int:
+        return self.resident_bytes
+
+
+@pytest.fixture
+def memory_settings():
+    with patch("akagi_ng.mjai_bot.engine.preload.local_settings") as mock_settings:
+        mock_settings.model_config.engine_memory_budget_mb = 0.0
+        mock_settings.model_config.engine_idle_ttl_s = 0.0
+        yield mock_settings.model_config
+
+
+def test_budget_evicts_least_recently_used_engine(preloader, memory_settings) -> None:
+    """测试常驻权重超出预算时淘汰最久未使用的引擎，并记录淘汰事件。"""
+    memory_settings.engine_memory_budget_mb = 150
+    with patch(
+        "akagi_ng.mjai_bot.engine.preload.load_local_mortal_engine", side_effect=[SizedEngine(100), SizedEngine(80)]
+    ):
+        preloader.get_or_load(Path("mortal.pth"), None, is_3p=False)
+        preloader.get_or_load(Path("mortal3p.pth"), None, is_3p=True)
+
+    status = preloader.get_status()
+    assert status["4p"]["status"] == PreloadStatus.EVICTED
+    assert status["3p"]["status"] == PreloadStatus.READY
+    assert status["3p"]["resident_mb"] == 80
+    assert status["events"][-1]["event"] == "evict"
+    assert status["events"][-1]["reason"] == "budget"
+    assert preloader.peek(Path("mortal.pth"), is_3p=False) is None
+
+
+def test_idle_sweep_evicts_and_lazy_engine_reloads(preloader, memory_settings) -> None:
+    """测试空闲超时的引擎被释放，延迟加载引擎在下次决策时重新加载并记录事件。"""
+    loaded = []
+
+    def load(*_args):
+        loaded.append(weakref.ref(engine := SizedEngine(10)))
+        return engine
+
+    with (
+        patch("akagi_ng.mjai_bot.engine.preload.load_local_mortal_engine", side_effect=load) as mock_load,
+        patch("akagi_ng.mjai_bot.engine.factory.engine_preloader", preloader),
+    ):
+        lazy = LazyLocalEngine(Path("mortal.pth"), None, is_3p=False)
+        assert lazy._ensure_engine() is loaded[0]()
+
+        # 未配置 TTL 时不淘汰
+        preloader.sweep()
+        assert preloader.get_status()["4p"]["status"] == PreloadStatus.READY
+
+        memory_settings.engine_idle_ttl_s = 60
+        preloader._entries[False].last_used -= 61
+        preloader.sweep()
+        assert preloader.get_status()["4p"]["status"] == PreloadStatus.EVICTED
+
+        # 预加载器释放后不再有强引用，权重随之回收
+        assert loaded[0]() is None
+        assert lazy._real_engine is None
+        assert lazy._ensure_engine() is loaded[1]()
+        assert mock_load.call_count == 2
+
+    events = preloader.get_status()["events"]
+    assert [e["event"] for e in events] == ["evict", "reload"]
+    assert events[0]["reason"] == "idle"
+
+
+def test_lazy_engine_release_frees_preloaded_model(preloader, memory_settings) -> None:
+    """测试子进程接管推理后，延迟加载引擎释放主进程中的模型，子进程不可用时再重新加载。"""
+    loaded = []
+
+    def load(*_args):
+        loaded.append(weakref.ref(engine := SizedEngine(10)))
+        return engine
+
+    with (
+        patch("akagi_ng.mjai_bot.engine.preload.load_local_mortal_engine", side_effect=load),
+        patch("akagi_ng.mjai_bot.engine.factory.engine_preloader", preloader),
+    ):
+        lazy = LazyLocalEngine(Path("mortal.pth"), None, is_3p=False)
+        lazy._ensure_engine()
+        lazy.release()
+
+        assert loaded[0]() is None
+        assert preloader.get_status()["events"][-1]["reason"] == "inference_process"
+        assert lazy._ensure_engine() is loaded[1]()
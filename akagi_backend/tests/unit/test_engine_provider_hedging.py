@@ -0,0 +1,117 @@
+import threading
+
+import numpy as np
+import pytest
+
+from akagi_ng.mjai_bot.engine.base import BaseEngine
+from akagi_ng.mjai_bot.engine.provider import EngineProvider
+
+
+class FakeEngine(BaseEngine):
+    """返回固定动作的假引擎；设置 gate 后推理阻塞直到 gate 被放行"""
+
+    def __init__(self, name: str, action: int, engine_type: str):
+        super().__init__(is_3p=False, version=4, name=name)
+        self.engine_type = engine_type
+        self.action = action
+        self.gate: threading.Event | None = None
+        self.error: Exception | None = None
+        self.calls = 0
+        self.done = threading.Event()
+
+    def react_batch(self, obs, masks, invisible_obs):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(timeout=5)
+        if self.error is not None:
+            raise self.error
+        res = [self.action], [[float(self.action)]], np.asarray(masks).tolist(), [True]
+        self.last_inference_result = {"actions": res[0], "q_out": res[1], "masks": res[2], "is_greedy": res[3]}
+        self.done.set()
+        return res
+
+
+@pytest.fixture
+def engines():
+    return FakeEngine("online", 1, "akagiot"), FakeEngine("local", 2, "mortal")
+
+
+@pytest.fixture
+def inputs():
+    return np.zeros((1, 4, 34)), np.ones((1, 3), dtype=bool)
+
+
+def test_online_within_budget_wins(engines, inputs) -> None:
+    """测试在线引擎在预算内返回时采用在线结果，本地推理计为浪费。"""
+    online, local = engines
+    provider = EngineProvider(online, local, is_3p=False, hedge_budget_ms=2000)
+
+    actions, _, _, _ = provider.react_batch(*inputs, None)
+
+    assert actions == [1]
+    assert provider.active_engine is online
+    assert provider.last_inference_result["actions"] == [1]
+    assert local.calls == 1
+    stats = provider.get_hedge_stats()
+    assert stats["online_wins"] == 1
+    assert stats["win_rate"] == 1.0
+    assert provider.get_additional_meta()["hedge_win_rate"] == 1.0
+
+
+def test_budget_miss_uses_local_and_records_late_response(engines, inputs) -> None:
+    """测试在线引擎超出预算时立即采用本地结果，迟到的在线结果只记录对比。"""
+    online, local = engines
+    online.gate = threading.Event()
+    provider = EngineProvider(online, local, is_3p=False, hedge_budget_ms=10)
+
+    actions, _, _, _ = provider.react_batch(*inputs, None)
+
+    assert actions == [2]
+    assert provider.active_engine is local
+    assert provider.fallback_active is False
+    assert provider.get_hedge_stats()["budget_misses"] == 1
+
+    online.gate.set()
+    assert online.done.wait(timeout=5)
+    provider._hedge_pool.shutdown(wait=True)
+    stats = provider.get_hedge_stats()
+    assert stats["late_responses"] == 1
+    assert stats["late_agreement_rate"] == 0.0
+    # 迟到结果不影响已做出的决策
+    assert provider.last_inference_result["actions"] == [2]
+
+
+def test_online_error_uses_local(engines, inputs) -> None:
+    """测试在线引擎报错（如熔断开启）时采用本地结果并标记回退。"""
+    online, local = engines
+    online.error = RuntimeError("circuit open")
+    provider = EngineProvider(online, local, is_3p=False, hedge_budget_ms=2000)
+
+    assert provider.react_batch(*inputs, None)[0] == [2]
+    assert provider.fallback_active is True
+    assert provider.get_hedge_stats()["online_errors"] == 1
+
+
+def test_local_failure_waits_for_online(engines, inputs) -> None:
+    """测试本地推理失败时等待在线结果，即使超出预算。"""
+    online, local = engines
+    local.error = RuntimeError("model missing")
+    provider = EngineProvider(online, local, is_3p=False, hedge_budget_ms=1)
+
+    assert provider.react_batch(*inputs, None)[0] == [1]
+    assert provider.active_engine is online
+
+
+def test_sync_mode_and_disabled_budget_skip_hedging(engines, inputs) -> None:
+    """测试同步快进或未配置预算时按原有顺序调用，不运行本地推理。"""
+    online, local = engines
+    provider = EngineProvider(online, local, is_3p=False, hedge_budget_ms=2000)
+    provider.set_sync_mode(True)
+    provider.react_batch(*inputs, None)
+
+    plain = EngineProvider(online, local, is_3p=False)
+    plain.react_batch(*inputs, None)
+
+    assert local.calls == 0
+    assert provider._hedge_pool is None
+    assert plain.precompute(*inputs) is False
@@ -0,0 +1,156 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+import torch
+
+from akagi_ng.mjai_bot.engine.ensemble import EnsembleEngine
+from akagi_ng.mjai_bot.engine.mortal import load_local_mortal_engine
+from akagi_ng.mjai_bot.network import DQN, Brain
+
+IN_CHANNELS = 16
+ACTION_SPACE = 46
+NUM_MEMBERS = 3
+
+
+@pytest.fixture
+def consts():
+    return SimpleNamespace(
+        obs_shape=lambda _v: (IN_CHANNELS, 34),
+        oracle_obs_shape=lambda _v: (8, 34),
+        ACTION_SPACE=ACTION_SPACE,
+    )
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path):
+    with patch("akagi_ng.mjai_bot.engine.artifact_cache.get_cache_dir", return_value=tmp_path / "cache"):
+        yield
+
+
+def _member(consts, seed: int, conv_channels: int = 32) -> tuple[Brain, DQN]:
+    torch.manual_seed(seed)
+    brain = Brain(consts.obs_shape, consts.oracle_obs_shape, conv_channels=conv_channels, num_blocks=1, version=4)
+    return brain.eval(), DQN(ACTION_SPACE, version=4).eval()
+
+
+def _members(consts, count: int = NUM_MEMBERS) -> tuple[list[Brain], list[DQN]]:
+    pairs = [_member(consts, seed) for seed in range(count)]
+    return [brain for brain, _ in pairs], [dqn for _, dqn in pairs]
+
+
+def _inputs(batch_size: int = 2) -> tuple[np.ndarray, np.ndarray]:
+    obs = np.linspace(0, 1, batch_size * IN_CHANNELS * 34, dtype=np.float32).reshape(batch_size, IN_CHANNELS, 34)
+    masks = np.zeros((batch_size, ACTION_SPACE), dtype=bool)
+    masks[:, :10] = True
+    return obs, masks
+
+
+def _reference_q(brains, dqns, obs, masks) -> torch.Tensor:
+    with torch.inference_mode():
+        return torch.stack(
+            [dqn(brain(torch.as_tensor(obs)), torch.as_tensor(masks)) for brain, dqn in zip(brains, dqns, strict=True)]
+        )
+
+
+def _save_checkpoint(path, brain, dqn):
+    state = {
+        "config": {"control": {"version": 4}, "resnet": {"conv_channels": 32, "num_blocks": 1}},
+        "mortal": brain.state_dict(),
+        "current_dqn": dqn.state_dict(),
+    }
+    torch.save(state, path)
+
+
+@pytest.mark.parametrize("aggregation", ["mean", "min", "weighted"])
+def test_vmapped_forward_matches_individual_members(consts, aggregation) -> None:
+    """测试一次批量前向的聚合结果与逐个成员计算后聚合一致。"""
+    brains, dqns = _members(consts)
+    reference = _reference_q(brains, dqns, *_inputs())
+    engine = EnsembleEngine(brains, dqns, ["a", "b", "c"], version=4, aggregation=aggregation, weights=[1.0, 2.0, 1.0])
+    obs, masks = _inputs()
+
+    actions, q_out, _, _ = engine.react_batch(obs, masks, None)
+
+    legal = torch.as_tensor(masks)
+    expected = {
+        "mean": reference.mean(0),
+        "min": reference.min(0).values,
+        "weighted": (reference * torch.tensor([0.25, 0.5, 0.25])[:, None, None]).sum(0),
+    }[aggregation]
+    assert torch.allclose(torch.tensor(q_out)[legal], expected[legal], atol=1e-5)
+    assert actions == expected.argmax(-1).tolist()
+    assert engine._vmap_enabled is True
+
+
+def test_member_q_values_in_meta(consts) -> None:
+    """测试元数据包含各成员对首条观测的合法动作 Q 值，命中缓存时不再上报。"""
+    brains, dqns = _members(consts, count=2)
+    reference = _reference_q(brains, dqns, *_inputs())
+    engine = EnsembleEngine(brains, dqns, ["a.pth", "b.pth"], version=4, q_cache_bytes=1 << 20)
+    obs, masks = _inputs()
+
+    engine.react_batch(obs, masks, None)
+    meta = engine.get_additional_meta()
+
+    assert meta["ensemble_members"] == ["a.pth", "b.pth"]
+    assert meta["ensemble_aggregation"] == "mean"
+    assert len(meta["ensemble_q_values"]) == 2
+    assert torch.allclose(torch.tensor(meta["ensemble_q_values"]), reference[:, 0, :10], atol=1e-5)
+
+    engine.react_batch(obs, masks, None)
+    assert "ensemble_q_values" not in engine.get_additional_meta()
+
+
+def test_sequential_fallback_when_vmap_fails(consts) -> None:
+    """测试 vmap 不可用时退回逐成员计算，结果保持一致。"""
+    brains, dqns = _members(consts, count=2)
+    reference = _reference_q(brains, dqns, *_inputs())
+    engine = EnsembleEngine(brains, dqns, ["a", "b"], version=4)
+    obs, masks = _inputs()
+
+    with patch("akagi_ng.mjai_bot.engine.ensemble.torch.vmap", side_effect=RuntimeError("no batching rule")):
+        _, q_out, _, _ = engine.react_batch(obs, masks, None)
+
+    assert engine._vmap_enabled is False
+    legal = torch.as_tensor(masks)
+    assert torch.allclose(torch.tensor(q_out)[legal], reference.mean(0)[legal], atol=1e-5)
+
+
+def test_rejects_incompatible_members(consts) -> None:
+    """测试结构不同的成员、非法权重与不支持的版本在构建时报错。"""
+    brains, dqns = _members(consts, count=2)
+    other_brain, other_dqn = _member(consts, seed=5, conv_channels=64)
+
+    with pytest.raises(ValueError, match="different architecture"):
+        EnsembleEngine([brains[0], other_brain], [dqns[0], other_dqn], ["a", "b"], version=4)
+    with pytest.raises(ValueError, match="weights"):
+        EnsembleEngine(brains, dqns, ["a", "b"], version=4, aggregation="weighted", weights=[1.0])
+    with pytest.raises(ValueError, match="not supported"):
+        EnsembleEngine(brains, dqns, ["a", "b"], version=1)
+
+
+def test_loader_builds_ensemble_from_settings(tmp_path, consts) -> None:
+    """测试配置了集成成员时加载集成引擎，缺失的成员被跳过，不足两个成员时退回单模型。"""
+    for seed, name in enumerate(("mortal.pth", "second.pth")):
+        _save_checkpoint(tmp_path / name, *_member(consts, seed))
+
+    with patch("akagi_ng.mjai_bot.engine.mortal.local_settings") as mock_settings:
+        config = mock_settings.model_config
+        config.fused_inference = False
+        config.precision = "fp32"
+        config.q_cache_mb = 0
+        config.ensemble_4p = ["second.pth", "missing.pth"]
+        config.ensemble_aggregation = "mean"
+        config.ensemble_weights = []
+        with patch("akagi_ng.mjai_bot.engine.ensemble.local_settings", mock_settings):
+            engine = load_local_mortal_engine(tmp_path / "mortal.pth", consts)
+
+            assert isinstance(engine, EnsembleEngine)
+            assert engine.member_names == ["mortal.pth", "second.pth"]
+            assert engine.in_channels == IN_CHANNELS
+
+            config.ensemble_4p = ["missing.pth"]
+            single = load_local_mortal_engine(tmp_path / "mortal.pth", consts)
+            assert not isinstance(single, EnsembleEngine)
@@ -0,0 +1,110 @@
+import os
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+import torch
+
+from akagi_ng.mjai_bot.engine.flat_weights import (
+    ALIGNMENT,
+    FlatWeightsError,
+    flat_weights_path,
+    load_checkpoint,
+    load_flat_weights,
+    write_flat_weights,
+)
+from akagi_ng.mjai_bot.engine.mortal import _build_eager_artifact
+from akagi_ng.mjai_bot.network import DQN, Brain
+
+IN_CHANNELS = 16
+ACTION_SPACE = 46
+
+
+@pytest.fixture
+def consts():
+    return SimpleNamespace(
+        obs_shape=lambda _v: (IN_CHANNELS, 34),
+        oracle_obs_shape=lambda _v: (8, 34),
+        ACTION_SPACE=ACTION_SPACE,
+    )
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path):
+    with patch("akagi_ng.mjai_bot.engine.artifact_cache.get_cache_dir", return_value=tmp_path / "cache"):
+        yield
+
+
+@pytest.fixture
+def checkpoint(tmp_path, consts):
+    torch.manual_seed(0)
+    brain = Brain(consts.obs_shape, consts.oracle_obs_shape, conv_channels=32, num_blocks=1, version=4)
+    state = {
+        "config": {"control": {"version": 4}, "resnet": {"conv_channels": 32, "num_blocks": 1}},
+        "mortal": brain.state_dict(),
+        "current_dqn": DQN(ACTION_SPACE, version=4).state_dict(),
+    }
+    path = tmp_path / "mortal.pth"
+    torch.save(state, path)
+    return path, state
+
+
+def _q_values(artifact) -> torch.Tensor:
+    obs = torch.linspace(0, 1, IN_CHANNELS * 34).reshape(1, IN_CHANNELS, 34)
+    masks = torch.ones(1, ACTION_SPACE, dtype=torch.bool)
+    with torch.inference_mode():
+        return artifact.dqn(artifact.brain(obs), masks)
+
+
+def test_round_trip_preserves_tensors(tmp_path, checkpoint) -> None:
+    """测试写入后内存映射读取的张量与原状态一致，且数据按对齐边界存放。"""
+    _, state = checkpoint
+    path = write_flat_weights(state, tmp_path / "mortal.akw")
+
+    loaded = load_flat_weights(path)
+
+    assert loaded["config"] == state["config"]
+    for key in ("mortal", "current_dqn"):
+        assert loaded[key].keys() == state[key].keys()
+        for name, tensor in state[key].items():
+            assert torch.equal(loaded[key][name], tensor)
+            assert loaded[key][name].data_ptr() % ALIGNMENT == 0
+
+
+def test_loader_writes_then_maps_flat_file(checkpoint, consts) -> None:
+    """测试首次加载从 .pth 生成扁平文件，之后直接映射且不再读取 .pth，结果一致。"""
+    model_path, _ = checkpoint
+    device = torch.device("cpu")
+
+    first = _build_eager_artifact(model_path, consts, device, "standard", "fp32")
+    assert flat_weights_path(model_path).exists()
+
+    with patch(
+        "akagi_ng.mjai_bot.engine.flat_weights.torch.load", side_effect=AssertionError("pth should not be read")
+    ):
+        mapped = _build_eager_artifact(model_path, consts, device, "standard", "fp32")
+
+    assert torch.equal(_q_values(first), _q_values(mapped))
+    # 参数直接引用映射内存（不可扩容的外部存储），而不是复制到新分配的张量
+    assert not mapped.brain.encoder.net[0].weight.untyped_storage().resizable()
+    assert first.brain.encoder.net[0].weight.untyped_storage().resizable()
+
+
+def test_stale_or_corrupt_flat_file_is_rebuilt(checkpoint) -> None:
+    """测试检查点更新或扁平文件损坏时回退到 .pth 并重新生成。"""
+    model_path, state = checkpoint
+    flat_path = flat_weights_path(model_path)
+    write_flat_weights(state, flat_path, source=model_path)
+
+    stat = model_path.stat()
+    os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    with pytest.raises(FlatWeightsError, match="stale"):
+        load_flat_weights(flat_path, source=model_path)
+    _, mapped = load_checkpoint(model_path, flat_path)
+    assert mapped is False
+    assert load_checkpoint(model_path, flat_path)[1] is True
+
+    flat_path.write_bytes(b"garbage")
+    _, mapped = load_checkpoint(model_path, flat_path)
+    assert mapped is False
+    assert load_checkpoint(model_path, flat_path)[1] is True
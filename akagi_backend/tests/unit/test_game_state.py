@@ -0,0 +1,101 @@
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from akagi_ng.core import encode_event
+from akagi_ng.mjai_bot.bot import StateTrackerBot
+from akagi_ng.mjai_bot.controller import Controller
+from akagi_ng.mjai_bot.game_state import GameState
+from akagi_ng.mjai_bot.mortal.bot import MortalBot
+
+TEHAI = ["1m", "2m", "3m", "4m", "5m", "6m", "7m", "8m", "9m", "1p", "2p", "3p", "E"]
+EVENTS = [
+    {"type": "start_game", "id": 0},
+    {
+        "type": "start_kyoku",
+        "bakaze": "E",
+        "dora_marker": "1p",
+        "kyoku": 1,
+        "honba": 0,
+        "kyotaku": 0,
+        "oya": 0,
+        "scores": [25000] * 4,
+        "tehais": [TEHAI] + [["?"] * 13] * 3,
+        "is_3p": False,
+    },
+    {"type": "tsumo", "actor": 0, "pai": "W"},
+    {"type": "dahai", "actor": 0, "pai": "W", "tsumogiri": True},
+]
+
+
+@pytest.fixture(autouse=True)
+def mock_lib_loader_module():
+    """Mock 掉 lib_loader 模块，防止加载真实二进制库"""
+    mock_module = MagicMock()
+    mock_module.libriichi.mjai.Bot = MagicMock
+    with patch.dict(sys.modules, {"akagi_ng.core.lib_loader": mock_module}):
+        yield mock_module
+
+
+@pytest.fixture
+def mock_model():
+    with patch("akagi_ng.mjai_bot.engine.factory.load_bot_and_engine") as mock_loader:
+        model = MagicMock()
+        model.react.return_value = None
+        engine = MagicMock()
+        engine.get_additional_meta.return_value = {"engine_type": "mortal"}
+        engine.get_notification_flags.return_value = {}
+        mock_loader.return_value = (model, engine)
+        yield model
+
+
+def test_apply_tracks_kyoku_history() -> None:
+    """测试事件应用到 PlayerState，并记录本局事件历史、打牌与宝牌指示牌。"""
+    state = GameState()
+    for event in map(encode_event, EVENTS):
+        state.apply(event)
+
+    assert state.action_candidate is not None
+    assert [e["type"] for e in state.history] == ["start_kyoku", "tsumo", "dahai"]
+    assert state.history_json[-1] == encode_event(EVENTS[-1]).json
+    assert state.dora_indicators == ["1p"]
+    assert len(state.discard_events) == 1
+    assert state.is_3p is False
+
+
+def test_apply_records_event_when_player_state_rejects_it() -> None:
+    """测试 PlayerState.update 抛出异常时，事件仍记入本局历史，异常照常抛出。"""
+    state = GameState()
+    for event in map(encode_event, EVENTS[:3]):
+        state.apply(event)
+
+    state.player_state = MagicMock()
+    state.player_state.update.side_effect = RuntimeError("rejected")
+    with pytest.raises(RuntimeError, match="rejected"):
+        state.apply(EVENTS[3])
+
+    assert [e["type"] for e in state.history] == ["start_kyoku", "tsumo", "dahai"]
+    assert state.history_json[-1] == encode_event(EVENTS[3]).json
+    assert len(state.discard_events) == 1
+
+
+def test_tracker_and_mortal_bot_share_state(mock_model) -> None:
+    """测试 Controller 加载的 MortalBot 读取 StateTrackerBot 的状态，每个事件只应用一次。"""
+    tracker = StateTrackerBot()
+    controller = Controller(game_state=tracker.state)
+    events = [encode_event(e) for e in EVENTS]
+
+    state_cls = type(tracker.state)
+    with patch.object(state_cls, "record", autospec=True, side_effect=state_cls.record) as mock_record:
+        for event in events:
+            tracker.react(event)
+            controller.react(event)
+
+    assert mock_record.call_count == len(events)
+    assert isinstance(controller.bot, MortalBot)
+    assert controller.bot.state is tracker.state
+    assert controller.bot.history_json is tracker.state.history_json
+    assert tracker.player_state is tracker.state.player_state
+    # 决策 Bot 仍把同一份事件编码交给 libriichi
+    assert [c.args[0] for c in mock_model.react.call_args_list] == [e.json for e in events[1:]]
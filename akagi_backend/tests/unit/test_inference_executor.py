@@ -0,0 +1,159 @@
+import json
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from akagi_ng.mjai_bot.engine import thread_tuner
+from akagi_ng.mjai_bot.engine.executor import InferenceExecutor
+from akagi_ng.mjai_bot.engine.thread_tuner import (
+    ThreadProfile,
+    TuneResult,
+    candidate_thread_counts,
+    load_thread_profile,
+    save_thread_profile,
+    tune_threads,
+)
+
+
+@pytest.fixture
+def settings_dir(tmp_path):
+    with patch("akagi_ng.mjai_bot.engine.thread_tuner.get_settings_dir", return_value=tmp_path):
+        yield tmp_path
+
+
+@pytest.fixture
+def executor():
+    executor = InferenceExecutor()
+    yield executor
+    executor.shutdown()
+
+
+@pytest.fixture
+def torch_threads():
+    """记录 torch 线程数设置，避免测试修改进程全局配置"""
+    state = {"threads": 8, "calls": []}
+
+    def set_threads(n):
+        state["threads"] = n
+        state["calls"].append(n)
+
+    with (
+        patch("torch.set_num_threads", side_effect=set_threads),
+        patch("torch.get_num_threads", side_effect=lambda: state["threads"]),
+    ):
+        yield state
+
+
+def test_submit_runs_on_dedicated_thread(executor, settings_dir, torch_threads) -> None:
+    """测试任务在专用推理线程中执行，并应用配置的线程数。"""
+    executor.start(num_threads=3)
+
+    name = executor.submit(lambda: threading.current_thread().name).result(timeout=5)
+
+    assert name.startswith("InferenceExecutor")
+    assert torch_threads["calls"] == [3]
+
+
+def test_busy_while_decision_in_flight(executor, settings_dir, torch_threads) -> None:
+    """测试提交的决策完成前执行器处于忙碌状态，完成后 wait_idle 返回。"""
+    executor.start(num_threads=1)
+    gate = threading.Event()
+    future = executor.submit(gate.wait, 5)
+
+    assert executor.busy
+    assert executor.wait_idle(0.05) is False
+    gate.set()
+    future.result(timeout=5)
+    assert executor.wait_idle(5) is True
+    assert not executor.busy
+
+
+def test_submit_without_start_runs_inline(executor) -> None:
+    """测试执行器未启动时任务在当前线程同步执行，异常通过 Future 返回。"""
+    assert executor.submit(threading.current_thread).result() is threading.current_thread()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        executor.submit(fail).result()
+
+
+def test_start_uses_saved_profile(executor, settings_dir, torch_threads) -> None:
+    """测试本机已有调优结果时直接使用，不再调优。"""
+    with patch("akagi_ng.mjai_bot.engine.executor.load_thread_profile", return_value=ThreadProfile(2)):
+        executor.start()
+    executor.submit(lambda: None).result(timeout=5)
+
+    assert torch_threads["calls"] == [2]
+    with patch("akagi_ng.mjai_bot.engine.executor.tune_threads") as mock_tune:
+        executor.schedule_auto_tune(MagicMock())
+        executor.submit(lambda: None).result(timeout=5)
+    mock_tune.assert_not_called()
+
+
+def test_auto_tune_runs_once_and_applies_profile(executor, settings_dir, torch_threads) -> None:
+    """测试无调优结果时只调优一次，并立即应用最佳线程数。"""
+    with patch("akagi_ng.mjai_bot.engine.executor.get_inference_device") as mock_device:
+        mock_device.return_value.type = "cpu"
+        executor.start()
+
+    result = TuneResult(profile=ThreadProfile(4), measurements={})
+    with patch("akagi_ng.mjai_bot.engine.executor.tune_threads", return_value=result) as mock_tune:
+        engine = MagicMock()
+        executor.schedule_auto_tune(engine)
+        executor.schedule_auto_tune(engine)
+        executor.submit(lambda: None).result(timeout=5)
+
+    mock_tune.assert_called_once_with(engine, fingerprint=executor.fingerprint)
+    assert torch_threads["threads"] == 4
+    assert executor.get_status()["tuned"] is True
+
+
+def test_candidate_thread_counts() -> None:
+    """测试候选线程数为 2 的幂并包含核数本身。"""
+    assert candidate_thread_counts(1) == [1]
+    assert candidate_thread_counts(6) == [1, 2, 4, 6]
+    assert candidate_thread_counts(8) == [1, 2, 4, 8]
+
+
+def test_tune_threads_prefers_fewer_threads_within_tolerance(settings_dir, torch_threads) -> None:
+    """测试以单条决策延迟选择线程数，延迟相近时选择更少的线程，并保存结果。"""
+    latency = {1: 10.0, 2: 5.0, 4: 4.9, 8: 6.0}
+    engine = MagicMock(in_channels=4, action_space=6)
+
+    with (
+        patch("akagi_ng.mjai_bot.engine.thread_tuner.os.cpu_count", return_value=8),
+        patch.object(thread_tuner, "_benchmark", side_effect=lambda e, obs, m, r: latency[torch_threads["threads"]]),
+    ):
+        result = tune_threads(engine, fingerprint="machine-a", batch_sizes=(1, 4))
+
+    assert result.profile == ThreadProfile(num_threads=2)
+    assert set(result.measurements) == {1, 2, 4, 8}
+    assert set(result.measurements[4]) == {1, 4}
+    # 调优结束后恢复原线程数，由调用方决定是否应用
+    assert torch_threads["threads"] == 8
+
+    saved = json.loads((settings_dir / thread_tuner.PROFILE_FILENAME).read_text(encoding="utf-8"))
+    assert saved["machine-a"]["num_threads"] == 2
+    assert saved["machine-a"]["measurements"]["4"]["1"] == 4.9
+
+
+def test_profile_roundtrip_keeps_other_machines(settings_dir) -> None:
+    """测试调优结果按机器保存，互不覆盖；损坏的文件被忽略。"""
+    save_thread_profile("machine-a", TuneResult(ThreadProfile(2), {}))
+    save_thread_profile("machine-b", TuneResult(ThreadProfile(6, 2), {}))
+
+    assert load_thread_profile("machine-a") == ThreadProfile(2)
+    assert load_thread_profile("machine-b") == ThreadProfile(6, 2)
+    assert load_thread_profile("machine-c") is None
+
+    (settings_dir / thread_tuner.PROFILE_FILENAME).write_text("{", encoding="utf-8")
+    assert load_thread_profile("machine-a") is None
+
+
+def test_tune_threads_requires_warmed_up_engine() -> None:
+    """测试引擎未预热（输入维度未知）时拒绝调优。"""
+    with pytest.raises(RuntimeError):
+        tune_threads(MagicMock(in_channels=None, action_space=None))
@@ -2,7 +2,7 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
-from akagi_ng.core import NotificationCode
+from akagi_ng.core import NotificationCode, encode_event
 from akagi_ng.mjai_bot.controller import Controller
 
 
@@ -21,7 +21,7 @@ def test_controller_nukidora_midgame_recovery(controller):
 
     # Mock bot switch
     mock_mortal3p = MagicMock()
-    mock_mortal3p.react.return_value = '{"type":"none"}'
+    mock_mortal3p.react_events.return_value = {"type": "none"}
 
     # Patch the creation of the bot inside _choose_bot_name
     # _choose_bot_name uses self.available_bots[index]()
@@ -36,7 +36,7 @@ def test_controller_nukidora_midgame_recovery(controller):
 def test_controller_unmatched_event_sequence(controller):
     # Setup bot first
     controller.bot = MagicMock()
-    controller.bot.react.return_value = '{"type":"none"}'
+    controller.bot.react_events.return_value = {"type": "none"}
 
     # start_game followed by something NOT start_kyoku
     controller.react({"type": "start_game", "scores": [25000] * 4})
@@ -44,11 +44,13 @@ def test_controller_unmatched_event_sequence(controller):
     assert res == {"type": "none"}
 
 
-def test_controller_json_decode_error(controller):
+def test_controller_passes_encoded_events_without_reserializing(controller):
     controller.bot = MagicMock()
-    controller.bot.react.return_value = "invalid json"
-    res = controller.react({"type": "dahai", "actor": 0, "tile": "1m"})
-    assert res["error"] == NotificationCode.JSON_DECODE_ERROR
+    controller.bot.react_events.return_value = {"type": "dahai", "actor": 0, "pai": "1m"}
+    event = encode_event({"type": "tsumo", "actor": 0, "pai": "1m"})
+    res = controller.react(event)
+    assert res == {"type": "dahai", "actor": 0, "pai": "1m"}
+    assert controller.bot.react_events.call_args.args[0][0] is event
 
 
 def test_controller_bot_switch_failed(controller):
@@ -60,7 +62,7 @@ def test_controller_bot_switch_failed(controller):
 
 def test_controller_runtime_error(controller):
     controller.bot = MagicMock()
-    controller.bot.react.side_effect = Exception("Crash")
+    controller.bot.react_events.side_effect = Exception("Crash")
     res = controller.react({"type": "dahai", "actor": 0, "tile": "1m"})
     assert res["error"] == NotificationCode.BOT_RUNTIME_ERROR
 
@@ -70,3 +72,30 @@ def test_controller_no_bot_loaded(controller):
     controller.bot = None
     res = controller.react({"type": "dahai", "actor": 0, "tile": "1m"})
     assert res["error"] == NotificationCode.NO_BOT_LOADED
+
+
+def test_controller_react_batch_forwards_events_in_one_call(controller):
+    """测试批量回放时 Bot 加载后，整段事件连同暂存的 start_game 一次性交给 Bot。"""
+    mock_mortal = MagicMock()
+    mock_mortal.react_events.return_value = {"type": "dahai", "actor": 0, "pai": "1m"}
+    controller.available_bots = [lambda: mock_mortal, MagicMock()]
+    controller.available_bots_names = ["mortal", "mortal3p"]
+
+    events = [
+        {"type": "start_game", "id": 0, "sync": True},
+        {"type": "start_kyoku", "scores": [25000] * 4, "is_3p": False, "sync": True},
+        {"type": "tsumo", "actor": 1, "pai": "?", "sync": True},
+        {"type": "dahai", "actor": 1, "pai": "9s", "tsumogiri": True, "sync": True},
+        {"type": "tsumo", "actor": 0, "pai": "1m"},
+    ]
+    res = controller.react_batch(events)
+
+    assert res == {"type": "dahai", "actor": 0, "pai": "1m"}
+    mock_mortal.react_events.assert_called_once_with(events)
+    assert controller.pending_start_game_event is None
+
+
+def test_controller_react_batch_without_bot(controller):
+    """测试 Bot 未加载时批量回放返回错误响应，不会抛出异常。"""
+    res = controller.react_batch([{"type": "tsumo", "actor": 0, "pai": "1m", "sync": True}])
+    assert res["error"] == NotificationCode.NO_BOT_LOADED
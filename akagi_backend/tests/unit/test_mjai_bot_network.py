@@ -1,7 +1,17 @@
 import pytest
 import torch
 
-from akagi_ng.mjai_bot.network import DQN, AuxNet, Brain, ChannelAttention, ResBlock, ResNet, get_inference_device
+from akagi_ng.mjai_bot.network import (
+    DQN,
+    AuxNet,
+    Brain,
+    ChannelAttention,
+    ResBlock,
+    ResNet,
+    fuse_brain_for_inference,
+    get_inference_device,
+    supports_bf16_autocast,
+)
 
 
 def test_inference_device_detection():
@@ -10,6 +20,12 @@ def test_inference_device_detection():
     assert isinstance(device, torch.device)
 
 
+def test_supports_bf16_autocast_probe():
+    """测试 bf16 能力探测返回布尔值，且不支持的设备返回 False。"""
+    assert isinstance(supports_bf16_autocast("cpu"), bool)
+    assert supports_bf16_autocast("not_a_device") is False
+
+
 def test_channel_attention():
     channels = 64
     ca = ChannelAttention(channels=channels, ratio=16)
@@ -133,3 +149,40 @@ def test_dqn_with_masking():
 def test_invalid_brain_version():
     with pytest.raises(ValueError, match="Unexpected version"):
         Brain(lambda x: (1, 1), lambda x: (1, 1), conv_channels=64, num_blocks=1, version=999)
+
+
+@pytest.mark.parametrize(("version", "norm_type"), [(1, "BN"), (2, "BN"), (4, "BN"), (4, "GN")])
+def test_fused_brain_matches_standard(version, norm_type):
+    """测试推理版 Brain 在观测样本上与原始 Brain 的 argmax 一致。"""
+    torch.manual_seed(0)
+    brain = Brain(
+        obs_shape_func=lambda _v: (64, 34),
+        oracle_obs_shape_func=lambda _v: (8, 34),
+        conv_channels=32,
+        num_blocks=2,
+        version=version,
+        norm_type=norm_type,
+    )
+    # 训练若干步以得到非平凡的 BatchNorm 统计量
+    brain.train()
+    with torch.no_grad():
+        for _ in range(3):
+            brain(torch.randint(0, 2, (16, 64, 34)).float())
+    brain.eval()
+
+    fused = fuse_brain_for_inference(brain)
+    dqn = DQN(action_space=46, version=version).eval()
+    obs = torch.randint(0, 2, (64, 64, 34)).float()
+    masks = torch.randint(0, 2, (64, 46)).bool()
+    masks[:, 0] = True
+
+    with torch.no_grad():
+        phi, fused_phi = brain(obs), fused(obs)
+        if version == 1:
+            phi, fused_phi = phi[0], fused_phi[0]
+        assert torch.allclose(phi, fused_phi, atol=1e-4)
+        assert torch.equal(dqn(phi, masks).argmax(-1), dqn(fused_phi, masks).argmax(-1))
+
+    # 原始模型不受影响
+    assert any(isinstance(m, torch.nn.BatchNorm1d) for m in brain.modules()) == (norm_type == "BN")
+    assert not any(isinstance(m, (torch.nn.BatchNorm1d, ChannelAttention)) for m in fused.modules())
@@ -0,0 +1,89 @@
+import json
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from akagi_ng.core import EncodedEvent, encode_event
+from akagi_ng.mjai_bot.mortal.bot import MortalBot
+
+
+@pytest.fixture(autouse=True)
+def mock_lib_loader_module():
+    """Mock 掉 lib_loader 模块，防止加载真实二进制库"""
+    mock_module = MagicMock()
+    mock_module.libriichi.mjai.Bot = MagicMock
+    with patch.dict(sys.modules, {"akagi_ng.core.lib_loader": mock_module}):
+        yield mock_module
+
+
+@pytest.fixture
+def mock_model():
+    with patch("akagi_ng.mjai_bot.engine.factory.load_bot_and_engine") as mock_loader:
+        model = MagicMock()
+        model.react.return_value = None
+        engine = MagicMock()
+        engine.get_additional_meta.return_value = {}
+        engine.get_notification_flags.return_value = {}
+        mock_loader.return_value = (model, engine)
+        yield model
+
+
+def test_encoded_event_caches_json() -> None:
+    """测试编码在首次访问时生成并缓存，且与原事件内容一致。"""
+    event = encode_event({"type": "tsumo", "actor": 0, "pai": "1m"})
+    assert event == {"type": "tsumo", "actor": 0, "pai": "1m"}
+    assert json.loads(event.json) == event
+    assert event.json is event.json
+
+
+def _set_pai(e):
+    e["pai"] = "2m"
+
+
+def _ior(e):
+    e |= {"pai": "2m"}
+
+
+@pytest.mark.parametrize(
+    "mutate",
+    [
+        _set_pai,
+        lambda e: e.__delitem__("tsumogiri"),
+        lambda e: e.update(actor=1),
+        lambda e: e.pop("tsumogiri"),
+        lambda e: e.setdefault("sync", True),
+        lambda e: e.popitem(),
+        lambda e: e.clear(),
+        _ior,
+    ],
+    ids=["setitem", "delitem", "update", "pop", "setdefault", "popitem", "clear", "ior"],
+)
+def test_encoded_event_invalidates_on_mutation(mutate) -> None:
+    """测试每种修改事件内容的方式都会使缓存的编码失效。"""
+    event = EncodedEvent(type="dahai", actor=0, pai="1m", tsumogiri=False)
+    _ = event.json
+    mutate(event)
+    assert json.loads(event.json) == dict(event)
+
+
+def test_encode_event_is_idempotent() -> None:
+    """测试已包装的事件原样返回，不会重复编码。"""
+    event = encode_event({"type": "end_game"})
+    assert encode_event(event) is event
+
+
+def test_mortal_bot_reuses_event_encoding(mock_model) -> None:
+    """测试 MortalBot.react_events 直接把事件携带的编码传给 libriichi，并以字典返回响应。"""
+    bot = MortalBot()
+    start = encode_event({"type": "start_game", "id": 0})
+    tsumo = encode_event({"type": "tsumo", "actor": 0, "pai": "1m"})
+
+    with patch("akagi_ng.core.mjai_event.json.dumps", wraps=json.dumps) as mock_dumps:
+        resp = bot.react_events([start, tsumo])
+
+    assert resp["type"] == "none"
+    # start_game 不经过 libriichi，只有 tsumo 被编码一次
+    assert mock_dumps.call_count == 1
+    mock_model.react.assert_called_once()
+    assert mock_model.react.call_args.args[0] is tsumo.json
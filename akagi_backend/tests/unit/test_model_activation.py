@@ -0,0 +1,132 @@
+import gc
+import time
+import weakref
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from akagi_ng.mjai_bot.engine.activation import ModelActivator
+from akagi_ng.mjai_bot.engine.base import BaseEngine
+from akagi_ng.mjai_bot.engine.factory import _ENGINE_CACHE, LazyLocalEngine
+from akagi_ng.mjai_bot.engine.preload import EnginePreloader, PreloadStatus
+from akagi_ng.mjai_bot.engine.process import ProcessEngine
+from akagi_ng.mjai_bot.engine.provider import EngineProvider
+
+
+class NamedEngine(BaseEngine):
+    """以模型文件名命名的假引擎"""
+
+    def __init__(self, model_path: Path):
+        super().__init__(is_3p=False, version=4, name=model_path.stem)
+
+
+@pytest.fixture
+def preloader():
+    preloader = EnginePreloader()
+    with (
+        patch("akagi_ng.mjai_bot.engine.activation.engine_preloader", preloader),
+        patch("akagi_ng.mjai_bot.engine.factory.engine_preloader", preloader),
+        patch("akagi_ng.mjai_bot.engine.preload.local_settings") as mock_settings,
+        patch(
+            "akagi_ng.mjai_bot.engine.preload.load_local_mortal_engine",
+            side_effect=lambda path, *_args: NamedEngine(path),
+        ),
+    ):
+        mock_settings.model_config.engine_memory_budget_mb = 0.0
+        mock_settings.model_config.engine_idle_ttl_s = 0.0
+        yield preloader
+
+
+@pytest.fixture
+def activation_settings(tmp_path):
+    with (
+        patch("akagi_ng.mjai_bot.engine.activation.local_settings") as mock_settings,
+        patch("akagi_ng.mjai_bot.engine.activation.get_models_dir", return_value=tmp_path),
+        patch.dict("sys.modules", {"akagi_ng.core.lib_loader": MagicMock()}),
+    ):
+        mock_settings.model_config.model_4p = "mortal.pth"
+        yield mock_settings
+
+
+@pytest.fixture(autouse=True)
+def engine_cache():
+    _ENGINE_CACHE.clear()
+    yield _ENGINE_CACHE
+    _ENGINE_CACHE.clear()
+
+
+def _wait(activator: ModelActivator, mode: str = "4p") -> dict:
+    deadline = time.monotonic() + 5
+    while (status := activator.get_status()[mode])["status"] == PreloadStatus.LOADING:
+        assert time.monotonic() < deadline, "model activation did not finish"
+        time.sleep(0.01)
+    return status
+
+
+def test_activate_swaps_lazy_engines_to_standby(preloader, activation_settings, engine_cache) -> None:
+    """测试新模型作为备用引擎加载完成后替换所有 Provider 的本地引擎，旧引擎随之释放。"""
+    lazy = LazyLocalEngine(Path("mortal.pth"), None, is_3p=False)
+    engine_cache[(False, False, None)] = EngineProvider(None, lazy, is_3p=False)
+    old_ref = weakref.ref(lazy._ensure_engine())
+    assert old_ref().name == "mortal"
+
+    activator = ModelActivator()
+    assert activator.activate("second.pth", is_3p=False) is True
+    status = _wait(activator)
+
+    assert status["status"] == PreloadStatus.READY
+    assert status["model"] == "second.pth"
+    assert lazy.model_path.name == "second.pth"
+    assert lazy._real_engine.name == "second"
+    # 之后的决策直接使用已切换的引擎，不再重新加载
+    assert lazy._ensure_engine() is lazy._real_engine
+    gc.collect()
+    assert old_ref() is None
+
+    preload_status = preloader.get_status()
+    assert preload_status["4p"]["model"] == "second.pth"
+    assert preload_status["events"][-1]["event"] == "activate"
+    assert activation_settings.model_config.model_4p == "second.pth"
+    activation_settings.save.assert_called_once()
+
+
+def test_activate_switches_process_engine_worker(activation_settings, engine_cache) -> None:
+    """测试子进程推理时由 ProcessEngine 在新子进程中加载，保底引擎改为按需加载新模型。"""
+    lazy = LazyLocalEngine(Path("mortal.pth"), None, is_3p=False)
+    process_engine = MagicMock(spec=ProcessEngine)
+    process_engine.name = "process"
+    process_engine.fallback = lazy
+    process_engine.switch_model.return_value = True
+    engine_cache[(False, False, None)] = EngineProvider(None, process_engine, is_3p=False)
+
+    activator = ModelActivator()
+    with patch("akagi_ng.mjai_bot.engine.activation.engine_preloader") as mock_preloader:
+        activator.activate("second.pth", is_3p=False)
+        assert _wait(activator)["status"] == PreloadStatus.READY
+
+    assert lazy.model_path.name == "second.pth"
+    process_engine.switch_model.assert_called_once_with(lazy.model_path)
+    assert lazy._real_engine is None
+    mock_preloader.evict.assert_called_once_with(False, reason="swap")
+    mock_preloader.load_standby.assert_not_called()
+
+
+def test_failed_activation_keeps_current_model(activation_settings, engine_cache) -> None:
+    """测试新模型加载失败时保留当前模型且不写入配置；切换进行中时拒绝重复请求。"""
+    lazy = LazyLocalEngine(Path("mortal.pth"), None, is_3p=False)
+    engine_cache[(False, False, None)] = EngineProvider(None, lazy, is_3p=False)
+
+    activator = ModelActivator()
+    with patch("akagi_ng.mjai_bot.engine.activation.engine_preloader") as mock_preloader:
+        mock_preloader.load_standby.side_effect = lambda *_args: time.sleep(0.2)
+        assert activator.activate("broken.pth", is_3p=False) is True
+        assert activator.activate("other.pth", is_3p=False) is False
+        status = _wait(activator)
+
+    assert status["status"] == PreloadStatus.FAILED
+    assert "broken.pth" in status["error"]
+    assert lazy.model_path.name == "mortal.pth"
+    mock_preloader.promote.assert_not_called()
+    activation_settings.save.assert_not_called()
+    assert activator.get_status()["3p"]["status"] == PreloadStatus.IDLE
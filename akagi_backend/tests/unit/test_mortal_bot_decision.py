@@ -146,3 +146,21 @@ def initialized_bot(mock_engine_setup):
     bot = MortalBot()
     bot.react(json.dumps([{"type": "start_game", "id": 0}]))
     return bot
+
+
+def test_sync_mode_toggled_once_per_replay(mock_engine_setup, initialized_bot) -> None:
+    """验证连续的同步事件只切换一次同步模式，回放结束后的实时事件正常推理。"""
+    _, mock_bot_instance, mock_engine = mock_engine_setup
+    events = [
+        {"type": "tsumo", "actor": 1, "pai": "?", "sync": True},
+        {"type": "dahai", "actor": 1, "pai": "9s", "tsumogiri": True, "sync": True},
+        {"type": "tsumo", "actor": 2, "pai": "?", "sync": True},
+        {"type": "tsumo", "actor": 0, "pai": "1m"},
+    ]
+    mock_bot_instance.react.reset_mock()
+
+    resp = initialized_bot.react_events(events)
+
+    assert resp["type"] == "dahai"
+    assert mock_bot_instance.react.call_count == len(events)
+    assert [c.args for c in mock_engine.set_sync_mode.call_args_list] == [(True,), (False,)]
@@ -222,3 +222,116 @@ def test_mortal_engine_react_batch_list_input(mock_mortal_components) -> None:
     masks = [[True] * 46]
     actions, _, _, _ = engine.react_batch(obs, masks, obs)
     assert len(actions) == 1
+
+
+def test_mortal_engine_amp_keeps_q_head_fp32(mock_mortal_components) -> None:
+    """测试 bf16 模式下 Brain 输出转回 fp32 后再进入 Q 值头。"""
+    brain, dqn = mock_mortal_components
+    engine = MortalEngine(brain, dqn, version=4, precision="bf16")
+    assert engine.enable_amp
+    engine.brain.return_value = torch.zeros((1, 1024), dtype=torch.bfloat16)
+
+    obs = np.zeros((1, 200, 34), dtype=np.float32)
+    masks = np.ones((1, 46), dtype=bool)
+    engine.react_batch(obs, masks, obs)
+
+    phi, _ = engine.dqn.call_args[0]
+    assert phi.dtype == torch.float32
+    assert engine.get_additional_meta() == {"precision": "bf16"}
+
+
+@pytest.mark.parametrize(("timings", "expected_precision"), [((0, 1, 0, 2), "fp32"), ((0, 2, 0, 1), "bf16")])
+def test_mortal_engine_amp_speedup_measured_at_warmup(mock_mortal_components, timings, expected_precision) -> None:
+    """测试 warmup 时测量 bf16 加速比，比 fp32 更慢时回退到 fp32。"""
+    brain, dqn = mock_mortal_components
+    engine = MortalEngine(brain, dqn, version=4, precision="bf16")
+    with (
+        patch.object(engine, "react_batch"),
+        patch.object(engine, "_infer"),
+        patch("akagi_ng.mjai_bot.engine.mortal.time.perf_counter", side_effect=timings),
+    ):
+        engine.warmup()
+
+    assert engine.amp_speedup == timings[1] / timings[3]
+    assert engine.precision == expected_precision
+
+
+def test_mortal_engine_q_cache_skips_repeated_observation(mock_mortal_components) -> None:
+    """测试相同观测第二次直接命中 Q 值缓存，不再执行前向推理。"""
+    brain, dqn = mock_mortal_components
+    engine = MortalEngine(brain, dqn, version=4, q_cache_bytes=1 << 20)
+    engine.dqn.return_value = torch.arange(46, dtype=torch.float32).unsqueeze(0)
+
+    obs = np.ones((1, 200, 34), dtype=np.float32)
+    masks = np.ones((1, 46), dtype=bool)
+    first = engine.react_batch(obs, masks, None)
+    second = engine.react_batch(obs, masks, None)
+
+    assert first == second
+    assert first[0] == [45]
+    assert engine.brain.call_count == 1
+    meta = engine.get_additional_meta()
+    assert meta["q_cache_hits"] == 1
+    assert meta["q_cache_misses"] == 1
+
+
+def test_mortal_engine_q_cache_runs_only_misses(mock_mortal_components) -> None:
+    """测试批量请求中仅未命中的观测进入前向推理。"""
+    brain, dqn = mock_mortal_components
+    engine = MortalEngine(brain, dqn, version=4, q_cache_bytes=1 << 20)
+    masks = np.ones((1, 46), dtype=bool)
+    engine.react_batch(np.zeros((1, 200, 34), dtype=np.float32), masks, None)
+
+    engine.brain.return_value = torch.zeros((1, 1024))
+    engine.dqn.return_value = torch.zeros((1, 46))
+    obs = np.stack([np.zeros((200, 34)), np.ones((200, 34))]).astype(np.float32)
+    actions, q_out, _, _ = engine.react_batch(obs, np.ones((2, 46), dtype=bool), None)
+
+    assert len(actions) == 2
+    assert len(q_out) == 2
+    assert engine.brain.call_args[0][0].shape[0] == 1
+    assert engine.q_cache.hits == 1
+
+
+def test_mortal_engine_q_cache_disabled_with_boltzmann(mock_mortal_components) -> None:
+    """测试开启 Boltzmann 采样时不使用 Q 值缓存。"""
+    brain, dqn = mock_mortal_components
+    engine = MortalEngine(brain, dqn, version=4, boltzmann_epsilon=0.5, q_cache_bytes=1 << 20)
+    obs = np.ones((1, 200, 34), dtype=np.float32)
+    masks = np.ones((1, 46), dtype=bool)
+    engine.react_batch(obs, masks, None)
+    engine.react_batch(obs, masks, None)
+
+    assert engine.brain.call_count == 2
+    assert len(engine.q_cache) == 0
+
+
+def test_mortal_engine_precompute_fills_q_cache(mock_mortal_components) -> None:
+    """测试预计算将整批假设观测一次前向写入缓存，之后的真实决策直接命中。"""
+    brain, dqn = mock_mortal_components
+    engine = MortalEngine(brain, dqn, version=4, q_cache_bytes=1 << 20)
+    engine.brain.return_value = torch.zeros((3, 1024))
+    engine.dqn.return_value = torch.arange(46, dtype=torch.float32).repeat(3, 1)
+    obs = np.stack([np.full((200, 34), i, dtype=np.float32) for i in range(3)])
+    masks = np.ones((3, 46), dtype=bool)
+
+    assert engine.precompute(obs, masks) is True
+    assert engine.brain.call_count == 1
+    assert engine.brain.call_args[0][0].shape[0] == 3
+    # 预计算本身不计入命中统计
+    assert engine.q_cache.hits == 0
+    assert engine.q_cache.misses == 0
+
+    actions, _, _, _ = engine.react_batch(obs[1:2], masks[1:2], None)
+    assert actions == [45]
+    assert engine.brain.call_count == 1
+    assert engine.q_cache.hits == 1
+
+
+def test_mortal_engine_precompute_requires_q_cache(mock_mortal_components) -> None:
+    """测试未启用 Q 值缓存时不支持预计算。"""
+    brain, dqn = mock_mortal_components
+    engine = MortalEngine(brain, dqn, version=4)
+
+    assert engine.precompute(np.ones((1, 200, 34), dtype=np.float32), np.ones((1, 46), dtype=bool)) is False
+    engine.brain.assert_not_called()
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+
+import pytest
+import requests
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from akagi_ng.mjai_bot.engine import ot_transport
+from akagi_ng.mjai_bot.engine.ot_transport import PooledSession
+
+
+@pytest.fixture
+async def server():
+    state = {"options": 0, "peers": set(), "headers": None}
+
+    async def echo(request: web.Request) -> web.Response:
+        state["headers"] = dict(request.headers)
+        return web.json_response({"body": (await request.read()).hex()}, headers={"X-Test": "1"})
+
+    async def slow(request: web.Request) -> web.Response:
+        await asyncio.sleep(1.0)
+        return web.Response(text="late")
+
+    async def options(request: web.Request) -> web.Response:
+        state["options"] += 1
+        state["peers"].add(request.transport.get_extra_info("peername"))
+        return web.Response(status=204, headers={"X-AkagiOT-Wire": "1"})
+
+    app = web.Application()
+    app.router.add_post("/echo", echo)
+    app.router.add_post("/slow", slow)
+    app.router.add_route("OPTIONS", "/", options)
+    client = TestClient(TestServer(app))
+    await client.start_server()
+    yield client, state
+    await client.close()
+
+
+@pytest.fixture
+def session():
+    session = PooledSession()
+    session.headers.update({"Authorization": "key", "Content-Encoding": "gzip"})
+    yield session
+    session.close()
+
+
+async def _in_thread(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+async def test_post_returns_requests_response(server, session) -> None:
+    """测试同步门面返回标准 requests.Response，请求头按 requests 规则合并。"""
+    cli, state = server
+    url = str(cli.make_url("/echo"))
+
+    resp = await _in_thread(
+        lambda: session.post(url, data=b"\x01\x02", headers={"Content-Encoding": None}, timeout=(2.0, 2.0))
+    )
+
+    assert isinstance(resp, requests.Response)
+    assert resp.status_code == 200
+    assert resp.headers["x-test"] == "1"
+    assert resp.json() == {"body": "0102"}
+    assert state["headers"]["Authorization"] == "key"
+    assert "Content-Encoding" not in state["headers"]
+
+
+async def test_errors_map_to_requests_exceptions(server, session) -> None:
+    """测试超时与连接失败映射为 requests 的异常类型，上层熔断逻辑无需改动。"""
+    cli, _ = server
+
+    with pytest.raises(requests.Timeout):
+        await _in_thread(lambda: session.post(str(cli.make_url("/slow")), data=b"", timeout=(1.0, 0.05)))
+
+    with pytest.raises(requests.ConnectionError):
+        await _in_thread(lambda: session.post("http://127.0.0.1:1/echo", data=b"", timeout=(0.5, 0.5)))
+
+
+async def test_health_pings_warm_multiple_connections(server, session) -> None:
+    """测试健康探测立即执行，同时预热多个连接，并把响应交给回调。"""
+    cli, state = server
+    received = threading.Event()
+    results = []
+
+    def on_result(response):
+        results.append(response)
+        received.set()
+
+    session.start_health_pings(str(cli.make_url("/")), on_result, interval=60.0)
+    session.start_health_pings(str(cli.make_url("/")), on_result, interval=60.0)
+    while not received.is_set():
+        await asyncio.sleep(0.01)
+
+    assert state["options"] == ot_transport.WARM_CONNECTIONS
+    assert len(state["peers"]) == ot_transport.WARM_CONNECTIONS
+    assert results[0].headers["X-AkagiOT-Wire"] == "1"
+
+
+async def test_concurrent_requests_share_pool(server, session) -> None:
+    """测试多个线程同时在途的请求在同一连接池上并发执行。"""
+    cli, _ = server
+    url = str(cli.make_url("/echo"))
+
+    responses = await asyncio.gather(
+        *(_in_thread(lambda: session.post(url, data=b"\x00", timeout=2.0)) for _ in range(4))
+    )
+
+    assert [r.status_code for r in responses] == [200] * 4
@@ -0,0 +1,114 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from akagi_ng.mjai_bot.engine import ot_wire
+from akagi_ng.mjai_bot.engine.akagi_ot import AkagiOTClient
+
+
+@pytest.fixture
+def inputs():
+    obs = (np.arange(3 * 10 * 34).reshape(3, 10, 34) % 3 == 0).astype(np.float32)
+    # 少数非二值通道（如分数等连续特征）保持原样
+    obs[:, 4, :] = np.linspace(0.0, 1.0, 3 * 34, dtype=np.float32).reshape(3, 34)
+    masks = np.arange(3 * 46).reshape(3, 46) % 5 == 0
+    return obs, masks
+
+
+@pytest.fixture
+def client():
+    with patch.object(AkagiOTClient, "_pre_warm_connection"):
+        return AkagiOTClient("http://fake-server", "fake-key")
+
+
+def _binary_response(actions, q_out, is_greedy, q_dtype="float16"):
+    resp = MagicMock(status_code=200)
+    resp.headers = {"Content-Type": ot_wire.CONTENT_TYPE}
+    resp.content = ot_wire.encode_response(actions, q_out, is_greedy, q_dtype=q_dtype)
+    return resp
+
+
+def test_request_roundtrip_is_lossless_and_compact(inputs) -> None:
+    """测试请求编码无损还原混合通道的观测，且远小于 JSON 负载。"""
+    obs, masks = inputs
+    data = ot_wire.encode_request(obs, masks)
+
+    decoded_obs, decoded_masks = ot_wire.decode_request(data)
+
+    assert np.array_equal(decoded_obs, obs)
+    assert np.array_equal(decoded_masks, masks)
+    # 9 个二值通道按位打包，1 个通道 float32
+    assert len(data) < obs.nbytes // 4
+
+
+@pytest.mark.parametrize("q_dtype", ["float32", "float16"])
+def test_response_roundtrip(q_dtype) -> None:
+    """测试响应按指定精度编码 Q 值，解码后转换为 Python 列表。"""
+    q_out = np.array([[0.5, -1.25, 2.0], [1.0, 0.0, -0.5]])
+    data = ot_wire.encode_response([2, 0], q_out, [True, False], q_dtype=q_dtype)
+
+    decoded = ot_wire.decode_response(data)
+
+    assert decoded.actions == [2, 0]
+    assert decoded.is_greedy == [True, False]
+    assert decoded.q_out == q_out.tolist()
+
+
+def test_decode_rejects_corrupt_payload(inputs) -> None:
+    """测试截断或版本不符的负载抛出 WireFormatError。"""
+    data = ot_wire.encode_request(*inputs)
+    with pytest.raises(ot_wire.WireFormatError):
+        ot_wire.decode_request(data[:-3])
+    with pytest.raises(ot_wire.WireFormatError):
+        ot_wire.decode_response(b"AOQ\x09" + b"\x00" * 8)
+
+
+def test_parse_wire_versions() -> None:
+    assert ot_wire.parse_wire_versions("1, 2") == {1, 2}
+    assert ot_wire.parse_wire_versions(None) == set()
+    assert ot_wire.parse_wire_versions("json") == set()
+
+
+def test_client_uses_binary_after_negotiation(client, inputs) -> None:
+    """测试服务端声明支持二进制格式后，请求以二进制发送且不再 gzip。"""
+    obs, masks = inputs
+    client._negotiate_wire("1")
+
+    with patch.object(client.session, "post", return_value=_binary_response([1, 2, 3], np.zeros((3, 46)), [True] * 3)):
+        result = client.predict(False, obs, masks)
+        kwargs = client.session.post.call_args.kwargs
+
+    assert result["actions"] == [1, 2, 3]
+    assert result["masks"] == masks.tolist()
+    assert kwargs["headers"][ot_wire.WIRE_HEADER] == "1"
+    assert kwargs["headers"]["Content-Encoding"] is None
+    assert np.array_equal(ot_wire.decode_request(kwargs["data"])[0], obs)
+    assert client.wire_format == "binary"
+
+
+def test_client_falls_back_to_json_when_rejected(client, inputs) -> None:
+    """测试服务端拒绝二进制请求时回退到 JSON 并记住协商结果，不计入熔断失败。"""
+    obs, masks = inputs
+    client._negotiate_wire("1")
+    rejected = MagicMock(status_code=415)
+    json_resp = MagicMock(status_code=200)
+    json_resp.json.return_value = {"actions": [0, 0, 0], "q_out": [], "masks": [], "is_greedy": []}
+
+    with patch.object(client.session, "post", side_effect=[rejected, json_resp, json_resp]) as mock_post:
+        assert client.predict(False, obs, masks)["actions"] == [0, 0, 0]
+        client.predict(False, obs, masks)
+
+    assert client.wire_format == "json"
+    assert client._failures == 0
+    assert mock_post.call_count == 3
+    assert "headers" not in mock_post.call_args.kwargs
+
+
+def test_client_defaults_to_json_without_advertisement(client, inputs) -> None:
+    """测试服务端未声明支持（或尚未完成协商）时使用 JSON 格式。"""
+    client._negotiate_wire(None)
+    assert client.wire_format == "json"
+    # 协商结果确定后不再改变
+    client._negotiate_wire("1")
+    assert client.wire_format == "json"
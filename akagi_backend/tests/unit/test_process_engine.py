@@ -0,0 +1,237 @@
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from akagi_ng.mjai_bot.engine import process
+from akagi_ng.mjai_bot.engine.base import BaseEngine
+from akagi_ng.mjai_bot.engine.process import ProcessEngine, SlotLayout, WorkerUnavailableError
+
+IN_CHANNELS = 2
+ACTION_SPACE = 4
+
+
+class EchoEngine(BaseEngine):
+    """按观测首元素返回动作的假引擎，Q 值为动作编号"""
+
+    def __init__(self, name: str = "echo"):
+        super().__init__(is_3p=False, version=4, name=name)
+        self.engine_type = "mortal"
+        self.in_channels = IN_CHANNELS
+        self.action_space = ACTION_SPACE
+        self.calls = 0
+        self.released = 0
+
+    def react_batch(self, obs, masks, invisible_obs):
+        self.calls += 1
+        actions = [int(o[0, 0]) for o in obs]
+        q_out = [[float(a)] * ACTION_SPACE for a in actions]
+        return actions, q_out, np.asarray(masks).tolist(), [True] * len(obs)
+
+    def precompute(self, obs, masks):
+        return True
+
+    def release(self):
+        self.released += 1
+
+    def get_additional_meta(self):
+        return {"precision": "fp32", "engine": self.name}
+
+
+def load_echo_engine() -> BaseEngine:
+    """子进程中构造假引擎（需为模块级函数以便 spawn 时 pickle）"""
+    return EchoEngine(name="child")
+
+
+def load_named_engine(model_path: str, _is_3p: bool) -> BaseEngine:
+    """以模型文件名命名的假引擎，用于验证模型切换"""
+    return EchoEngine(name=Path(model_path).stem)
+
+
+def load_nothing() -> None:
+    return None
+
+
+def _request(*actions: int):
+    obs = np.stack([np.full((IN_CHANNELS, 34), a, dtype=np.float32) for a in actions])
+    masks = np.ones((len(actions), ACTION_SPACE), dtype=bool)
+    return obs, masks
+
+
+@pytest.fixture
+def fallback():
+    return EchoEngine(name="fallback")
+
+
+@pytest.fixture
+def engine(fallback):
+    engine = ProcessEngine(Path("mortal.pth"), False, fallback, max_batch_size=2, engine_loader=load_echo_engine)
+    engine.start(wait=True)
+    yield engine
+    engine.shutdown()
+
+
+def _wait_for_worker(engine: ProcessEngine, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while engine.using_fallback:
+        assert time.monotonic() < deadline, "inference worker did not restart"
+        time.sleep(0.05)
+
+
+def _wait_for_release(fallback: EchoEngine, count: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while fallback.released < count:
+        assert time.monotonic() < deadline, "fallback engine was not released"
+        time.sleep(0.01)
+
+
+def test_slot_layout_views_do_not_overlap() -> None:
+    """测试共享内存槽位视图按对齐偏移排列，互不重叠。"""
+    layout = SlotLayout(slots=2, max_batch=3, in_channels=IN_CHANNELS, action_space=ACTION_SPACE)
+    buf = memoryview(bytearray(layout.total_nbytes))
+    first, second = layout.views(buf, 0), layout.views(buf, 1)
+
+    first["obs"][:] = 1
+    first["q_out"][:] = 2
+    assert not second["obs"].any()
+    assert not first["masks"].any()
+    assert first["obs"].shape == (3, IN_CHANNELS, 34)
+    assert layout.slot_nbytes % 64 == 0
+
+
+def test_react_batch_runs_in_worker_process(engine, fallback) -> None:
+    """测试推理经共享内存在子进程执行，超过槽位容量的批被拆分。"""
+    obs, masks = _request(3, 1, 2)
+    actions, q_out, clean_masks, is_greedy = engine.react_batch(obs, masks, None)
+
+    assert actions == [3, 1, 2]
+    assert q_out[0] == [3.0] * ACTION_SPACE
+    assert clean_masks == masks.tolist()
+    assert is_greedy == [True] * 3
+    assert fallback.calls == 0
+    meta = engine.get_additional_meta()
+    assert meta["engine"] == "child"
+    assert meta["inference_process"] is True
+    assert engine.precompute(obs, masks) is True
+
+
+def test_first_decision_does_not_wait_for_worker_startup(fallback) -> None:
+    """测试子进程尚未就绪时决策立即由进程内引擎处理，子进程在后台启动。"""
+    engine = ProcessEngine(Path("mortal.pth"), False, fallback, engine_loader=load_echo_engine)
+    try:
+        obs, masks = _request(2)
+        start = time.monotonic()
+        assert engine.react_batch(obs, masks, None)[0] == [2]
+        assert time.monotonic() - start < 1.0
+        assert fallback.calls == 1
+        assert engine.get_additional_meta()["inference_process"] is False
+
+        _wait_for_worker(engine)
+        engine.react_batch(obs, masks, None)
+        assert fallback.calls == 1
+        # 子进程就绪后释放进程内引擎加载的模型
+        _wait_for_release(fallback, 1)
+    finally:
+        engine.shutdown()
+
+
+def test_worker_crash_falls_back_and_restarts(engine, fallback) -> None:
+    """测试子进程崩溃后立即回退到进程内推理，并在后台重启子进程。"""
+    obs, masks = _request(1)
+    engine.react_batch(obs, masks, None)
+    crashed = engine._worker
+    crashed.process.kill()
+    crashed.process.join(timeout=10)
+    crashed._reader.join(timeout=10)
+
+    with patch.object(process, "RESTART_BACKOFF_SECONDS", 0):
+        assert engine.react_batch(obs, masks, None)[0] == [1]
+        assert fallback.calls == 1
+        assert engine.get_additional_meta()["inference_process"] is False
+
+        _wait_for_worker(engine)
+    assert engine._worker is not crashed
+    engine.react_batch(obs, masks, None)
+    assert fallback.calls == 1
+    # 首次启动与重启后各释放一次进程内引擎
+    _wait_for_release(fallback, 2)
+
+
+def test_worker_load_failure_gives_up_after_max_restarts(fallback) -> None:
+    """测试子进程反复启动失败时停止重启，始终使用进程内推理。"""
+    engine = ProcessEngine(Path("mortal.pth"), False, fallback, engine_loader=load_nothing)
+    obs, masks = _request(2)
+    with (
+        patch.object(process, "RESTART_BACKOFF_SECONDS", 0),
+        patch.object(process, "_WorkerHandle", side_effect=WorkerUnavailableError("boom")) as mock_worker,
+    ):
+        for _ in range(process.MAX_RESTARTS + 1):
+            engine.start(wait=True)
+        assert engine._gave_up is True
+
+        # 放弃重启后请求直接由进程内引擎处理，不再尝试启动子进程
+        assert engine.react_batch(obs, masks, None)[0] == [2]
+
+    assert mock_worker.call_count == process.MAX_RESTARTS + 1
+    assert fallback.calls == 1
+
+
+def test_sync_mode_skips_worker(fallback) -> None:
+    """测试同步快进模式不启动子进程，直接返回最低合法动作。"""
+    engine = ProcessEngine(Path("mortal.pth"), False, fallback, engine_loader=load_echo_engine)
+    engine.set_sync_mode(True)
+    masks = np.array([[False, False, True, True]])
+
+    with patch.object(process, "_WorkerHandle") as mock_worker:
+        actions, q_out, _, _ = engine.react_batch(np.zeros((1, IN_CHANNELS, 34)), masks, None)
+
+    assert actions == [2]
+    assert q_out == [[0.0] * ACTION_SPACE]
+    assert fallback.is_sync_mode
+    mock_worker.assert_not_called()
+
+
+def test_switch_model_replaces_worker_between_requests(engine, fallback) -> None:
+    """测试切换模型时新子进程就绪后才替换，旧子进程随后关闭，请求不中断。"""
+    obs, masks = _request(1)
+    engine.react_batch(obs, masks, None)
+    old = engine._worker
+
+    with patch.object(process, "load_worker_engine", load_named_engine):
+        assert engine.switch_model(Path("second.pth")) is True
+
+    assert engine._worker is not old
+    assert not old.alive
+    assert engine.model_path == Path("second.pth")
+    assert engine.react_batch(obs, masks, None)[0] == [1]
+    assert engine.get_additional_meta()["engine"] == "second"
+    assert fallback.calls == 0
+
+
+def test_worker_call_returns_copies_not_slot_views(engine) -> None:
+    """测试推理结果在归还槽位前复制，之后其他请求覆盖槽位不影响已返回的结果。"""
+    engine.react_batch(*_request(1), None)
+    worker = engine._worker
+    outputs, _ = worker.call("react", *_request(3, 2))
+
+    for view in worker.views:
+        for name in ("actions", "q_out", "is_greedy"):
+            assert not np.shares_memory(outputs[name], view[name])
+    worker.call("react", *_request(1, 1))
+    assert outputs["actions"].tolist() == [3, 2]
+
+
+def test_profile_capture_is_forwarded_to_worker(engine, fallback) -> None:
+    """测试性能采集请求转发到子进程中的采集器，子进程不可用时由进程内采集器处理。"""
+    assert engine.request_profile(3) == 3
+    assert engine.get_profile_status()["pending"] == 3
+
+    with patch("akagi_ng.mjai_bot.engine.profiling.decision_profiler._remotes", {engine}):
+        status = process.decision_profiler.get_status()
+    assert status["pending"] >= 3
+
+    engine.shutdown()
+    assert engine.request_profile(1) is None
+    assert engine.get_profile_status() is None
@@ -0,0 +1,61 @@
+import numpy as np
+
+from akagi_ng.mjai_bot.engine.q_cache import CachedDecision, QValueCache
+
+ACTION_SPACE = 46
+
+
+def _entry(action: int = 0) -> CachedDecision:
+    return CachedDecision(
+        action=action,
+        q_out=np.zeros(ACTION_SPACE, dtype=np.float32),
+        masks=np.ones(ACTION_SPACE, dtype=bool),
+    )
+
+
+def _key(value: float, mask_bit: bool = True) -> bytes:
+    obs = np.full((4, 34), value, dtype=np.float32)
+    masks = np.zeros(ACTION_SPACE, dtype=bool)
+    masks[0] = mask_bit
+    return QValueCache.make_key(obs, masks, None)
+
+
+def test_make_key_depends_on_obs_mask_and_tag() -> None:
+    """测试摘要同时覆盖观测、掩码与推理配置标签。"""
+    assert _key(1.0) == _key(1.0)
+    assert _key(1.0) != _key(0.0)
+    assert _key(1.0) != _key(1.0, mask_bit=False)
+
+    obs = np.ones((4, 34), dtype=np.float32)
+    masks = np.ones(ACTION_SPACE, dtype=bool)
+    assert QValueCache.make_key(obs, masks, None, "fp32") != QValueCache.make_key(obs, masks, None, "bf16")
+
+
+def test_hit_and_miss_counters() -> None:
+    """测试命中与未命中计数。"""
+    cache = QValueCache(max_bytes=1 << 20)
+    assert cache.get(_key(1.0)) is None
+    cache.put(_key(1.0), _entry(3))
+    assert cache.get(_key(1.0)).action == 3
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.clear()
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_lru_eviction_respects_memory_budget() -> None:
+    """测试超出内存预算时淘汰最久未使用的条目。"""
+    entry_bytes = _entry().nbytes
+    cache = QValueCache(max_bytes=entry_bytes * 2)
+    cache.put(_key(1.0), _entry(1))
+    cache.put(_key(2.0), _entry(2))
+    # 访问 1.0 使 2.0 成为最久未使用
+    assert cache.get(_key(1.0)) is not None
+    cache.put(_key(3.0), _entry(3))
+
+    assert len(cache) == 2
+    assert cache.size_bytes <= cache.max_bytes
+    assert cache.get(_key(2.0)) is None
+    assert cache.get(_key(1.0)) is not None
+    assert cache.get(_key(3.0)) is not None
@@ -80,7 +80,7 @@ class TestRiichiLookahead(unittest.TestCase):
         sim_engine = MagicMock()
         self.model_loader.return_value = (sim_bot, sim_engine)
 
-        self.bot.history_json = ['{"type":"discard","tile":"1m"}']
+        self.bot.state.history_json = ['{"type":"discard","tile":"1m"}']
         self.bot.game_start_event = {"type": "start_game", "id": 0}
         self.bot.is_3p = True
 
@@ -0,0 +1,160 @@
+import asyncio
+import gzip
+import json
+import threading
+
+import numpy as np
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from akagi_ng.mjai_bot.engine import ot_wire
+from akagi_ng.mjai_bot.engine.akagi_ot import AkagiOTClient
+from akagi_ng.mjai_bot.engine.base import BaseEngine
+from akagi_ng.serve import InferenceServer, KeyLimiter, LatencyHistogram
+
+ACTION_SPACE = 5
+
+
+class EchoEngine(BaseEngine):
+    """按观测首元素返回动作的假引擎，记录每次前向的批大小；设置 gate 后推理阻塞"""
+
+    def __init__(self):
+        super().__init__(is_3p=False, version=4, name="echo")
+        self.batch_sizes: list[int] = []
+        self.gate: threading.Event | None = None
+        self.entered = threading.Event()
+
+    def react_batch(self, obs, masks, invisible_obs):
+        self.entered.set()
+        if self.gate is not None:
+            self.gate.wait(timeout=5)
+        self.batch_sizes.append(len(obs))
+        actions = [int(o[0, 0]) for o in obs]
+        q_out = [[float(a)] * ACTION_SPACE for a in actions]
+        return actions, q_out, np.asarray(masks).tolist(), [True] * len(obs)
+
+
+def _payload(*actions: int) -> tuple[np.ndarray, np.ndarray]:
+    obs = np.stack([np.full((3, 34), a, dtype=np.float32) for a in actions])
+    return obs, np.ones((len(actions), ACTION_SPACE), dtype=bool)
+
+
+def _gzip_json(obs: np.ndarray, masks: np.ndarray) -> bytes:
+    return gzip.compress(json.dumps({"obs": obs.tolist(), "masks": masks.tolist()}).encode())
+
+
+@pytest.fixture
+def engine():
+    return EchoEngine()
+
+
+@pytest.fixture
+async def make_client(engine):
+    clients = []
+
+    async def _make(**kwargs):
+        server = InferenceServer({False: engine}, **kwargs)
+        client = TestClient(TestServer(server.create_app()))
+        await client.start_server()
+        clients.append(client)
+        return client, server
+
+    yield _make
+    for client in clients:
+        await client.close()
+
+
+async def test_gzip_json_contract(make_client) -> None:
+    """测试与 AkagiOTClient 相同的 gzip JSON 请求/响应格式，并声明二进制格式支持。"""
+    cli, _ = await make_client(batch_window_ms=0)
+    obs, masks = _payload(3, 1)
+
+    resp = await cli.post("/react_batch", data=_gzip_json(obs, masks), headers={"Content-Encoding": "gzip"})
+
+    assert resp.status == 200
+    assert resp.headers[ot_wire.WIRE_HEADER] == str(ot_wire.WIRE_VERSION)
+    data = await resp.json()
+    assert data["actions"] == [3, 1]
+    assert data["masks"] == masks.tolist()
+    # 未加载三麻模型
+    assert (await cli.post("/react_batch_3p", data=_gzip_json(obs, masks))).status == 503
+
+
+async def test_binary_wire_format(make_client) -> None:
+    """测试二进制请求返回指定精度的二进制响应。"""
+    cli, _ = await make_client(batch_window_ms=0, q_dtype="float16")
+    obs, masks = _payload(2)
+
+    resp = await cli.post(
+        "/react_batch", data=ot_wire.encode_request(obs, masks), headers={"Content-Type": ot_wire.CONTENT_TYPE}
+    )
+
+    decoded = ot_wire.decode_response(await resp.read())
+    assert decoded.actions == [2]
+    assert decoded.q_out == [[2.0] * ACTION_SPACE]
+
+
+async def test_concurrent_requests_are_batched(make_client, engine) -> None:
+    """测试不同连接的并发请求合并为一次前向计算，并计入延迟直方图。"""
+    cli, _ = await make_client(batch_window_ms=200, max_batch_size=3, max_concurrency=8)
+
+    responses = await asyncio.gather(*(cli.post("/react_batch", data=_gzip_json(*_payload(a))) for a in range(3)))
+
+    assert sorted([(await r.json())["actions"][0] for r in responses]) == [0, 1, 2]
+    assert engine.batch_sizes == [3]
+    stats = await (await cli.get("/stats")).json()
+    assert stats["endpoints"]["/react_batch"]["count"] == 3
+    assert stats["batching"]["4p"]["max_batch_rows"] == 3
+
+
+async def test_auth_and_per_key_concurrency(make_client, engine) -> None:
+    """测试未授权请求被拒绝，单个 Key 超出并发上限时返回 429。"""
+    cli, _ = await make_client(api_keys={"alice", "bob"}, max_concurrency=1, batch_window_ms=0)
+    body = _gzip_json(*_payload(1))
+    assert (await cli.post("/react_batch", data=body, headers={"Authorization": "eve"})).status == 401
+
+    engine.gate = threading.Event()
+    first = asyncio.ensure_future(cli.post("/react_batch", data=body, headers={"Authorization": "alice"}))
+    # 等待第一个请求进入推理
+    while not engine.entered.is_set():
+        await asyncio.sleep(0.01)
+
+    rejected = await cli.post("/react_batch", data=body, headers={"Authorization": "alice"})
+    engine.gate.set()
+    other_key = await cli.post("/react_batch", data=body, headers={"Authorization": "bob"})
+
+    assert rejected.status == 429
+    assert (await first).status == 200
+    assert other_key.status == 200
+    stats = await (await cli.get("/stats")).json()
+    assert stats["rejected"] == {"alice": 1}
+
+
+async def test_akagi_ot_client_round_trip(make_client) -> None:
+    """测试真实 AkagiOTClient 经健康探测协商后以二进制格式调用本服务。"""
+    cli, _ = await make_client(batch_window_ms=0)
+    client = AkagiOTClient(str(cli.make_url("")), "key")
+    obs, masks = _payload(4)
+
+    while client.wire_format is None:
+        await asyncio.sleep(0.01)
+    result = await asyncio.get_running_loop().run_in_executor(None, client.predict, False, obs, masks)
+    client.session.close()
+
+    assert client.wire_format == "binary"
+    assert result["actions"] == [4]
+
+
+def test_latency_histogram_and_limiter() -> None:
+    """测试直方图按桶上界计数，限流器按 Key 独立计数。"""
+    hist = LatencyHistogram(buckets=(10, 100))
+    for ms in (5, 10, 50, 500):
+        hist.record(ms)
+    assert hist.to_dict()["buckets"] == {"le_10ms": 2, "le_100ms": 1, "inf": 1}
+
+    limiter = KeyLimiter(max_concurrency=1)
+    assert limiter.try_acquire("a") is True
+    assert limiter.try_acquire("a") is False
+    assert limiter.try_acquire("b") is True
+    limiter.release("a")
+    assert limiter.try_acquire("a") is True
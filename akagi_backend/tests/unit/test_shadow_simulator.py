@@ -0,0 +1,109 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from akagi_ng.mjai_bot.mortal.shadow import ShadowSimulator
+
+REACH = '{"type":"reach","actor":0}'
+SIM_META = {"q_values": [1.0], "mask_bits": 1}
+
+
+@pytest.fixture
+def bots():
+    """按创建顺序记录 model_loader 创建的影子 Bot"""
+    return []
+
+
+@pytest.fixture
+def model_loader(bots):
+    def build(_player_id, _is_3p):
+        bot = MagicMock()
+        bot.react.side_effect = lambda e: json.dumps({"type": "none", "meta": SIM_META}) if e == REACH else None
+        bots.append(bot)
+        return bot, MagicMock()
+
+    return MagicMock(side_effect=build)
+
+
+@pytest.fixture
+def shadow(model_loader):
+    return ShadowSimulator(model_loader, player_id=0, is_3p=False)
+
+
+def test_lookahead_feeds_only_new_events(model_loader, bots, shadow) -> None:
+    """测试影子 Bot 只增量喂入新事件，不重复回放历史。"""
+    history = ['{"type":"start_kyoku"}', '{"type":"tsumo","actor":0}']
+
+    assert shadow.lookahead(history) == SIM_META
+    # 真实对局中玩家选择立直，影子 Bot 仍然有效
+    history += [REACH, '{"type":"dahai","actor":0}', '{"type":"tsumo","actor":1}']
+    assert shadow.lookahead(history) == SIM_META
+
+    assert model_loader.call_count == 1
+    fed = [c.args[0] for c in bots[0].react.call_args_list]
+    assert fed == [
+        '{"type":"start_kyoku"}',
+        '{"type":"tsumo","actor":0}',
+        REACH,
+        '{"type":"dahai","actor":0}',
+        '{"type":"tsumo","actor":1}',
+        REACH,
+    ]
+
+
+def test_lookahead_is_memoized_per_decision(model_loader, bots, shadow) -> None:
+    """测试同一决策点的前瞻只执行一次。"""
+    history = ['{"type":"start_kyoku"}', '{"type":"tsumo","actor":0}']
+
+    assert shadow.lookahead(history) == SIM_META
+    assert shadow.lookahead(history) == SIM_META
+
+    reach_calls = [c for c in bots[0].react.call_args_list if c.args[0] == REACH]
+    assert len(reach_calls) == 1
+
+
+def test_diverged_shadow_is_rebuilt_when_idle(model_loader, bots, shadow) -> None:
+    """测试玩家未立直时影子 Bot 失效，并在空闲时重建。"""
+    history = ['{"type":"start_kyoku"}', '{"type":"tsumo","actor":0}']
+    shadow.lookahead(history)
+
+    history.append('{"type":"dahai","actor":0}')
+    shadow.prepare(history)
+
+    assert model_loader.call_count == 2
+    assert [c.args[0] for c in bots[1].react.call_args_list] == history
+
+    # 重建后的影子 Bot 已同步，下一次前瞻无需再次回放
+    history.append('{"type":"tsumo","actor":0}')
+    shadow.lookahead(history)
+    assert model_loader.call_count == 2
+    assert [c.args[0] for c in bots[1].react.call_args_list][-2:] == ['{"type":"tsumo","actor":0}', REACH]
+
+
+def test_new_kyoku_reuses_shadow(model_loader, shadow) -> None:
+    """测试新的一局开始时复用影子 Bot（start_kyoku 会重置牌局状态）。"""
+    shadow.lookahead(['{"type":"start_kyoku"}', '{"type":"tsumo","actor":0}'])
+    shadow.lookahead(['{"type":"start_kyoku"}', '{"type":"tsumo","actor":0}'])
+
+    assert model_loader.call_count == 1
+
+
+def test_lookahead_3p_replays_start_game_on_build(model_loader, bots) -> None:
+    """测试三麻影子 Bot 创建时先回放 start_game。"""
+    shadow = ShadowSimulator(model_loader, player_id=0, is_3p=True, game_start_event={"type": "start_game", "id": 0})
+    shadow.lookahead(['{"type":"start_kyoku"}'])
+
+    assert bots[0].react.call_args_list[0].args[0] == '{"type":"start_game","id":0}'
+
+
+def test_lookahead_failure_invalidates_shadow(model_loader, shadow) -> None:
+    """测试模拟失败时丢弃影子 Bot。"""
+    model_loader.side_effect = None
+    bot = MagicMock()
+    bot.react.side_effect = RuntimeError("boom")
+    model_loader.return_value = (bot, MagicMock())
+
+    with pytest.raises(RuntimeError, match="boom"):
+        shadow.lookahead(['{"type":"start_kyoku"}'])
+    assert shadow._bot is None
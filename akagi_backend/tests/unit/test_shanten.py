@@ -0,0 +1,106 @@
+import random
+
+import pytest
+from mjai.bot.tools import calc_shanten as reference_shanten
+
+from akagi_ng.mjai_bot.shanten import TILES_34, analyze_hand, calc_shanten, tiles_to_counts
+
+
+def _counts(hand: str) -> list[int]:
+    """把 123m456p11z 形式的手牌转为 vec34"""
+    tiles = []
+    digits = ""
+    for ch in hand:
+        if ch.isdigit():
+            digits += ch
+            continue
+        for d in digits:
+            tiles.append(TILES_34[27 + int(d) - 1] if ch == "z" else f"{d}{ch}")
+        digits = ""
+    return tiles_to_counts(tiles)
+
+
+def _short(counts: list[int]) -> str:
+    out = ""
+    for start, suit, size in ((0, "m", 9), (9, "p", 9), (18, "s", 9), (27, "z", 7)):
+        part = "".join(str(i + 1) * counts[start + i] for i in range(size))
+        if part:
+            out += part + suit
+    return out
+
+
+@pytest.mark.parametrize(
+    ("hand", "expected"),
+    [
+        ("123m456p789s1122z", 0),
+        ("123m456p789s11222z", -1),
+        ("1199m1199p1199s1z", 0),
+        ("19m19p19s1234567z", 0),
+        ("19m19p19s12345677z", -1),
+        ("147m258p369s1234z", 6),
+        ("2m", 0),
+        ("22m", -1),
+        ("123m5p", 0),
+        ("13m", 0),
+    ],
+)
+def test_calc_shanten(hand, expected) -> None:
+    """测试一般形、七对子、国士无双及副露后手牌张数的向听数。"""
+    assert calc_shanten(_counts(hand)) == expected
+
+
+def test_chiitoi_does_not_count_quad_as_two_pairs() -> None:
+    """测试同种 4 枚不能当作两个对子。"""
+    assert calc_shanten(_counts("1111m2233p4455s6z")) > 0
+
+
+def test_ukeire_of_tenpai_hand() -> None:
+    """测试两面听牌的进张，扣除可见牌。"""
+    counts = _counts("123m456p789s23s11z")
+    analysis = analyze_hand(counts)
+    assert analysis.shanten == 0
+    assert analysis.improving_tiles == ["1s", "4s"]
+    assert analysis.ukeire == 8
+
+    visible = counts.copy()
+    visible[TILES_34.index("1s")] = 3
+    assert analyze_hand(counts, visible).ukeire == 5
+
+
+def test_ukeire_excludes_fifth_copy() -> None:
+    """测试 4 枚用尽时不能再听同种牌：1111m 为一向听，摸入其余任意牌均可单骑听牌。"""
+    analysis = analyze_hand(_counts("1111m"))
+    assert analysis.shanten == 1
+    assert "1m" not in analysis.improving_tiles
+    assert analysis.ukeire == 33 * 4
+
+
+def test_analyze_hand_discard_options() -> None:
+    """测试 14 张手牌一次给出所有打牌选择，并按向听数与进张排序。"""
+    analysis = analyze_hand(_counts("123m456p789s23s117z"))
+    assert len(analysis.discards) == 13
+    best = analysis.discards[0]
+    assert (best.tile, best.shanten, best.ukeire) == ("C", 0, 8)
+    assert analysis.shanten == best.shanten
+    assert analysis.ukeire == best.ukeire
+    assert all(
+        (a.shanten, -a.ukeire) <= (b.shanten, -b.ukeire)
+        for a, b in zip(analysis.discards, analysis.discards[1:], strict=False)
+    )
+
+
+def test_matches_reference_shanten() -> None:
+    """测试随机手牌（不含 3 枚以上同种牌）的向听数与 mjai 实现一致。"""
+    rng = random.Random(0)
+    checked = 0
+    while checked < 300:
+        size = rng.choice((13, 14))
+        kinds = rng.sample(range(34), rng.randint(6, 20))
+        pool = [t for t in kinds for _ in range(2)]
+        if len(pool) < size:
+            continue
+        counts = [0] * 34
+        for t in rng.sample(pool, size):
+            counts[t] += 1
+        assert calc_shanten(counts) == reference_shanten(_short(counts)), _short(counts)
+        checked += 1
@@ -0,0 +1,315 @@
+import json
+import threading
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from akagi_ng.mjai_bot.engine.executor import inference_executor
+from akagi_ng.mjai_bot.mortal.speculation import (
+    DRAW_CANDIDATES_3P,
+    DRAW_CANDIDATES_4P,
+    PRECOMPUTE_CHUNK,
+    TsumoSpeculator,
+    _RecordingEngine,
+    likely_draws,
+    own_hand,
+    plausible_draws,
+)
+
+PLAYER_ID = 1
+ACTION_SPACE = 4
+
+
+def _start_kyoku(tehai: list[str] | None = None) -> dict:
+    tehais = [["?"] * 13 for _ in range(4)]
+    tehais[PLAYER_ID] = tehai or ["?"] * 13
+    return {"type": "start_kyoku", "dora_marker": "1m", "tehais": tehais}
+
+
+class FakeBot:
+    """收到自家 tsumo 时以摸到的牌构造观测调用引擎，模拟 libriichi Bot 的决策请求"""
+
+    def __init__(self, engine, player_id):
+        self.engine = engine
+        self.player_id = player_id
+        self.events = []
+
+    def react(self, e_json: str):
+        self.events.append(e_json)
+        e = json.loads(e_json)
+        if e["type"] == "tsumo" and e["actor"] == self.player_id:
+            index = DRAW_CANDIDATES_4P.index(e["pai"])
+            obs = np.full((1, 2, 34), index, dtype=np.float32)
+            self.engine.react_batch(obs, np.ones((1, ACTION_SPACE), dtype=bool), None)
+
+
+@pytest.fixture
+def engine():
+    engine = MagicMock()
+    engine.is_3p = False
+    engine.version = 4
+    engine.is_oracle = False
+    engine.precompute.return_value = True
+    return engine
+
+
+@pytest.fixture
+def bots():
+    return []
+
+
+@pytest.fixture
+def speculator(engine, bots):
+    def build(recording_engine, player_id):
+        bot = FakeBot(recording_engine, player_id)
+        bots.append(bot)
+        return bot
+
+    return TsumoSpeculator(build, engine, PLAYER_ID, is_3p=False)
+
+
+def _kamicha_discard(speculator, pai: str = "9s"):
+    history = [_start_kyoku(), {"type": "dahai", "actor": 0, "pai": pai, "tsumogiri": True}]
+    speculator.maybe_start(history, [json.dumps(e) for e in history])
+    return history
+
+
+def test_candidates_cover_all_tile_kinds() -> None:
+    """测试候选摸牌覆盖 34 种牌与赤宝牌，三麻排除 2m-8m。"""
+    assert len(DRAW_CANDIDATES_4P) == 37
+    assert len(DRAW_CANDIDATES_3P) == 29
+    assert "5mr" not in DRAW_CANDIDATES_3P
+    assert plausible_draws([_start_kyoku()], PLAYER_ID, is_3p=False) == DRAW_CANDIDATES_4P
+
+
+def test_plausible_draws_exclude_exhausted_tiles() -> None:
+    """测试四枚均已可见的牌种与已见过的赤宝牌被排除。"""
+    history = [
+        _start_kyoku(["E", "E", "5pr", "1s", "2s", "3s", "4s", "6s", "7s", "8s", "9s", "9s", "9s"]),
+        {"type": "dahai", "actor": 2, "pai": "E", "tsumogiri": False},
+        {"type": "pon", "actor": 3, "target": 0, "pai": "9s", "consumed": ["5p", "5p"]},
+    ]
+    history.insert(2, {"type": "dahai", "actor": 0, "pai": "9s", "tsumogiri": False})
+    draws = plausible_draws(history, PLAYER_ID, is_3p=False)
+
+    assert "E" in draws
+    assert "9s" not in draws
+    assert "5pr" not in draws
+    # 5p 只见过三枚（含赤），仍可能摸到
+    assert "5p" in draws
+
+    history.append({"type": "dahai", "actor": 0, "pai": "E", "tsumogiri": True})
+    assert "E" not in plausible_draws(history, PLAYER_ID, is_3p=False)
+
+
+def test_recording_engine_records_only_outside_sync(engine) -> None:
+    """测试推测引擎只记录非同步请求的观测，且不影响被包装引擎的同步状态。"""
+    recording = _RecordingEngine(engine)
+    obs = np.ones((1, 2, 34), dtype=np.float32)
+    masks = np.array([[False, True, True, False]])
+
+    recording.set_sync_mode(True)
+    recording.react_batch(obs, masks, None)
+    assert recording.recorded is None
+
+    recording.set_sync_mode(False)
+    actions, _, _, _ = recording.react_batch(obs, masks, None)
+    assert actions == [1]
+    assert recording.recorded[0].shape == (2, 34)
+    engine.set_sync_mode.assert_not_called()
+    engine.react_batch.assert_not_called()
+
+
+def test_own_hand_follows_draws_discards_and_calls() -> None:
+    """测试从本局事件还原自家手牌。"""
+    history = [
+        _start_kyoku(["1m", "2m", "3m", "5pr", "5p", "5p", "E", "E", "?", "?", "?", "?", "?"]),
+        {"type": "tsumo", "actor": PLAYER_ID, "pai": "4m"},
+        {"type": "dahai", "actor": PLAYER_ID, "pai": "1m", "tsumogiri": False},
+        {"type": "dahai", "actor": 2, "pai": "E", "tsumogiri": True},
+        {"type": "pon", "actor": PLAYER_ID, "target": 2, "pai": "E", "consumed": ["E", "E"]},
+    ]
+    assert own_hand(history, PLAYER_ID) == {"2m": 1, "3m": 1, "4m": 1, "5p": 3}
+
+
+def test_likely_draws_rank_by_remaining_copies_then_hand_shape() -> None:
+    """测试假设摸牌按剩余枚数排序，枚数相同时优先与手牌相连的牌，而不是候选顺序。"""
+    history = [_start_kyoku(["2m", "2m", "3m", "7s", "?", "?", "?", "?", "?", "?", "?", "?", "?"])]
+    draws = likely_draws(history, PLAYER_ID, is_3p=False)
+
+    assert sorted(draws) == sorted(DRAW_CANDIDATES_4P)
+    # 剩余 4 枚的牌中，与 2m2m3m 相连的 4m 最先，其次是与 7s 相连的牌
+    assert draws[:4] == ["4m", "6s", "8s", "9s"]
+    # 赤宝牌只有一枚，排在最后；未见赤 5 时普通 5 只剩三枚
+    assert set(draws[-3:]) == {"5mr", "5pr", "5sr"}
+    assert draws.index("5p") > draws.index("4p")
+    assert likely_draws(history, PLAYER_ID, is_3p=False, limit=4) == draws[:4]
+
+
+def test_speculation_precomputes_all_plausible_draws_in_chunks(engine, bots, speculator) -> None:
+    """测试上家打牌后为所有可能的摸牌施加假设，按概率顺序分批预计算。"""
+    history = _kamicha_discard(speculator)
+    speculator._thread.join(timeout=10)
+
+    expected = likely_draws(history, PLAYER_ID, is_3p=False)
+    assert len(bots) == len(expected)
+    assert bots[0].events[:2] == [json.dumps(e) for e in history]
+    batches = [call.args for call in engine.precompute.call_args_list]
+    assert [obs.shape[0] for obs, _ in batches] == [PRECOMPUTE_CHUNK] * 4 + [len(expected) - 4 * PRECOMPUTE_CHUNK]
+    first_obs, first_masks = batches[0]
+    assert first_masks.shape == (PRECOMPUTE_CHUNK, ACTION_SPACE)
+    # FakeBot 以摸牌在候选中的序号构造观测
+    assert [int(o[0, 0]) for o in first_obs] == [DRAW_CANDIDATES_4P.index(t) for t in expected[:PRECOMPUTE_CHUNK]]
+
+    speculator.observe({"type": "tsumo", "actor": PLAYER_ID, "pai": expected[-1]})
+    stats = speculator.get_stats()
+    assert stats["hits"] == 1
+    assert stats["hit_rate"] == 1.0
+    assert stats["avg_hypotheses"] == len(expected)
+
+
+def test_hypothesis_bots_follow_game_incrementally(engine, bots, speculator) -> None:
+    """测试推测 Bot 跨巡复用：命中的 Bot 只喂入新事件，未命中的 Bot 才重新回放，回放开销计入统计。"""
+    # 与主 Bot 一样，同一局内事件列表只追加
+    history = [_start_kyoku(), {"type": "dahai", "actor": 0, "pai": "9s", "tsumogiri": True}]
+    history_json = [json.dumps(e) for e in history]
+    speculator.maybe_start(history, history_json)
+    speculator._thread.join(timeout=10)
+    draws = likely_draws(history, PLAYER_ID, is_3p=False)
+    hit = draws[1]
+    hit_bot = bots[1]
+    assert speculator.stats.replayed_events == 0
+
+    new_events = [
+        {"type": "tsumo", "actor": PLAYER_ID, "pai": hit},
+        {"type": "dahai", "actor": PLAYER_ID, "pai": hit, "tsumogiri": True},
+        {"type": "tsumo", "actor": 2, "pai": "?"},
+        {"type": "dahai", "actor": 2, "pai": "1p", "tsumogiri": True},
+        {"type": "tsumo", "actor": 3, "pai": "?"},
+        {"type": "dahai", "actor": 3, "pai": "2p", "tsumogiri": True},
+        {"type": "tsumo", "actor": 0, "pai": "?"},
+        {"type": "dahai", "actor": 0, "pai": "3p", "tsumogiri": True},
+    ]
+    speculator.observe(new_events[0])
+    history.extend(new_events)
+    history_json.extend(json.dumps(e) for e in new_events)
+    speculator.maybe_start(history, history_json)
+    speculator._thread.join(timeout=10)
+
+    assert len(bots) == len(draws) + len(likely_draws(history, PLAYER_ID, is_3p=False)) - 1
+    assert hit_bot in [h.bot for h in speculator._hypothesis_bots]
+    # 命中的 Bot：初始 2 个事件 + 假设摸牌，之后只喂入摸牌之后的 7 个新事件再施加一次假设
+    assert len(hit_bot.events) == 3 + 7 + 1
+    # 其余 Bot 各自从头回放 10 个事件
+    assert speculator.stats.replayed_events == (len(draws) - 1) * len(history)
+    assert speculator.get_stats()["replay_ms_per_speculation"] >= 0
+
+
+def test_cancelled_speculation_keeps_finished_chunks(engine) -> None:
+    """测试推测中途作废时，已预计算的高概率摸牌仍然计为命中。"""
+    gate = threading.Event()
+    first_chunk = threading.Event()
+    built = []
+
+    def build(recording_engine, player_id):
+        if len(built) == PRECOMPUTE_CHUNK:
+            gate.wait(timeout=10)
+        built.append(None)
+        return FakeBot(recording_engine, player_id)
+
+    engine.precompute.side_effect = lambda *_: first_chunk.set() or True
+    speculator = TsumoSpeculator(build, engine, PLAYER_ID, is_3p=False)
+    history = _kamicha_discard(speculator)
+    assert first_chunk.wait(timeout=10)
+    speculator.observe({"type": "tsumo", "actor": PLAYER_ID, "pai": likely_draws(history, PLAYER_ID, False)[0]})
+    gate.set()
+    speculator._thread.join(timeout=10)
+
+    assert engine.precompute.call_count == 1
+    assert speculator.stats.hits == 1
+
+
+def test_speculation_waits_for_real_decision(engine, speculator) -> None:
+    """测试真实决策进行中时推测不推进，作废后不再预计算。"""
+    inference_executor._begin()
+    try:
+        _kamicha_discard(speculator)
+        speculator._thread.join(timeout=0.2)
+        assert speculator._thread.is_alive()
+        engine.precompute.assert_not_called()
+        speculator.observe({"type": "tsumo", "actor": PLAYER_ID, "pai": "1m"})
+    finally:
+        inference_executor._end()
+    speculator._thread.join(timeout=10)
+
+    engine.precompute.assert_not_called()
+    assert speculator.stats.misses == 1
+
+
+def test_other_event_cancels_speculation(engine) -> None:
+    """测试其他事件（如副露）到达时推测作废，不再执行预计算。"""
+    gate = threading.Event()
+
+    def build(recording_engine, player_id):
+        gate.wait(timeout=10)
+        return FakeBot(recording_engine, player_id)
+
+    speculator = TsumoSpeculator(build, engine, PLAYER_ID, is_3p=False)
+    _kamicha_discard(speculator)
+    speculator.observe({"type": "pon", "actor": 2, "target": 0, "pai": "9s", "consumed": ["9s", "9s"]})
+    gate.set()
+    speculator._thread.join(timeout=10)
+
+    engine.precompute.assert_not_called()
+    assert speculator.stats.cancelled == 1
+
+    # 作废后摸牌不计入命中统计
+    speculator.observe({"type": "tsumo", "actor": PLAYER_ID, "pai": "1m"})
+    assert speculator.stats.hits == 0
+    assert speculator.stats.misses == 0
+
+
+def test_unfinished_speculation_counts_as_miss(engine) -> None:
+    """测试真实摸牌时推测尚未完成计为未命中。"""
+    gate = threading.Event()
+
+    def build(recording_engine, player_id):
+        gate.wait(timeout=10)
+        return FakeBot(recording_engine, player_id)
+
+    speculator = TsumoSpeculator(build, engine, PLAYER_ID, is_3p=False)
+    _kamicha_discard(speculator)
+    speculator.observe({"type": "tsumo", "actor": PLAYER_ID, "pai": "1m"})
+    gate.set()
+    speculator._thread.join(timeout=10)
+
+    assert speculator.stats.misses == 1
+    engine.precompute.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "last_events",
+    [
+        [{"type": "dahai", "actor": 2, "pai": "1m", "tsumogiri": True}],
+        [{"type": "dahai", "actor": 0, "pai": "1m", "tsumogiri": True, "sync": True}],
+        [{"type": "reach", "actor": 0}, {"type": "dahai", "actor": 0, "pai": "1m", "tsumogiri": True}],
+    ],
+)
+def test_speculation_only_after_kamicha_discard(speculator, last_events) -> None:
+    """测试只在上家的非同步、非立直宣言打牌后开始推测。"""
+    history = [_start_kyoku(), *last_events]
+    speculator.maybe_start(history, [json.dumps(e) for e in history])
+    assert speculator.stats.started == 0
+
+
+def test_unsupported_engine_disables_speculation(engine, speculator) -> None:
+    """测试引擎不支持预计算时停止后续推测。"""
+    engine.precompute.return_value = False
+    _kamicha_discard(speculator)
+    speculator._thread.join(timeout=10)
+
+    assert speculator.supported is False
+    speculator.observe({"type": "tsumo", "actor": PLAYER_ID, "pai": "1m"})
+    _kamicha_discard(speculator)
+    assert speculator.stats.started == 1
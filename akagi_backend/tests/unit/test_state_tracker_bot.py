@@ -49,18 +49,16 @@ sys.modules["mjai.mlibriichi.tools"] = mock_mjai_mlibriichi_tools
 sys.modules["numpy"] = mock_numpy
 
 import akagi_ng.mjai_bot.bot
+import akagi_ng.mjai_bot.game_state
 
+importlib.reload(akagi_ng.mjai_bot.game_state)
 importlib.reload(akagi_ng.mjai_bot.bot)
 from akagi_ng.mjai_bot.bot import StateTrackerBot
 
 
 @pytest.fixture
 def bot():
-    with (
-        patch("akagi_ng.mjai_bot.bot.PlayerState") as MockPlayerState,
-        patch("akagi_ng.mjai_bot.bot.calc_shanten") as MockShanten,
-    ):
-        MockShanten.return_value = 0
+    with patch("akagi_ng.mjai_bot.game_state.PlayerState") as MockPlayerState:
         bot = StateTrackerBot()
         bot.player_state = MockPlayerState.return_value
         return bot
@@ -95,6 +93,11 @@ def test_find_daiminkan_candidates(bot):
     assert len(candidates) == 1
     assert candidates[0]["consumed"] == ["1m", "1m", "1m"]
     assert candidates[0]["event"]["type"] == "daiminkan"
+    # 杠前 1112m 听 2m / 3m，杠后只剩 2m 单骑（手牌中的牌计为可见）
+    assert candidates[0]["current_shanten"] == 0
+    assert candidates[0]["current_ukeire"] == 7
+    assert candidates[0]["next_shanten"] == 0
+    assert candidates[0]["next_ukeire"] == 3
 
 
 def test_find_ankan_candidates(bot):
@@ -112,7 +115,7 @@ def test_find_kakan_candidates(bot):
     bot.tehai_mjai = ["5m", "6m"]
     bot.player_id = 0
     # Mock 外部生成的内部私有变量
-    bot._StateTrackerBot__call_events = [{"type": "pon", "actor": 0, "consumed": ["5m", "5m"]}]
+    bot.state.call_events = [{"type": "pon", "actor": 0, "consumed": ["5m", "5m"]}]
 
     candidates = bot.find_kakan_candidates()
     assert len(candidates) == 1
@@ -126,7 +129,7 @@ def test_nukidora_3p(bot):
     event = {"type": "nukidora", "actor": 0}
     bot.react(event)
     # 检查 discard_events 是否记录了替换后的事件
-    assert any(e["type"] == "dahai" and e["pai"] == "N" for e in bot._StateTrackerBot__discard_events)
+    assert any(e["type"] == "dahai" and e["pai"] == "N" for e in bot.state.discard_events)
 
 
 def test_error_handling(bot):
@@ -136,3 +139,39 @@ def test_error_handling(bot):
         res = json.loads(res_str)
         assert res["type"] == "none"
         assert "error" in res
+
+
+def test_react_batch_decides_once(bot):
+    """测试批量回放时逐个事件更新状态，只对最后一个事件计算动作。"""
+    events = [
+        {"type": "tsumo", "actor": 0, "pai": "1m", "sync": True},
+        {"type": "dahai", "actor": 0, "pai": "1m", "tsumogiri": True, "sync": True},
+        {"type": "tsumo", "actor": 1, "pai": "?"},
+    ]
+    with patch.object(bot, "think", return_value="{}") as mock_think:
+        assert bot.react_batch(events) == "{}"
+
+    assert bot.player_state.update.call_count == 3
+    mock_think.assert_called_once()
+    assert len(bot.state.discard_events) == 1
+
+
+def test_react_batch_continues_after_bad_event(bot):
+    """测试批量回放中某个事件出错时，后续事件仍被应用到状态。"""
+    events = [
+        {"type": "tsumo", "actor": 0, "pai": "1m", "sync": True},
+        {"type": "dahai", "actor": 0, "pai": "1m", "tsumogiri": True, "sync": True},
+        {"type": "pon", "actor": 1, "target": 0, "pai": "1m", "consumed": ["1m", "1m"], "sync": True},
+        {"type": "dahai", "actor": 1, "pai": "9s", "tsumogiri": False},
+    ]
+    bot.player_state.update.side_effect = [None, None, RuntimeError("bad event"), None]
+
+    with patch.object(bot, "think", return_value="{}") as mock_think:
+        res = json.loads(bot.react_batch(events))
+
+    assert bot.player_state.update.call_count == 4
+    assert len(bot.state.discard_events) == 2
+    assert len(bot.state.call_events) == 1
+    assert res["type"] == "none"
+    assert "error" in res
+    mock_think.assert_not_called()
@@ -16,6 +16,7 @@ export interface FullRecommendationData {
   engine_type?: string;
   is_fallback?: boolean;
   circuit_open?: boolean;
+  circuit_state?: 'closed' | 'open' | 'half_open';
 }
 
 export interface NotificationItem {
@@ -49,12 +50,30 @@ export interface Settings {
     online: boolean;
     server: string;
     api_key: string;
+    hedge_budget_ms?: number;
   };
   model_config: {
     model_4p: string;
     model_3p: string;
     temperature: number;
     rule_based_agari_guard: boolean;
+    fused_inference?: boolean;
+    precision?: 'fp32' | 'int8' | 'bf16';
+    batch_window_ms?: number;
+    max_batch_size?: number;
+    q_cache_mb?: number;
+    speculative_tsumo?: boolean;
+    num_threads?: number;
+    num_interop_threads?: number;
+    inference_process?: boolean;
+    ensemble_4p?: string[];
+    ensemble_3p?: string[];
+    ensemble_aggregation?: 'mean' | 'min' | 'weighted';
+    ensemble_weights?: number[];
+    engine_memory_budget_mb?: number;
+    engine_idle_ttl_s?: number;
+    profile_every_n?: number;
+    profile_max_traces?: number;
   };
   autoplay?: {
     enabled: boolean;